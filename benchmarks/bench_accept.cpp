@@ -0,0 +1,108 @@
+/**
+ * @file bench_accept.cpp
+ * @brief New-connection rate with one listener vs N SO_REUSEPORT listeners
+ *
+ * Usage: crest_bench_accept [--model epoll|blocking] [--acceptors N]
+ *                           [--clients 64] [--seconds 5] [--port 18180]
+ *
+ * Every request opens a fresh connection and sends "Connection: close", so
+ * the run is bound by accept() throughput rather than handler time. The
+ * same load is run with 1 acceptor and with N (default: one per core).
+ */
+
+#include "crest/crest.hpp"
+#include "bench_util.hpp"
+#include <atomic>
+#include <iostream>
+#include <mutex>
+
+struct RunResult {
+    double seconds = 0;
+    size_t errors = 0;
+    bench::LatencyStats latency;
+};
+
+static RunResult run_connections(int port, int clients, int seconds) {
+    static const char request[] = "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n";
+
+    std::mutex samples_mutex;
+    std::vector<double> samples;
+    std::atomic<size_t> errors{0};
+
+    auto start = bench::Clock::now();
+    auto deadline = start + std::chrono::seconds(seconds);
+    std::vector<std::thread> threads;
+    for (int c = 0; c < clients; c++) {
+        threads.emplace_back([&] {
+            std::vector<double> local;
+            while (bench::Clock::now() < deadline) {
+                auto t0 = bench::Clock::now();
+                int fd = bench::connect_local(port, 1000);
+                bool ok = fd >= 0 &&
+                          bench::send_all(fd, request, sizeof(request) - 1) &&
+                          bench::read_until_close(fd);
+                if (fd >= 0) close(fd);
+                if (!ok) {
+                    errors++;
+                    continue;
+                }
+                local.push_back(bench::elapsed_us(t0, bench::Clock::now()));
+            }
+            std::lock_guard<std::mutex> lock(samples_mutex);
+            samples.insert(samples.end(), local.begin(), local.end());
+        });
+    }
+    for (auto& t : threads) t.join();
+
+    RunResult result;
+    result.seconds = bench::elapsed_us(start, bench::Clock::now()) / 1e6;
+    result.errors = errors;
+    result.latency = bench::summarize(samples);
+    return result;
+}
+
+static void bench_acceptors(crest::IoModel model, int acceptors, int port, int clients, int seconds) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.acceptors = acceptors;
+    crest::App app(config);
+    app.get("/ping", [](crest::Request&, crest::Response& res) {
+        res.json(200, R"({"pong":true})");
+    });
+
+    std::thread server([&] { app.run("127.0.0.1", port); });
+    if (!bench::wait_for_server(port)) {
+        std::cerr << "server did not start on port " << port << "\n";
+        std::exit(1);
+    }
+
+    RunResult r = run_connections(port, clients, seconds);
+
+    app.stop();
+    server.join();
+
+    printf("%9d %10zu %10.0f %10.1f %10.1f %10.1f %8zu\n", acceptors, r.latency.count,
+           static_cast<double>(r.latency.count) / r.seconds,
+           r.latency.p50_us, r.latency.p99_us, r.latency.max_us, r.errors);
+}
+
+int main(int argc, char** argv) {
+    std::string model = bench::arg_string(argc, argv, "--model", "epoll");
+    long cores = static_cast<long>(std::thread::hardware_concurrency());
+    int acceptors = static_cast<int>(bench::arg_long(argc, argv, "--acceptors", cores > 1 ? cores : 2));
+    int clients = static_cast<int>(bench::arg_long(argc, argv, "--clients", 64));
+    int seconds = static_cast<int>(bench::arg_long(argc, argv, "--seconds", 5));
+    int port = static_cast<int>(bench::arg_long(argc, argv, "--port", 18180));
+
+    crest::App::set_logging_enabled(false);
+    crest::IoModel io_model = model == "blocking" ? crest::IoModel::BLOCKING : crest::IoModel::EVENT_LOOP;
+
+    printf("model=%s clients=%d duration=%ds cores=%ld\n", model.c_str(), clients, seconds, cores);
+    printf("%9s %10s %10s %10s %10s %10s %8s\n", "acceptors", "conns", "conns/s",
+           "p50(us)", "p99(us)", "max(us)", "errors");
+
+    bench_acceptors(io_model, 1, port, clients, seconds);
+    bench_acceptors(io_model, acceptors, port + 1, clients, seconds);
+    return 0;
+}
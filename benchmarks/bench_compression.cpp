@@ -0,0 +1,146 @@
+/**
+ * @file bench_compression.cpp
+ * @brief CPU cost of CompressionMiddleware against the bytes it saves
+ *
+ * Usage: crest_bench_compression [--millis 300]
+ *
+ * Compresses four JSON payloads of the kind a Crest API sends:
+ *
+ *   object     one record with a few orders, about 600 bytes
+ *   list       100 records, about 16 KB
+ *   openapi    the /openapi.json of a 300-route app, about 150 KB
+ *   export     20,000 records, about 3.3 MB, compressed in streaming steps
+ *
+ * with gzip at levels 1 (the default), 4, 6 and 9, each for --millis of
+ * wall time on one thread. Each row reports the compressed size, the share
+ * of bytes saved, microseconds of CPU per body, input MB per second, and
+ * microseconds spent per KB saved: the price of the bandwidth.
+ *
+ * The "fresh" row repeats level 6 with a new zlib stream per body, the
+ * cost the per-thread stream avoids. The "cached" row serves the body as
+ * one marked immutable: hashing it and taking the level 9 bytes from a
+ * PrecompressedCache, which compressed it once before timing started.
+ */
+
+#include "crest/internal/app_internal.h"
+#include "middleware/compression.hpp"
+#include "swagger/openapi.hpp"
+#include "bench_util.hpp"
+#include <iostream>
+#include <zlib.h>
+
+static void noop(crest_request_t*, crest_response_t*) {}
+
+static std::string record(int i) {
+    return "{\"id\":" + std::to_string(i) + ",\"name\":\"Customer " + std::to_string(i) +
+           "\",\"email\":\"customer" + std::to_string(i) + "@example.com\",\"active\":" +
+           (i % 3 ? "true" : "false") + ",\"balance\":" + std::to_string(i * 37 % 10000) + "." +
+           std::to_string(i % 100) + ",\"tags\":[\"retail\",\"tier-" + std::to_string(i % 4) +
+           "\"],\"created_at\":\"2024-0" + std::to_string(1 + i % 9) + "-1" + std::to_string(i % 10) +
+           "T08:" + std::to_string(10 + i % 50) + ":00Z\"}";
+}
+
+static std::string records(int count) {
+    std::string json = "{\"data\":[";
+    for (int i = 0; i < count; i++) {
+        if (i > 0) json += ",";
+        json += record(i);
+    }
+    return json + "],\"total\":" + std::to_string(count) + "}";
+}
+
+static std::string object_payload() {
+    std::string json = "{\"user\":" + record(42) + ",\"orders\":[";
+    for (int i = 0; i < 6; i++) {
+        if (i > 0) json += ",";
+        json += "{\"order_id\":\"ord_" + std::to_string(1000 + i) + "\",\"status\":\"shipped\",\"items\":" +
+                std::to_string(i + 1) + ",\"total\":" + std::to_string(19 * (i + 1)) + ".99}";
+    }
+    return json + "]}";
+}
+
+static std::string openapi_payload() {
+    crest_app_t* app = crest_create();
+    for (int i = 0; i < 300; i++) {
+        std::string path = "/api/v1/resource" + std::to_string(i / 3) + "/{id}";
+        crest_method_t method = i % 3 == 0 ? CREST_GET : i % 3 == 1 ? CREST_PUT : CREST_DELETE;
+        crest_route(app, method, path.c_str(), noop, "Generated route");
+    }
+    std::string spec = crest::swagger::generate_openapi_spec(app);
+    crest_destroy(app);
+    return spec;
+}
+
+// A new stream for every body, as a compressor without per-thread state has to
+static bool compress_fresh(const std::string& in, std::string& out) {
+    z_stream z{};
+    if (deflateInit2(&z, 6, Z_DEFLATED, 15 + 16, 8, Z_DEFAULT_STRATEGY) != Z_OK) return false;
+    out.resize(deflateBound(&z, static_cast<uLong>(in.size())));
+    z.next_in = reinterpret_cast<Bytef*>(const_cast<char*>(in.data()));
+    z.avail_in = static_cast<uInt>(in.size());
+    z.next_out = reinterpret_cast<Bytef*>(out.data());
+    z.avail_out = static_cast<uInt>(out.size());
+    bool done = deflate(&z, Z_FINISH) == Z_STREAM_END;
+    out.resize(z.total_out);
+    deflateEnd(&z);
+    return done;
+}
+
+template <typename Fn>
+static void measure(const char* payload, const char* label, const std::string& in, long millis, Fn fn) {
+    std::string out;
+    long bodies = 0;
+    auto start = bench::Clock::now();
+    auto deadline = start + std::chrono::milliseconds(millis);
+    do {
+        if (!fn(in, out)) {
+            fprintf(stderr, "compression failed for %s\n", payload);
+            return;
+        }
+        bodies++;
+    } while (bench::Clock::now() < deadline);
+    double us = bench::elapsed_us(start, bench::Clock::now()) / static_cast<double>(bodies);
+    double saved = static_cast<double>(in.size() - out.size());
+    printf("%-8s %-6s %10zu %10zu %7.1f%% %10.1f %9.0f %12.2f\n", payload, label, in.size(), out.size(),
+           100.0 * saved / static_cast<double>(in.size()), us, static_cast<double>(in.size()) / us,
+           us / (saved / 1024));
+}
+
+int main(int argc, char** argv) {
+    long millis = bench::arg_long(argc, argv, "--millis", 300);
+
+    struct Payload {
+        const char* name;
+        std::string json;
+    };
+    const Payload payloads[] = {
+        {"object", object_payload()},
+        {"list", records(100)},
+        {"openapi", openapi_payload()},
+        {"export", records(20000)},
+    };
+
+    printf("%-8s %-6s %10s %10s %8s %10s %9s %12s\n", "payload", "level", "bytes", "gzip", "saved", "us/body",
+           "MB/s", "us/KB_saved");
+    for (const Payload& payload : payloads) {
+        for (int level : {1, 4, 6, 9}) {
+            std::string label = std::to_string(level);
+            measure(payload.name, label.c_str(), payload.json, millis, [level](const std::string& in, std::string& out) {
+                return crest::middleware::compress(crest::middleware::Encoding::GZIP, level, in.data(), in.size(), out);
+            });
+        }
+        if (payload.json.size() <= crest::middleware::kStreamThreshold) {
+            measure(payload.name, "fresh", payload.json, millis, compress_fresh);
+        }
+        crest::middleware::PrecompressedCache cache;
+        measure(payload.name, "cached", payload.json, millis, [&cache](const std::string& in, std::string& out) {
+            uint64_t hash = crest::middleware::hash_body(in.data(), in.size());
+            auto* body = cache.acquire("/bench", hash, in.data(), in.size(), crest::middleware::Encoding::GZIP, 9);
+            if (!body) return false;
+            if (out.empty()) out = body->data;
+            crest::middleware::release_compressed(body);
+            return true;
+        });
+    }
+    return 0;
+}
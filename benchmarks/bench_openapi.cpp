@@ -0,0 +1,60 @@
+/**
+ * @file bench_openapi.cpp
+ * @brief Time to generate the OpenAPI document for large route tables
+ *
+ * Usage: crest_bench_openapi [--routes 5000] [--iterations 20]
+ *
+ * Builds tables of a quarter, half and all of --routes routes, shaped like
+ * a REST API: five methods on each "/api/v{n}/resource{i}/{id}" path, and
+ * a shorthand request and response schema on every other route. For each
+ * table it generates the document --iterations times and reports the mean
+ * time per document, the time per route, which stays flat when generation
+ * is linear, and the size of the document.
+ */
+
+#include "crest/internal/app_internal.h"
+#include "swagger/openapi.hpp"
+#include "bench_util.hpp"
+#include <iostream>
+
+static void noop(crest_request_t*, crest_response_t*) {}
+
+static const crest_method_t kMethods[] = {CREST_GET, CREST_POST, CREST_PUT, CREST_DELETE, CREST_PATCH};
+
+static crest_app_t* build_app(size_t routes) {
+    crest_app_t* app = crest_create();
+    for (size_t i = 0; i < routes; i++) {
+        crest_method_t method = kMethods[i % 5];
+        std::string path = "/api/v" + std::to_string(1 + i % 3) + "/resource" + std::to_string(i / 5) + "/{id}";
+        crest_route(app, method, path.c_str(), noop, "Generated route");
+        if (i % 2 == 0) {
+            crest_set_request_schema(app, method, path.c_str(),
+                                     "{\"name\": \"string\", \"count\": \"integer\", \"tags\": [\"string\"]}");
+            crest_set_response_schema(app, method, path.c_str(),
+                                      "{\"id\": \"number\", \"owner\": {\"email\": \"email\"}}");
+        }
+    }
+    return app;
+}
+
+int main(int argc, char** argv) {
+    size_t route_count = static_cast<size_t>(bench::arg_long(argc, argv, "--routes", 5000));
+    long iterations = bench::arg_long(argc, argv, "--iterations", 20);
+
+    printf("%-8s %12s %12s %12s\n", "routes", "ms/doc", "ns/route", "doc_KB");
+    for (size_t routes : {route_count / 4, route_count / 2, route_count}) {
+        crest_app_t* app = build_app(routes);
+        size_t bytes = crest::swagger::generate_openapi_spec(app).size();  // warm up
+
+        auto start = bench::Clock::now();
+        for (long i = 0; i < iterations; i++) {
+            bytes = crest::swagger::generate_openapi_spec(app).size();
+        }
+        double us = bench::elapsed_us(start, bench::Clock::now()) / static_cast<double>(iterations);
+
+        printf("%-8zu %12.2f %12.0f %12.0f\n", routes, us / 1000, us * 1000 / static_cast<double>(routes),
+               static_cast<double>(bytes) / 1024);
+        crest_destroy(app);
+    }
+    return 0;
+}
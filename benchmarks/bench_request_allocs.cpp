@@ -0,0 +1,182 @@
+/**
+ * @file bench_request_allocs.cpp
+ * @brief Heap allocations per request, for both I/O models
+ *
+ * Usage: crest_bench_request_allocs [--requests 20000] [--port 18100]
+ *
+ * malloc, calloc and realloc are counted for the whole process while one
+ * keep-alive client, which allocates nothing itself, sends requests one at
+ * a time. Three routes are measured, and the first again with a new
+ * connection for every request:
+ *
+ *   static   a C++ handler that only writes a JSON response
+ *   reads    a C++ handler that also reads the path, a header and a path
+ *            parameter longer than the std::string small-string buffer
+ *   views    the same reads through path_view(), header_view() and
+ *            param_view()
+ *   connect  static, with "Connection: close"
+ *
+ * Counting needs glibc, where the allocator can be wrapped by name.
+ */
+
+#include "crest/crest.hpp"
+#include "bench_util.hpp"
+#include <atomic>
+#include <iostream>
+
+#if defined(__GLIBC__)
+
+extern "C" {
+void* __libc_malloc(size_t size);
+void* __libc_calloc(size_t count, size_t size);
+void* __libc_realloc(void* ptr, size_t size);
+}
+
+static std::atomic<bool> counting{false};
+static std::atomic<size_t> allocations{0};
+
+extern "C" void* malloc(size_t size) {
+    if (counting.load(std::memory_order_relaxed)) allocations.fetch_add(1, std::memory_order_relaxed);
+    return __libc_malloc(size);
+}
+
+extern "C" void* calloc(size_t count, size_t size) {
+    if (counting.load(std::memory_order_relaxed)) allocations.fetch_add(1, std::memory_order_relaxed);
+    return __libc_calloc(count, size);
+}
+
+extern "C" void* realloc(void* ptr, size_t size) {
+    if (counting.load(std::memory_order_relaxed)) allocations.fetch_add(1, std::memory_order_relaxed);
+    return __libc_realloc(ptr, size);
+}
+
+#endif
+
+// Read one response into a fixed buffer, using Content-Length to find its end
+static bool read_one(int fd, char* buffer, size_t size) {
+    size_t have = 0;
+    size_t total = 0;
+    while (total == 0 || have < total) {
+        ssize_t n = recv(fd, buffer + have, size - 1 - have, 0);
+        if (n <= 0) return false;
+        have += static_cast<size_t>(n);
+        buffer[have] = '\0';
+        if (total == 0) {
+            const char* end = strstr(buffer, "\r\n\r\n");
+            const char* length = strstr(buffer, "Content-Length: ");
+            if (!end || !length) continue;
+            total = static_cast<size_t>(end + 4 - buffer) + strtoul(length + 16, nullptr, 10);
+            if (total >= size) return false;
+        }
+    }
+    return true;
+}
+
+// Send one request and read its response, on a new connection if fd < 0
+static bool round_trip(int port, int& fd, const char* request, size_t len, bool reconnect) {
+    char buffer[8192];
+    if (fd < 0) fd = bench::connect_local(port);
+    bool ok = fd >= 0 && bench::send_all(fd, request, len) && read_one(fd, buffer, sizeof(buffer));
+    if (fd >= 0 && (!ok || reconnect)) {
+        close(fd);
+        fd = -1;
+    }
+    return ok;
+}
+
+static double measure(int port, const char* request, long requests, bool reconnect = false) {
+    int fd = -1;
+    size_t len = strlen(request);
+
+    // Warm up: the connection, worker threads and the allocator caches
+    for (int i = 0; i < 1000; i++) {
+        if (!round_trip(port, fd, request, len, reconnect)) return -1;
+    }
+
+    size_t before = 0;
+#if defined(__GLIBC__)
+    before = allocations.load();
+    counting = true;
+#endif
+    for (long i = 0; i < requests; i++) {
+        if (!round_trip(port, fd, request, len, reconnect)) return -1;
+    }
+    size_t counted = 0;
+#if defined(__GLIBC__)
+    counting = false;
+    counted = allocations.load() - before;
+#endif
+    if (fd >= 0) close(fd);
+    return static_cast<double>(counted) / static_cast<double>(requests);
+}
+
+static void bench_model(const char* name, crest::IoModel model, int port, long requests) {
+    static const char static_request[] =
+        "GET /hello HTTP/1.1\r\nHost: localhost\r\n\r\n";
+    static const char reads_request[] =
+        "GET /users/1234567890abcdef1234 HTTP/1.1\r\nHost: localhost\r\n"
+        "User-Agent: crest-bench-allocs/1.0 (linux)\r\n\r\n";
+    static const char close_request[] =
+        "GET /hello HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n";
+    static const char views_request[] =
+        "GET /views/1234567890abcdef1234 HTTP/1.1\r\nHost: localhost\r\n"
+        "User-Agent: crest-bench-allocs/1.0 (linux)\r\n\r\n";
+
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.worker_threads = 2;
+    config.max_keep_alive_requests = 1 << 30;
+    crest::App app(config);
+    app.get("/hello", [](crest::Request&, crest::Response& res) {
+        res.json(200, R"({"ok":true})");
+    });
+    app.get("/users/{id}", [](crest::Request& req, crest::Response& res) {
+        std::string path = req.path();
+        std::string agent = req.header("User-Agent");
+        std::string id = req.param("id");
+        res.json(path.empty() || agent.empty() || id.empty() ? 400 : 200, R"({"ok":true})");
+    });
+    app.get("/views/{id}", [](crest::Request& req, crest::Response& res) {
+        std::string_view path = req.path_view();
+        std::string_view agent = req.header_view("User-Agent");
+        std::string_view id = req.param_view("id");
+        res.json(path.empty() || agent.empty() || id.empty() ? 400 : 200, R"({"ok":true})");
+    });
+
+    std::thread server([&] { app.run("127.0.0.1", port); });
+    if (!bench::wait_for_server(port)) {
+        std::cerr << "server did not start on port " << port << "\n";
+        std::exit(1);
+    }
+
+    double static_allocs = measure(port, static_request, requests);
+    double reads_allocs = measure(port, reads_request, requests);
+    double views_allocs = measure(port, views_request, requests);
+    double connect_allocs = measure(port, close_request, requests, true);
+
+    app.stop();
+    server.join();
+
+    printf("%-10s %10.2f %10.2f %10.2f %10.2f\n", name, static_allocs, reads_allocs, views_allocs,
+           connect_allocs);
+}
+
+int main(int argc, char** argv) {
+    long requests = bench::arg_long(argc, argv, "--requests", 20000);
+    int port = static_cast<int>(bench::arg_long(argc, argv, "--port", 18100));
+
+    crest::App::set_logging_enabled(false);
+
+#if !defined(__GLIBC__)
+    printf("allocation counting needs glibc; the counts below are zero\n");
+#endif
+    printf("requests=%ld (allocations per request)\n", requests);
+    printf("%-10s %10s %10s %10s %10s\n", "model", "static", "reads", "views", "connect");
+
+    bench_model("blocking", crest::IoModel::BLOCKING, port, requests);
+#if defined(__linux__)
+    bench_model("event", crest::IoModel::EVENT_LOOP, port + 1, requests);
+#endif
+    return 0;
+}
@@ -0,0 +1,121 @@
+/**
+ * @file bench_router.cpp
+ * @brief Route lookup throughput: radix-tree router vs the old linear scan
+ *
+ * Usage: crest_bench_router [--routes 1000] [--lookups 2000000]
+ *
+ * Builds a table of --routes static routes spread over the five methods,
+ * the shape of a large REST API, and looks up a mix of hits and misses.
+ * The legacy path is the per-request loop the server used before: rebuild
+ * each route's method string and strcmp method and path in turn. A second
+ * table with "{id}" parameters, which the linear scan could not match at
+ * all, is measured with the tree alone.
+ */
+
+#include "router/route_tree.hpp"
+#include "bench_util.hpp"
+#include <iostream>
+
+namespace legacy {
+
+struct Route {
+    crest_method_t method;
+    std::string path;
+};
+
+const char* method_name(crest_method_t method) {
+    switch (method) {
+        case CREST_GET: return "GET";
+        case CREST_POST: return "POST";
+        case CREST_PUT: return "PUT";
+        case CREST_DELETE: return "DELETE";
+        case CREST_PATCH: return "PATCH";
+        default: return "";
+    }
+}
+
+long find(const std::vector<Route>& routes, const char* method, const char* path) {
+    for (size_t i = 0; i < routes.size(); i++) {
+        if (strcmp(method, method_name(routes[i].method)) == 0 && strcmp(path, routes[i].path.c_str()) == 0) {
+            return static_cast<long>(i);
+        }
+    }
+    return -1;
+}
+
+} // namespace legacy
+
+struct Lookup {
+    std::string method;
+    std::string path;
+};
+
+static const crest_method_t kMethods[] = {CREST_GET, CREST_POST, CREST_PUT, CREST_DELETE, CREST_PATCH};
+
+static std::string resource(size_t i) {
+    return "/api/v" + std::to_string(1 + i % 3) + "/resource" + std::to_string(i / 5);
+}
+
+// Every 8th lookup misses
+static std::vector<Lookup> lookups(size_t routes, size_t count, bool params) {
+    std::vector<Lookup> out;
+    uint32_t seed = 12345;
+    for (size_t i = 0; i < count; i++) {
+        seed = seed * 1103515245u + 12345u;
+        size_t r = (seed >> 8) % routes;
+        std::string path = resource(r) + (params ? "/" + std::to_string(seed % 100000) : "/items");
+        if (i % 8 == 7) path += "/missing";
+        out.push_back({legacy::method_name(kMethods[r % 5]), path});
+    }
+    return out;
+}
+
+template <typename Fn>
+static double lookups_per_second(Fn fn, const std::vector<Lookup>& queries, long total) {
+    long hits = 0;
+    auto start = bench::Clock::now();
+    for (long i = 0; i < total; i++) {
+        const Lookup& q = queries[static_cast<size_t>(i) % queries.size()];
+        hits += fn(q);
+    }
+    double seconds = bench::elapsed_us(start, bench::Clock::now()) / 1e6;
+    if (hits == 0) std::cerr << "nothing matched\n";
+    return static_cast<double>(total) / seconds;
+}
+
+int main(int argc, char** argv) {
+    size_t route_count = static_cast<size_t>(bench::arg_long(argc, argv, "--routes", 1000));
+    long total = bench::arg_long(argc, argv, "--lookups", 2000000);
+
+    std::vector<legacy::Route> table;
+    crest::router::Router tree;
+    crest::router::Router param_tree;
+    for (size_t i = 0; i < route_count; i++) {
+        crest_method_t method = kMethods[i % 5];
+        table.push_back({method, resource(i) + "/items"});
+        tree.insert(method, table.back().path, i);
+        param_tree.insert(method, resource(i) + "/{id}", i);
+    }
+
+    std::vector<Lookup> static_queries = lookups(route_count, 4096, false);
+    std::vector<Lookup> param_queries = lookups(route_count, 4096, true);
+
+    double old_rate = lookups_per_second([&](const Lookup& q) {
+        return legacy::find(table, q.method.c_str(), q.path.c_str()) >= 0;
+    }, static_queries, total / 20);
+    double new_rate = lookups_per_second([&](const Lookup& q) {
+        crest::router::RouteMatch match;
+        return tree.find(q.method, q.path, match);
+    }, static_queries, total);
+    double param_rate = lookups_per_second([&](const Lookup& q) {
+        crest::router::RouteMatch match;
+        return param_tree.find(q.method, q.path, match);
+    }, param_queries, total);
+
+    printf("routes=%zu lookups=%ld (legacy: %ld)\n", route_count, total, total / 20);
+    printf("%-22s %16s\n", "table", "lookups/sec");
+    printf("%-22s %16.0f\n", "static, linear scan", old_rate);
+    printf("%-22s %16.0f  (%.1fx)\n", "static, radix tree", new_rate, new_rate / old_rate);
+    printf("%-22s %16.0f\n", "{id} params, tree", param_rate);
+    return 0;
+}
@@ -0,0 +1,191 @@
+/**
+ * @file bench_server.cpp
+ * @brief Requests/sec and latency of the epoll event loops vs blocking I/O
+ *
+ * Usage: crest_bench_server [--model both|epoll|blocking] [--clients 64]
+ *                           [--seconds 5] [--slow 0] [--keep-alive 0|1]
+ *                           [--pipeline 1] [--acceptors 1]
+ *                           [--affinity off|on|both] [--port 18080]
+ *
+ * Without --keep-alive every request opens a new connection and sends
+ * "Connection: close"; with it each client reuses one connection.
+ * --pipeline N (implies --keep-alive) writes N requests per round trip and
+ * then reads the N responses; latency is reported per batch.
+ *
+ * --slow opens idle connections that never send a request, the way slow
+ * peers behave under load. Blocking I/O pins one worker per idle peer;
+ * the event loops keep serving everyone else.
+ *
+ * --affinity both runs every model twice, with threads floating and with
+ * loops and workers pinned to cores (rows marked "+pin"); combine it with
+ * --acceptors to keep each listener's threads on its own NUMA node.
+ */
+
+#include "crest/crest.hpp"
+#include "bench_util.hpp"
+#include <atomic>
+#include <iostream>
+#include <mutex>
+
+struct RunResult {
+    double seconds = 0;
+    size_t requests = 0;
+    size_t errors = 0;
+    bench::LatencyStats latency;
+};
+
+static RunResult run_load(int port, int clients, int seconds, bool keep_alive, int pipeline) {
+    static const char close_request[] = "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n";
+    static const char keep_alive_request[] = "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n";
+
+    std::string batch;
+    for (int i = 0; i < pipeline; i++) batch += keep_alive_request;
+
+    std::mutex samples_mutex;
+    std::vector<double> samples;
+    std::atomic<size_t> errors{0};
+    std::atomic<size_t> completed{0};
+
+    auto start = bench::Clock::now();
+    auto deadline = start + std::chrono::seconds(seconds);
+    std::vector<std::thread> threads;
+    for (int c = 0; c < clients; c++) {
+        threads.emplace_back([&] {
+            std::vector<double> local;
+            std::string buffer;
+            std::string response;
+            int fd = -1;
+            while (bench::Clock::now() < deadline) {
+                auto t0 = bench::Clock::now();
+                bool ok;
+                size_t answered = 0;
+                if (keep_alive) {
+                    if (fd < 0) {
+                        fd = bench::connect_local(port, 1000);
+                        buffer.clear();
+                    }
+                    ok = fd >= 0 && bench::send_all(fd, batch.data(), batch.size());
+                    bool closing = false;
+                    while (ok && !closing && answered < static_cast<size_t>(pipeline)) {
+                        ok = bench::read_response(fd, buffer, &response);
+                        if (!ok) break;
+                        answered++;
+                        // The server closes after max_keep_alive_requests
+                        closing = response.find("Connection: close") != std::string::npos;
+                    }
+                    if (fd >= 0 && (!ok || closing)) {
+                        close(fd);
+                        fd = -1;
+                    }
+                    ok = ok || answered > 0;
+                } else {
+                    fd = bench::connect_local(port, 1000);
+                    ok = fd >= 0 &&
+                         bench::send_all(fd, close_request, sizeof(close_request) - 1) &&
+                         bench::read_until_close(fd);
+                    if (fd >= 0) close(fd);
+                    fd = -1;
+                    answered = ok ? 1 : 0;
+                }
+                if (!ok) {
+                    errors++;
+                    continue;
+                }
+                completed += answered;
+                local.push_back(bench::elapsed_us(t0, bench::Clock::now()));
+            }
+            if (fd >= 0) close(fd);
+            std::lock_guard<std::mutex> lock(samples_mutex);
+            samples.insert(samples.end(), local.begin(), local.end());
+        });
+    }
+    for (auto& t : threads) t.join();
+
+    RunResult result;
+    result.seconds = bench::elapsed_us(start, bench::Clock::now()) / 1e6;
+    result.requests = completed;
+    result.errors = errors;
+    result.latency = bench::summarize(samples);
+    return result;
+}
+
+struct ServerOptions {
+    int acceptors = 1;
+    bool pinned = false;
+};
+
+static void bench_model(crest::IoModel model, std::string name, int port, ServerOptions options,
+                        int clients, int seconds, int slow, bool keep_alive, int pipeline) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.acceptors = options.acceptors;
+    config.cpu_affinity = options.pinned;
+    if (options.pinned) name += "+pin";
+    crest::App app(config);
+    app.get("/ping", [](crest::Request&, crest::Response& res) {
+        res.json(200, R"({"pong":true})");
+    });
+
+    std::thread server([&] { app.run("127.0.0.1", port); });
+    if (!bench::wait_for_server(port)) {
+        std::cerr << "server did not start on port " << port << "\n";
+        std::exit(1);
+    }
+
+    std::vector<int> idle;
+    for (int i = 0; i < slow; i++) {
+        int fd = bench::connect_local(port);
+        if (fd >= 0) idle.push_back(fd);
+    }
+
+    RunResult r = run_load(port, clients, seconds, keep_alive, pipeline);
+
+    for (int fd : idle) close(fd);
+    app.stop();
+    server.join();
+
+    printf("%-12s %8zu %10.0f %10.1f %10.1f %10.1f %8zu\n", name.c_str(), r.requests,
+           static_cast<double>(r.requests) / r.seconds,
+           r.latency.p50_us, r.latency.p99_us, r.latency.max_us, r.errors);
+}
+
+int main(int argc, char** argv) {
+    std::string model = bench::arg_string(argc, argv, "--model", "both");
+    int clients = static_cast<int>(bench::arg_long(argc, argv, "--clients", 64));
+    int seconds = static_cast<int>(bench::arg_long(argc, argv, "--seconds", 5));
+    int slow = static_cast<int>(bench::arg_long(argc, argv, "--slow", 0));
+    bool keep_alive = bench::arg_long(argc, argv, "--keep-alive", 0) != 0;
+    int pipeline = static_cast<int>(bench::arg_long(argc, argv, "--pipeline", 1));
+    if (pipeline < 1) pipeline = 1;
+    if (pipeline > 1) keep_alive = true;
+    int acceptors = static_cast<int>(bench::arg_long(argc, argv, "--acceptors", 1));
+    std::string affinity = bench::arg_string(argc, argv, "--affinity", "off");
+    int port = static_cast<int>(bench::arg_long(argc, argv, "--port", 18080));
+
+    crest::App::set_logging_enabled(false);
+
+    printf("clients=%d duration=%ds idle peers=%d keep-alive=%s pipeline=%d acceptors=%d\n", clients,
+           seconds, slow, keep_alive ? "on" : "off", pipeline, acceptors);
+    printf("%-12s %8s %10s %10s %10s %10s %8s\n", "model", "requests", "req/s",
+           "p50(us)", "p99(us)", "max(us)", "errors");
+
+    std::vector<bool> pinning;
+    if (affinity != "on") pinning.push_back(false);
+    if (affinity == "on" || affinity == "both") pinning.push_back(true);
+    for (bool pinned : pinning) {
+        ServerOptions options;
+        options.acceptors = acceptors;
+        options.pinned = pinned;
+        int base = port + (pinned ? 2 : 0);
+        if (model == "both" || model == "blocking") {
+            bench_model(crest::IoModel::BLOCKING, "blocking", base, options, clients, seconds, slow,
+                        keep_alive, pipeline);
+        }
+        if (model == "both" || model == "epoll") {
+            bench_model(crest::IoModel::EVENT_LOOP, "epoll", base + 1, options, clients, seconds, slow,
+                        keep_alive, pipeline);
+        }
+    }
+    return 0;
+}
@@ -0,0 +1,168 @@
+/**
+ * @file bench_static_files.cpp
+ * @brief App::static_dir() against a handler that reads the file itself
+ *
+ * Usage: crest_bench_static_files [--model both|epoll|blocking]
+ *                                 [--seconds 2] [--port 18200]
+ *
+ * Files of 1 KB, 100 KB and 100 MB are written to a temporary directory
+ * and fetched over one keep-alive connection, as fast as the client can
+ * read them, from two routes:
+ *
+ *   static    app.static_dir("/static", dir): small files from the in-memory
+ *             cache, the 100 MB file with sendfile(2)
+ *   handler   app.get("/handler/{name}") reading the file into a string
+ *             and answering with res.send()
+ *
+ * The client discards bodies as they arrive, so memory use and time
+ * reflect the server. Each row reports requests/sec, payload MB/sec and
+ * the mean and p99 latency per request.
+ */
+
+#include "crest/crest.hpp"
+#include "bench_util.hpp"
+#include <filesystem>
+#include <fstream>
+#include <iostream>
+#include <iterator>
+
+namespace fs = std::filesystem;
+
+// Read one response, counting its body without keeping it
+static bool read_discarding(int fd, std::string& head, size_t& body_bytes) {
+    char buf[65536];
+    head.clear();
+    size_t header_end;
+    while ((header_end = head.find("\r\n\r\n")) == std::string::npos) {
+        ssize_t n = recv(fd, buf, sizeof(buf), 0);
+        if (n <= 0) return false;
+        head.append(buf, static_cast<size_t>(n));
+    }
+    size_t cl = head.find("Content-Length: ");
+    if (cl == std::string::npos || cl > header_end) return false;
+    size_t total = strtoul(head.c_str() + cl + 16, nullptr, 10);
+    size_t have = head.size() - header_end - 4;
+    while (have < total) {
+        ssize_t n = recv(fd, buf, std::min(sizeof(buf), total - have), 0);
+        if (n <= 0) return false;
+        have += static_cast<size_t>(n);
+    }
+    body_bytes = total;
+    return have == total;
+}
+
+struct Row {
+    size_t requests = 0;
+    size_t bytes = 0;
+    double seconds = 0;
+    bench::LatencyStats latency;
+};
+
+static Row fetch(int port, const std::string& path, size_t expected, int seconds, size_t max_requests) {
+    Row row;
+    int fd = bench::connect_local(port, 30000);
+    if (fd < 0) return row;
+    std::string request = "GET " + path + " HTTP/1.1\r\nHost: localhost\r\n\r\n";
+    std::string head;
+    std::vector<double> samples;
+
+    auto start = bench::Clock::now();
+    auto deadline = start + std::chrono::seconds(seconds);
+    while (bench::Clock::now() < deadline && row.requests < max_requests) {
+        auto sent = bench::Clock::now();
+        size_t body = 0;
+        if (!bench::send_all(fd, request.data(), request.size()) ||
+            !read_discarding(fd, head, body) || body != expected) {
+            fprintf(stderr, "bad response for %s\n", path.c_str());
+            break;
+        }
+        samples.push_back(bench::elapsed_us(sent, bench::Clock::now()));
+        row.requests++;
+        row.bytes += body;
+    }
+    row.seconds = bench::elapsed_us(start, bench::Clock::now()) / 1e6;
+    row.latency = bench::summarize(samples);
+    close(fd);
+    return row;
+}
+
+static void bench_model(const char* name, crest::IoModel model, int port, const fs::path& dir,
+                        int seconds) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.max_keep_alive_requests = 1 << 30;
+    crest::App app(config);
+    app.static_dir("/static", dir.string());
+    app.get("/handler/{name}", [dir](crest::Request& req, crest::Response& res) {
+        std::ifstream in(dir / std::string(req.param_view("name")), std::ios::binary);
+        if (!in) {
+            res.json(404, R"({"error":"Not Found"})");
+            return;
+        }
+        std::string body((std::istreambuf_iterator<char>(in)), std::istreambuf_iterator<char>());
+        res.send(200, body, "application/octet-stream");
+    });
+
+    std::thread server([&] { app.run("127.0.0.1", port); });
+    if (!bench::wait_for_server(port)) {
+        std::cerr << "server did not start on port " << port << "\n";
+        std::exit(1);
+    }
+
+    struct Size {
+        const char* label;
+        const char* file;
+        size_t bytes;
+        size_t max_requests;
+    };
+    const Size sizes[] = {
+        {"1KB", "1k.bin", 1024, 1000000},
+        {"100KB", "100k.bin", 100 * 1024, 1000000},
+        {"100MB", "100m.bin", 100 * 1024 * 1024, 200},
+    };
+    for (const Size& size : sizes) {
+        for (const char* route : {"static", "handler"}) {
+            Row row = fetch(port, std::string("/") + route + "/" + size.file, size.bytes, seconds,
+                            size.max_requests);
+            double rate = row.seconds > 0 ? static_cast<double>(row.requests) / row.seconds : 0;
+            double mbps = row.seconds > 0 ? static_cast<double>(row.bytes) / row.seconds / 1e6 : 0;
+            printf("%-9s %-6s %-8s %10.0f %10.1f %10.1f %10.1f\n", name, size.label, route, rate, mbps,
+                   row.latency.mean_us, row.latency.p99_us);
+        }
+    }
+
+    app.stop();
+    server.join();
+}
+
+int main(int argc, char** argv) {
+    std::string model = bench::arg_string(argc, argv, "--model", "both");
+    int seconds = static_cast<int>(bench::arg_long(argc, argv, "--seconds", 2));
+    int port = static_cast<int>(bench::arg_long(argc, argv, "--port", 18200));
+
+    crest::App::set_logging_enabled(false);
+
+    fs::path dir = fs::temp_directory_path() / "crest_bench_static";
+    fs::create_directories(dir);
+    for (auto [file, bytes] : {std::pair<const char*, size_t>{"1k.bin", 1024},
+                               {"100k.bin", 100 * 1024},
+                               {"100m.bin", 100 * 1024 * 1024}}) {
+        std::string data(bytes, 'x');
+        std::ofstream(dir / file, std::ios::binary).write(data.data(), static_cast<std::streamsize>(bytes));
+    }
+
+    printf("%-9s %-6s %-8s %10s %10s %10s %10s\n", "model", "size", "route", "req/s", "MB/s", "mean_us",
+           "p99_us");
+    if (model == "both" || model == "blocking") {
+        bench_model("blocking", crest::IoModel::BLOCKING, port, dir, seconds);
+    }
+#if defined(__linux__)
+    if (model == "both" || model == "epoll") {
+        bench_model("epoll", crest::IoModel::EVENT_LOOP, port + 1, dir, seconds);
+    }
+#endif
+
+    fs::remove_all(dir);
+    return 0;
+}
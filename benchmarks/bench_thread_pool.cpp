@@ -0,0 +1,165 @@
+/**
+ * @file bench_thread_pool.cpp
+ * @brief Task throughput: work-stealing pool vs the old single-queue pool
+ *
+ * Usage: crest_bench_thread_pool [--tasks 400000] [--producers 4] [--work 200]
+ *
+ * Runs each pool at 2, 8, 32 and 64 threads with two workloads:
+ *
+ *   external  --producers threads (standing in for the reactor's event
+ *             loops) enqueue --tasks closures between them, each capturing
+ *             two shared_ptrs like the server's request closures
+ *   fan-out   tasks running on the pool enqueue the rest, the pattern of
+ *             handlers that hand work back to the pool
+ *
+ * Each task spins --work iterations. Every pool runs the workload twice and
+ * the second round is reported, once the queues have grown. The legacy
+ * pool is the single mutex, condition variable and
+ * std::queue<std::function> the server used before.
+ */
+
+#include "utils/thread_pool.hpp"
+#include "bench_util.hpp"
+#include <functional>
+#include <iostream>
+#include <memory>
+#include <queue>
+
+namespace legacy {
+
+class ThreadPool {
+public:
+    explicit ThreadPool(size_t num_threads) : stop_(false) {
+        for (size_t i = 0; i < num_threads; ++i) {
+            workers_.emplace_back([this] { worker_thread(); });
+        }
+    }
+
+    ~ThreadPool() {
+        {
+            std::unique_lock<std::mutex> lock(queue_mutex_);
+            stop_ = true;
+        }
+        condition_.notify_all();
+        for (std::thread& worker : workers_) worker.join();
+    }
+
+    void enqueue(std::function<void()> task) {
+        {
+            std::unique_lock<std::mutex> lock(queue_mutex_);
+            tasks_.push(std::move(task));
+        }
+        condition_.notify_one();
+    }
+
+private:
+    void worker_thread() {
+        while (true) {
+            std::function<void()> task;
+            {
+                std::unique_lock<std::mutex> lock(queue_mutex_);
+                condition_.wait(lock, [this] { return stop_ || !tasks_.empty(); });
+                if (stop_ && tasks_.empty()) return;
+                task = std::move(tasks_.front());
+                tasks_.pop();
+            }
+            task();
+        }
+    }
+
+    std::vector<std::thread> workers_;
+    std::queue<std::function<void()>> tasks_;
+    std::mutex queue_mutex_;
+    std::condition_variable condition_;
+    std::atomic<bool> stop_;
+};
+
+} // namespace legacy
+
+struct Counter {
+    std::atomic<long> done{0};
+};
+
+static long g_work = 200;
+
+static void spin(long iterations) {
+    volatile long sink = 0;
+    for (long i = 0; i < iterations; i++) sink = sink + i;
+}
+
+static void wait_for(const Counter& counter, long total) {
+    while (counter.done.load(std::memory_order_acquire) < total) std::this_thread::yield();
+}
+
+template <typename Pool>
+static double external(Pool& pool, long total, long producers) {
+    auto counter = std::make_shared<Counter>();
+    auto payload = std::make_shared<std::string>("request");
+    auto start = bench::Clock::now();
+
+    std::vector<std::thread> loops;
+    for (long p = 0; p < producers; p++) {
+        loops.emplace_back([&, p] {
+            for (long i = p; i < total; i += producers) {
+                pool.enqueue([counter, payload, i] {
+                    spin(g_work + (i & 1));
+                    counter->done.fetch_add(1, std::memory_order_release);
+                });
+            }
+        });
+    }
+    for (auto& loop : loops) loop.join();
+    wait_for(*counter, total);
+    return static_cast<double>(total) / (bench::elapsed_us(start, bench::Clock::now()) / 1e6);
+}
+
+template <typename Pool>
+static double fan_out(Pool& pool, long total) {
+    Counter counter;
+    const long roots = 64;
+    const long children = total / roots;
+    auto start = bench::Clock::now();
+
+    for (long r = 0; r < roots; r++) {
+        pool.enqueue([&pool, &counter, children] {
+            for (long c = 0; c < children; c++) {
+                pool.enqueue([&counter] {
+                    spin(g_work);
+                    counter.done.fetch_add(1, std::memory_order_release);
+                });
+            }
+        });
+    }
+    wait_for(counter, roots * children);
+    return static_cast<double>(roots * children) / (bench::elapsed_us(start, bench::Clock::now()) / 1e6);
+}
+
+// The first round grows the pool's queues; the second is timed
+template <typename Pool>
+static double measure(bool fan, size_t threads, long total, long producers) {
+    Pool pool(threads);
+    double rate = 0;
+    for (int round = 0; round < 2; round++) {
+        rate = fan ? fan_out(pool, total) : external(pool, total, producers);
+    }
+    return rate;
+}
+
+int main(int argc, char** argv) {
+    long total = bench::arg_long(argc, argv, "--tasks", 400000);
+    long producers = bench::arg_long(argc, argv, "--producers", 4);
+    g_work = bench::arg_long(argc, argv, "--work", 200);
+
+    printf("tasks=%ld producers=%ld work=%ld cores=%u\n", total, producers, g_work,
+           std::thread::hardware_concurrency());
+    printf("%-9s %8s %16s %16s %8s\n", "workload", "threads", "legacy tasks/s", "stealing tasks/s", "speedup");
+    for (bool fan : {false, true}) {
+        for (size_t threads : {2, 8, 32, 64}) {
+            double old_rate = measure<legacy::ThreadPool>(fan, threads, total, producers);
+            double new_rate = measure<crest::ThreadPool>(fan, threads, total, producers);
+            printf("%-9s %8zu %16.0f %16.0f %7.1fx\n", fan ? "fan-out" : "external", threads, old_rate,
+                   new_rate, new_rate / old_rate);
+        }
+    }
+    return 0;
+}
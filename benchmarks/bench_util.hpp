@@ -0,0 +1,169 @@
+/**
+ * @file bench_util.hpp
+ * @brief Shared helpers for the Crest benchmarks (POSIX sockets, timing, stats)
+ */
+
+#ifndef CREST_BENCH_UTIL_HPP
+#define CREST_BENCH_UTIL_HPP
+
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include <sys/socket.h>
+#include <sys/time.h>
+#include <netinet/in.h>
+#include <netinet/tcp.h>
+#include <arpa/inet.h>
+#include <unistd.h>
+
+namespace bench {
+
+using Clock = std::chrono::steady_clock;
+
+inline double elapsed_us(Clock::time_point start, Clock::time_point end) {
+    return std::chrono::duration<double, std::micro>(end - start).count();
+}
+
+/**
+ * @brief Read an integer option such as "--clients 64"
+ */
+inline long arg_long(int argc, char** argv, const char* name, long fallback) {
+    for (int i = 1; i + 1 < argc; i++) {
+        if (strcmp(argv[i], name) == 0) return strtol(argv[i + 1], nullptr, 10);
+    }
+    return fallback;
+}
+
+/**
+ * @brief Read a string option such as "--model epoll"
+ */
+inline std::string arg_string(int argc, char** argv, const char* name, const char* fallback) {
+    for (int i = 1; i + 1 < argc; i++) {
+        if (strcmp(argv[i], name) == 0) return argv[i + 1];
+    }
+    return fallback;
+}
+
+/**
+ * @brief Connect to 127.0.0.1:port with a receive timeout
+ * @return Socket descriptor or -1
+ */
+inline int connect_local(int port, int timeout_ms = 5000) {
+    int fd = socket(AF_INET, SOCK_STREAM, 0);
+    if (fd < 0) return -1;
+
+    struct timeval tv;
+    tv.tv_sec = timeout_ms / 1000;
+    tv.tv_usec = (timeout_ms % 1000) * 1000;
+    setsockopt(fd, SOL_SOCKET, SO_RCVTIMEO, &tv, sizeof(tv));
+    int one = 1;
+    setsockopt(fd, IPPROTO_TCP, TCP_NODELAY, &one, sizeof(one));
+
+    struct sockaddr_in addr = {};
+    addr.sin_family = AF_INET;
+    addr.sin_port = htons(static_cast<uint16_t>(port));
+    addr.sin_addr.s_addr = inet_addr("127.0.0.1");
+    if (connect(fd, reinterpret_cast<struct sockaddr*>(&addr), sizeof(addr)) < 0) {
+        close(fd);
+        return -1;
+    }
+    return fd;
+}
+
+inline bool send_all(int fd, const char* data, size_t len) {
+    while (len > 0) {
+        ssize_t n = send(fd, data, len, MSG_NOSIGNAL);
+        if (n <= 0) return false;
+        data += n;
+        len -= static_cast<size_t>(n);
+    }
+    return true;
+}
+
+/**
+ * @brief Read until the peer closes; returns false on timeout or error
+ */
+inline bool read_until_close(int fd, std::string* out = nullptr) {
+    char buf[16384];
+    while (true) {
+        ssize_t n = recv(fd, buf, sizeof(buf), 0);
+        if (n == 0) return true;
+        if (n < 0) return false;
+        if (out) out->append(buf, static_cast<size_t>(n));
+    }
+}
+
+/**
+ * @brief Read one Content-Length framed response; leftover bytes stay in buffer
+ * @return false on timeout, error or early close
+ */
+inline bool read_response(int fd, std::string& buffer, std::string* out = nullptr) {
+    char buf[16384];
+    while (true) {
+        size_t header_end = buffer.find("\r\n\r\n");
+        if (header_end != std::string::npos) {
+            size_t body_len = 0;
+            size_t cl = buffer.find("Content-Length: ");
+            if (cl != std::string::npos && cl < header_end) {
+                body_len = strtoul(buffer.c_str() + cl + 16, nullptr, 10);
+            }
+            size_t total = header_end + 4 + body_len;
+            if (buffer.size() >= total) {
+                if (out) out->assign(buffer, 0, total);
+                buffer.erase(0, total);
+                return true;
+            }
+        }
+        ssize_t n = recv(fd, buf, sizeof(buf), 0);
+        if (n <= 0) return false;
+        buffer.append(buf, static_cast<size_t>(n));
+    }
+}
+
+/**
+ * @brief Poll until the server accepts connections
+ */
+inline bool wait_for_server(int port, int timeout_ms = 5000) {
+    auto deadline = Clock::now() + std::chrono::milliseconds(timeout_ms);
+    while (Clock::now() < deadline) {
+        int fd = connect_local(port);
+        if (fd >= 0) {
+            close(fd);
+            return true;
+        }
+        std::this_thread::sleep_for(std::chrono::milliseconds(20));
+    }
+    return false;
+}
+
+struct LatencyStats {
+    size_t count = 0;
+    double mean_us = 0;
+    double p50_us = 0;
+    double p99_us = 0;
+    double max_us = 0;
+};
+
+inline LatencyStats summarize(std::vector<double>& samples) {
+    LatencyStats stats;
+    if (samples.empty()) return stats;
+    std::sort(samples.begin(), samples.end());
+    double sum = 0;
+    for (double s : samples) sum += s;
+    stats.count = samples.size();
+    stats.mean_us = sum / static_cast<double>(samples.size());
+    stats.p50_us = samples[samples.size() / 2];
+    stats.p99_us = samples[std::min(samples.size() - 1, samples.size() * 99 / 100)];
+    stats.max_us = samples.back();
+    return stats;
+}
+
+} // namespace bench
+
+#endif // CREST_BENCH_UTIL_HPP
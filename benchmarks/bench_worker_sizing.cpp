@@ -0,0 +1,127 @@
+/**
+ * @file bench_worker_sizing.cpp
+ * @brief Blocking handlers: fixed worker counts vs an adaptive pool
+ *
+ * Usage: crest_bench_worker_sizing [--clients 128] [--seconds 5]
+ *                                  [--io-ms 20] [--max-workers 256]
+ *                                  [--port 18090]
+ *
+ * Every request sleeps --io-ms in its handler, standing in for a blocking
+ * database or upstream call. Each client keeps one connection and sends its
+ * next request when the last is answered. The server runs three times:
+ *
+ *   default   the default worker count, two per core
+ *   maximum   a fixed pool of --max-workers
+ *   adaptive  the default count, allowed to grow to --max-workers
+ *
+ * The last column is the number of workers running when the load stops.
+ */
+
+#include "crest/crest.hpp"
+#include "bench_util.hpp"
+#include <atomic>
+#include <iostream>
+#include <mutex>
+
+struct RunResult {
+    double seconds = 0;
+    size_t requests = 0;
+    size_t errors = 0;
+    size_t workers = 0;
+    bench::LatencyStats latency;
+};
+
+static RunResult run_load(int port, int clients, int seconds) {
+    static const char request[] = "GET /io HTTP/1.1\r\nHost: localhost\r\n\r\n";
+
+    std::mutex samples_mutex;
+    std::vector<double> samples;
+    std::atomic<size_t> errors{0};
+
+    auto start = bench::Clock::now();
+    auto deadline = start + std::chrono::seconds(seconds);
+    std::vector<std::thread> threads;
+    for (int c = 0; c < clients; c++) {
+        threads.emplace_back([&] {
+            std::vector<double> local;
+            std::string buffer;
+            int fd = -1;
+            while (bench::Clock::now() < deadline) {
+                if (fd < 0) {
+                    fd = bench::connect_local(port, 10000);
+                    buffer.clear();
+                }
+                auto t0 = bench::Clock::now();
+                if (fd < 0 || !bench::send_all(fd, request, sizeof(request) - 1) ||
+                    !bench::read_response(fd, buffer)) {
+                    errors++;
+                    if (fd >= 0) close(fd);
+                    fd = -1;
+                    continue;
+                }
+                local.push_back(bench::elapsed_us(t0, bench::Clock::now()));
+            }
+            if (fd >= 0) close(fd);
+            std::lock_guard<std::mutex> lock(samples_mutex);
+            samples.insert(samples.end(), local.begin(), local.end());
+        });
+    }
+    for (auto& t : threads) t.join();
+
+    RunResult result;
+    result.seconds = bench::elapsed_us(start, bench::Clock::now()) / 1e6;
+    result.requests = samples.size();
+    result.errors = errors;
+    result.latency = bench::summarize(samples);
+    return result;
+}
+
+static void bench_sizing(const char* name, int min_workers, int max_workers, int port,
+                         int clients, int seconds, int io_ms) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.worker_threads = min_workers;
+    config.max_worker_threads = max_workers;
+    config.max_keep_alive_requests = 1 << 30;
+    crest::App app(config);
+    app.get("/io", [io_ms](crest::Request&, crest::Response& res) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(io_ms));
+        res.json(200, R"({"ok":true})");
+    });
+
+    std::thread server([&] { app.run("127.0.0.1", port); });
+    if (!bench::wait_for_server(port)) {
+        std::cerr << "server did not start on port " << port << "\n";
+        std::exit(1);
+    }
+
+    RunResult r = run_load(port, clients, seconds);
+    r.workers = app.pool_stats().workers;
+
+    app.stop();
+    server.join();
+
+    printf("%-9s %8zu %10.0f %10.1f %10.1f %10.1f %8zu %8zu\n", name, r.requests,
+           static_cast<double>(r.requests) / r.seconds, r.latency.p50_us / 1000,
+           r.latency.p99_us / 1000, r.latency.max_us / 1000, r.errors, r.workers);
+}
+
+int main(int argc, char** argv) {
+    int clients = static_cast<int>(bench::arg_long(argc, argv, "--clients", 128));
+    int seconds = static_cast<int>(bench::arg_long(argc, argv, "--seconds", 5));
+    int io_ms = static_cast<int>(bench::arg_long(argc, argv, "--io-ms", 20));
+    int max_workers = static_cast<int>(bench::arg_long(argc, argv, "--max-workers", 256));
+    int port = static_cast<int>(bench::arg_long(argc, argv, "--port", 18090));
+
+    crest::App::set_logging_enabled(false);
+
+    printf("clients=%d duration=%ds handler sleep=%dms max workers=%d cores=%u\n", clients,
+           seconds, io_ms, max_workers, std::thread::hardware_concurrency());
+    printf("%-9s %8s %10s %10s %10s %10s %8s %8s\n", "workers", "requests", "req/s",
+           "p50(ms)", "p99(ms)", "max(ms)", "errors", "final");
+
+    bench_sizing("default", 0, 0, port, clients, seconds, io_ms);
+    bench_sizing("maximum", max_workers, 0, port + 1, clients, seconds, io_ms);
+    bench_sizing("adaptive", 0, max_workers, port + 2, clients, seconds, io_ms);
+    return 0;
+}
@@ -19,6 +19,7 @@ class CrestConan(ConanFile):
     options = {"shared": [True, False], "fPIC": [True, False]}
     default_options = {"shared": False, "fPIC": True}
     exports_sources = "src/*", "include/*", "xmake.lua"
+    requires = "zlib/1.3.1"
 
     def config_options(self):
         """Configure options based on the target platform."""
@@ -38,13 +38,57 @@ typedef struct crest_app crest_app_t;
 typedef struct crest_request crest_request_t;
 typedef struct crest_response crest_response_t;
 
+typedef enum {
+    CREST_IO_AUTO,
+    CREST_IO_EVENT_LOOP,
+    CREST_IO_BLOCKING
+} crest_io_model_t;
+
+typedef enum {
+    CREST_OVERLOAD_REJECT,
+    CREST_OVERLOAD_BLOCK,
+    CREST_OVERLOAD_DROP_OLDEST
+} crest_overload_policy_t;
+
 typedef struct crest_config {
     const char* title;
     const char* description;
     const char* version;
     bool docs_enabled;
+    crest_io_model_t io_model;
+    int event_loops;
+    int keep_alive_timeout;
+    int max_keep_alive_requests;
+    int max_pipeline_depth;
+    int acceptors;
+    int prefork_processes;
+    size_t max_body_size;
+    size_t max_queued_requests;
+    crest_overload_policy_t overload_policy;
+    int worker_threads;
+    int max_worker_threads;
+    bool cpu_affinity;
 } crest_config_t;
 
+/* Worker pool figures, summed over the server's worker groups */
+typedef struct crest_pool_stats {
+    size_t workers;
+    size_t queued;
+    size_t queue_capacity;  /* 0 = unbounded */
+    uint64_t rejected;
+    uint64_t dropped;
+    uint64_t blocked;
+} crest_pool_stats_t;
+
+/* Heap allocations the server made on the request path since it started.
+   Memory is reused between requests, so in steady state these stop
+   growing; allocations made by handlers are not counted. */
+typedef struct crest_alloc_stats {
+    uint64_t contexts;      /* connection contexts and request jobs created */
+    uint64_t buffers;       /* receive and response buffers grown */
+    uint64_t arena_blocks;  /* request scratch memory blocks */
+} crest_alloc_stats_t;
+
 typedef enum {
     CREST_GET,
     CREST_POST,
@@ -114,6 +158,24 @@ CREST_API void crest_set_request_schema(crest_app_t* app, crest_method_t method,
  */
 CREST_API void crest_set_response_schema(crest_app_t* app, crest_method_t method, const char* path, const char* schema);
 
+/**
+ * @brief Stream a route's request body to its handler instead of buffering it
+ * 
+ * The handler is called as soon as the request headers arrive and pulls the
+ * body with crest_request_read_body while the client is still sending it.
+ * Only a small window of the body is held in memory at a time, so the route
+ * may accept bodies far larger than the app's max_body_size. Any part of the
+ * body the handler leaves unread is discarded once it returns. If the body
+ * turns out malformed or too large while the handler reads it, its response
+ * is replaced with 400 or 413 and the connection is closed.
+ * 
+ * @param app Application instance
+ * @param method HTTP method
+ * @param path Route path
+ * @param max_bytes Largest accepted body in bytes (0 = the app's max_body_size)
+ */
+CREST_API void crest_set_body_streaming(crest_app_t* app, crest_method_t method, const char* path, size_t max_bytes);
+
 /**
  * @brief Start the server
  * @param app Application instance
@@ -123,6 +185,166 @@ CREST_API void crest_set_response_schema(crest_app_t* app, crest_method_t method
  */
 CREST_API int crest_run(crest_app_t* app, const char* host, int port);
 
+/**
+ * @brief Select the connection I/O model used by crest_run
+ * 
+ * CREST_IO_EVENT_LOOP runs non-blocking, edge-triggered epoll event loops that
+ * own every connection and only hand fully-received requests to the worker
+ * pool. CREST_IO_BLOCKING uses one blocking worker per connection.
+ * CREST_IO_AUTO (default) picks the event loop where it is available (Linux).
+ * 
+ * @param app Application instance
+ * @param model I/O model
+ */
+CREST_API void crest_set_io_model(crest_app_t* app, crest_io_model_t model);
+
+/**
+ * @brief Set the number of event loops used by the event loop I/O model
+ * @param app Application instance
+ * @param count Number of loops (0 = one per CPU core)
+ */
+CREST_API void crest_set_event_loops(crest_app_t* app, int count);
+
+/**
+ * @brief Set the number of worker threads that run handlers
+ * 
+ * With max_threads above min_threads the pool sizes itself: it adds
+ * workers while requests wait in its queue longer than about 10 ms and all
+ * workers are busy (handlers blocked on I/O, say), and retires workers that
+ * stay idle for 10 seconds, never going below min_threads. Changes are
+ * logged. With several acceptors the counts are split between their worker
+ * groups. Takes effect on the next crest_run.
+ * 
+ * @param app Application instance
+ * @param min_threads Workers started (0 = default, two per CPU core)
+ * @param max_threads Most workers (0 or min_threads = fixed size)
+ */
+CREST_API void crest_set_worker_threads(crest_app_t* app, int min_threads, int max_threads);
+
+/**
+ * @brief Pin event loop and worker threads to CPU cores (Linux only)
+ * 
+ * Each event loop and each worker is bound to one core, so threads stop
+ * migrating and the buffers they allocate stay in memory local to that
+ * core. With several acceptors, every acceptor's loops and workers are
+ * kept on one NUMA node, spreading the acceptors over the nodes. Ignored
+ * in prefork worker processes. Takes effect on the next crest_run.
+ * 
+ * @param app Application instance
+ * @param enabled true to pin threads (default false)
+ */
+CREST_API void crest_set_cpu_affinity(crest_app_t* app, bool enabled);
+
+/**
+ * @brief Configure HTTP/1.1 persistent connections
+ * 
+ * Connections stay open between requests unless the client sends
+ * "Connection: close" (or speaks HTTP/1.0 without "Connection: keep-alive").
+ * 
+ * @param app Application instance
+ * @param timeout_seconds Idle seconds before a persistent connection is closed (0 = default, 5)
+ * @param max_requests Requests served per connection before it is closed (0 = default, 1000; 1 disables keep-alive)
+ */
+CREST_API void crest_set_keep_alive(crest_app_t* app, int timeout_seconds, int max_requests);
+
+/**
+ * @brief Limit how many pipelined requests per connection run at once
+ * 
+ * Requests a client sends without waiting for replies are dispatched to the
+ * worker pool in parallel, up to this depth, and answered in order. Further
+ * requests stay buffered until earlier responses are written.
+ * 
+ * @param app Application instance
+ * @param depth Maximum in-flight requests per connection (0 = default, 16; 1 = sequential)
+ */
+CREST_API void crest_set_pipeline_depth(crest_app_t* app, int depth);
+
+/**
+ * @brief Set the number of listening sockets accepting connections
+ * 
+ * With more than one acceptor, crest_run opens that many SO_REUSEPORT
+ * listeners on the same host:port, each with its own accept loop and worker
+ * group, and the kernel spreads new connections across them. Falls back to
+ * a single listener where SO_REUSEPORT is unavailable.
+ * 
+ * @param app Application instance
+ * @param count Number of listeners (0 = default, 1)
+ */
+CREST_API void crest_set_acceptors(crest_app_t* app, int count);
+
+/**
+ * @brief Serve from pre-forked worker processes (POSIX only)
+ * 
+ * crest_run binds the listening socket(s) in a master process, forks this
+ * many workers that each run the server loop, and restarts any worker that
+ * exits or crashes. SIGTERM, SIGINT and SIGQUIT sent to the master stop all
+ * workers; SIGHUP makes every worker finish its requests and restart.
+ * 
+ * @param app Application instance
+ * @param processes Worker processes (0 = disabled, serve in-process)
+ */
+CREST_API void crest_set_prefork(crest_app_t* app, int processes);
+
+/**
+ * @brief Limit the size of a request body
+ * 
+ * Applies to Content-Length and chunked bodies alike. A request that
+ * declares a larger Content-Length is answered with 413 as soon as its
+ * headers arrive, before any of the body is read; a chunked body is cut off
+ * with 413 once it grows past the limit.
+ * 
+ * @param app Application instance
+ * @param max_bytes Largest accepted body in bytes (0 = default, 1 MiB)
+ */
+CREST_API void crest_set_max_body_size(crest_app_t* app, size_t max_bytes);
+
+/**
+ * @brief Bound the requests waiting for a worker, and choose how to shed load
+ * 
+ * Requests are queued for the worker pool once they have been read. When
+ * max_queued are already waiting, the policy decides:
+ * - CREST_OVERLOAD_REJECT: the new request is answered 503 at once
+ * - CREST_OVERLOAD_BLOCK: the request waits until a worker frees a place.
+ *   With blocking I/O the acceptor stops accepting meanwhile, leaving
+ *   clients in the kernel's queue. An event loop never waits: it holds
+ *   such requests in arrival order and hands them over as room frees,
+ *   while it keeps serving its connections, each of which stops being
+ *   read once its pipeline is full
+ * - CREST_OVERLOAD_DROP_OLDEST: the longest-waiting request is answered
+ *   503 and the new one takes its place
+ * 
+ * 503 responses are prebuilt, carry "Retry-After: 1" and close the
+ * connection. With several acceptors the limit is split between their
+ * worker groups. Takes effect on the next crest_run.
+ * 
+ * @param app Application instance
+ * @param max_queued Waiting requests (0 keeps the current value; default
+ *        4096; SIZE_MAX = unbounded)
+ * @param policy What to do with a request that finds the queue full
+ */
+CREST_API void crest_set_queue_limit(crest_app_t* app, size_t max_queued, crest_overload_policy_t policy);
+
+/**
+ * @brief Read the worker pool's queue depth and load-shedding counters
+ * @param app Application instance
+ * @param stats Filled in on success
+ * @return 0 on success, -1 if the server is not running
+ */
+CREST_API int crest_get_pool_stats(crest_app_t* app, crest_pool_stats_t* stats);
+
+/**
+ * @brief Read how often the server allocated memory on the request path
+ * 
+ * Connection state, buffers and scratch memory are recycled from request
+ * to request; these counters show how often that failed and memory had to
+ * be allocated. With prefork workers, each process counts its own.
+ * 
+ * @param app Application instance
+ * @param stats Filled in on success
+ * @return 0 on success, -1 if the server is not running
+ */
+CREST_API int crest_get_alloc_stats(crest_app_t* app, crest_alloc_stats_t* stats);
+
 /**
  * @brief Stop the server
  * @param app Application instance
@@ -150,6 +372,21 @@ CREST_API const char* crest_request_get_method(crest_request_t* req);
  */
 CREST_API const char* crest_request_get_body(crest_request_t* req);
 
+/**
+ * @brief Read the next part of the request body
+ * 
+ * Works for every route. On a streaming route (crest_set_body_streaming) it
+ * waits for the client to send more of the body, and crest_request_get_body
+ * returns NULL; otherwise it copies from the buffered body.
+ * 
+ * @param req Request object
+ * @param buffer Destination
+ * @param size Space at buffer
+ * @return Bytes read, 0 once the whole body has been read, or -1 if the body
+ *         is malformed, over its size limit or the client went away
+ */
+CREST_API int64_t crest_request_read_body(crest_request_t* req, void* buffer, size_t size);
+
 /**
  * @brief Get query parameter
  * @param req Request object
@@ -166,6 +403,14 @@ CREST_API const char* crest_request_get_query(crest_request_t* req, const char*
  */
 CREST_API const char* crest_request_get_header(crest_request_t* req, const char* key);
 
+/**
+ * @brief Get a path parameter captured by the matched route
+ * @param req Request object
+ * @param name Parameter name, e.g. "id" for a route "/users/{id}"
+ * @return Percent-decoded value or NULL
+ */
+CREST_API const char* crest_request_get_param(crest_request_t* req, const char* name);
+
 /**
  * @brief Send JSON response
  * @param res Response object
@@ -190,6 +435,47 @@ CREST_API void crest_response_text(crest_response_t* res, int status, const char
  */
 CREST_API void crest_response_html(crest_response_t* res, int status, const char* html);
 
+/**
+ * @brief Send a body of any bytes, which may include NUL
+ * @param res Response object
+ * @param status HTTP status code
+ * @param content_type Content type, e.g. "image/png"; NULL for
+ *        "application/octet-stream"
+ * @param data Body; copied before the call returns
+ * @param length Body size in bytes
+ */
+CREST_API void crest_response_bytes(crest_response_t* res, int status, const char* content_type,
+                                    const void* data, size_t length);
+
+/**
+ * @brief Send a buffer as the body without copying it
+ * 
+ * The response takes data and writes it as it is. Once it has been sent,
+ * or if it cannot be, release(data) is called, from whichever thread
+ * finishes with it; pass NULL as release for data that outlives the
+ * server, such as a static array.
+ * 
+ * @param res Response object
+ * @param status HTTP status code
+ * @param content_type Content type; NULL for "application/octet-stream"
+ * @param data Body
+ * @param length Body size in bytes
+ * @param release Frees data, e.g. free; may be NULL
+ */
+CREST_API void crest_response_bytes_owned(crest_response_t* res, int status, const char* content_type,
+                                          void* data, size_t length, void (*release)(void* data));
+
+/**
+ * @brief Mark the body written as the same on every request to the route
+ * 
+ * For bodies such as a fixed JSON document. CompressionMiddleware then
+ * compresses such a body once and serves later requests from memory. The
+ * mark is dropped if another body is written.
+ * 
+ * @param res Response object, after its body has been written
+ */
+CREST_API void crest_response_mark_immutable(crest_response_t* res);
+
 /**
  * @brief Set response header
  * @param res Response object
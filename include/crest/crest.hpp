@@ -13,9 +13,11 @@
 
 #include "crest.h"
 #include <string>
+#include <string_view>
 #include <functional>
 #include <memory>
 #include <map>
+#include <span>
 #include <vector>
 
 namespace crest {
@@ -47,6 +49,21 @@ enum class Status {
     SERVICE_UNAVAILABLE = 503
 };
 
+enum class IoModel {
+    AUTO = CREST_IO_AUTO,
+    EVENT_LOOP = CREST_IO_EVENT_LOOP,
+    BLOCKING = CREST_IO_BLOCKING
+};
+
+enum class OverloadPolicy {
+    REJECT = CREST_OVERLOAD_REJECT,
+    BLOCK = CREST_OVERLOAD_BLOCK,
+    DROP_OLDEST = CREST_OVERLOAD_DROP_OLDEST
+};
+
+using PoolStats = crest_pool_stats_t;
+using AllocStats = crest_alloc_stats_t;
+
 class Request {
 public:
     Request(crest_request_t* req) : req_(req) {}
@@ -54,11 +71,54 @@ public:
     std::string path() const;
     std::string method() const;
     std::string body() const;
+    
+    /**
+     * @brief Read the next part of the body
+     * 
+     * On a streaming route this waits for the client to send more; body()
+     * then returns whatever has not been read yet.
+     * 
+     * @return Bytes read; 0 once the body is exhausted or reading it failed
+     */
+    size_t read_body(char* buffer, size_t size);
+    
+    /**
+     * @brief Call on_data with each part of the body as it arrives
+     * @return false if the body could not be read completely
+     */
+    bool read_body(const std::function<void(const char* data, size_t size)>& on_data);
+    
+    /**
+     * @brief Why reading the body failed: 400 (malformed or cut short),
+     * 413 (over the size limit), or 0 if it has not
+     */
+    int body_error() const;
+    
     std::string query(const std::string& key) const;
     std::string header(const std::string& key) const;
     std::map<std::string, std::string> queries() const;
     std::map<std::string, std::string> headers() const;
     
+    /**
+     * @brief Path parameter captured by the route, e.g. "id" for
+     * "/users/{id}"; empty if there is none
+     */
+    std::string param(const std::string& name) const;
+    std::map<std::string, std::string> params() const;
+    
+    /**
+     * @brief The same values without copying them into std::strings
+     * 
+     * The views point into the request buffer and stay valid until the
+     * handler returns. body_view() is empty on a streaming route.
+     */
+    std::string_view path_view() const;
+    std::string_view method_view() const;
+    std::string_view body_view() const;
+    std::string_view query_view(const char* key) const;
+    std::string_view header_view(const char* key) const;
+    std::string_view param_view(const char* name) const;
+    
     crest_request_t* raw() { return req_; }
     
 private:
@@ -75,6 +135,39 @@ public:
     void text(int status, const std::string& text);
     void html(Status status, const std::string& html);
     void html(int status, const std::string& html);
+    
+    /**
+     * @brief Send a body of any bytes; it is copied before the call returns
+     */
+    void send(Status status, std::string_view body,
+              const std::string& content_type = "application/octet-stream");
+    void send(int status, std::string_view body,
+              const std::string& content_type = "application/octet-stream");
+    void send(Status status, std::span<const std::byte> body,
+              const std::string& content_type = "application/octet-stream");
+    void send(int status, std::span<const std::byte> body,
+              const std::string& content_type = "application/octet-stream");
+    
+    /**
+     * @brief Send a body the response takes over instead of copying
+     * 
+     * The buffer is freed once it has been written to the client.
+     */
+    void send_owned(Status status, std::string&& body,
+                    const std::string& content_type = "application/octet-stream");
+    void send_owned(int status, std::string&& body,
+                    const std::string& content_type = "application/octet-stream");
+    void send_owned(Status status, std::vector<std::byte>&& body,
+                    const std::string& content_type = "application/octet-stream");
+    void send_owned(int status, std::vector<std::byte>&& body,
+                    const std::string& content_type = "application/octet-stream");
+    
+    /**
+     * @brief Mark the body sent as the same on every request to the route,
+     * so CompressionMiddleware compresses it only once
+     */
+    void mark_immutable();
+    
     void set_header(const std::string& key, const std::string& value);
     
     crest_response_t* raw() { return res_; }
@@ -95,6 +188,19 @@ struct Config {
     std::string proxy_url;
     int max_connections = 1000;
     int timeout_seconds = 30;
+    IoModel io_model = IoModel::AUTO;
+    int event_loops = 0;
+    int keep_alive_timeout = 5;
+    int max_keep_alive_requests = 1000;
+    int max_pipeline_depth = 16;
+    int acceptors = 1;
+    int prefork_processes = 0;
+    size_t max_body_size = 1024 * 1024;
+    size_t max_queued_requests = 4096;
+    OverloadPolicy overload_policy = OverloadPolicy::REJECT;
+    int worker_threads = 0;      // 0 = two per CPU core
+    int max_worker_threads = 0;  // above worker_threads: grow with queue delay
+    bool cpu_affinity = false;   // pin loops and workers to cores (Linux)
 };
 
 class App {
@@ -190,6 +296,37 @@ public:
      */
     App& set_response_schema(Method method, const std::string& path, const std::string& schema);
     
+    /**
+     * @brief Stream a route's request body to its handler instead of buffering it
+     * 
+     * The handler runs as soon as the headers arrive and reads the body with
+     * Request::read_body() while it is still being received.
+     * 
+     * @param method HTTP method
+     * @param path Route path
+     * @param max_bytes Largest accepted body (0 = the app's max_body_size)
+     * @return Reference to this app for chaining
+     */
+    App& set_body_streaming(Method method, const std::string& path, size_t max_bytes = 0);
+    
+    /**
+     * @brief Serve the files under a directory with GET
+     * 
+     * A request for prefix + "/a/b.css" is answered with root/a/b.css. Small
+     * files are cached in memory and larger ones sent with sendfile(2).
+     * Responses carry ETag and Last-Modified and answer conditional and
+     * single-range requests; a "name.br" or "name.gz" next to a file is sent
+     * instead to clients that accept that encoding. A directory is answered
+     * with its index.html.
+     * 
+     * @param prefix URL path the files appear under, e.g. "/assets"
+     * @param root Directory to serve
+     * @param dotfiles Serve files and directories whose names start with
+     * "."; by default they are answered with 404
+     * @return Reference to this app for chaining
+     */
+    App& static_dir(const std::string& prefix, const std::string& root, bool dotfiles = false);
+    
     /**
      * @brief Start the server
      * @param host Host address
@@ -226,6 +363,84 @@ public:
      */
     void set_proxy(const std::string& proxy_url);
     
+    /**
+     * @brief Select the connection I/O model
+     * @param model Event loop (epoll) or blocking worker-per-connection
+     */
+    void set_io_model(IoModel model);
+    
+    /**
+     * @brief Set the number of event loops
+     * @param count Number of loops (0 = one per CPU core)
+     */
+    void set_event_loops(int count);
+    
+    /**
+     * @brief Set the number of worker threads
+     * @param min_threads Workers started (0 = two per CPU core)
+     * @param max_threads Above min_threads, the pool grows while requests
+     * wait and shrinks when idle (0 = fixed size)
+     */
+    void set_worker_threads(int min_threads, int max_threads = 0);
+    
+    /**
+     * @brief Pin event loops and workers to cores, each acceptor's threads
+     * on one NUMA node (Linux only)
+     * @param enabled true to pin threads
+     */
+    void set_cpu_affinity(bool enabled);
+    
+    /**
+     * @brief Configure HTTP/1.1 persistent connections
+     * @param timeout_seconds Idle seconds before a connection is closed
+     * @param max_requests Requests per connection (1 disables keep-alive)
+     */
+    void set_keep_alive(int timeout_seconds, int max_requests);
+    
+    /**
+     * @brief Limit in-flight pipelined requests per connection
+     * @param depth Maximum parallel requests per connection (1 = sequential)
+     */
+    void set_pipeline_depth(int depth);
+    
+    /**
+     * @brief Set the number of SO_REUSEPORT listeners
+     * @param count Listeners, each with its own accept loop and worker group
+     */
+    void set_acceptors(int count);
+    
+    /**
+     * @brief Serve from supervised worker processes (POSIX only)
+     * @param processes Worker processes forked by run() (0 = in-process)
+     */
+    void set_prefork(int processes);
+    
+    /**
+     * @brief Limit request bodies; larger ones are answered with 413
+     * @param max_bytes Largest accepted body in bytes
+     */
+    void set_max_body_size(size_t max_bytes);
+    
+    /**
+     * @brief Bound the requests waiting for a worker
+     * @param max_queued Waiting requests (SIZE_MAX = unbounded)
+     * @param policy Answer new requests 503, stop accepting, or answer the
+     * oldest waiting request 503 once the queue is full
+     */
+    void set_queue_limit(size_t max_queued, OverloadPolicy policy = OverloadPolicy::REJECT);
+    
+    /**
+     * @brief Queue depth and load-shedding counters of the running server
+     * @throws Exception if the server is not running
+     */
+    PoolStats pool_stats() const;
+    
+    /**
+     * @brief Allocations the running server made on the request path
+     * @throws Exception if the server is not running
+     */
+    AllocStats alloc_stats() const;
+    
     /**
      * @brief Enable or disable console logging
      * @param enabled true to enable, false to disable
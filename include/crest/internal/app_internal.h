@@ -25,6 +25,8 @@ typedef struct {
     void* cpp_handler;
     char* request_schema;
     char* response_schema;
+    bool stream_body;
+    size_t max_body_size;  /* streamed body limit; 0 = the app's */
 } crest_route_entry_t;
 
 struct crest_app {
@@ -38,26 +40,227 @@ struct crest_app {
     crest_route_entry_t* routes;
     size_t route_count;
     size_t route_capacity;
+    void* route_table;  /* crest::router::RouteTable: lock-free lookup for requests */
+    void* docs_cache;   /* crest::server::DocsCache: the docs pages, built once per docs_version */
+    uint64_t docs_version;  /* bumped under route_mutex when what the docs show changes */
     bool running;
     int server_socket;
     void* route_mutex;
     void* thread_pool;
+    void* server;
+    crest_io_model_t io_model;
+    int event_loops;
+    int keep_alive_timeout;
+    int max_keep_alive_requests;
+    int max_pipeline_depth;
+    int acceptors;
+    int prefork_processes;
+    size_t max_body_size;
+    size_t max_queued_requests;
+    crest_overload_policy_t overload_policy;
+    int worker_threads;
+    int max_worker_threads;
+    bool cpu_affinity;
 };
 
+/* Fields indexed per request; more headers are rejected with 431 by the
+   parser, more query parameters are ignored */
+#define CREST_MAX_FIELDS 64
+
+/* Open-addressing slots per index: a power of two at least twice
+   CREST_MAX_FIELDS, so probe sequences stay short */
+#define CREST_FIELD_SLOTS 128
+
+/* A header or query parameter; both strings point into the request buffer */
+typedef struct {
+    const char* name;
+    const char* value;
+    size_t name_length;
+} crest_field_t;
+
+/* Fields in arrival order plus a hash table over their names. All zero is
+   a valid empty index. */
+typedef struct {
+    crest_field_t fields[CREST_MAX_FIELDS];
+    size_t count;
+    uint8_t slots[CREST_FIELD_SLOTS];  /* index into fields + 1; 0 = free */
+} crest_field_index_t;
+
+/* Headers a response can carry besides the ones the server adds */
+#define CREST_MAX_RESPONSE_HEADERS 32
+
+/* A header set on a response; name and value are copies that share one
+   allocation, starting at name */
+typedef struct {
+    char* name;
+    size_t name_length;
+    char* value;
+    size_t value_length;
+} crest_response_header_t;
+
+/* First block of an arena that was not given one, in bytes */
+#define CREST_ARENA_BLOCK_SIZE 4096
+
+/* Largest first block a reset grows an arena to; requests needing more
+   fall back to extra blocks every time */
+#define CREST_ARENA_KEEP_SIZE (64 * 1024)
+
+typedef struct crest_arena_block crest_arena_block_t;
+
+/* Bump allocator for memory that lives as long as one request, released
+   all at once by crest_arena_reset(). All zero is a valid empty arena. */
+typedef struct {
+    char* base;       /* block being carved */
+    size_t size;
+    size_t used;
+    size_t requested;  /* bytes handed out since the last reset */
+    char* first;       /* block kept across resets */
+    size_t first_size;
+    bool first_owned;  /* first came from malloc rather than the caller */
+    crest_arena_block_t* extra;  /* blocks added since the last reset */
+    size_t mallocs;    /* blocks ever taken from malloc, for statistics */
+} crest_arena_t;
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/* Start an arena on buffer (may be NULL), which must outlive it */
+void crest_arena_init(crest_arena_t* arena, void* buffer, size_t size);
+
+/* size bytes aligned for any type, or NULL if out of memory */
+void* crest_arena_alloc(crest_arena_t* arena, size_t size);
+
+/* Release every allocation; the first block is kept for reuse */
+void crest_arena_reset(crest_arena_t* arena);
+
+/* Release every allocation and all memory the arena holds */
+void crest_arena_destroy(crest_arena_t* arena);
+
+/* Free a response's head, body and headers unless they came from its
+   arena, and hand a taken body back to its release function */
+void crest_response_release(crest_response_t* res);
+
+/* Write a body of length bytes. Without release the data is copied; with
+   it the response takes data as it is and calls release(context) once it
+   is done with it. content_type is copied if copy_type is set, and must
+   otherwise outlive the response (a literal). */
+void crest_response_write(crest_response_t* res, int status, const char* content_type,
+                          bool copy_type, const void* data, size_t length,
+                          void (*release)(void* context), void* context);
+
+/* Write length bytes of the open file fd, starting at offset, as the body.
+   The server copies them to the socket itself (sendfile(2) where there is
+   one). release(context) is called once they are sent or discarded and
+   should close fd; content_type must outlive the response. */
+void crest_response_file(crest_response_t* res, int status, const char* content_type, int fd,
+                         int64_t offset, size_t length, void (*release)(void* context),
+                         void* context);
+
+/* Replace the body of a written response, keeping its status, content type
+   and headers; data is taken as crest_response_write() takes it. Nothing
+   changes, and a taken body is released, if no body was written, the head
+   is already built, or the body is sent from a file. */
+void crest_response_replace_body(crest_response_t* res, const void* data, size_t length,
+                                 void (*release)(void* context), void* context);
+
+/* Release a response and make it ready for the next request, keeping its
+   arena and keep_alive */
+void crest_response_clear(crest_response_t* res);
+
+/* Build the head from the status and headers once the handler is done;
+   does nothing if no response was written or the head already exists */
+void crest_response_finish(crest_response_t* res);
+
+/* Value of a header set with crest_response_set_header(), or NULL */
+const char* crest_response_get_header(const crest_response_t* res, const char* key);
+
+/* Length of an HTTP date: "Sun, 06 Nov 1994 08:49:37 GMT" */
+#define CREST_HTTP_DATE_LENGTH 29
+
+/* Format seconds since the epoch as an HTTP date into out, which needs
+   CREST_HTTP_DATE_LENGTH + 1 bytes; returns the length, or 0 if the time
+   cannot be represented */
+size_t crest_format_http_date(int64_t seconds, char* out);
+
+/* Reason phrase for a status, e.g. "Not Found"; empty if unknown */
+const char* crest_status_reason(int status);
+
+/* Add a NUL-terminated field; a repeated name keeps resolving to its first
+   value. Returns false once the index is full. */
+bool crest_fields_add(crest_field_index_t* index, const char* name, size_t name_length,
+                      const char* value, bool ignore_case);
+
+/* Remove every field; cheaper than zeroing the index */
+void crest_fields_clear(crest_field_index_t* index);
+
+/* Empty a request for reuse, keeping its arena. Zeroing it instead would
+   clear every field of its three indexes. */
+void crest_request_clear(crest_request_t* req);
+
+/* Value of the first field named name, or NULL */
+const char* crest_fields_find(const crest_field_index_t* index, const char* name,
+                              bool ignore_case);
+
+/* Decode %XX escapes (and '+' as a space, for query strings) in place;
+   returns the decoded length */
+size_t crest_url_decode(char* text, bool plus_as_space);
+
+/* Split a query string in place into percent-decoded parameters */
+void crest_fields_parse_query(crest_field_index_t* index, char* query);
+
+/* crest_route() for a C++ handler; cpp_handler is a crest::Handler* */
+int crest_route_cpp(crest_app_t* app, crest_method_t method, const char* path,
+                    void* cpp_handler, const char* description);
+
+#ifdef __cplusplus
+}
+#endif
+
 struct crest_request {
     char* method;
     char* path;
     char* body;
-    char* query_string;
-    void* headers;
-    void* queries;
+    size_t body_length;
+    char* query_string;  /* split into queries in place once bound */
+    crest_field_index_t headers;  /* names match case-insensitively */
+    crest_field_index_t queries;
+    crest_field_index_t params;   /* path parameters of the matched route */
+    const char* route;  /* pattern of the matched route, e.g. "/users/:id", while its handler runs */
+    /* Source of a streamed body (NULL when buffered): returns bytes read,
+       0 at the end of the body, or a negative HTTP status on failure */
+    int64_t (*read_body)(void* source, void* buffer, size_t size);
+    void* body_source;
+    size_t body_read;  /* bytes of a buffered body already read */
+    int body_error;    /* HTTP status once reading the body failed */
+    crest_arena_t* arena;  /* scratch memory released after the response */
 };
 
 struct crest_response {
     int status;
-    char* body;
-    void* headers;
+    const char* content_type;  /* static; a Content-Type header overrides it */
+    char* head;            /* status line and headers, through the blank line */
+    size_t head_length;
+    char* body;            /* not NUL-terminated; may hold any bytes */
+    size_t body_length;
+    char* storage;         /* copies of the body and content type, if any */
+    /* Set when body is the handler's own buffer: called with body_context
+       once the response has been sent or discarded */
+    void (*body_release)(void* context);
+    void* body_context;
+    /* Set when the body is body_length bytes of the file body_file from
+       body_offset, sent by the server; body is then NULL */
+    bool body_from_file;
+    int body_file;
+    int64_t body_offset;
+    /* Set by crest_response_mark_immutable(): the body is the same on every
+       request to the route, so its compressed forms can be cached */
+    bool body_immutable;
+    crest_response_header_t headers[CREST_MAX_RESPONSE_HEADERS];
+    size_t header_count;
     bool sent;
+    bool keep_alive;
+    crest_arena_t* arena;  /* owns head and body when set; otherwise they are malloc'd */
 };
 
 
@@ -9,6 +9,7 @@
 
 #include "crest.hpp"
 #include <functional>
+#include <memory>
 #include <vector>
 #include <string>
 #include <regex>
@@ -18,6 +19,10 @@
 
 namespace crest {
 
+namespace middleware {
+class PrecompressedCache;
+}
+
 using NextFunction = std::function<void()>;
 using MiddlewareFunction = std::function<void(Request&, Response&, NextFunction)>;
 
@@ -85,9 +90,48 @@ public:
     void handle(Request& req, Response& res, NextFunction next) override;
 };
 
+/**
+ * @brief Compresses response bodies with gzip or deflate
+ *
+ * Runs after next() and compresses the body the handler wrote when the
+ * client's Accept-Encoding allows gzip (preferred) or deflate, the body
+ * is at least min_size bytes, and its content type is in content_types.
+ * Requests without Accept-Encoding are passed through untouched. Bodies
+ * sent from a file, responses that already have a Content-Encoding, and
+ * bodies that would not get smaller are left as they are.
+ *
+ * Each thread keeps its own compressor state and reuses it for every
+ * body. Bodies over 256 KiB are compressed in steps into a buffer that
+ * grows with the output, and given up on if their first 256 KiB do not
+ * shrink by a tenth.
+ *
+ * Bodies marked with Response::mark_immutable() are compressed once per
+ * route and encoding, at level 9, and kept in memory; later requests for
+ * the same body are sent the cached bytes without compressing anything.
+ * cache_bytes bounds that memory, least recently used bodies going first.
+ * Copies of the middleware share one cache.
+ */
 class CompressionMiddleware : public Middleware {
 public:
+    struct Options {
+        int level;                               // zlib level, 1 (fastest) to 9 (smallest)
+        size_t min_size;                         // smaller bodies are sent as they are
+        std::vector<std::string> content_types;  // "text/" matches a prefix, "+json" a suffix
+        bool deflate;                            // offer deflate to clients without gzip
+        size_t cache_bytes;                      // for immutable bodies; 0 compresses them every time
+
+        Options() : level(1), min_size(1024), content_types({"text/", "application/json", "application/javascript", "application/xml", "image/svg+xml", "+json", "+xml"}), deflate(true), cache_bytes(16 * 1024 * 1024) {}
+    };
+
+    explicit CompressionMiddleware(const Options& opts = Options());
+    
     void handle(Request& req, Response& res, NextFunction next) override;
+
+private:
+    bool compressible(const char* content_type) const;
+
+    Options options_;
+    std::shared_ptr<middleware::PrecompressedCache> cache_;
 };
 
 } // namespace crest
@@ -5,7 +5,7 @@ echo ========================================
 echo.
 
 echo Building all tests...
-xmake build crest_tests crest_test_middleware crest_test_websocket crest_test_database crest_test_upload crest_test_template
+xmake build crest_tests crest_test_middleware crest_test_websocket crest_test_database crest_test_upload crest_test_template crest_test_server crest_test_parser crest_test_router crest_test_thread_pool crest_test_affinity crest_test_arena crest_test_response crest_test_openapi
 if %errorlevel% neq 0 (
     echo Build failed!
     exit /b 1
@@ -17,7 +17,7 @@ echo Running Tests
 echo ========================================
 
 echo.
-echo [1/6] Basic Tests...
+echo [1/14] Basic Tests...
 xmake run crest_tests
 if %errorlevel% neq 0 (
     echo Basic tests failed!
@@ -25,7 +25,7 @@ if %errorlevel% neq 0 (
 )
 
 echo.
-echo [2/6] Middleware Tests...
+echo [2/14] Middleware Tests...
 xmake run crest_test_middleware
 if %errorlevel% neq 0 (
     echo Middleware tests failed!
@@ -33,7 +33,7 @@ if %errorlevel% neq 0 (
 )
 
 echo.
-echo [3/6] WebSocket Tests...
+echo [3/14] WebSocket Tests...
 xmake run crest_test_websocket
 if %errorlevel% neq 0 (
     echo WebSocket tests failed!
@@ -41,7 +41,7 @@ if %errorlevel% neq 0 (
 )
 
 echo.
-echo [4/6] Database Tests...
+echo [4/14] Database Tests...
 xmake run crest_test_database
 if %errorlevel% neq 0 (
     echo Database tests failed!
@@ -49,7 +49,7 @@ if %errorlevel% neq 0 (
 )
 
 echo.
-echo [5/6] File Upload Tests...
+echo [5/14] File Upload Tests...
 xmake run crest_test_upload
 if %errorlevel% neq 0 (
     echo File upload tests failed!
@@ -57,13 +57,77 @@ if %errorlevel% neq 0 (
 )
 
 echo.
-echo [6/6] Template Engine Tests...
+echo [6/14] Template Engine Tests...
 xmake run crest_test_template
 if %errorlevel% neq 0 (
     echo Template tests failed!
     exit /b 1
 )
 
+echo.
+echo [7/14] Server Tests...
+xmake run crest_test_server
+if %errorlevel% neq 0 (
+    echo Server tests failed!
+    exit /b 1
+)
+
+echo.
+echo [8/14] HTTP Parser Tests...
+xmake run crest_test_parser
+if %errorlevel% neq 0 (
+    echo Parser tests failed!
+    exit /b 1
+)
+
+echo.
+echo [9/14] Router Tests...
+xmake run crest_test_router
+if %errorlevel% neq 0 (
+    echo Router tests failed!
+    exit /b 1
+)
+
+echo.
+echo [10/14] Thread Pool Tests...
+xmake run crest_test_thread_pool
+if %errorlevel% neq 0 (
+    echo Thread pool tests failed!
+    exit /b 1
+)
+
+echo.
+echo [11/14] Affinity Tests...
+xmake run crest_test_affinity
+if %errorlevel% neq 0 (
+    echo Affinity tests failed!
+    exit /b 1
+)
+
+echo.
+echo [12/14] Arena Tests...
+xmake run crest_test_arena
+if %errorlevel% neq 0 (
+    echo Arena tests failed!
+    exit /b 1
+)
+
+echo.
+echo [13/14] Response Tests...
+xmake run crest_test_response
+if %errorlevel% neq 0 (
+    echo Response tests failed!
+    exit /b 1
+)
+
+echo.
+echo [14/14] OpenAPI Tests...
+xmake run crest_test_openapi
+if %errorlevel% neq 0 (
+    echo OpenAPI tests failed!
+    exit /b 1
+)
+
 echo.
 echo ========================================
 echo ✅ ALL TESTS PASSED!
@@ -76,6 +140,14 @@ echo   - WebSocket Tests: PASSED
 echo   - Database Tests: PASSED
 echo   - File Upload Tests: PASSED
 echo   - Template Engine Tests: PASSED
+echo   - Server Tests: PASSED
+echo   - HTTP Parser Tests: PASSED
+echo   - Router Tests: PASSED
+echo   - Thread Pool Tests: PASSED
+echo   - Affinity Tests: PASSED
+echo   - Arena Tests: PASSED
+echo   - Response Tests: PASSED
+echo   - OpenAPI Tests: PASSED
 echo.
-echo Total: 6/6 test suites passed
+echo Total: 14/14 test suites passed
 echo ========================================
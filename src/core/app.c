@@ -19,6 +19,12 @@ extern char* strdup(const char*);
 
 extern void* crest_mutex_create();
 extern void crest_mutex_destroy(void* mutex);
+extern void crest_mutex_lock(void* mutex);
+extern void crest_mutex_unlock(void* mutex);
+extern void* crest_route_table_create(crest_app_t* app);
+extern void crest_route_table_destroy(void* table);
+extern void* crest_docs_cache_create();
+extern void crest_docs_cache_destroy(void* cache);
 
 crest_app_t* crest_create(void) {
     crest_app_t* app = (crest_app_t*)calloc(1, sizeof(crest_app_t));
@@ -33,9 +39,26 @@ crest_app_t* crest_create(void) {
     app->routes = NULL;
     app->route_count = 0;
     app->route_capacity = 0;
+    app->route_table = crest_route_table_create(app);
+    app->docs_cache = crest_docs_cache_create();
+    app->docs_version = 0;
     app->running = false;
     app->route_mutex = crest_mutex_create();
     app->thread_pool = NULL;
+    app->server = NULL;
+    app->io_model = CREST_IO_AUTO;
+    app->event_loops = 0;
+    app->keep_alive_timeout = 5;
+    app->max_keep_alive_requests = 1000;
+    app->max_pipeline_depth = 16;
+    app->acceptors = 1;
+    app->prefork_processes = 0;
+    app->max_body_size = 1024 * 1024;
+    app->max_queued_requests = 4096;
+    app->overload_policy = CREST_OVERLOAD_REJECT;
+    app->worker_threads = 0;
+    app->max_worker_threads = 0;
+    app->cpu_affinity = false;
     
     return app;
 }
@@ -57,6 +80,16 @@ crest_app_t* crest_create_with_config(crest_config_t* config) {
         app->version = strdup(config->version);
     }
     app->docs_enabled = config->docs_enabled;
+    app->io_model = config->io_model;
+    app->event_loops = config->event_loops > 0 ? config->event_loops : 0;
+    crest_set_keep_alive(app, config->keep_alive_timeout, config->max_keep_alive_requests);
+    crest_set_pipeline_depth(app, config->max_pipeline_depth);
+    crest_set_acceptors(app, config->acceptors);
+    crest_set_prefork(app, config->prefork_processes);
+    crest_set_max_body_size(app, config->max_body_size);
+    crest_set_queue_limit(app, config->max_queued_requests, config->overload_policy);
+    crest_set_worker_threads(app, config->worker_threads, config->max_worker_threads);
+    crest_set_cpu_affinity(app, config->cpu_affinity);
     
     return app;
 }
@@ -78,6 +111,8 @@ void crest_destroy(crest_app_t* app) {
         free(app->routes[i].response_schema);
     }
     free(app->routes);
+    crest_route_table_destroy(app->route_table);
+    crest_docs_cache_destroy(app->docs_cache);
     
     if (app->route_mutex) {
         crest_mutex_destroy(app->route_mutex);
@@ -90,17 +125,25 @@ void crest_set_docs_enabled(crest_app_t* app, bool enabled) {
     if (app) app->docs_enabled = enabled;
 }
 
+/* The docs show the title and description, so they change under the
+   route mutex like the routes do */
 void crest_set_title(crest_app_t* app, const char* title) {
     if (app && title) {
+        crest_mutex_lock(app->route_mutex);
         free(app->title);
         app->title = strdup(title);
+        app->docs_version++;
+        crest_mutex_unlock(app->route_mutex);
     }
 }
 
 void crest_set_description(crest_app_t* app, const char* description) {
     if (app && description) {
+        crest_mutex_lock(app->route_mutex);
         free(app->description);
         app->description = strdup(description);
+        app->docs_version++;
+        crest_mutex_unlock(app->route_mutex);
     }
 }
 
@@ -110,3 +153,49 @@ void crest_set_proxy(crest_app_t* app, const char* proxy_url) {
         app->proxy_url = strdup(proxy_url);
     }
 }
+
+void crest_set_io_model(crest_app_t* app, crest_io_model_t model) {
+    if (app) app->io_model = model;
+}
+
+void crest_set_event_loops(crest_app_t* app, int count) {
+    if (app) app->event_loops = count > 0 ? count : 0;
+}
+
+void crest_set_keep_alive(crest_app_t* app, int timeout_seconds, int max_requests) {
+    if (!app) return;
+    if (timeout_seconds > 0) app->keep_alive_timeout = timeout_seconds;
+    if (max_requests > 0) app->max_keep_alive_requests = max_requests;
+}
+
+void crest_set_pipeline_depth(crest_app_t* app, int depth) {
+    if (app && depth > 0) app->max_pipeline_depth = depth;
+}
+
+void crest_set_worker_threads(crest_app_t* app, int min_threads, int max_threads) {
+    if (!app) return;
+    app->worker_threads = min_threads > 0 ? min_threads : 0;
+    app->max_worker_threads = max_threads > 0 ? max_threads : 0;
+}
+
+void crest_set_cpu_affinity(crest_app_t* app, bool enabled) {
+    if (app) app->cpu_affinity = enabled;
+}
+
+void crest_set_acceptors(crest_app_t* app, int count) {
+    if (app && count > 0) app->acceptors = count;
+}
+
+void crest_set_prefork(crest_app_t* app, int processes) {
+    if (app && processes >= 0) app->prefork_processes = processes;
+}
+
+void crest_set_max_body_size(crest_app_t* app, size_t max_bytes) {
+    if (app && max_bytes > 0) app->max_body_size = max_bytes;
+}
+
+void crest_set_queue_limit(crest_app_t* app, size_t max_queued, crest_overload_policy_t policy) {
+    if (!app) return;
+    if (max_queued > 0) app->max_queued_requests = max_queued;
+    app->overload_policy = policy;
+}
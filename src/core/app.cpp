@@ -5,7 +5,9 @@
 
 #include "crest/crest.hpp"
 #include "crest/internal/app_internal.h"
+#include "../server/static_files.hpp"
 #include <cstring>
+#include <memory>
 
 namespace crest {
 
@@ -20,8 +22,35 @@ std::string Request::method() const {
 }
 
 std::string Request::body() const {
+    if (req_->read_body) {
+        std::string body;
+        char buffer[16384];
+        int64_t n;
+        while ((n = crest_request_read_body(req_, buffer, sizeof(buffer))) > 0) {
+            body.append(buffer, (size_t)n);
+        }
+        return body;
+    }
     const char* b = crest_request_get_body(req_);
-    return b ? std::string(b) : "";
+    return b ? std::string(b, req_->body_length) : "";
+}
+
+size_t Request::read_body(char* buffer, size_t size) {
+    int64_t n = crest_request_read_body(req_, buffer, size);
+    return n > 0 ? (size_t)n : 0;
+}
+
+bool Request::read_body(const std::function<void(const char* data, size_t size)>& on_data) {
+    char buffer[16384];
+    int64_t n;
+    while ((n = crest_request_read_body(req_, buffer, sizeof(buffer))) > 0) {
+        on_data(buffer, (size_t)n);
+    }
+    return n == 0;
+}
+
+int Request::body_error() const {
+    return req_->body_error;
 }
 
 std::string Request::query(const std::string& key) const {
@@ -34,36 +63,141 @@ std::string Request::header(const std::string& key) const {
     return v ? std::string(v) : "";
 }
 
+// A repeated name keeps its first value, as query() and header() do
 std::map<std::string, std::string> Request::queries() const {
-    return {};
+    std::map<std::string, std::string> result;
+    for (size_t i = 0; i < req_->queries.count; i++) {
+        const crest_field_t& field = req_->queries.fields[i];
+        result.emplace(std::string(field.name, field.name_length), field.value);
+    }
+    return result;
 }
 
 std::map<std::string, std::string> Request::headers() const {
-    return {};
+    std::map<std::string, std::string> result;
+    for (size_t i = 0; i < req_->headers.count; i++) {
+        const crest_field_t& field = req_->headers.fields[i];
+        result.emplace(std::string(field.name, field.name_length), field.value);
+    }
+    return result;
+}
+
+std::string Request::param(const std::string& name) const {
+    const char* v = crest_request_get_param(req_, name.c_str());
+    return v ? std::string(v) : "";
+}
+
+std::map<std::string, std::string> Request::params() const {
+    std::map<std::string, std::string> result;
+    for (size_t i = 0; i < req_->params.count; i++) {
+        const crest_field_t& field = req_->params.fields[i];
+        result.emplace(std::string(field.name, field.name_length), field.value);
+    }
+    return result;
+}
+
+std::string_view Request::path_view() const {
+    const char* p = crest_request_get_path(req_);
+    return p ? std::string_view(p) : std::string_view();
+}
+
+std::string_view Request::method_view() const {
+    const char* m = crest_request_get_method(req_);
+    return m ? std::string_view(m) : std::string_view();
+}
+
+std::string_view Request::body_view() const {
+    if (req_->read_body || !req_->body) return std::string_view();
+    return std::string_view(req_->body, req_->body_length);
+}
+
+std::string_view Request::query_view(const char* key) const {
+    const char* v = crest_request_get_query(req_, key);
+    return v ? std::string_view(v) : std::string_view();
+}
+
+std::string_view Request::header_view(const char* key) const {
+    const char* v = crest_request_get_header(req_, key);
+    return v ? std::string_view(v) : std::string_view();
+}
+
+std::string_view Request::param_view(const char* name) const {
+    const char* v = crest_request_get_param(req_, name);
+    return v ? std::string_view(v) : std::string_view();
 }
 
 void Response::json(Status status, const std::string& json) {
-    crest_response_json(res_, static_cast<int>(status), json.c_str());
+    this->json(static_cast<int>(status), json);
 }
 
 void Response::json(int status, const std::string& json) {
-    crest_response_json(res_, status, json.c_str());
+    crest_response_write(res_, status, "application/json", false, json.data(), json.size(),
+                         nullptr, nullptr);
 }
 
 void Response::text(Status status, const std::string& text) {
-    crest_response_text(res_, static_cast<int>(status), text.c_str());
+    this->text(static_cast<int>(status), text);
 }
 
 void Response::text(int status, const std::string& text) {
-    crest_response_text(res_, status, text.c_str());
+    crest_response_write(res_, status, "text/plain", false, text.data(), text.size(), nullptr, nullptr);
 }
 
 void Response::html(Status status, const std::string& html) {
-    crest_response_html(res_, static_cast<int>(status), html.c_str());
+    this->html(static_cast<int>(status), html);
 }
 
 void Response::html(int status, const std::string& html) {
-    crest_response_html(res_, status, html.c_str());
+    crest_response_write(res_, status, "text/html; charset=utf-8", false, html.data(), html.size(),
+                         nullptr, nullptr);
+}
+
+void Response::send(Status status, std::string_view body, const std::string& content_type) {
+    send(static_cast<int>(status), body, content_type);
+}
+
+void Response::send(int status, std::string_view body, const std::string& content_type) {
+    crest_response_bytes(res_, status, content_type.c_str(), body.data(), body.size());
+}
+
+void Response::send(Status status, std::span<const std::byte> body, const std::string& content_type) {
+    send(static_cast<int>(status), body, content_type);
+}
+
+void Response::send(int status, std::span<const std::byte> body, const std::string& content_type) {
+    crest_response_bytes(res_, status, content_type.c_str(), body.data(), body.size());
+}
+
+namespace {
+
+// The buffer moves to the heap, where its data stays put until it is sent
+template <typename Buffer>
+void send_buffer(crest_response_t* res, int status, Buffer&& body, const std::string& content_type) {
+    auto* owned = new Buffer(std::move(body));
+    crest_response_write(res, status, content_type.c_str(), true, owned->data(), owned->size(),
+                         [](void* context) { delete static_cast<Buffer*>(context); }, owned);
+}
+
+} // namespace
+
+void Response::send_owned(Status status, std::string&& body, const std::string& content_type) {
+    send_buffer(res_, static_cast<int>(status), std::move(body), content_type);
+}
+
+void Response::send_owned(int status, std::string&& body, const std::string& content_type) {
+    send_buffer(res_, status, std::move(body), content_type);
+}
+
+void Response::send_owned(Status status, std::vector<std::byte>&& body, const std::string& content_type) {
+    send_buffer(res_, static_cast<int>(status), std::move(body), content_type);
+}
+
+void Response::send_owned(int status, std::vector<std::byte>&& body, const std::string& content_type) {
+    send_buffer(res_, status, std::move(body), content_type);
+}
+
+void Response::mark_immutable() {
+    crest_response_mark_immutable(res_);
 }
 
 void Response::set_header(const std::string& key, const std::string& value) {
@@ -78,6 +212,19 @@ App::App(const Config& config) {
     c_config.description = config.description.c_str();
     c_config.version = config.version.c_str();
     c_config.docs_enabled = config.docs_enabled;
+    c_config.io_model = static_cast<crest_io_model_t>(config.io_model);
+    c_config.event_loops = config.event_loops;
+    c_config.keep_alive_timeout = config.keep_alive_timeout;
+    c_config.max_keep_alive_requests = config.max_keep_alive_requests;
+    c_config.max_pipeline_depth = config.max_pipeline_depth;
+    c_config.acceptors = config.acceptors;
+    c_config.prefork_processes = config.prefork_processes;
+    c_config.max_body_size = config.max_body_size;
+    c_config.max_queued_requests = config.max_queued_requests;
+    c_config.overload_policy = static_cast<crest_overload_policy_t>(config.overload_policy);
+    c_config.worker_threads = config.worker_threads;
+    c_config.max_worker_threads = config.max_worker_threads;
+    c_config.cpu_affinity = config.cpu_affinity;
     app_ = crest_create_with_config(&c_config);
 }
 
@@ -106,12 +253,9 @@ App& App::route(Method method, const std::string& path, Handler handler, const s
     
     Handler* handler_ptr = new Handler(std::move(handler));
     
-    auto c_handler = [](crest_request_t* req, crest_response_t* res) {
-        // C handler wrapper - actual handler called via cpp_handler pointer
-    };
-    
-    int result = crest_route(app_, static_cast<crest_method_t>(method), 
-                            path.c_str(), c_handler, description.c_str());
+    // Registered together with the route, so no request sees it without
+    int result = crest_route_cpp(app_, static_cast<crest_method_t>(method),
+                                 path.c_str(), handler_ptr, description.c_str());
     
     if (result != 0) {
         delete handler_ptr;
@@ -120,10 +264,6 @@ App& App::route(Method method, const std::string& path, Handler handler, const s
     
     handlers_[handler_ptr] = *handler_ptr;
     
-    if (app_->route_count > 0) {
-        app_->routes[app_->route_count - 1].cpp_handler = handler_ptr;
-    }
-    
     return *this;
 }
 
@@ -176,11 +316,82 @@ void App::set_proxy(const std::string& proxy_url) {
     if (app_) crest_set_proxy(app_, proxy_url.c_str());
 }
 
+void App::set_io_model(IoModel model) {
+    if (app_) crest_set_io_model(app_, static_cast<crest_io_model_t>(model));
+}
+
+void App::set_event_loops(int count) {
+    if (app_) crest_set_event_loops(app_, count);
+}
+
+void App::set_keep_alive(int timeout_seconds, int max_requests) {
+    if (app_) crest_set_keep_alive(app_, timeout_seconds, max_requests);
+}
+
+void App::set_pipeline_depth(int depth) {
+    if (app_) crest_set_pipeline_depth(app_, depth);
+}
+
+void App::set_worker_threads(int min_threads, int max_threads) {
+    if (app_) crest_set_worker_threads(app_, min_threads, max_threads);
+}
+
+void App::set_cpu_affinity(bool enabled) {
+    if (app_) crest_set_cpu_affinity(app_, enabled);
+}
+
+void App::set_acceptors(int count) {
+    if (app_) crest_set_acceptors(app_, count);
+}
+
+void App::set_prefork(int processes) {
+    if (app_) crest_set_prefork(app_, processes);
+}
+
+void App::set_max_body_size(size_t max_bytes) {
+    if (app_) crest_set_max_body_size(app_, max_bytes);
+}
+
+void App::set_queue_limit(size_t max_queued, OverloadPolicy policy) {
+    if (app_) crest_set_queue_limit(app_, max_queued, static_cast<crest_overload_policy_t>(policy));
+}
+
+PoolStats App::pool_stats() const {
+    PoolStats stats = {};
+    if (!app_ || crest_get_pool_stats(app_, &stats) != 0) {
+        throw Exception("Server is not running");
+    }
+    return stats;
+}
+
+AllocStats App::alloc_stats() const {
+    AllocStats stats = {};
+    if (!app_ || crest_get_alloc_stats(app_, &stats) != 0) {
+        throw Exception("Server is not running");
+    }
+    return stats;
+}
+
 App& App::set_request_schema(Method method, const std::string& path, const std::string& schema) {
     if (app_) crest_set_request_schema(app_, static_cast<crest_method_t>(method), path.c_str(), schema.c_str());
     return *this;
 }
 
+App& App::set_body_streaming(Method method, const std::string& path, size_t max_bytes) {
+    if (app_) crest_set_body_streaming(app_, static_cast<crest_method_t>(method), path.c_str(), max_bytes);
+    return *this;
+}
+
+App& App::static_dir(const std::string& prefix, const std::string& root, bool dotfiles) {
+    auto files = std::make_shared<server::StaticFiles>(root, dotfiles);
+    std::string pattern = prefix;
+    while (!pattern.empty() && pattern.back() == '/') pattern.pop_back();
+    pattern += "/*path";
+    return get(pattern, [files](Request& req, Response& res) {
+        files->serve(req.raw(), res.raw(), req.param_view("path"));
+    }, "Files under " + root);
+}
+
 App& App::set_response_schema(Method method, const std::string& path, const std::string& schema) {
     if (app_) crest_set_response_schema(app_, static_cast<crest_method_t>(method), path.c_str(), schema.c_str());
     return *this;
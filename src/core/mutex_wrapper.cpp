@@ -17,4 +17,12 @@ void crest_mutex_destroy(void* mutex) {
     }
 }
 
+void crest_mutex_lock(void* mutex) {
+    static_cast<std::mutex*>(mutex)->lock();
+}
+
+void crest_mutex_unlock(void* mutex) {
+    static_cast<std::mutex*>(mutex)->unlock();
+}
+
 }
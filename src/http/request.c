@@ -19,14 +19,163 @@ const char* crest_request_get_body(crest_request_t* req) {
     return req ? req->body : NULL;
 }
 
+int64_t crest_request_read_body(crest_request_t* req, void* buffer, size_t size) {
+    if (!req || (!buffer && size > 0)) return -1;
+    if (req->body_error) return -1;
+    
+    if (req->read_body) {
+        int64_t n = req->read_body(req->body_source, buffer, size);
+        if (n < 0) {
+            req->body_error = (int)-n;
+            return -1;
+        }
+        return n;
+    }
+    
+    size_t left = req->body_length - req->body_read;
+    if (size > left) size = left;
+    if (size > 0) memcpy(buffer, req->body + req->body_read, size);
+    req->body_read += size;
+    return (int64_t)size;
+}
+
 const char* crest_request_get_query(crest_request_t* req, const char* key) {
-    if (!req || !key || !req->queries) return NULL;
-    // Implementation would use a hash map
-    return NULL;
+    if (!req || !key) return NULL;
+    return crest_fields_find(&req->queries, key, false);
 }
 
 const char* crest_request_get_header(crest_request_t* req, const char* key) {
-    if (!req || !key || !req->headers) return NULL;
-    // Implementation would use a hash map
-    return NULL;
+    if (!req || !key) return NULL;
+    return crest_fields_find(&req->headers, key, true);
+}
+
+const char* crest_request_get_param(crest_request_t* req, const char* name) {
+    if (!req || !name) return NULL;
+    return crest_fields_find(&req->params, name, false);
+}
+
+static unsigned char fold(unsigned char c) {
+    return (c >= 'A' && c <= 'Z') ? (unsigned char)(c + ('a' - 'A')) : c;
+}
+
+/* FNV-1a over the ASCII-lowercased name, so both matching modes share slots */
+static uint32_t field_hash(const char* name, size_t length) {
+    uint32_t hash = 2166136261u;
+    for (size_t i = 0; i < length; i++) {
+        hash ^= fold((unsigned char)name[i]);
+        hash *= 16777619u;
+    }
+    return hash;
+}
+
+static bool field_matches(const crest_field_t* field, const char* name, size_t length,
+                          bool ignore_case) {
+    if (field->name_length != length) return false;
+    if (!ignore_case) return memcmp(field->name, name, length) == 0;
+    
+    for (size_t i = 0; i < length; i++) {
+        if (fold((unsigned char)field->name[i]) != fold((unsigned char)name[i])) return false;
+    }
+    return true;
+}
+
+/* Slot of the first field with this name, or the free slot it would take.
+   At most half the slots are ever used, so probing always ends. */
+static size_t field_slot(const crest_field_index_t* index, const char* name, size_t length,
+                         bool ignore_case) {
+    size_t mask = CREST_FIELD_SLOTS - 1;
+    size_t slot = field_hash(name, length) & mask;
+    while (index->slots[slot] != 0 &&
+           !field_matches(&index->fields[index->slots[slot] - 1], name, length, ignore_case)) {
+        slot = (slot + 1) & mask;
+    }
+    return slot;
+}
+
+bool crest_fields_add(crest_field_index_t* index, const char* name, size_t name_length,
+                      const char* value, bool ignore_case) {
+    if (index->count >= CREST_MAX_FIELDS) return false;
+    
+    size_t slot = field_slot(index, name, name_length, ignore_case);
+    crest_field_t* field = &index->fields[index->count++];
+    field->name = name;
+    field->value = value;
+    field->name_length = name_length;
+    if (index->slots[slot] == 0) index->slots[slot] = (uint8_t)index->count;
+    return true;
+}
+
+void crest_fields_clear(crest_field_index_t* index) {
+    if (index->count == 0) return;  /* every slot is still free */
+    index->count = 0;
+    memset(index->slots, 0, sizeof(index->slots));
+}
+
+void crest_request_clear(crest_request_t* req) {
+    req->method = NULL;
+    req->path = NULL;
+    req->body = NULL;
+    req->body_length = 0;
+    req->query_string = NULL;
+    crest_fields_clear(&req->headers);
+    crest_fields_clear(&req->queries);
+    crest_fields_clear(&req->params);
+    req->read_body = NULL;
+    req->body_source = NULL;
+    req->body_read = 0;
+    req->body_error = 0;
+}
+
+const char* crest_fields_find(const crest_field_index_t* index, const char* name,
+                              bool ignore_case) {
+    if (index->count == 0) return NULL;
+    
+    size_t slot = field_slot(index, name, strlen(name), ignore_case);
+    return index->slots[slot] ? index->fields[index->slots[slot] - 1].value : NULL;
+}
+
+static int hex_value(char c) {
+    if (c >= '0' && c <= '9') return c - '0';
+    if (c >= 'a' && c <= 'f') return c - 'a' + 10;
+    if (c >= 'A' && c <= 'F') return c - 'A' + 10;
+    return -1;
+}
+
+size_t crest_url_decode(char* text, bool plus_as_space) {
+    char* out = text;
+    for (const char* in = text; *in; in++) {
+        int high, low;
+        if (*in == '+' && plus_as_space) {
+            *out++ = ' ';
+        } else if (*in == '%' && (high = hex_value(in[1])) >= 0 && (low = hex_value(in[2])) >= 0) {
+            *out++ = (char)(high * 16 + low);
+            in += 2;
+        } else {
+            *out++ = *in;
+        }
+    }
+    *out = '\0';
+    return (size_t)(out - text);
+}
+
+void crest_fields_parse_query(crest_field_index_t* index, char* query) {
+    char* next = query;
+    while (next && *next) {
+        char* name = next;
+        next = strchr(name, '&');
+        if (next) *next++ = '\0';
+        if (!*name) continue;
+        
+        // A parameter without '=' has an empty value
+        char* value = strchr(name, '=');
+        if (value) {
+            *value++ = '\0';
+        } else {
+            value = name + strlen(name);
+        }
+        
+        size_t name_length = crest_url_decode(name, true);
+        crest_url_decode(value, true);
+        if (!crest_fields_add(index, name, name_length, value, false)) return;
+    }
 }
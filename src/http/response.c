@@ -3,67 +3,447 @@
  * @brief HTTP response handling
  */
 
+/* gmtime_r is POSIX, hidden by strict ISO C modes such as -std=c17 */
+#if !defined(_WIN32) && !defined(_POSIX_C_SOURCE)
+#define _POSIX_C_SOURCE 200809L
+#endif
+
 #include "crest/crest.h"
 #include "crest/internal/app_internal.h"
 #include <stdlib.h>
 #include <string.h>
 #include <stdio.h>
+#include <time.h>
+
+#if defined(_MSC_VER)
+    #define THREAD_LOCAL __declspec(thread)
+#else
+    #define THREAD_LOCAL _Thread_local
+#endif
+
+typedef struct {
+    int status;
+    const char* reason;
+    const char* line;  /* "HTTP/1.1 <status> <reason>\r\n" */
+    size_t length;
+} status_line_t;
+
+#define STATUS_LINE(status, reason) \
+    { status, reason, "HTTP/1.1 " #status " " reason "\r\n", \
+      sizeof("HTTP/1.1 " #status " " reason "\r\n") - 1 }
+
+/* Sorted by status for binary search */
+static const status_line_t status_lines[] = {
+    STATUS_LINE(100, "Continue"),
+    STATUS_LINE(101, "Switching Protocols"),
+    STATUS_LINE(200, "OK"),
+    STATUS_LINE(201, "Created"),
+    STATUS_LINE(202, "Accepted"),
+    STATUS_LINE(203, "Non-Authoritative Information"),
+    STATUS_LINE(204, "No Content"),
+    STATUS_LINE(205, "Reset Content"),
+    STATUS_LINE(206, "Partial Content"),
+    STATUS_LINE(300, "Multiple Choices"),
+    STATUS_LINE(301, "Moved Permanently"),
+    STATUS_LINE(302, "Found"),
+    STATUS_LINE(303, "See Other"),
+    STATUS_LINE(304, "Not Modified"),
+    STATUS_LINE(307, "Temporary Redirect"),
+    STATUS_LINE(308, "Permanent Redirect"),
+    STATUS_LINE(400, "Bad Request"),
+    STATUS_LINE(401, "Unauthorized"),
+    STATUS_LINE(402, "Payment Required"),
+    STATUS_LINE(403, "Forbidden"),
+    STATUS_LINE(404, "Not Found"),
+    STATUS_LINE(405, "Method Not Allowed"),
+    STATUS_LINE(406, "Not Acceptable"),
+    STATUS_LINE(407, "Proxy Authentication Required"),
+    STATUS_LINE(408, "Request Timeout"),
+    STATUS_LINE(409, "Conflict"),
+    STATUS_LINE(410, "Gone"),
+    STATUS_LINE(411, "Length Required"),
+    STATUS_LINE(412, "Precondition Failed"),
+    STATUS_LINE(413, "Payload Too Large"),
+    STATUS_LINE(414, "URI Too Long"),
+    STATUS_LINE(415, "Unsupported Media Type"),
+    STATUS_LINE(416, "Range Not Satisfiable"),
+    STATUS_LINE(417, "Expectation Failed"),
+    STATUS_LINE(418, "I'm a teapot"),
+    STATUS_LINE(421, "Misdirected Request"),
+    STATUS_LINE(422, "Unprocessable Entity"),
+    STATUS_LINE(425, "Too Early"),
+    STATUS_LINE(426, "Upgrade Required"),
+    STATUS_LINE(428, "Precondition Required"),
+    STATUS_LINE(429, "Too Many Requests"),
+    STATUS_LINE(431, "Request Header Fields Too Large"),
+    STATUS_LINE(451, "Unavailable For Legal Reasons"),
+    STATUS_LINE(500, "Internal Server Error"),
+    STATUS_LINE(501, "Not Implemented"),
+    STATUS_LINE(502, "Bad Gateway"),
+    STATUS_LINE(503, "Service Unavailable"),
+    STATUS_LINE(504, "Gateway Timeout"),
+    STATUS_LINE(505, "HTTP Version Not Supported"),
+};
+
+static const status_line_t* find_status_line(int status) {
+    size_t low = 0;
+    size_t high = sizeof(status_lines) / sizeof(status_lines[0]);
+    while (low < high) {
+        size_t mid = (low + high) / 2;
+        if (status_lines[mid].status == status) return &status_lines[mid];
+        if (status_lines[mid].status < status) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+    return NULL;
+}
+
+const char* crest_status_reason(int status) {
+    const status_line_t* found = find_status_line(status);
+    return found ? found->reason : "";
+}
+
+static const char days[7][4] = {"Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"};
+static const char months[12][4] = {"Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                   "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"};
+
+size_t crest_format_http_date(int64_t seconds, char* out) {
+    time_t t = (time_t)seconds;
+    struct tm utc;
+#if defined(_WIN32) || defined(_WIN64)
+    if (gmtime_s(&utc, &t) != 0) return 0;
+#else
+    if (!gmtime_r(&t, &utc)) return 0;
+#endif
+    /* Years past 9999 do not fit the fixed-length form */
+    if (utc.tm_year + 1900 < 0 || utc.tm_year + 1900 > 9999) return 0;
+    char buffer[64];  /* room for any int the format could print */
+    int n = snprintf(buffer, sizeof(buffer), "%s, %02d %s %04d %02d:%02d:%02d GMT",
+                     days[utc.tm_wday], utc.tm_mday, months[utc.tm_mon], utc.tm_year + 1900,
+                     utc.tm_hour, utc.tm_min, utc.tm_sec);
+    if (n != CREST_HTTP_DATE_LENGTH) return 0;
+    memcpy(out, buffer, (size_t)n + 1);
+    return (size_t)n;
+}
+
+/* "Date: Sun, 06 Nov 1994 08:49:37 GMT\r\n", formatted at most once a
+   second per thread */
+#define DATE_HEADER_LENGTH (CREST_HTTP_DATE_LENGTH + 8)
+
+static const char* date_header(void) {
+    static THREAD_LOCAL time_t cached_at = (time_t)-1;
+    static THREAD_LOCAL char header[DATE_HEADER_LENGTH + 1];
+
+    time_t now = time(NULL);
+    if (now == cached_at) return header;
+
+    memcpy(header, "Date: ", 6);
+    if (crest_format_http_date((int64_t)now, header + 6) == 0) {
+        memcpy(header + 6, "Thu, 01 Jan 1970 00:00:00 GMT", CREST_HTTP_DATE_LENGTH);
+    }
+    memcpy(header + 6 + CREST_HTTP_DATE_LENGTH, "\r\n", 3);
+    cached_at = now;
+    return header;
+}
+
+static void* response_alloc(crest_response_t* res, size_t size) {
+    return res->arena ? crest_arena_alloc(res->arena, size) : malloc(size);
+}
+
+static void release_body(crest_response_t* res) {
+    if (!res->arena) {
+        free(res->head);
+        free(res->storage);
+    }
+    if (res->body_release) res->body_release(res->body_context);
+    res->head = NULL;
+    res->head_length = 0;
+    res->storage = NULL;
+    res->body = NULL;
+    res->body_length = 0;
+    res->body_release = NULL;
+    res->body_context = NULL;
+    res->body_from_file = false;
+    res->body_file = -1;
+    res->body_offset = 0;
+    res->body_immutable = false;
+}
+
+static void keep_data(void* context) {
+    (void)context;
+}
+
+// Without release the content is copied, once, into memory from the
+// response's arena when it has one; with it the response takes the
+// handler's buffer as it is. A content type that may not outlive the call
+// is copied alongside. The head is built when the response is finished.
+// Returns false if nothing was written, with content already released.
+static bool write_body(crest_response_t* res, int status, const char* content_type,
+                       bool copy_type, const void* content, size_t content_length,
+                       void (*release)(void*), void* context) {
+    if (!res || res->sent) {
+        if (release) release(context);
+        return false;
+    }
+
+    release_body(res);
+    size_t copy_length = release ? 0 : content_length;
+    size_t type_length = copy_type ? strlen(content_type) + 1 : 0;
+    char* storage = NULL;
+    if (copy_length + type_length > 0) {
+        storage = (char*)response_alloc(res, copy_length + type_length);
+        if (!storage) {
+            if (release) release(context);
+            return false;
+        }
+    }
+
+    if (release) {
+        res->body = (char*)content;
+        res->body_release = release;
+        res->body_context = context;
+    } else {
+        res->body = storage;
+        if (copy_length > 0) memcpy(storage, content, copy_length);
+    }
+    if (copy_type) {
+        memcpy(storage + copy_length, content_type, type_length);
+        content_type = storage + copy_length;
+    }
 
-void crest_response_json(crest_response_t* res, int status, const char* json) {
-    if (!res || res->sent) return;
-    
     res->status = status;
-    free(res->body);
-    
-    size_t len = strlen(json) + 256;
-    res->body = (char*)malloc(len);
-    snprintf(res->body, len,
-        "HTTP/1.1 %d OK\r\n"
-        "Content-Type: application/json\r\n"
-        "Content-Length: %zu\r\n"
-        "Connection: close\r\n"
-        "\r\n%s", status, strlen(json), json);
-    
+    res->content_type = content_type;
+    res->storage = storage;
+    res->body_length = content_length;
     res->sent = true;
+    return true;
+}
+
+void crest_response_write(crest_response_t* res, int status, const char* content_type,
+                          bool copy_type, const void* data, size_t length,
+                          void (*release)(void*), void* context) {
+    write_body(res, status, content_type, copy_type, data, length, release, context);
+}
+
+void crest_response_file(crest_response_t* res, int status, const char* content_type, int fd,
+                         int64_t offset, size_t length, void (*release)(void*), void* context) {
+    if (!write_body(res, status, content_type, false, NULL, length, release, context)) return;
+    res->body_from_file = true;
+    res->body_file = fd;
+    res->body_offset = offset;
+}
+
+void crest_response_replace_body(crest_response_t* res, const void* data, size_t length,
+                                 void (*release)(void*), void* context) {
+    if (!res || !res->sent || res->head || res->body_from_file) {
+        if (release) release(context);
+        return;
+    }
+    /* The content type may be a copy in the storage the old body frees */
+    const char* content_type = res->content_type;
+    char* type = NULL;
+    if (content_type) {
+        size_t type_length = strlen(content_type) + 1;
+        type = (char*)malloc(type_length);
+        if (!type) {
+            if (release) release(context);
+            return;
+        }
+        memcpy(type, content_type, type_length);
+    }
+    res->sent = false;
+    write_body(res, res->status, type, type != NULL, data, length, release, context);
+    free(type);
+}
+
+void crest_response_json(crest_response_t* res, int status, const char* json) {
+    write_body(res, status, "application/json", false, json, strlen(json), NULL, NULL);
 }
 
 void crest_response_text(crest_response_t* res, int status, const char* text) {
-    if (!res || res->sent) return;
-    
-    res->status = status;
-    free(res->body);
-    
-    size_t len = strlen(text) + 256;
-    res->body = (char*)malloc(len);
-    snprintf(res->body, len,
-        "HTTP/1.1 %d OK\r\n"
-        "Content-Type: text/plain\r\n"
-        "Content-Length: %zu\r\n"
-        "Connection: close\r\n"
-        "\r\n%s", status, strlen(text), text);
-    
-    res->sent = true;
+    write_body(res, status, "text/plain", false, text, strlen(text), NULL, NULL);
 }
 
 void crest_response_html(crest_response_t* res, int status, const char* html) {
-    if (!res || res->sent) return;
-    
-    res->status = status;
-    free(res->body);
-    
-    size_t len = strlen(html) + 256;
-    res->body = (char*)malloc(len);
-    snprintf(res->body, len,
-        "HTTP/1.1 %d OK\r\n"
-        "Content-Type: text/html; charset=utf-8\r\n"
-        "Content-Length: %zu\r\n"
-        "Connection: close\r\n"
-        "\r\n%s", status, strlen(html), html);
-    
-    res->sent = true;
+    write_body(res, status, "text/html; charset=utf-8", false, html, strlen(html), NULL, NULL);
+}
+
+void crest_response_bytes(crest_response_t* res, int status, const char* content_type,
+                          const void* data, size_t length) {
+    if (!data && length > 0) return;
+    if (!content_type) content_type = "application/octet-stream";
+    write_body(res, status, content_type, true, data, length, NULL, NULL);
+}
+
+void crest_response_bytes_owned(crest_response_t* res, int status, const char* content_type,
+                                void* data, size_t length, void (*release)(void* data)) {
+    if (!data && length > 0) return;
+    if (!content_type) content_type = "application/octet-stream";
+    write_body(res, status, content_type, true, data, length, release ? release : keep_data, data);
+}
+
+static bool same_name(const char* a, size_t a_length, const char* b, size_t b_length) {
+    if (a_length != b_length) return false;
+    for (size_t i = 0; i < a_length; i++) {
+        unsigned char x = (unsigned char)a[i];
+        unsigned char y = (unsigned char)b[i];
+        if (x >= 'A' && x <= 'Z') x = (unsigned char)(x + ('a' - 'A'));
+        if (y >= 'A' && y <= 'Z') y = (unsigned char)(y + ('a' - 'A'));
+        if (x != y) return false;
+    }
+    return true;
+}
+
+static bool has_line_break(const char* text, size_t length) {
+    return memchr(text, '\r', length) || memchr(text, '\n', length);
+}
+
+/* Framing is the server's to decide */
+static bool reserved_header(const char* name, size_t length) {
+    return same_name(name, length, "Content-Length", 14) ||
+           same_name(name, length, "Transfer-Encoding", 17) ||
+           same_name(name, length, "Connection", 10);
+}
+
+void crest_response_mark_immutable(crest_response_t* res) {
+    if (!res || !res->sent || res->body_from_file) return;
+    res->body_immutable = true;
 }
 
 void crest_response_set_header(crest_response_t* res, const char* key, const char* value) {
     if (!res || !key || !value) return;
-    // Implementation would use a hash map
+
+    size_t name_length = strlen(key);
+    size_t value_length = strlen(value);
+    if (name_length == 0 || memchr(key, ':', name_length) || has_line_break(key, name_length) ||
+        has_line_break(value, value_length) || reserved_header(key, name_length)) {
+        return;
+    }
+
+    crest_response_header_t* header = NULL;
+    for (size_t i = 0; i < res->header_count; i++) {
+        if (same_name(res->headers[i].name, res->headers[i].name_length, key, name_length)) {
+            header = &res->headers[i];
+            break;
+        }
+    }
+    if (!header && res->header_count >= CREST_MAX_RESPONSE_HEADERS) return;
+
+    /* Name and value share one allocation */
+    char* copy = (char*)response_alloc(res, name_length + value_length + 2);
+    if (!copy) return;
+    memcpy(copy, key, name_length + 1);
+    memcpy(copy + name_length + 1, value, value_length + 1);
+
+    if (header) {
+        if (!res->arena) free(header->name);
+    } else {
+        header = &res->headers[res->header_count++];
+    }
+    header->name = copy;
+    header->name_length = name_length;
+    header->value = copy + name_length + 1;
+    header->value_length = value_length;
+}
+
+const char* crest_response_get_header(const crest_response_t* res, const char* key) {
+    if (!res || !key) return NULL;
+    size_t length = strlen(key);
+    for (size_t i = 0; i < res->header_count; i++) {
+        if (same_name(res->headers[i].name, res->headers[i].name_length, key, length)) {
+            return res->headers[i].value;
+        }
+    }
+    return NULL;
+}
+
+static char* append(char* out, const char* text, size_t length) {
+    memcpy(out, text, length);
+    return out + length;
+}
+
+void crest_response_finish(crest_response_t* res) {
+    if (!res || !res->sent || res->head) return;
+
+    char status_buffer[32];
+    const char* status_line;
+    size_t status_length;
+    const status_line_t* found = find_status_line(res->status);
+    if (found) {
+        status_line = found->line;
+        status_length = found->length;
+    } else {
+        /* The reason phrase may be empty */
+        int n = snprintf(status_buffer, sizeof(status_buffer), "HTTP/1.1 %d \r\n", res->status);
+        status_line = status_buffer;
+        status_length = n > 0 ? (size_t)n : 0;
+    }
+
+    /* 1xx, 204 and 304 responses never have a body */
+    bool bodiless = res->status < 200 || res->status == 204 || res->status == 304;
+    if (bodiless) res->body_length = 0;
+
+    char length_buffer[48];
+    size_t length_length = 0;
+    if (!bodiless) {
+        int n = snprintf(length_buffer, sizeof(length_buffer), "Content-Length: %zu\r\n",
+                         res->body_length);
+        length_length = n > 0 ? (size_t)n : 0;
+    }
+
+    const char* content_type = res->content_type;
+    bool has_date = false;
+    size_t size = status_length + length_length + 2;
+    for (size_t i = 0; i < res->header_count; i++) {
+        const crest_response_header_t* header = &res->headers[i];
+        if (same_name(header->name, header->name_length, "Content-Type", 12)) content_type = NULL;
+        if (same_name(header->name, header->name_length, "Date", 4)) has_date = true;
+        size += header->name_length + header->value_length + 4;
+    }
+    if (content_type && !bodiless) size += strlen(content_type) + 16;
+    if (!has_date) size += DATE_HEADER_LENGTH;
+    const char* connection = res->keep_alive ? "Connection: keep-alive\r\n" : "Connection: close\r\n";
+    size_t connection_length = strlen(connection);
+    size += connection_length;
+
+    char* head = (char*)response_alloc(res, size);
+    if (!head) return;
+
+    char* out = append(head, status_line, status_length);
+    if (content_type && !bodiless) {
+        out = append(out, "Content-Type: ", 14);
+        out = append(out, content_type, strlen(content_type));
+        out = append(out, "\r\n", 2);
+    }
+    out = append(out, length_buffer, length_length);
+    if (!has_date) out = append(out, date_header(), DATE_HEADER_LENGTH);
+    out = append(out, connection, connection_length);
+    for (size_t i = 0; i < res->header_count; i++) {
+        const crest_response_header_t* header = &res->headers[i];
+        out = append(out, header->name, header->name_length);
+        out = append(out, ": ", 2);
+        out = append(out, header->value, header->value_length);
+        out = append(out, "\r\n", 2);
+    }
+    out = append(out, "\r\n", 2);
+
+    res->head = head;
+    res->head_length = (size_t)(out - head);
+}
+
+void crest_response_clear(crest_response_t* res) {
+    crest_response_release(res);
+    res->status = 200;
+    res->content_type = NULL;
+    res->sent = false;
+}
+
+void crest_response_release(crest_response_t* res) {
+    release_body(res);
+    if (!res->arena) {
+        for (size_t i = 0; i < res->header_count; i++) free(res->headers[i].name);
+    }
+    res->header_count = 0;
 }
@@ -0,0 +1,278 @@
+/**
+ * @file compression.cpp
+ * @brief gzip and deflate with zlib streams kept per thread, and a cache
+ * of compressed bodies that do not change
+ */
+
+#include "compression.hpp"
+#include <algorithm>
+#include <cstdint>
+#include <cstring>
+#include <zlib.h>
+
+namespace crest {
+namespace middleware {
+
+namespace {
+
+// One deflate stream per coding, kept for the life of the thread. A stream
+// holds about 256 KiB of window and hash tables, which deflateReset() keeps
+// where deflateInit2() would allocate them again.
+struct Stream {
+    z_stream z{};
+    bool ready = false;
+    int level = 0;
+
+    ~Stream() {
+        if (ready) deflateEnd(&z);
+    }
+};
+
+thread_local Stream streams[2];
+
+Stream* stream_for(Encoding encoding, int level) {
+    Stream& stream = streams[static_cast<int>(encoding)];
+    if (stream.ready) {
+        deflateReset(&stream.z);
+        return &stream;
+    }
+    int window = encoding == Encoding::GZIP ? 15 + 16 : 15;
+    stream.z = z_stream{};
+    if (deflateInit2(&stream.z, level, Z_DEFLATED, window, 8, Z_DEFAULT_STRATEGY) != Z_OK) return nullptr;
+    stream.ready = true;
+    stream.level = level;
+    return &stream;
+}
+
+// Switch a reset stream to level. zlib before 1.2.12 writes the header out
+// as it does, so next_out must already point where the body goes.
+bool set_level(Stream& stream, int level) {
+    if (stream.level == level) return true;
+    if (deflateParams(&stream.z, level, Z_DEFAULT_STRATEGY) != Z_OK) return false;
+    stream.level = level;
+    return true;
+}
+
+// Compress in kStreamChunk steps, growing out as output appears, so a large
+// body needs about its compressed size of memory rather than its full size
+bool compress_streaming(Stream& stream, int level, const unsigned char* in, size_t length, std::string& out) {
+    z_stream* z = &stream.z;
+    out.resize(kStreamChunk);
+    z->next_out = reinterpret_cast<Bytef*>(out.data());
+    z->avail_out = static_cast<uInt>(out.size());
+    if (!set_level(stream, level)) return false;
+
+    size_t remaining = length;
+    size_t produced = static_cast<size_t>(reinterpret_cast<char*>(z->next_out) - out.data());
+    while (true) {
+        if (z->avail_in == 0 && remaining > 0) {
+            size_t step = std::min(remaining, kStreamChunk);
+            z->next_in = const_cast<unsigned char*>(in);
+            z->avail_in = static_cast<uInt>(step);
+            in += step;
+            remaining -= step;
+        }
+        if (produced == out.size()) out.resize(out.size() * 2);
+        z->next_out = reinterpret_cast<Bytef*>(&out[produced]);
+        z->avail_out = static_cast<uInt>(std::min<size_t>(out.size() - produced, UINT32_MAX));
+        int rc = deflate(z, remaining == 0 ? Z_FINISH : Z_NO_FLUSH);
+        produced = static_cast<size_t>(reinterpret_cast<char*>(z->next_out) - out.data());
+        if (rc == Z_STREAM_END) break;
+        if (rc != Z_OK && rc != Z_BUF_ERROR) return false;
+
+        // Data that does not shrink, such as media already compressed,
+        // is not worth the rest of the CPU
+        size_t consumed = length - remaining - z->avail_in;
+        if (consumed >= kStreamProbeBytes && produced * 10 > consumed * 9) return false;
+    }
+    out.resize(produced);
+    return produced < length;
+}
+
+// What an entry costs besides its variants and copies, so entries of
+// bodies that do not shrink count against the budget too
+constexpr size_t kEntryOverhead = 128;
+
+uint64_t rotate(uint64_t value, int bits) {
+    return (value << bits) | (value >> (64 - bits));
+}
+
+} // namespace
+
+const char* encoding_name(Encoding encoding) {
+    return encoding == Encoding::GZIP ? "gzip" : "deflate";
+}
+
+bool compress(Encoding encoding, int level, const void* data, size_t length, std::string& out) {
+    level = std::clamp(level, 1, 9);
+    Stream* stream = stream_for(encoding, level);
+    if (!stream) return false;
+
+    const auto* in = static_cast<const unsigned char*>(data);
+    if (length > kStreamThreshold) return compress_streaming(*stream, level, in, length, out);
+
+    z_stream* z = &stream->z;
+    out.resize(deflateBound(z, static_cast<uLong>(length)));
+    z->next_in = const_cast<unsigned char*>(in);
+    z->avail_in = static_cast<uInt>(length);
+    z->next_out = reinterpret_cast<Bytef*>(out.data());
+    z->avail_out = static_cast<uInt>(out.size());
+    if (!set_level(*stream, level)) return false;
+    if (deflate(z, Z_FINISH) != Z_STREAM_END) return false;
+    out.resize(z->total_out);
+    return out.size() < length;
+}
+
+uint64_t hash_body(const void* data, size_t length) {
+    const auto* bytes = static_cast<const unsigned char*>(data);
+    constexpr uint64_t kMultiply = 0x9e3779b97f4a7c15ull;
+    uint64_t lanes[4] = {length, length ^ 0x6a09e667f3bcc909ull, length ^ 0xbb67ae8584caa73bull,
+                         length ^ 0x3c6ef372fe94f82bull};
+    size_t at = 0;
+    for (; at + 32 <= length; at += 32) {
+        for (int lane = 0; lane < 4; lane++) {
+            uint64_t word;
+            memcpy(&word, bytes + at + lane * 8, sizeof(word));
+            lanes[lane] = (lanes[lane] ^ word) * kMultiply;
+            lanes[lane] ^= lanes[lane] >> 29;
+        }
+    }
+    uint64_t hash = lanes[0] ^ rotate(lanes[1], 17) ^ rotate(lanes[2], 31) ^ rotate(lanes[3], 47);
+    for (; at < length; at++) hash = (hash ^ bytes[at]) * 0x100000001b3ull;
+    // Spread every input bit over the whole result
+    hash ^= hash >> 33;
+    hash *= 0xff51afd7ed558ccdull;
+    hash ^= hash >> 33;
+    hash *= 0xc4ceb9fe1a85ec53ull;
+    hash ^= hash >> 33;
+    return hash;
+}
+
+void release_compressed(void* body) {
+    auto* compressed = static_cast<CompressedBody*>(body);
+    if (compressed->references.fetch_sub(1, std::memory_order_acq_rel) == 1) delete compressed;
+}
+
+PrecompressedCache::PrecompressedCache(size_t max_bytes) : max_bytes_(max_bytes) {}
+
+PrecompressedCache::~PrecompressedCache() {
+    for (Entry& entry : entries_) {
+        for (CompressedBody* variant : entry.variants) {
+            if (variant) release_compressed(variant);
+        }
+    }
+}
+
+CompressedBody* PrecompressedCache::acquire(std::string_view route, uint64_t hash, const void* data,
+                                            size_t length, Encoding encoding, int level) {
+    int slot = static_cast<int>(encoding);
+    // A body whose copy alone is past the budget would only push out the rest
+    bool cacheable = kEntryOverhead + route.size() + length <= max_bytes_;
+    if (cacheable) {
+        std::shared_ptr<const std::string> source;
+        CompressedBody* hit = nullptr;
+        bool incompressible = false;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            auto found = index_.find(Key{route, hash, length});
+            if (found != index_.end()) {
+                entries_.splice(entries_.begin(), entries_, found->second);
+                Entry& entry = *found->second;
+                source = entry.source;
+                incompressible = entry.incompressible[slot];
+                hit = entry.variants[slot];
+                if (hit) hit->references.fetch_add(1, std::memory_order_relaxed);
+            }
+        }
+        // Compared outside the lock, so a large body holds up no one else
+        if (source && same_body(*source, data, length)) {
+            if (incompressible) return nullptr;
+            if (hit) return hit;
+        } else if (hit) {
+            release_compressed(hit);
+        }
+    }
+
+    // Two threads missing on the same body both compress it; the first to
+    // finish is kept
+    auto* body = new CompressedBody();
+    bool shrinks = compress(encoding, level, data, length, body->data);
+    body->data.shrink_to_fit();  // compress() sized it for the worst case
+    if (!cacheable) {
+        if (shrinks) return body;
+        delete body;
+        return nullptr;
+    }
+    auto source = std::make_shared<const std::string>(static_cast<const char*>(data), length);
+
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto found = index_.find(Key{route, hash, length});
+    if (found == index_.end()) {
+        entries_.emplace_front();
+        Entry& entry = entries_.front();
+        entry.route.assign(route);
+        entry.source = std::move(source);
+        entry.hash = hash;
+        entry.length = length;
+        found = index_.emplace(Key{entry.route, hash, length}, entries_.begin()).first;
+        bytes_ += entry_bytes(entry);
+    } else if (!same_body(*found->second->source, data, length)) {
+        // A collision: the entry keeps the body it was made for
+        if (shrinks) return body;
+        delete body;
+        return nullptr;
+    } else {
+        entries_.splice(entries_.begin(), entries_, found->second);
+    }
+
+    Entry& entry = *found->second;
+    if (CompressedBody* existing = entry.variants[slot]) {
+        delete body;
+        existing->references.fetch_add(1, std::memory_order_relaxed);
+        return existing;
+    }
+    if (!shrinks) {
+        delete body;
+        entry.incompressible[slot] = true;
+        evict();
+        return nullptr;
+    }
+    if (body->data.size() <= max_bytes_) {
+        body->references.fetch_add(1, std::memory_order_relaxed);  // the cache's
+        entry.variants[slot] = body;
+        bytes_ += body->data.size();
+    }
+    evict();
+    return body;
+}
+
+bool PrecompressedCache::same_body(const std::string& source, const void* data, size_t length) {
+    return source.size() == length && memcmp(source.data(), data, length) == 0;
+}
+
+size_t PrecompressedCache::entry_bytes(const Entry& entry) {
+    return kEntryOverhead + entry.route.size() + entry.length;
+}
+
+void PrecompressedCache::evict() {
+    // The entry just used is at the front and stays
+    while (bytes_ > max_bytes_ && entries_.size() > 1) {
+        Entry& entry = entries_.back();
+        for (CompressedBody* variant : entry.variants) {
+            if (!variant) continue;
+            bytes_ -= variant->data.size();
+            release_compressed(variant);
+        }
+        bytes_ -= entry_bytes(entry);
+        index_.erase(Key{entry.route, entry.hash, entry.length});
+        entries_.pop_back();
+    }
+}
+
+size_t PrecompressedCache::cached_bytes() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return bytes_;
+}
+
+} // namespace middleware
+} // namespace crest
@@ -0,0 +1,151 @@
+/**
+ * @file compression.hpp
+ * @brief gzip and deflate with zlib streams kept per thread, and a cache
+ * of compressed bodies that do not change
+ */
+
+#ifndef CREST_COMPRESSION_HPP
+#define CREST_COMPRESSION_HPP
+
+#include <atomic>
+#include <cstddef>
+#include <cstdint>
+#include <list>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+
+namespace crest {
+namespace middleware {
+
+/** Content codings the compressor produces */
+enum class Encoding {
+    GZIP,     // RFC 1952
+    DEFLATE,  // zlib format (RFC 1950), what HTTP calls "deflate"
+};
+
+/**
+ * Bodies up to this size are compressed in one call into a buffer sized
+ * for the worst case; larger ones are fed in kStreamChunk steps into a
+ * buffer that grows with the output.
+ */
+constexpr size_t kStreamThreshold = 256 * 1024;
+
+/** Input handed to zlib per step when streaming */
+constexpr size_t kStreamChunk = 64 * 1024;
+
+/** A streamed body is abandoned once this much of it compressed worse than 9:10 */
+constexpr size_t kStreamProbeBytes = 256 * 1024;
+
+/** The Content-Encoding value for encoding */
+const char* encoding_name(Encoding encoding);
+
+/**
+ * @brief Compress length bytes of data into out
+ *
+ * Uses this thread's zlib stream for encoding, created on first use and
+ * reset for each body, so steady traffic allocates no compressor state.
+ * level is zlib's, from 1 (fastest) to 9 (smallest).
+ *
+ * @return false if the output would not be smaller than the input, or
+ * zlib failed; out is then unspecified
+ */
+bool compress(Encoding encoding, int level, const void* data, size_t length, std::string& out);
+
+/** Bytes of compressed bodies a PrecompressedCache keeps by default */
+constexpr size_t kPrecompressedCacheBytes = 16 * 1024 * 1024;
+
+/**
+ * @brief Hash of a body, for PrecompressedCache keys
+ *
+ * Reads eight bytes at a time in four independent lanes, so hashing a
+ * body costs a small fraction of compressing it. Not cryptographic.
+ */
+uint64_t hash_body(const void* data, size_t length);
+
+/** A compressed body, shared by every response sending it */
+struct CompressedBody {
+    std::string data;
+    std::atomic<int> references{1};
+};
+
+/** Drop a reference taken by PrecompressedCache::acquire(); a body release function */
+void release_compressed(void* body);
+
+/**
+ * @brief Compressed forms of bodies that do not change, built once
+ *
+ * Entries are keyed by a route, naming where a body comes from, and the
+ * body's hash and length, and hold one variant per encoding, compressed
+ * the first time a client asks for it. Later requests get the same bytes
+ * by reference without compressing anything. Each entry keeps a copy of
+ * its body, and a hit is compared with it, so two bodies whose hashes
+ * collide never get each other's bytes. Least recently used entries go
+ * once the variants and copies exceed the byte budget; responses still
+ * sending one keep it alive.
+ */
+class PrecompressedCache {
+public:
+    explicit PrecompressedCache(size_t max_bytes = kPrecompressedCacheBytes);
+    ~PrecompressedCache();
+
+    PrecompressedCache(const PrecompressedCache&) = delete;
+    PrecompressedCache& operator=(const PrecompressedCache&) = delete;
+
+    /**
+     * @brief The body compressed with encoding, with a reference for the
+     * caller
+     *
+     * hash is hash_body() of the body; callers that keep it avoid hashing
+     * again. A miss compresses at level outside the lock, so requests for
+     * other bodies do not wait. A body that collides with the cached one
+     * for its key is compressed for this caller alone.
+     *
+     * @return nullptr if the body does not shrink, which is remembered too
+     */
+    CompressedBody* acquire(std::string_view route, uint64_t hash, const void* data, size_t length,
+                            Encoding encoding, int level);
+
+    /** Bytes of compressed variants held */
+    size_t cached_bytes() const;
+
+private:
+    struct Key {
+        std::string_view route;  // views Entry::route
+        uint64_t hash;
+        size_t length;
+        bool operator==(const Key& other) const {
+            return hash == other.hash && length == other.length && route == other.route;
+        }
+    };
+    struct KeyHash {
+        size_t operator()(const Key& key) const {
+            return static_cast<size_t>(key.hash ^ std::hash<std::string_view>()(key.route));
+        }
+    };
+    struct Entry {
+        std::string route;
+        std::shared_ptr<const std::string> source;  // the body, to confirm a hit outside the lock
+        uint64_t hash = 0;
+        size_t length = 0;
+        CompressedBody* variants[2] = {};  // per Encoding; each holds one reference
+        bool incompressible[2] = {};
+    };
+
+    static bool same_body(const std::string& source, const void* data, size_t length);
+    static size_t entry_bytes(const Entry& entry);
+    void evict();
+
+    size_t max_bytes_;
+    mutable std::mutex mutex_;
+    std::list<Entry> entries_;  // most recently used first
+    std::unordered_map<Key, std::list<Entry>::iterator, KeyHash> index_;
+    size_t bytes_ = 0;
+};
+
+} // namespace middleware
+} // namespace crest
+
+#endif // CREST_COMPRESSION_HPP
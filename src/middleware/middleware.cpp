@@ -4,11 +4,41 @@
  */
 
 #include "crest/middleware.hpp"
+#include "crest/internal/app_internal.h"
+#include "compression.hpp"
+#include "../server/server_internal.hpp"
+#include <algorithm>
+#include <cctype>
 #include <chrono>
+#include <cstring>
 #include <sstream>
 
 namespace crest {
 
+namespace {
+
+// Whether a Vary value names field, in any case, or is "*"
+bool varies_on(const char* vary, std::string_view field) {
+    std::string_view rest(vary);
+    while (!rest.empty()) {
+        size_t comma = rest.find(',');
+        std::string_view item = rest.substr(0, comma);
+        rest = comma == std::string_view::npos ? std::string_view() : rest.substr(comma + 1);
+        while (!item.empty() && (item.front() == ' ' || item.front() == '\t')) item.remove_prefix(1);
+        while (!item.empty() && (item.back() == ' ' || item.back() == '\t')) item.remove_suffix(1);
+        if (item == "*") return true;
+        if (item.size() == field.size() &&
+            std::equal(item.begin(), item.end(), field.begin(), [](char x, char y) {
+                return std::tolower(static_cast<unsigned char>(x)) == std::tolower(static_cast<unsigned char>(y));
+            })) {
+            return true;
+        }
+    }
+    return false;
+}
+
+} // namespace
+
 void CorsMiddleware::handle(Request& req, Response& res, NextFunction next) {
     std::string origin = req.header("Origin");
     
@@ -126,14 +156,96 @@ void LoggingMiddleware::handle(Request& req, Response& res, NextFunction next) {
     printf("[%s] %s - %dms\n", req.method().c_str(), req.path().c_str(), (int)duration.count());
 }
 
-void CompressionMiddleware::handle(Request& req, Response& res, NextFunction next) {
-    std::string accept_encoding = req.header("Accept-Encoding");
-    
-    if (accept_encoding.find("gzip") != std::string::npos) {
-        res.set_header("Content-Encoding", "gzip");
+bool CompressionMiddleware::compressible(const char* content_type) const {
+    if (!content_type) return false;
+    std::string_view type(content_type);
+    type = type.substr(0, type.find(';'));
+    while (!type.empty() && type.back() == ' ') type.remove_suffix(1);
+    auto same_text = [](std::string_view a, std::string_view b) {
+        return a.size() == b.size() && std::equal(a.begin(), a.end(), b.begin(), [](char x, char y) {
+            return std::tolower(static_cast<unsigned char>(x)) == std::tolower(static_cast<unsigned char>(y));
+        });
+    };
+    for (const std::string& allowed : options_.content_types) {
+        if (allowed.empty()) continue;
+        if (allowed.back() == '/') {
+            if (type.size() > allowed.size() && same_text(type.substr(0, allowed.size()), allowed)) return true;
+        } else if (allowed.front() == '+') {
+            if (type.size() > allowed.size() && same_text(type.substr(type.size() - allowed.size()), allowed)) return true;
+        } else if (same_text(type, allowed)) {
+            return true;
+        }
     }
-    
+    return false;
+}
+
+CompressionMiddleware::CompressionMiddleware(const Options& opts) : options_(opts) {
+    if (options_.cache_bytes > 0) {
+        cache_ = std::make_shared<middleware::PrecompressedCache>(options_.cache_bytes);
+    }
+}
+
+void CompressionMiddleware::handle(Request& req, Response& res, NextFunction next) {
     next();
+
+    // Without Accept-Encoding the client gets the body as written
+    const char* accept = crest_request_get_header(req.raw(), "Accept-Encoding");
+    if (!accept) return;
+
+    crest_response_t* raw = res.raw();
+    if (!raw->sent || raw->head || raw->body_from_file || raw->status == 206 ||
+        raw->body_length < options_.min_size || crest_response_get_header(raw, "Content-Encoding")) {
+        return;
+    }
+    const char* type = crest_response_get_header(raw, "Content-Type");
+    if (!compressible(type ? type : raw->content_type)) return;
+
+    // Caches must keep the encodings apart, whichever one this client gets
+    const char* vary = crest_response_get_header(raw, "Vary");
+    if (!vary) {
+        crest_response_set_header(raw, "Vary", "Accept-Encoding");
+    } else if (!varies_on(vary, "Accept-Encoding")) {
+        crest_response_set_header(raw, "Vary", (std::string(vary) + ", Accept-Encoding").c_str());
+    }
+
+    middleware::Encoding encoding;
+    if (server::accepts_encoding(accept, "gzip")) {
+        encoding = middleware::Encoding::GZIP;
+    } else if (options_.deflate && server::accepts_encoding(accept, "deflate")) {
+        encoding = middleware::Encoding::DEFLATE;
+    } else {
+        return;
+    }
+
+    // An immutable body is compressed hard once and then sent by reference.
+    // It is filed under its route, so "/users/:id" holds one entry per
+    // distinct body rather than one per id requested.
+    middleware::CompressedBody* cached = nullptr;
+    std::string* body = nullptr;
+    if (raw->body_immutable && cache_) {
+        const crest_request_t* source = req.raw();
+        const char* route = source->route ? source->route : source->path;
+        uint64_t hash = middleware::hash_body(raw->body, raw->body_length);
+        cached = cache_->acquire(route ? route : "", hash, raw->body, raw->body_length, encoding, 9);
+        if (!cached) return;
+    } else {
+        body = new std::string();
+        if (!middleware::compress(encoding, options_.level, raw->body, raw->body_length, *body)) {
+            delete body;
+            return;
+        }
+    }
+    crest_response_set_header(raw, "Content-Encoding", middleware::encoding_name(encoding));
+    // The encoded bytes differ, so a strong validator no longer fits them
+    const char* etag = crest_response_get_header(raw, "ETag");
+    if (etag && etag[0] == '"') crest_response_set_header(raw, "ETag", (std::string("W/") + etag).c_str());
+    if (cached) {
+        crest_response_replace_body(raw, cached->data.data(), cached->data.size(), middleware::release_compressed,
+                                    cached);
+    } else {
+        crest_response_replace_body(raw, body->data(), body->size(),
+                                    [](void* context) { delete static_cast<std::string*>(context); }, body);
+    }
 }
 
 } // namespace crest
@@ -0,0 +1,95 @@
+/**
+ * @file route_table.cpp
+ * @brief Routes published to request handling as immutable snapshots
+ */
+
+#include "route_table.hpp"
+#include <cassert>
+#include <mutex>
+#include <thread>
+
+namespace crest {
+namespace router {
+
+RouteTable::RouteTable(crest_app_t* app) : app_(app), current_(0) {
+    swap_in(new RouteSnapshot());
+}
+
+RouteTable::~RouteTable() {
+    // No reader may outlive the table, so the count is zero
+    delete unpack(current_.load(std::memory_order_acquire));
+}
+
+RouteTable::Reader RouteTable::read() const {
+    if (stale_.load(std::memory_order_acquire)) publish();
+
+    uint64_t word = current_.load(std::memory_order_relaxed);
+    while (true) {
+        if ((word & kCountMask) == kCountMask) {
+            // One more would carry into the pointer
+            std::this_thread::yield();
+            word = current_.load(std::memory_order_relaxed);
+            continue;
+        }
+        if (current_.compare_exchange_weak(word, word + 1, std::memory_order_acquire,
+                                           std::memory_order_relaxed)) {
+            return Reader(*this, unpack(word));
+        }
+    }
+}
+
+void RouteTable::release(const RouteSnapshot* snapshot) const {
+    uint64_t word = current_.load(std::memory_order_relaxed);
+    while (unpack(word) == snapshot) {
+        if (current_.compare_exchange_weak(word, word - 1, std::memory_order_release,
+                                           std::memory_order_relaxed)) {
+            return;
+        }
+    }
+
+    // Replaced meanwhile: this hold was moved into the snapshot's own count
+    if (snapshot->refs_.fetch_sub(1, std::memory_order_acq_rel) == 1) delete snapshot;
+}
+
+void RouteTable::swap_in(const RouteSnapshot* snapshot) const {
+    assert(unpack(pack(snapshot)) == snapshot);
+    uint64_t old = current_.exchange(pack(snapshot), std::memory_order_acq_rel);
+    const RouteSnapshot* retired = unpack(old);
+    if (!retired) return;
+
+    // Readers that release before this add drive refs_ below zero, so it
+    // only reaches zero once the last of them is done
+    int64_t holders = static_cast<int64_t>(old & kCountMask);
+    if (retired->refs_.fetch_add(holders, std::memory_order_acq_rel) + holders == 0) delete retired;
+}
+
+bool RouteTable::insert(crest_method_t method, std::string_view pattern, size_t route) {
+    return router_.insert(method, pattern, route);
+}
+
+void RouteTable::mark_stale() {
+    stale_.store(true, std::memory_order_release);
+}
+
+void RouteTable::publish() const {
+    std::lock_guard<std::mutex> lock(*static_cast<std::mutex*>(app_->route_mutex));
+    if (!stale_.load(std::memory_order_relaxed)) return;  // another reader did
+
+    auto* snapshot = new RouteSnapshot();
+    snapshot->router = router_;
+    snapshot->targets.resize(app_->route_count);
+    for (size_t i = 0; i < app_->route_count; i++) {
+        RouteTarget& target = snapshot->targets[i];
+        const crest_route_entry_t& route = app_->routes[i];
+        target.pattern = route.path;
+        target.handler = route.handler;
+        target.cpp_handler = route.cpp_handler;
+        target.stream_body = route.stream_body;
+        target.max_body_size = route.max_body_size;
+    }
+    swap_in(snapshot);
+    stale_.store(false, std::memory_order_release);  // readers then see the new snapshot
+}
+
+} // namespace router
+} // namespace crest
@@ -0,0 +1,128 @@
+/**
+ * @file route_table.hpp
+ * @brief Routes published to request handling as immutable snapshots
+ */
+
+#ifndef CREST_ROUTE_TABLE_HPP
+#define CREST_ROUTE_TABLE_HPP
+
+#include "crest/internal/app_internal.h"
+#include "route_tree.hpp"
+#include <atomic>
+#include <cstdint>
+#include <string>
+#include <vector>
+
+namespace crest {
+namespace router {
+
+/** What dispatch needs of a route; indexed by RouteMatch::route */
+struct RouteTarget {
+    std::string pattern;  // as registered, e.g. "/users/:id"
+    crest_handler_t handler = nullptr;
+    void* cpp_handler = nullptr;  // crest::Handler*, preferred over handler
+    bool stream_body = false;
+    size_t max_body_size = 0;
+};
+
+/**
+ * @brief One published version of the routes; never modified once published
+ */
+struct RouteSnapshot {
+    Router router;
+    std::vector<RouteTarget> targets;
+
+private:
+    friend class RouteTable;
+    // Holds moved here from the table's count when the snapshot is replaced
+    mutable std::atomic<int64_t> refs_{0};
+};
+
+/**
+ * @brief Route lookup for request handling, read without locking
+ *
+ * Registration keeps its own tree, guarded by the app's route_mutex like
+ * the rest of the route entries, and marks the table stale after each
+ * change. The next lookup builds a fresh snapshot under the mutex and
+ * swaps it in with one atomic exchange, so registering routes one after
+ * another at startup copies the tree once rather than once per route.
+ * Readers pin the
+ * current snapshot with a single compare-and-swap on a word that packs the
+ * snapshot pointer with a count of its readers; when a snapshot is
+ * replaced, that count moves into the snapshot itself and the last reader
+ * to let go frees it. Lookups therefore only block to build the snapshot
+ * after a change, handlers never wait on registration or on each other,
+ * and registration never waits for handlers to finish.
+ */
+class RouteTable {
+public:
+    /**
+     * @brief Keeps one snapshot alive; must not outlive the table
+     */
+    class Reader {
+    public:
+        Reader(const RouteTable& table, const RouteSnapshot* snapshot)
+            : table_(table), snapshot_(snapshot) {}
+        Reader(const Reader&) = delete;
+        Reader& operator=(const Reader&) = delete;
+        ~Reader() { table_.release(snapshot_); }
+
+        const RouteSnapshot* operator->() const { return snapshot_; }
+        const RouteSnapshot& operator*() const { return *snapshot_; }
+
+    private:
+        const RouteTable& table_;
+        const RouteSnapshot* snapshot_;
+    };
+
+    /** The table of app's routes; built before app's route_mutex exists */
+    explicit RouteTable(crest_app_t* app);
+    ~RouteTable();
+    RouteTable(const RouteTable&) = delete;
+    RouteTable& operator=(const RouteTable&) = delete;
+
+    /** Pin the current snapshot, publishing the routes first if they changed */
+    Reader read() const;
+
+    /**
+     * @brief Add a pattern to the registration tree; the caller holds
+     * route_mutex and marks the table stale afterwards
+     * @return false if the pattern is malformed or conflicts with a route
+     */
+    bool insert(crest_method_t method, std::string_view pattern, size_t route);
+
+    /**
+     * @brief Have the next read() publish the registration tree and the
+     * app's route entries; the caller holds route_mutex
+     */
+    void mark_stale();
+
+private:
+    // Low bits of current_ count readers of the snapshot in the high bits.
+    // User-space pointers fit in 48 bits on the supported 64-bit platforms,
+    // which leaves room for 65535 requests holding one snapshot at a time;
+    // another waits until one of them lets go.
+    static constexpr int kCountBits = 16;
+    static constexpr uint64_t kCountMask = (uint64_t(1) << kCountBits) - 1;
+
+    static uint64_t pack(const RouteSnapshot* snapshot) {
+        return static_cast<uint64_t>(reinterpret_cast<uintptr_t>(snapshot)) << kCountBits;
+    }
+    static const RouteSnapshot* unpack(uint64_t word) {
+        return reinterpret_cast<const RouteSnapshot*>(static_cast<uintptr_t>(word >> kCountBits));
+    }
+
+    void publish() const;
+    void swap_in(const RouteSnapshot* snapshot) const;
+    void release(const RouteSnapshot* snapshot) const;
+
+    crest_app_t* app_;
+    Router router_;
+    mutable std::atomic<uint64_t> current_;
+    mutable std::atomic<bool> stale_{false};
+};
+
+} // namespace router
+} // namespace crest
+
+#endif // CREST_ROUTE_TABLE_HPP
@@ -0,0 +1,232 @@
+/**
+ * @file route_tree.cpp
+ * @brief Compressed radix tree mapping request paths to routes
+ */
+
+#include "route_tree.hpp"
+#include <algorithm>
+
+namespace crest {
+namespace router {
+
+struct RouteTree::Node {
+    std::string prefix;   // static bytes this node matches
+    std::string name;     // parameter name of a "{name}" or "*name" node
+    std::string indices;  // first byte of each static child, in children order
+    std::vector<std::unique_ptr<Node>> children;
+    std::unique_ptr<Node> param;
+    std::unique_ptr<Node> wildcard;
+    bool has_route = false;
+    size_t route = 0;
+};
+
+RouteTree::RouteTree() : root_(std::make_unique<Node>()) {}
+
+RouteTree::RouteTree(const RouteTree& other) : root_(clone(*other.root_)) {}
+
+RouteTree& RouteTree::operator=(const RouteTree& other) {
+    if (this != &other) root_ = clone(*other.root_);
+    return *this;
+}
+
+RouteTree::~RouteTree() = default;
+
+std::unique_ptr<RouteTree::Node> RouteTree::clone(const Node& node) {
+    auto copy = std::make_unique<Node>();
+    copy->prefix = node.prefix;
+    copy->name = node.name;
+    copy->indices = node.indices;
+    copy->children.reserve(node.children.size());
+    for (const auto& child : node.children) copy->children.push_back(clone(*child));
+    if (node.param) copy->param = clone(*node.param);
+    if (node.wildcard) copy->wildcard = clone(*node.wildcard);
+    copy->has_route = node.has_route;
+    copy->route = node.route;
+    return copy;
+}
+
+// Special segments only count where a segment starts
+static bool segment_start(std::string_view text, size_t i) {
+    return i == 0 || text[i - 1] == '/';
+}
+
+static bool is_special(char c) {
+    return c == '{' || c == ':' || c == '*';
+}
+
+// Every "{name}" must fill its segment and a wildcard may only start the
+// last one, so a rejected pattern leaves no parameter nodes behind
+static bool valid_pattern(std::string_view pattern) {
+    size_t params = 0;
+    for (size_t i = 0; i < pattern.size(); i++) {
+        if (!segment_start(pattern, i)) continue;
+        size_t end = pattern.find('/', i);
+        if (end == std::string_view::npos) end = pattern.size();
+        std::string_view segment = pattern.substr(i, end - i);
+
+        if (!segment.empty() && segment[0] == '*') {
+            if (end != pattern.size() || segment.find_first_of("{}*", 1) != std::string_view::npos) {
+                return false;
+            }
+            params++;
+        } else if (!segment.empty() && segment[0] == '{') {
+            if (segment.size() < 3 || segment.back() != '}' ||
+                segment.substr(1, segment.size() - 2).find_first_of("{}*") != std::string_view::npos) {
+                return false;
+            }
+            params++;
+        } else if (!segment.empty() && segment[0] == ':') {
+            if (segment.size() < 2) return false;
+            params++;
+        }
+    }
+    return params <= kMaxParams;
+}
+
+bool RouteTree::insert(std::string_view pattern, size_t route) {
+    return valid_pattern(pattern) && insert_at(*root_, pattern, route);
+}
+
+// Cut node's prefix at `at`; the rest of it, and everything below, moves
+// into a single static child
+void RouteTree::split(Node& node, size_t at) {
+    auto tail = std::make_unique<Node>();
+    tail->prefix = node.prefix.substr(at);
+    tail->indices = std::move(node.indices);
+    tail->children = std::move(node.children);
+    tail->param = std::move(node.param);
+    tail->wildcard = std::move(node.wildcard);
+    tail->has_route = node.has_route;
+    tail->route = node.route;
+
+    node.prefix.resize(at);
+    node.indices.assign(1, tail->prefix[0]);
+    node.children.clear();
+    node.children.push_back(std::move(tail));
+    node.has_route = false;
+    node.route = 0;
+}
+
+bool RouteTree::insert_at(Node& node, std::string_view rest, size_t route) {
+    if (rest.empty()) {
+        if (node.has_route) return false;
+        node.has_route = true;
+        node.route = route;
+        return true;
+    }
+
+    if (rest[0] == '{' || rest[0] == ':') {
+        size_t end = rest[0] == '{' ? rest.find('}') + 1 : std::min(rest.find('/'), rest.size());
+        std::string_view name = rest.substr(1, rest[0] == '{' ? end - 2 : end - 1);
+        rest.remove_prefix(end);
+
+        if (!node.param) {
+            node.param = std::make_unique<Node>();
+            node.param->name = std::string(name);
+        } else if (node.param->name != name) {
+            return false;
+        }
+        return insert_at(*node.param, rest, route);
+    }
+
+    if (rest[0] == '*') {
+        if (node.wildcard) return false;
+        node.wildcard = std::make_unique<Node>();
+        node.wildcard->name = std::string(rest.substr(1));
+        node.wildcard->has_route = true;
+        node.wildcard->route = route;
+        return true;
+    }
+
+    // Static text runs up to the next parameter or wildcard segment
+    size_t end = 1;
+    while (end < rest.size() && !(is_special(rest[end]) && segment_start(rest, end))) {
+        end++;
+    }
+    std::string_view text = rest.substr(0, end);
+    rest.remove_prefix(end);
+
+    Node* current = &node;
+    while (!text.empty()) {
+        size_t i = current->indices.find(text[0]);
+        if (i == std::string::npos) {
+            auto child = std::make_unique<Node>();
+            child->prefix = std::string(text);
+            current->indices.push_back(text[0]);
+            current->children.push_back(std::move(child));
+            current = current->children.back().get();
+            break;
+        }
+
+        Node& child = *current->children[i];
+        size_t common = 0;
+        while (common < child.prefix.size() && common < text.size() &&
+               child.prefix[common] == text[common]) {
+            common++;
+        }
+        if (common < child.prefix.size()) split(child, common);
+        text.remove_prefix(common);
+        current = &child;
+    }
+    return insert_at(*current, rest, route);
+}
+
+bool RouteTree::find(std::string_view path, RouteMatch& match) const {
+    match.param_count = 0;
+    return find_at(*root_, path, match);
+}
+
+bool RouteTree::find_at(const Node& node, std::string_view path, RouteMatch& match) {
+    if (path.empty() && node.has_route) {
+        match.route = node.route;
+        return true;
+    }
+
+    if (!path.empty()) {
+        size_t i = node.indices.find(path[0]);
+        if (i != std::string::npos) {
+            const Node& child = *node.children[i];
+            if (path.compare(0, child.prefix.size(), child.prefix) == 0 &&
+                find_at(child, path.substr(child.prefix.size()), match)) {
+                return true;
+            }
+        }
+
+        if (node.param) {
+            size_t end = path.find('/');
+            if (end == std::string_view::npos) end = path.size();
+            if (end > 0) {
+                size_t saved = match.param_count;
+                match.params[match.param_count++] = {node.param->name, path.substr(0, end)};
+                if (find_at(*node.param, path.substr(end), match)) return true;
+                match.param_count = saved;
+            }
+        }
+    }
+
+    if (node.wildcard) {
+        match.params[match.param_count++] = {node.wildcard->name, path};
+        match.route = node.wildcard->route;
+        return true;
+    }
+    return false;
+}
+
+static const char* const kMethodNames[kMethodCount] = {
+    "GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"
+};
+
+bool Router::insert(crest_method_t method, std::string_view pattern, size_t route) {
+    if (static_cast<size_t>(method) >= kMethodCount) return false;
+    return trees_[method].insert(pattern, route);
+}
+
+bool Router::find(std::string_view method, std::string_view path, RouteMatch& match) const {
+    for (size_t i = 0; i < kMethodCount; i++) {
+        if (method == kMethodNames[i]) return trees_[i].find(path, match);
+    }
+    return false;
+}
+
+} // namespace router
+} // namespace crest
@@ -0,0 +1,91 @@
+/**
+ * @file route_tree.hpp
+ * @brief Compressed radix tree mapping request paths to routes
+ */
+
+#ifndef CREST_ROUTE_TREE_HPP
+#define CREST_ROUTE_TREE_HPP
+
+#include "crest/crest.h"
+#include <cstddef>
+#include <memory>
+#include <string>
+#include <string_view>
+#include <vector>
+
+namespace crest {
+namespace router {
+
+/** Parameters a route pattern may declare */
+constexpr size_t kMaxParams = 16;
+
+/** One crest_method_t value per tree */
+constexpr size_t kMethodCount = CREST_OPTIONS + 1;
+
+struct RouteParam {
+    std::string_view name;   // points into the tree
+    std::string_view value;  // points into the matched path
+};
+
+struct RouteMatch {
+    size_t route = 0;  // index passed to insert()
+    size_t param_count = 0;
+    RouteParam params[kMaxParams];
+};
+
+/**
+ * @brief Routes of one method, keyed by path pattern
+ *
+ * Patterns are matched segment by segment. A segment written "{name}" or
+ * ":name" matches any non-empty segment and captures it; a final segment
+ * "*" or "*name" matches the rest of the path, slashes included. Every
+ * other byte must match exactly. Static text wins over a parameter, and a parameter
+ * over a wildcard; a lookup backtracks when a more specific branch fails
+ * further down.
+ */
+class RouteTree {
+public:
+    RouteTree();
+    RouteTree(const RouteTree& other);
+    RouteTree& operator=(const RouteTree& other);
+    ~RouteTree();
+
+    /**
+     * @return false if the pattern is malformed, already registered, or
+     *         names a parameter differently from a pattern sharing its
+     *         position (e.g. "/users/{id}" next to "/users/{name}/posts")
+     */
+    bool insert(std::string_view pattern, size_t route);
+
+    /** @return false if no pattern matches path */
+    bool find(std::string_view path, RouteMatch& match) const;
+
+private:
+    struct Node;
+
+    static std::unique_ptr<Node> clone(const Node& node);
+    static void split(Node& node, size_t at);
+    static bool insert_at(Node& node, std::string_view rest, size_t route);
+    static bool find_at(const Node& node, std::string_view path, RouteMatch& match);
+
+    std::unique_ptr<Node> root_;
+};
+
+/**
+ * @brief Route trees for every method
+ */
+class Router {
+public:
+    bool insert(crest_method_t method, std::string_view pattern, size_t route);
+
+    /** @param method Method as sent, e.g. "GET" */
+    bool find(std::string_view method, std::string_view path, RouteMatch& match) const;
+
+private:
+    RouteTree trees_[kMethodCount];
+};
+
+} // namespace router
+} // namespace crest
+
+#endif // CREST_ROUTE_TREE_HPP
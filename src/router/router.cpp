@@ -5,6 +5,7 @@
 
 #include "crest/crest.h"
 #include "crest/internal/app_internal.h"
+#include "route_table.hpp"
 #include <cstring>
 #include <cstdlib>
 #include <mutex>
@@ -15,19 +16,18 @@
 
 extern "C" {
 
-int crest_route(crest_app_t* app, crest_method_t method, const char* path,
-                crest_handler_t handler, const char* description) {
-    if (!app || !path || !handler) return -1;
-    
+void* crest_route_table_create(crest_app_t* app) {
+    return new crest::router::RouteTable(app);
+}
+
+void crest_route_table_destroy(void* table) {
+    delete static_cast<crest::router::RouteTable*>(table);
+}
+
+static int add_route(crest_app_t* app, crest_method_t method, const char* path,
+                     crest_handler_t handler, void* cpp_handler, const char* description) {
     std::lock_guard<std::mutex> lock(*static_cast<std::mutex*>(app->route_mutex));
     
-    // Check for duplicate routes
-    for (size_t i = 0; i < app->route_count; i++) {
-        if (app->routes[i].method == method && strcmp(app->routes[i].path, path) == 0) {
-            return -1; // Duplicate route
-        }
-    }
-    
     // Expand capacity if needed
     if (app->route_count >= app->route_capacity) {
         size_t new_capacity = app->route_capacity == 0 ? 16 : app->route_capacity * 2;
@@ -38,20 +38,40 @@ int crest_route(crest_app_t* app, crest_method_t method, const char* path,
         app->route_capacity = new_capacity;
     }
     
+    // Rejects duplicates and malformed or conflicting patterns
+    auto* table = static_cast<crest::router::RouteTable*>(app->route_table);
+    if (!table->insert(method, path, app->route_count)) return -1;
+    
     // Add route
     crest_route_entry_t* entry = &app->routes[app->route_count];
     entry->method = method;
     entry->path = strdup(path);
     entry->handler = handler;
     entry->description = description ? strdup(description) : strdup("");
-    entry->cpp_handler = nullptr;
+    entry->cpp_handler = cpp_handler;
     entry->request_schema = nullptr;
     entry->response_schema = nullptr;
+    entry->stream_body = false;
+    entry->max_body_size = 0;
     
     app->route_count++;
+    app->docs_version++;
+    table->mark_stale();
     return 0;
 }
 
+int crest_route(crest_app_t* app, crest_method_t method, const char* path,
+                crest_handler_t handler, const char* description) {
+    if (!app || !path || !handler) return -1;
+    return add_route(app, method, path, handler, nullptr, description);
+}
+
+int crest_route_cpp(crest_app_t* app, crest_method_t method, const char* path,
+                    void* cpp_handler, const char* description) {
+    if (!app || !path || !cpp_handler) return -1;
+    return add_route(app, method, path, nullptr, cpp_handler, description);
+}
+
 void crest_set_request_schema(crest_app_t* app, crest_method_t method, const char* path, const char* schema) {
     if (!app || !path || !schema) return;
     
@@ -61,6 +81,7 @@ void crest_set_request_schema(crest_app_t* app, crest_method_t method, const cha
         if (app->routes[i].method == method && strcmp(app->routes[i].path, path) == 0) {
             free(app->routes[i].request_schema);
             app->routes[i].request_schema = strdup(schema);
+            app->docs_version++;
             return;
         }
     }
@@ -75,6 +96,22 @@ void crest_set_response_schema(crest_app_t* app, crest_method_t method, const ch
         if (app->routes[i].method == method && strcmp(app->routes[i].path, path) == 0) {
             free(app->routes[i].response_schema);
             app->routes[i].response_schema = strdup(schema);
+            app->docs_version++;
+            return;
+        }
+    }
+}
+
+void crest_set_body_streaming(crest_app_t* app, crest_method_t method, const char* path, size_t max_bytes) {
+    if (!app || !path) return;
+    
+    std::lock_guard<std::mutex> lock(*static_cast<std::mutex*>(app->route_mutex));
+    
+    for (size_t i = 0; i < app->route_count; i++) {
+        if (app->routes[i].method == method && strcmp(app->routes[i].path, path) == 0) {
+            app->routes[i].stream_body = true;
+            app->routes[i].max_body_size = max_bytes;
+            static_cast<crest::router::RouteTable*>(app->route_table)->mark_stale();
             return;
         }
     }
@@ -0,0 +1,141 @@
+/**
+ * @file affinity.cpp
+ * @brief CPU topology and thread pinning for worker groups
+ */
+
+#include "affinity.hpp"
+#include <algorithm>
+#include <cstdlib>
+#include <fstream>
+
+#if defined(__linux__)
+    #include <dirent.h>
+    #include <pthread.h>
+    #include <sched.h>
+#endif
+
+namespace crest {
+namespace server {
+
+std::vector<int> parse_cpu_list(const std::string& list) {
+    std::vector<int> cpus;
+    size_t pos = 0;
+    while (pos < list.size()) {
+        size_t end = list.find(',', pos);
+        if (end == std::string::npos) end = list.size();
+        std::string item = list.substr(pos, end - pos);
+        while (!item.empty() && (item.back() == '\n' || item.back() == ' ')) item.pop_back();
+        pos = end + 1;
+        if (item.empty()) continue;
+
+        char* rest = nullptr;
+        long first = strtol(item.c_str(), &rest, 10);
+        long last = first;
+        if (rest == item.c_str() || first < 0) return {};
+        if (*rest == '-') {
+            const char* from = rest + 1;
+            last = strtol(from, &rest, 10);
+            if (rest == from || last < first) return {};
+        }
+        if (*rest != '\0') return {};
+        for (long cpu = first; cpu <= last; cpu++) cpus.push_back(static_cast<int>(cpu));
+    }
+    std::sort(cpus.begin(), cpus.end());
+    cpus.erase(std::unique(cpus.begin(), cpus.end()), cpus.end());
+    return cpus;
+}
+
+std::vector<std::vector<int>> group_cpus(const std::vector<std::vector<int>>& nodes, size_t groups) {
+    std::vector<std::vector<int>> result;
+    if (nodes.empty() || groups == 0) return result;
+    result.resize(groups);
+    if (groups <= nodes.size()) {
+        for (size_t n = 0; n < nodes.size(); n++) {
+            auto& cpus = result[n % groups];
+            cpus.insert(cpus.end(), nodes[n].begin(), nodes[n].end());
+        }
+    } else {
+        for (size_t g = 0; g < groups; g++) result[g] = nodes[g % nodes.size()];
+    }
+    return result;
+}
+
+#if defined(__linux__)
+
+std::vector<int> thread_cpus() {
+    std::vector<int> cpus;
+    cpu_set_t set;
+    CPU_ZERO(&set);
+    if (pthread_getaffinity_np(pthread_self(), sizeof(set), &set) != 0) return cpus;
+    for (int cpu = 0; cpu < CPU_SETSIZE; cpu++) {
+        if (CPU_ISSET(cpu, &set)) cpus.push_back(cpu);
+    }
+    return cpus;
+}
+
+bool pin_thread(const std::vector<int>& cpus) {
+    cpu_set_t set;
+    CPU_ZERO(&set);
+    for (int cpu : cpus) {
+        if (cpu >= 0 && cpu < CPU_SETSIZE) CPU_SET(cpu, &set);
+    }
+    if (CPU_COUNT(&set) == 0) return false;
+    return pthread_setaffinity_np(pthread_self(), sizeof(set), &set) == 0;
+}
+
+std::vector<std::vector<int>> numa_nodes() {
+    std::vector<std::vector<int>> nodes;
+    cpu_set_t usable;
+    CPU_ZERO(&usable);
+    if (sched_getaffinity(0, sizeof(usable), &usable) != 0) return nodes;
+
+    // node<N> entries, visited in node order
+    std::vector<int> ids;
+    if (DIR* dir = opendir("/sys/devices/system/node")) {
+        while (struct dirent* entry = readdir(dir)) {
+            std::string name = entry->d_name;
+            if (name.size() > 4 && name.compare(0, 4, "node") == 0 &&
+                name.find_first_not_of("0123456789", 4) == std::string::npos) {
+                ids.push_back(atoi(name.c_str() + 4));
+            }
+        }
+        closedir(dir);
+    }
+    std::sort(ids.begin(), ids.end());
+
+    std::vector<bool> placed(CPU_SETSIZE, false);
+    for (int id : ids) {
+        std::ifstream file("/sys/devices/system/node/node" + std::to_string(id) + "/cpulist");
+        std::string list;
+        std::getline(file, list);
+        std::vector<int> cpus;
+        for (int cpu : parse_cpu_list(list)) {
+            if (cpu < CPU_SETSIZE && CPU_ISSET(cpu, &usable) && !placed[cpu]) {
+                cpus.push_back(cpu);
+                placed[cpu] = true;
+            }
+        }
+        if (!cpus.empty()) nodes.push_back(std::move(cpus));
+    }
+
+    // Unknown topology, or CPUs no node listed: one more node
+    std::vector<int> rest;
+    for (int cpu = 0; cpu < CPU_SETSIZE; cpu++) {
+        if (CPU_ISSET(cpu, &usable) && !placed[cpu]) rest.push_back(cpu);
+    }
+    if (!rest.empty()) nodes.push_back(std::move(rest));
+    return nodes;
+}
+
+#else
+
+std::vector<int> thread_cpus() { return {}; }
+
+bool pin_thread(const std::vector<int>&) { return false; }
+
+std::vector<std::vector<int>> numa_nodes() { return {}; }
+
+#endif
+
+} // namespace server
+} // namespace crest
@@ -0,0 +1,56 @@
+/**
+ * @file affinity.hpp
+ * @brief CPU topology and thread pinning for worker groups
+ */
+
+#ifndef CREST_AFFINITY_HPP
+#define CREST_AFFINITY_HPP
+
+#include <cstddef>
+#include <string>
+#include <vector>
+
+namespace crest {
+namespace server {
+
+/**
+ * @brief Parse a kernel CPU list such as "0-3,8,10-11"
+ * @return The CPUs in ascending order; empty if the list is malformed
+ */
+std::vector<int> parse_cpu_list(const std::string& list);
+
+/**
+ * @brief The CPUs this process may run on, one list per NUMA node
+ *
+ * Nodes without usable CPUs are left out. Where the topology cannot be
+ * read, all usable CPUs form a single node; empty if pinning is
+ * unsupported on this platform.
+ */
+std::vector<std::vector<int>> numa_nodes();
+
+/**
+ * @brief Share the nodes' CPUs between worker groups
+ *
+ * Each group is kept on one node. With fewer groups than nodes, a group
+ * takes every node whose index is congruent to its own; with more, groups
+ * share nodes round-robin.
+ *
+ * @return One CPU list per group; empty if nodes is empty
+ */
+std::vector<std::vector<int>> group_cpus(const std::vector<std::vector<int>>& nodes, size_t groups);
+
+/**
+ * @brief Restrict the calling thread to the given CPUs
+ * @return false if unsupported or rejected by the system
+ */
+bool pin_thread(const std::vector<int>& cpus);
+
+/**
+ * @brief The CPUs the calling thread may run on; empty if unsupported
+ */
+std::vector<int> thread_cpus();
+
+} // namespace server
+} // namespace crest
+
+#endif // CREST_AFFINITY_HPP
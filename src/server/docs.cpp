@@ -0,0 +1,317 @@
+/**
+ * @file docs.cpp
+ * @brief The /docs, /openapi.json and /playground pages, built once per
+ * version of the routes
+ */
+
+#include "docs.hpp"
+#include "server_internal.hpp"
+#include "../swagger/openapi.hpp"
+#include <cstdarg>
+#include <cstdio>
+#include <cstring>
+#include <mutex>
+
+namespace crest {
+namespace server {
+
+namespace {
+
+// Append printf-style output to out, measuring it first so any length fits
+#if defined(__GNUC__)
+__attribute__((format(printf, 2, 3)))
+#endif
+void append_format(std::string& out, const char* format, ...) {
+    va_list args;
+    va_start(args, format);
+    va_list measure;
+    va_copy(measure, args);
+    int length = vsnprintf(nullptr, 0, format, measure);
+    va_end(measure);
+    if (length > 0) {
+        size_t start = out.size();
+        out.resize(start + static_cast<size_t>(length));
+        vsnprintf(&out[start], static_cast<size_t>(length) + 1, format, args);
+    }
+    va_end(args);
+}
+
+// The page served at /playground; it does not depend on the routes
+const char kPlaygroundHtml[] =
+    "<!DOCTYPE html><html><head><meta charset='utf-8'><title>API Playground</title><meta name='viewport' content='width=device-width,initial-scale=1'><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#fafafa;color:#333}.header{background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:white;padding:40px 20px;position:relative;box-shadow:0 4px 6px rgba(0,0,0,0.1)}.header h1{font-size:2.5em;margin-bottom:10px;font-weight:600}.refresh-btn{position:absolute;top:20px;right:20px;background:rgba(255,255,255,0.2);border:2px solid white;color:white;padding:10px 20px;border-radius:6px;cursor:pointer;font-size:14px;font-weight:600;transition:all 0.3s}.refresh-btn:hover{background:rgba(255,255,255,0.3);transform:scale(1.05)}.container{max-width:1400px;margin:0 auto;padding:20px}.playground{background:white;padding:25px;margin:20px 0;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.08)}.playground h2{color:#667eea;margin-bottom:20px}.form-group{margin:15px 0}.form-group label{display:block;margin-bottom:8px;font-weight:600;color:#333}.form-control{width:100%;padding:12px;border:1px solid #e0e0e0;border-radius:6px;font-size:1em;font-family:'Courier New',monospace}textarea.form-control{min-height:150px;resize:vertical}.btn-group{display:flex;gap:10px;margin:20px 0}.btn{padding:12px 24px;border:none;border-radius:6px;cursor:pointer;font-size:1em;font-weight:600;transition:all 0.3s}.btn-primary{background:#667eea;color:white}.btn-primary:hover{background:#5568d3;transform:translateY(-2px);box-shadow:0 4px 8px rgba(102,126,234,0.3)}.btn-secondary{background:#6c757d;color:white}.btn-secondary:hover{background:#5a6268}.response-box{margin-top:20px;padding:20px;background:#f8f9fa;border-radius:6px;border-left:4px solid #667eea;display:none}.response-box.show{display:block}.response-box.success{border-left-color:#49cc90}.response-box.error{border-left-color:#f93e3e}.response-header{display:flex;justify-content:space-between;margin-bottom:15px;padding-bottom:10px;border-bottom:2px solid #e0e0e0}.response-body{font-family:'Courier New',monospace;white-space:pre-wrap;word-wrap:break-word;background:white;padding:15px;border-radius:4px;max-height:400px;overflow-y:auto}.tabs{display:flex;gap:10px;margin-bottom:20px;border-bottom:2px solid #e0e0e0}.tab{padding:12px 24px;cursor:pointer;border-bottom:3px solid transparent;transition:all 0.3s;font-weight:600}.tab.active{border-bottom-color:#667eea;color:#667eea}.tab:hover{background:#f8f9fa}.tab-content{display:none}.tab-content.active{display:block}.header-item{display:flex;gap:10px;margin-bottom:10px}.header-item input{flex:1}.add-header-btn{background:#28a745;color:white;padding:8px 16px;border:none;border-radius:4px;cursor:pointer;font-size:0.9em}.add-header-btn:hover{background:#218838}.remove-btn{background:#dc3545;color:white;padding:8px 12px;border:none;border-radius:4px;cursor:pointer}.remove-btn:hover{background:#c82333}@media(max-width:768px){.header h1{font-size:1.8em}.container{padding:10px}.btn-group{flex-direction:column}}</style></head><body><div class='header'><button class='refresh-btn' onclick='location.reload()'>🔄 Refresh</button><h1>🎮 API Playground</h1><p>Test your API endpoints interactively</p></div><div class='container'><div class='playground'><h2>🚀 Request Builder</h2><div class='tabs'><div class='tab active' onclick='switchTab(\"basic\")'>Basic</div><div class='tab' onclick='switchTab(\"headers\")'>Headers</div><div class='tab' onclick='switchTab(\"body\")'>Body</div></div><div id='basic-tab' class='tab-content active'><div class='form-group'><label>HTTP Method</label><select id='method' class='form-control'><option value='GET'>GET</option><option value='POST'>POST</option><option value='PUT'>PUT</option><option value='DELETE'>DELETE</option><option value='PATCH'>PATCH</option></select></div><div class='form-group'><label>Endpoint URL</label><input type='text' id='url' class='form-control' placeholder='/api/endpoint' value='/'></div><div class='form-group'><label>Query Parameters (key=value, one per line)</label><textarea id='query' class='form-control' placeholder='page=1&#10;limit=10'></textarea></div></div><div id='headers-tab' class='tab-content'><div class='form-group'><label>Custom Headers</label><div id='headers-list'><div class='header-item'><input type='text' placeholder='Header Name' class='form-control'><input type='text' placeholder='Header Value' class='form-control'><button class='remove-btn' onclick='removeHeader(this)'>✕</button></div></div><button class='add-header-btn' onclick='addHeader()'>+ Add Header</button></div></div><div id='body-tab' class='tab-content'><div class='form-group'><label>Request Body (JSON)</label><textarea id='body' class='form-control' placeholder='{\"key\": \"value\"}'></textarea></div><button class='btn btn-secondary' onclick='formatJSON()'>Format JSON</button></div><div class='btn-group'><button class='btn btn-primary' onclick='sendRequest()'>▶ Send Request</button><button class='btn btn-secondary' onclick='clearForm()'>🗑 Clear</button></div></div><div id='response' class='response-box'><div class='response-header'><div><strong>Response</strong></div><div id='response-status'></div></div><div class='response-body' id='response-body'></div></div></div><script>function switchTab(tab){document.querySelectorAll('.tab').forEach(t=>t.classList.remove('active'));document.querySelectorAll('.tab-content').forEach(t=>t.classList.remove('active'));event.target.classList.add('active');document.getElementById(tab+'-tab').classList.add('active');}function addHeader(){const list=document.getElementById('headers-list');const item=document.createElement('div');item.className='header-item';item.innerHTML='<input type=\"text\" placeholder=\"Header Name\" class=\"form-control\"><input type=\"text\" placeholder=\"Header Value\" class=\"form-control\"><button class=\"remove-btn\" onclick=\"removeHeader(this)\">✕</button>';list.appendChild(item);}function removeHeader(btn){btn.parentElement.remove();}function formatJSON(){try{const body=document.getElementById('body');const json=JSON.parse(body.value);body.value=JSON.stringify(json,null,2);}catch(e){alert('Invalid JSON');}}function clearForm(){document.getElementById('url').value='/';document.getElementById('query').value='';document.getElementById('body').value='';document.getElementById('response').classList.remove('show','success','error');}async function sendRequest(){const method=document.getElementById('method').value;let url=document.getElementById('url').value;const query=document.getElementById('query').value;const body=document.getElementById('body').value;const responseBox=document.getElementById('response');const responseBody=document.getElementById('response-body');const responseStatus=document.getElementById('response-status');if(query){const params=query.split('\\n').filter(l=>l.trim()).map(l=>l.trim()).join('&');url+=url.includes('?')?'&'+params:'?'+params;}const headers={'Content-Type':'application/json'};document.querySelectorAll('#headers-list .header-item').forEach(item=>{const inputs=item.querySelectorAll('input');if(inputs[0].value&&inputs[1].value){headers[inputs[0].value]=inputs[1].value;}});responseBox.classList.add('show');responseBox.classList.remove('success','error');responseBody.textContent='Sending request...';responseStatus.textContent='';try{const options={method,headers};if(body&&method!=='GET'&&method!=='DELETE'){options.body=body;}const start=Date.now();const response=await fetch(url,options);const duration=Date.now()-start;const text=await response.text();responseBox.classList.add(response.ok?'success':'error');responseStatus.innerHTML=`<span style=\"color:${response.ok?'#28a745':'#dc3545'}\">Status: ${response.status} ${response.statusText}</span> | Time: ${duration}ms`;try{const json=JSON.parse(text);responseBody.textContent=JSON.stringify(json,null,2);}catch{responseBody.textContent=text;}}catch(err){responseBox.classList.add('error');responseStatus.textContent='Error';responseBody.textContent='Error: '+err.message;}}</script></body></html>";
+
+} // namespace
+
+std::string build_docs_html(const crest_app_t* app) {
+    std::string html;
+    
+    if (app->route_count == 0) {
+        append_format(html,
+            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>%s</title>"
+            "<meta name='viewport' content='width=device-width,initial-scale=1'>"
+            "<style>body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;margin:0;background:#fafafa}"
+            ".header{background:linear-gradient(135deg,#667eea 0%%,#764ba2 100%%);color:white;padding:40px 20px;position:relative}"
+            ".refresh-btn{position:absolute;top:20px;right:20px;background:rgba(255,255,255,0.2);border:2px solid white;color:white;padding:10px 20px;border-radius:6px;cursor:pointer;font-size:14px;transition:all 0.3s}"
+            ".refresh-btn:hover{background:rgba(255,255,255,0.3);transform:scale(1.05)}"
+            ".container{max-width:1200px;margin:40px auto;padding:20px;background:white;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.1)}"
+            "h1{font-size:2.5em;margin-bottom:10px}p{color:#666;margin:10px 0}</style></head>"
+            "<body><div class='header'><button class='refresh-btn' onclick='location.reload()'>🔄 Refresh</button>"
+            "<h1>%s</h1><p>%s</p><p><strong>Version:</strong> %s</p></div>"
+            "<div class='container'><h2>⚠️ No Routes Defined</h2>"
+            "<p>Add routes to your API to see them documented here.</p></div></body></html>",
+            app->title, app->title, app->description, app->version);
+        return html;
+    }
+    
+    std::string routes_html;
+    for (size_t i = 0; i < app->route_count; i++) {
+        const char* method_str = "";
+        const char* method_color = "";
+        const char* req_body = "";
+        const char* res_body = "";
+        
+        switch (app->routes[i].method) {
+            case CREST_GET: 
+                method_str = "GET"; method_color = "#61affe";
+                req_body = "None";
+                res_body = "{&quot;data&quot;: &quot;string&quot;}";
+                break;
+            case CREST_POST: 
+                method_str = "POST"; method_color = "#49cc90";
+                req_body = "{&quot;name&quot;: &quot;string&quot;, &quot;value&quot;: &quot;string&quot;}";
+                res_body = "{&quot;id&quot;: &quot;number&quot;, &quot;status&quot;: &quot;string&quot;}";
+                break;
+            case CREST_PUT: 
+                method_str = "PUT"; method_color = "#fca130";
+                req_body = "{&quot;name&quot;: &quot;string&quot;, &quot;value&quot;: &quot;string&quot;}";
+                res_body = "{&quot;status&quot;: &quot;string&quot;}";
+                break;
+            case CREST_DELETE: 
+                method_str = "DELETE"; method_color = "#f93e3e";
+                req_body = "None";
+                res_body = "{&quot;status&quot;: &quot;string&quot;}";
+                break;
+            case CREST_PATCH: 
+                method_str = "PATCH"; method_color = "#50e3c2";
+                req_body = "{&quot;field&quot;: &quot;string&quot;}";
+                res_body = "{&quot;status&quot;: &quot;string&quot;}";
+                break;
+            default: 
+                method_str = "UNKNOWN"; method_color = "#999";
+                req_body = "Unknown";
+                res_body = "Unknown";
+                break;
+        }
+        
+        // Use custom schemas if set, otherwise use defaults
+        if (app->routes[i].request_schema) {
+            req_body = app->routes[i].request_schema;
+        }
+        if (app->routes[i].response_schema) {
+            res_body = app->routes[i].response_schema;
+        }
+        // Note: Schemas will be auto-detected on first request
+        
+        append_format(routes_html,
+            "<div class='endpoint'>"
+            "<div class='endpoint-header' onclick='toggleEndpoint(%zu)'>"
+            "<span class='method' style='background:%s'>%s</span>"
+            "<span class='path'>%s</span>"
+            "<span class='toggle'>▼</span>"
+            "</div>"
+            "<div class='endpoint-body' id='endpoint-%zu' style='display:none'>"
+            "<div class='description'>%s</div>"
+            "<div class='section'><h4>📥 Request Schema</h4>"
+            "<div class='schema-box'><pre>%s</pre></div></div>"
+            "<div class='section'><h4>📤 Response Schema (200 OK)</h4>"
+            "<div class='schema-box success'><pre>%s</pre></div></div>"
+            "<div class='section'><h4>📊 Possible Responses</h4>"
+            "<div class='response-list'>"
+            "<div class='response-item'><span class='status-code success'>200</span> Success</div>"
+            "<div class='response-item'><span class='status-code error'>400</span> Bad Request</div>"
+            "<div class='response-item'><span class='status-code error'>404</span> Not Found</div>"
+            "<div class='response-item'><span class='status-code error'>500</span> Internal Server Error</div>"
+            "</div></div>"
+            "<div class='section'><h4>🚀 Try it out</h4>"
+            "<button class='try-btn' onclick='tryEndpoint(\"%s\", \"%s\", %zu)'>Execute Request</button>"
+            "<div class='result' id='result-%zu'></div>"
+            "</div></div></div>",
+            i, method_color, method_str, app->routes[i].path, i,
+            app->routes[i].description[0] ? app->routes[i].description : "No description provided",
+            req_body, res_body, method_str, app->routes[i].path, i, i);
+    }
+    
+    append_format(html,
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>%s - API Documentation</title>"
+        "<meta name='viewport' content='width=device-width,initial-scale=1'>"
+        "<style>*{margin:0;padding:0;box-sizing:border-box}"
+        "body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,Oxygen,Ubuntu,sans-serif;background:#fafafa;color:#333}"
+        ".header{background:linear-gradient(135deg,#667eea 0%%,#764ba2 100%%);color:white;padding:40px 20px;position:relative;box-shadow:0 4px 6px rgba(0,0,0,0.1)}"
+        ".header h1{font-size:2.5em;margin-bottom:10px;font-weight:600}.header p{font-size:1.1em;opacity:0.95;margin:5px 0}"
+        ".refresh-btn{position:absolute;top:20px;right:20px;background:rgba(255,255,255,0.2);border:2px solid white;color:white;padding:10px 20px;border-radius:6px;cursor:pointer;font-size:14px;font-weight:600;transition:all 0.3s}"
+        ".refresh-btn:hover{background:rgba(255,255,255,0.3);transform:scale(1.05)}"
+        ".container{max-width:1200px;margin:0 auto;padding:20px}"
+        ".info{background:white;padding:25px;margin:20px 0;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.08)}"
+        ".info h2{color:#667eea;margin-bottom:15px;font-size:1.5em}.info p{margin:8px 0;font-size:1.05em}"
+        ".info a{color:#667eea;text-decoration:none;font-weight:600}.info a:hover{text-decoration:underline}"
+        ".endpoints{background:white;padding:20px;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.08)}"
+        ".endpoint{margin:15px 0;border:1px solid #e0e0e0;border-radius:8px;overflow:hidden;transition:all 0.3s}"
+        ".endpoint:hover{box-shadow:0 4px 12px rgba(0,0,0,0.1)}"
+        ".endpoint-header{padding:15px 20px;background:#f8f9fa;cursor:pointer;display:flex;align-items:center;transition:background 0.3s}"
+        ".endpoint-header:hover{background:#e9ecef}"
+        ".method{display:inline-block;padding:6px 14px;border-radius:4px;color:white;font-weight:700;margin-right:15px;font-size:0.85em;text-transform:uppercase;letter-spacing:0.5px}"
+        ".path{font-size:1.15em;font-weight:500;color:#333;flex:1;font-family:'Courier New',monospace}"
+        ".toggle{font-size:1.2em;color:#666;transition:transform 0.3s}.toggle.open{transform:rotate(180deg)}"
+        ".endpoint-body{padding:20px;background:white;border-top:1px solid #e0e0e0}"
+        ".description{padding:15px;background:#f8f9fa;border-left:4px solid #667eea;margin-bottom:20px;border-radius:4px;font-size:1.05em}"
+        ".section{margin:20px 0}.section h4{color:#667eea;margin-bottom:12px;font-size:1.1em;font-weight:600}"
+        ".schema-box{background:#f8f9fa;border:1px solid #e0e0e0;border-radius:6px;padding:15px;font-family:'Courier New',monospace;font-size:0.95em;overflow-x:auto}"
+        ".schema-box.success{border-left:4px solid #49cc90}.schema-box pre{margin:0;white-space:pre-wrap;word-wrap:break-word}"
+        ".response-list{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:10px}"
+        ".response-item{padding:12px;background:#f8f9fa;border-radius:6px;display:flex;align-items:center;font-size:0.95em}"
+        ".status-code{display:inline-block;padding:4px 10px;border-radius:4px;font-weight:700;margin-right:10px;font-size:0.9em}"
+        ".status-code.success{background:#d4edda;color:#155724}.status-code.error{background:#f8d7da;color:#721c24}"
+        ".try-btn{background:#667eea;color:white;border:none;padding:12px 24px;border-radius:6px;cursor:pointer;font-size:1em;font-weight:600;transition:all 0.3s}"
+        ".try-btn:hover{background:#5568d3;transform:translateY(-2px);box-shadow:0 4px 8px rgba(102,126,234,0.3)}"
+        ".result{margin-top:15px;padding:15px;background:#f8f9fa;border-radius:6px;font-family:'Courier New',monospace;font-size:0.9em;display:none}"
+        ".result.show{display:block}.result.success{border-left:4px solid #49cc90}.result.error{border-left:4px solid #f93e3e}"
+        "@media(max-width:768px){.header h1{font-size:1.8em}.container{padding:10px}.refresh-btn{top:10px;right:10px;padding:8px 16px;font-size:12px}"
+        ".endpoint-header{flex-direction:column;align-items:flex-start}.method{margin-bottom:8px}.path{font-size:1em}}"
+        "</style>"
+        "<script>"
+        "function toggleEndpoint(id){var el=document.getElementById('endpoint-'+id);var toggle=event.currentTarget.querySelector('.toggle');"
+        "if(el.style.display==='none'){el.style.display='block';toggle.classList.add('open');}else{el.style.display='none';toggle.classList.remove('open');}}"
+        "function tryEndpoint(method,path,id){var resultEl=document.getElementById('result-'+id);"
+        "resultEl.className='result show';resultEl.innerHTML='<strong>Sending '+method+' request to '+path+'...</strong>';"
+        "fetch(path,{method:method}).then(r=>r.text()).then(data=>{resultEl.className='result show success';"
+        "resultEl.innerHTML='<strong>Response ('+method+' '+path+'):</strong><br><br>'+data;}).catch(err=>{"
+        "resultEl.className='result show error';resultEl.innerHTML='<strong>Error:</strong><br><br>'+err.message;});}"
+        "</script></head>"
+        "<body><div class='header'><button class='refresh-btn' onclick='location.reload()'>🔄 Refresh</button>"
+        "<h1>%s</h1><p>%s</p><p><strong>Version:</strong> %s | <strong>Powered by:</strong> Crest %s</p></div>"
+        "<div class='container'><div class='info'><h2>📚 API Documentation</h2>"
+        "<p><strong>Total Endpoints:</strong> %zu</p>"
+        "<p><strong>OpenAPI Specification:</strong> <a href='/openapi.json' target='_blank'>View JSON</a></p>"
+        "<p><strong>Interactive Playground:</strong> <a href='/playground' target='_blank'>Test API 🎮</a></p>"
+        "<p><strong>Base URL:</strong> <code>/</code></p></div>"
+        "<div class='endpoints'><h2 style='margin-bottom:20px;color:#667eea'>Endpoints</h2>%s</div></div></body></html>",
+        app->title, app->title, app->description, app->version, CREST_VERSION,
+        app->route_count, routes_html.c_str());
+    
+    return html;
+}
+
+std::string content_etag(uint64_t hash, const char* coding) {
+    char etag[48];
+    if (coding) {
+        snprintf(etag, sizeof(etag), "\"%016llx-%s\"", static_cast<unsigned long long>(hash), coding);
+    } else {
+        snprintf(etag, sizeof(etag), "\"%016llx\"", static_cast<unsigned long long>(hash));
+    }
+    return etag;
+}
+
+void release_docs(void* pages) {
+    auto* docs = static_cast<DocsPages*>(pages);
+    if (docs->references.fetch_sub(1, std::memory_order_acq_rel) == 1) delete docs;
+}
+
+DocsCache::~DocsCache() {
+    if (current_) release_docs(current_);
+}
+
+DocsPages* DocsCache::acquire(crest_app_t* app) {
+    std::lock_guard<std::mutex> lock(*static_cast<std::mutex*>(app->route_mutex));
+    if (!current_ || current_->version != app->docs_version) {
+        // Requests still sending the old pages keep them alive
+        auto* pages = new DocsPages();
+        pages->version = app->docs_version;
+        pages->html = build_docs_html(app);
+        pages->html_hash = middleware::hash_body(pages->html.data(), pages->html.size());
+        pages->openapi = swagger::generate_openapi_spec(app);
+        pages->openapi_hash = middleware::hash_body(pages->openapi.data(), pages->openapi.size());
+        if (current_) release_docs(current_);
+        current_ = pages;
+    }
+    current_->references.fetch_add(1, std::memory_order_relaxed);
+    return current_;
+}
+
+// Send body by reference, or 304 if the client already has it. Browsers
+// revalidate every time, so a changed route shows up on the next load.
+// Clients that accept gzip or deflate get the page compressed once, at
+// the smallest level, and then sent from the cache.
+static void send_page(crest_request_t* req, crest_response_t* res, middleware::PrecompressedCache& cache,
+                      const char* content_type, const char* body, size_t length, uint64_t hash,
+                      void (*release)(void*), void* context) {
+    middleware::CompressedBody* compressed = nullptr;
+    const char* coding = nullptr;
+    const char* accept = crest_request_get_header(req, "Accept-Encoding");
+    if (accept) {
+        for (middleware::Encoding encoding : {middleware::Encoding::GZIP, middleware::Encoding::DEFLATE}) {
+            if (!accepts_encoding(accept, middleware::encoding_name(encoding))) continue;
+            compressed = cache.acquire(req->path, hash, body, length, encoding, 9);
+            if (compressed) coding = middleware::encoding_name(encoding);
+            break;
+        }
+    }
+
+    std::string etag = content_etag(hash, coding);
+    crest_response_set_header(res, "ETag", etag.c_str());
+    crest_response_set_header(res, "Cache-Control", "no-cache");
+    crest_response_set_header(res, "Vary", "Accept-Encoding");
+    const char* none_match = crest_request_get_header(req, "If-None-Match");
+    if (none_match && etag_listed(none_match, etag)) {
+        if (release) release(context);
+        if (compressed) middleware::release_compressed(compressed);
+        crest_response_write(res, 304, content_type, false, "", 0, nullptr, nullptr);
+        return;
+    }
+    if (compressed) {
+        if (release) release(context);
+        crest_response_set_header(res, "Content-Encoding", coding);
+        crest_response_write(res, 200, content_type, false, compressed->data.data(), compressed->data.size(),
+                             middleware::release_compressed, compressed);
+        return;
+    }
+    crest_response_write(res, 200, content_type, false, body, length, release, context);
+}
+
+bool serve_docs(crest_app_t* app, crest_request_t* req, crest_response_t* res) {
+    if (!app->docs_enabled) return false;
+
+    auto* cache = static_cast<DocsCache*>(app->docs_cache);
+    if (strcmp(req->path, "/docs") == 0 || strcmp(req->path, "/openapi.json") == 0) {
+        DocsPages* pages = cache->acquire(app);
+        if (req->path[1] == 'd') {
+            send_page(req, res, cache->compressed(), "text/html; charset=utf-8", pages->html.data(),
+                      pages->html.size(), pages->html_hash, release_docs, pages);
+        } else {
+            send_page(req, res, cache->compressed(), "application/json", pages->openapi.data(),
+                      pages->openapi.size(), pages->openapi_hash, release_docs, pages);
+        }
+        return true;
+    }
+    if (strcmp(req->path, "/playground") == 0) {
+        static const uint64_t hash = middleware::hash_body(kPlaygroundHtml, sizeof(kPlaygroundHtml) - 1);
+        send_page(req, res, cache->compressed(), "text/html; charset=utf-8", kPlaygroundHtml,
+                  sizeof(kPlaygroundHtml) - 1, hash, nullptr, nullptr);
+        return true;
+    }
+    return false;
+}
+
+} // namespace server
+} // namespace crest
+
+extern "C" {
+
+void* crest_docs_cache_create() {
+    return new crest::server::DocsCache();
+}
+
+void crest_docs_cache_destroy(void* cache) {
+    delete static_cast<crest::server::DocsCache*>(cache);
+}
+
+} // extern "C"
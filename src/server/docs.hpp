@@ -0,0 +1,87 @@
+/**
+ * @file docs.hpp
+ * @brief The /docs, /openapi.json and /playground pages, built once per
+ * version of the routes
+ */
+
+#ifndef CREST_DOCS_HPP
+#define CREST_DOCS_HPP
+
+#include "crest/internal/app_internal.h"
+#include "../middleware/compression.hpp"
+#include <atomic>
+#include <cstdint>
+#include <string>
+
+namespace crest {
+namespace server {
+
+/**
+ * @brief The documentation pages for one version of the routes
+ *
+ * Never modified once built. Responses send the pages from here without
+ * copying them, each holding a reference until it has been written.
+ */
+struct DocsPages {
+    uint64_t version = 0;        // app->docs_version they describe
+    std::string html;            // /docs
+    uint64_t html_hash = 0;      // middleware::hash_body() of html
+    std::string openapi;         // /openapi.json
+    uint64_t openapi_hash = 0;
+    std::atomic<int> references{1};
+};
+
+/** Drop a reference taken by DocsCache::acquire(); a body release function */
+void release_docs(void* pages);
+
+/** Bytes of compressed pages, and the copies they are checked against, a DocsCache keeps */
+constexpr size_t kCompressedDocsBytes = 16 * 1024 * 1024;
+
+/**
+ * @brief The pages of an app's current routes, rebuilt only after the
+ * routes, their schemas, or the app's title or description change
+ *
+ * Also holds the gzip and deflate forms of the pages, compressed the first
+ * time a client asks for each.
+ */
+class DocsCache {
+public:
+    DocsCache() = default;
+    ~DocsCache();
+    DocsCache(const DocsCache&) = delete;
+    DocsCache& operator=(const DocsCache&) = delete;
+
+    /**
+     * @brief The pages for app's routes as they are now, with a reference
+     * for the caller
+     *
+     * Takes the app's route_mutex, so the pages describe one consistent
+     * set of routes.
+     */
+    DocsPages* acquire(crest_app_t* app);
+
+    middleware::PrecompressedCache& compressed() { return compressed_; }
+
+private:
+    DocsPages* current_ = nullptr;  // holds one reference; guarded by route_mutex
+    middleware::PrecompressedCache compressed_{kCompressedDocsBytes};
+};
+
+/** The /docs page for app's routes; the caller holds route_mutex */
+std::string build_docs_html(const crest_app_t* app);
+
+/**
+ * @brief Quoted strong ETag for a body with hash, as sent in coding if set
+ */
+std::string content_etag(uint64_t hash, const char* coding = nullptr);
+
+/**
+ * @brief Answer /docs, /openapi.json or /playground
+ * @return false if the request is for none of them, or docs are disabled
+ */
+bool serve_docs(crest_app_t* app, crest_request_t* req, crest_response_t* res);
+
+} // namespace server
+} // namespace crest
+
+#endif // CREST_DOCS_HPP
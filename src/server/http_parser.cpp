@@ -0,0 +1,481 @@
+/**
+ * @file http_parser.cpp
+ * @brief Incremental, allocation-free HTTP/1.x request parser
+ */
+
+#include "http_parser.hpp"
+#include <cstdint>
+#include <cstring>
+
+namespace crest {
+namespace server {
+
+namespace {
+
+// RFC 9110 token characters (method and header names)
+bool is_tchar(unsigned char c) {
+    if ((c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z') || (c >= '0' && c <= '9')) return true;
+    switch (c) {
+        case '!': case '#': case '$': case '%': case '&': case '\'': case '*':
+        case '+': case '-': case '.': case '^': case '_': case '`': case '|': case '~':
+            return true;
+        default:
+            return false;
+    }
+}
+
+bool iequals(const char* s, size_t len, const char* lower) {
+    size_t n = strlen(lower);
+    if (len != n) return false;
+    for (size_t i = 0; i < n; i++) {
+        char c = s[i];
+        if (c >= 'A' && c <= 'Z') c = (char)(c - 'A' + 'a');
+        if (c != lower[i]) return false;
+    }
+    return true;
+}
+
+bool is_space(char c) {
+    return c == ' ' || c == '\t';
+}
+
+// Calls fn(token, length) for each comma-separated element of a header
+// value, with surrounding whitespace removed and empty elements skipped
+template <typename Fn>
+void for_each_token(const char* value, const char* end, Fn fn) {
+    const char* token = value;
+    while (token < end) {
+        const char* comma = static_cast<const char*>(memchr(token, ',', (size_t)(end - token)));
+        const char* token_end = comma ? comma : end;
+        const char* start = token;
+        const char* stop = token_end;
+        while (start < stop && is_space(*start)) start++;
+        while (stop > start && is_space(stop[-1])) stop--;
+        if (stop > start) fn(start, (size_t)(stop - start));
+        token = token_end + 1;
+    }
+}
+
+int hex_value(char c) {
+    if (c >= '0' && c <= '9') return c - '0';
+    if (c >= 'a' && c <= 'f') return c - 'a' + 10;
+    if (c >= 'A' && c <= 'F') return c - 'A' + 10;
+    return -1;
+}
+
+// Longest chunk-size line, extensions included
+constexpr size_t kMaxChunkLine = 4096;
+
+// chunk-size [ chunk-ext ]; extensions are ignored
+bool parse_chunk_size(const char* line, size_t len, size_t& size) {
+    size_t i = 0;
+    size = 0;
+    while (i < len && hex_value(line[i]) >= 0) {
+        if (size > (SIZE_MAX >> 4)) return false;  // overflow
+        size = (size << 4) | (size_t)hex_value(line[i]);
+        i++;
+    }
+    if (i == 0) return false;
+    while (i < len && is_space(line[i])) i++;
+    return i == len || line[i] == ';';
+}
+
+} // namespace
+
+void ParsedRequest::rebase(const char* from, const char* to) {
+    auto move = [from, to](std::string_view& view) {
+        if (view.data()) view = std::string_view(to + (view.data() - from), view.size());
+    };
+    move(method);
+    move(target);
+    move(path);
+    move(query);
+    move(body);
+    for (size_t i = 0; i < header_count; i++) {
+        move(headers[i].name);
+        move(headers[i].value);
+    }
+}
+
+void BodyDecoder::start(size_t content_length) {
+    *this = BodyDecoder();
+    remaining_ = content_length;
+    state_ = content_length > 0 ? State::LENGTH : State::DONE;
+}
+
+void BodyDecoder::start_chunked(size_t max_body_size) {
+    *this = BodyDecoder();
+    chunked_ = true;
+    max_body_size_ = max_body_size;
+    state_ = State::CHUNK_SIZE;
+}
+
+ParseResult BodyDecoder::fail(int status) {
+    error_status_ = status;
+    return ParseResult::ERROR;
+}
+
+ParseResult BodyDecoder::decode(const char* in, size_t len, char* out, size_t capacity,
+                                size_t& consumed, size_t& produced) {
+    consumed = 0;
+    produced = 0;
+    if (error_status_) return ParseResult::ERROR;
+
+    while (state_ != State::DONE) {
+        const char* next = in + consumed;
+        size_t available = len - consumed;
+
+        switch (state_) {
+            case State::LENGTH:
+            case State::CHUNK_DATA: {
+                size_t n = available < remaining_ ? available : remaining_;
+                if (n > capacity - produced) n = capacity - produced;
+                if (n == 0) return ParseResult::INCOMPLETE;
+                memmove(out + produced, next, n);
+                consumed += n;
+                produced += n;
+                decoded_ += n;
+                remaining_ -= n;
+                if (remaining_ == 0) {
+                    state_ = state_ == State::LENGTH ? State::DONE : State::CHUNK_DATA_END;
+                }
+                break;
+            }
+            case State::CHUNK_SIZE: {
+                const char* newline = static_cast<const char*>(memchr(next, '\n', available));
+                if (!newline) {
+                    if (available > kMaxChunkLine) return fail(400);
+                    return ParseResult::INCOMPLETE;
+                }
+                size_t line_len = (size_t)(newline - next);
+                consumed += line_len + 1;
+                framing_ += line_len + 1;
+                if (line_len > 0 && next[line_len - 1] == '\r') line_len--;
+
+                size_t size = 0;
+                if (line_len > kMaxChunkLine || !parse_chunk_size(next, line_len, size)) return fail(400);
+                if (size == 0) {
+                    state_ = State::TRAILERS;
+                } else if (size > max_body_size_ - decoded_) {
+                    return fail(413);
+                } else {
+                    remaining_ = size;
+                    state_ = State::CHUNK_DATA;
+                }
+                break;
+            }
+            case State::CHUNK_DATA_END: {
+                size_t crlf = available > 0 && next[0] == '\n' ? 1 : 2;
+                if (available < crlf) return ParseResult::INCOMPLETE;
+                if (crlf == 2 && (next[0] != '\r' || next[1] != '\n')) return fail(400);
+                consumed += crlf;
+                framing_ += crlf;
+                state_ = State::CHUNK_SIZE;
+                break;
+            }
+            case State::TRAILERS: {
+                // Trailer fields are accepted but not exposed
+                const char* newline = static_cast<const char*>(memchr(next, '\n', available));
+                if (!newline) {
+                    if (trailer_bytes_ + available > kMaxHeaderBytes) return fail(431);
+                    return ParseResult::INCOMPLETE;
+                }
+                size_t line_len = (size_t)(newline - next);
+                consumed += line_len + 1;
+                framing_ += line_len + 1;
+                trailer_bytes_ += line_len + 1;
+                if (trailer_bytes_ > kMaxHeaderBytes) return fail(431);
+                if (line_len == 0 || (line_len == 1 && next[0] == '\r')) state_ = State::DONE;
+                break;
+            }
+            default:
+                return fail(400);
+        }
+
+        // Chunk framing is buffered along with the data; cap it so tiny
+        // chunks cannot hold far more memory than the body limit suggests
+        if (framing_ > kMaxHeaderBytes + decoded_) return fail(413);
+    }
+    return ParseResult::COMPLETE;
+}
+
+void HttpParser::reset() {
+    state_ = State::REQUEST_LINE;
+    line_start_ = 0;
+    scanned_ = 0;
+    body_start_ = 0;
+    body_length_ = 0;
+    request_length_ = 0;
+    error_status_ = 0;
+    version_minor_ = 1;
+    has_content_length_ = false;
+    content_length_ = 0;
+    connection_close_ = false;
+    connection_keep_alive_ = false;
+    has_transfer_encoding_ = false;
+    chunked_ = false;
+    bad_coding_ = false;
+    unknown_coding_ = false;
+    expect_continue_ = false;
+    header_count_ = 0;
+}
+
+bool HttpParser::expects_continue() const {
+    bool in_body = state_ == State::HEAD || state_ == State::BODY || state_ == State::CHUNKED;
+    return expect_continue_ && version_minor_ >= 1 && in_body;
+}
+
+size_t HttpParser::expected_length() const {
+    return state_ == State::BODY ? body_start_ + content_length_ : 0;
+}
+
+bool HttpParser::body_decoder(size_t max_body_size, BodyDecoder& decoder) {
+    if (state_ != State::HEAD) return false;
+    if (chunked_) {
+        decoder.start_chunked(max_body_size);
+    } else if (content_length_ > max_body_size) {
+        error_status_ = 413;
+        return false;
+    } else {
+        decoder.start(content_length_);
+    }
+    return true;
+}
+
+HttpParser::Result HttpParser::fail(int status) {
+    error_status_ = status;
+    return Result::ERROR;
+}
+
+bool HttpParser::next_line(const char* buffer, size_t len, size_t& offset, size_t& line_len) {
+    const char* newline = scanned_ < len
+        ? static_cast<const char*>(memchr(buffer + scanned_, '\n', len - scanned_))
+        : nullptr;
+    if (!newline) {
+        scanned_ = len;
+        return false;
+    }
+
+    size_t end = static_cast<size_t>(newline - buffer);
+    offset = line_start_;
+    line_len = end - offset;
+    if (line_len > 0 && buffer[end - 1] == '\r') line_len--;
+    scanned_ = line_start_ = end + 1;
+    return true;
+}
+
+HttpParser::Result HttpParser::parse_headers(const char* buffer, size_t len) {
+    if (error_status_) return Result::ERROR;
+
+    while (state_ == State::REQUEST_LINE || state_ == State::HEADERS) {
+        size_t offset = 0;
+        size_t line_len = 0;
+        if (!next_line(buffer, len, offset, line_len)) {
+            if (len > kMaxHeaderBytes) return fail(431);
+            return Result::INCOMPLETE;
+        }
+        if (scanned_ > kMaxHeaderBytes) return fail(431);
+
+        if (state_ == State::REQUEST_LINE) {
+            // Empty lines before the request line are ignored (RFC 9112 2.2)
+            if (line_len == 0) continue;
+            if (!parse_request_line(buffer + offset, offset, line_len)) return fail(400);
+            state_ = State::HEADERS;
+        } else if (line_len == 0) {
+            if (!end_headers()) return Result::ERROR;
+        } else if (!parse_header(buffer + offset, offset, line_len)) {
+            return fail(error_status_ ? error_status_ : 400);
+        }
+    }
+    return Result::COMPLETE;
+}
+
+HttpParser::Result HttpParser::parse_head(char* buffer, size_t len, ParsedRequest& out) {
+    Result result = parse_headers(buffer, len);
+    if (result != Result::COMPLETE) return result;
+
+    finish_head(buffer, out);
+    out.content_length = chunked_ ? 0 : content_length_;
+    out.body = std::string_view();
+    out.length = body_start_;
+    return Result::COMPLETE;
+}
+
+HttpParser::Result HttpParser::parse(char* buffer, size_t len, ParsedRequest& out) {
+    Result result = parse_headers(buffer, len);
+    if (result != Result::COMPLETE) return result;
+
+    if (state_ == State::HEAD) {
+        if (chunked_) {
+            body_.start_chunked(max_body_size_);
+            state_ = State::CHUNKED;
+        } else if (content_length_ > max_body_size_) {
+            // Rejected before the client spends time sending the body
+            return fail(413);
+        } else {
+            state_ = State::BODY;
+        }
+    }
+
+    if (state_ == State::BODY) {
+        if (len - body_start_ < content_length_) return Result::INCOMPLETE;
+        body_length_ = content_length_;
+        request_length_ = body_start_ + content_length_;
+    } else if (state_ == State::CHUNKED) {
+        size_t consumed = 0;
+        size_t produced = 0;
+        result = body_.decode(buffer + scanned_, len - scanned_, buffer + body_start_ + body_length_,
+                              SIZE_MAX, consumed, produced);
+        scanned_ += consumed;
+        body_length_ += produced;
+        if (result == Result::ERROR) return fail(body_.error_status());
+        if (result == Result::INCOMPLETE) return Result::INCOMPLETE;
+        request_length_ = scanned_;
+        state_ = State::DONE;
+    }
+
+    finish_head(buffer, out);
+    out.content_length = body_length_;
+    out.body = std::string_view(buffer + body_start_, body_length_);
+    out.length = request_length_;
+    return Result::COMPLETE;
+}
+
+bool HttpParser::end_headers() {
+    body_start_ = scanned_;
+
+    int status = 0;
+    if (has_transfer_encoding_) {
+        // A Content-Length next to a transfer coding is a request smuggling
+        // attempt (RFC 9112 6.3)
+        if (has_content_length_ || bad_coding_ || (!chunked_ && !unknown_coding_)) {
+            status = 400;
+        } else if (unknown_coding_) {
+            status = 501;
+        }
+    }
+    // The body limit is only applied once the caller picks how the body is
+    // read: buffered by parse() or streamed through body_decoder()
+    state_ = State::HEAD;
+
+    error_status_ = status;
+    return status == 0;
+}
+
+bool HttpParser::parse_request_line(const char* line, size_t offset, size_t len) {
+    // METHOD SP request-target SP HTTP/1.x
+    const char* end = line + len;
+    const char* method_end = static_cast<const char*>(memchr(line, ' ', len));
+    if (!method_end || method_end == line) return false;
+    for (const char* p = line; p < method_end; p++) {
+        if (!is_tchar(static_cast<unsigned char>(*p))) return false;
+    }
+
+    const char* target = method_end + 1;
+    const char* target_end = static_cast<const char*>(memchr(target, ' ', (size_t)(end - target)));
+    if (!target_end || target_end == target) return false;
+    for (const char* p = target; p < target_end; p++) {
+        unsigned char c = static_cast<unsigned char>(*p);
+        if (c <= 0x20 || c == 0x7f) return false;
+    }
+
+    const char* version = target_end + 1;
+    if (end - version != 8 || memcmp(version, "HTTP/1.", 7) != 0 ||
+        version[7] < '0' || version[7] > '9') {
+        return false;
+    }
+
+    method_ = {static_cast<uint32_t>(offset), static_cast<uint32_t>(method_end - line)};
+    target_ = {static_cast<uint32_t>(offset + (size_t)(target - line)),
+               static_cast<uint32_t>(target_end - target)};
+    const char* question = static_cast<const char*>(memchr(target, '?', (size_t)(target_end - target)));
+    path_length_ = (size_t)((question ? question : target_end) - target);
+    version_minor_ = version[7] - '0';
+    return true;
+}
+
+bool HttpParser::parse_header(const char* line, size_t offset, size_t len) {
+    // Obsolete line folding is rejected rather than unfolded (RFC 9112 5.2)
+    if (is_space(line[0])) return false;
+
+    const char* colon = static_cast<const char*>(memchr(line, ':', len));
+    if (!colon || colon == line) return false;
+    size_t name_len = (size_t)(colon - line);
+    for (size_t i = 0; i < name_len; i++) {
+        if (!is_tchar(static_cast<unsigned char>(line[i]))) return false;
+    }
+
+    const char* value = colon + 1;
+    const char* value_end = line + len;
+    while (value < value_end && is_space(*value)) value++;
+    while (value_end > value && is_space(value_end[-1])) value_end--;
+    size_t value_len = (size_t)(value_end - value);
+
+    if (header_count_ == kMaxHeaders) {
+        error_status_ = 431;
+        return false;
+    }
+    header_names_[header_count_] = {static_cast<uint32_t>(offset), static_cast<uint32_t>(name_len)};
+    header_values_[header_count_] = {static_cast<uint32_t>(offset + (size_t)(value - line)),
+                                     static_cast<uint32_t>(value_len)};
+    header_count_++;
+
+    if (iequals(line, name_len, "content-length")) {
+        if (value_len == 0) return false;
+        size_t length = 0;
+        for (size_t i = 0; i < value_len; i++) {
+            if (value[i] < '0' || value[i] > '9') return false;
+            size_t next = length * 10 + (size_t)(value[i] - '0');
+            if (next / 10 != length) return false;  // overflow
+            length = next;
+        }
+        if (has_content_length_ && length != content_length_) return false;
+        has_content_length_ = true;
+        content_length_ = length;
+    } else if (iequals(line, name_len, "transfer-encoding")) {
+        // Codings are listed in the order applied; chunked must come last
+        // and only once, and no other coding is decoded
+        has_transfer_encoding_ = true;
+        for_each_token(value, value_end, [this](const char* token, size_t token_len) {
+            if (iequals(token, token_len, "chunked")) {
+                if (chunked_) bad_coding_ = true;
+                chunked_ = true;
+            } else {
+                if (chunked_) bad_coding_ = true;
+                unknown_coding_ = true;
+            }
+        });
+    } else if (iequals(line, name_len, "connection")) {
+        // Comma-separated tokens, e.g. "keep-alive, Upgrade"
+        for_each_token(value, value_end, [this](const char* token, size_t token_len) {
+            if (iequals(token, token_len, "close")) connection_close_ = true;
+            if (iequals(token, token_len, "keep-alive")) connection_keep_alive_ = true;
+        });
+    } else if (iequals(line, name_len, "expect")) {
+        if (iequals(value, value_len, "100-continue")) expect_continue_ = true;
+    }
+    return true;
+}
+
+void HttpParser::finish_head(const char* buffer, ParsedRequest& out) const {
+    auto view = [buffer](const Span& span) {
+        return std::string_view(buffer + span.offset, span.length);
+    };
+
+    out.method = view(method_);
+    out.target = view(target_);
+    out.path = out.target.substr(0, path_length_);
+    out.query = path_length_ < out.target.size() ? out.target.substr(path_length_ + 1)
+                                                 : std::string_view(out.target.data() + out.target.size(), 0);
+    out.version_minor = version_minor_;
+    out.keep_alive = connection_close_ ? false : (version_minor_ >= 1 || connection_keep_alive_);
+    out.chunked = has_transfer_encoding_;
+    out.header_count = header_count_;
+    for (size_t i = 0; i < header_count_; i++) {
+        out.headers[i].name = view(header_names_[i]);
+        out.headers[i].value = view(header_values_[i]);
+    }
+}
+
+} // namespace server
+} // namespace crest
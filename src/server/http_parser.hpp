@@ -0,0 +1,264 @@
+/**
+ * @file http_parser.hpp
+ * @brief Incremental, allocation-free HTTP/1.x request parser
+ */
+
+#ifndef CREST_HTTP_PARSER_HPP
+#define CREST_HTTP_PARSER_HPP
+
+#include <cstddef>
+#include <cstdint>
+#include <string_view>
+
+namespace crest {
+namespace server {
+
+/** Header fields a request may carry; more is answered with 431 */
+constexpr size_t kMaxHeaders = 64;
+
+/** Largest request line plus header block; more is answered with 431 */
+constexpr size_t kMaxHeaderBytes = 64 * 1024;
+
+/** Body limit used until set_max_body_size() is called */
+constexpr size_t kDefaultMaxBodySize = 1024 * 1024;
+
+struct HttpHeader {
+    std::string_view name;
+    std::string_view value;
+};
+
+/**
+ * @brief A parsed request; every view points into the parsed buffer
+ */
+struct ParsedRequest {
+    std::string_view method;
+    std::string_view target;  // path plus "?query" as sent
+    std::string_view path;
+    std::string_view query;   // without the leading '?'
+    int version_minor = 1;    // HTTP/1.<minor>
+    bool keep_alive = true;
+    bool chunked = false;     // body arrived with Transfer-Encoding: chunked
+    size_t content_length = 0;  // body bytes, after chunked decoding
+    std::string_view body;
+    size_t header_count = 0;
+    HttpHeader headers[kMaxHeaders];
+
+    /** Bytes from the request line through the end of the body */
+    size_t length = 0;
+
+    /**
+     * @brief Point every view at a copy of the same bytes
+     * @param from Buffer the request was parsed from
+     * @param to Buffer holding the same request bytes at the same offsets
+     */
+    void rebase(const char* from, const char* to);
+};
+
+/** Outcome of feeding bytes to the parser or a body decoder */
+enum class ParseResult {
+    INCOMPLETE,  // need more bytes
+    COMPLETE,    // done; see the caller for what was produced
+    ERROR        // malformed or over a limit; see error_status()
+};
+
+/**
+ * @brief Incremental decoder for a body framed by Content-Length or by
+ * chunked transfer coding
+ *
+ * decode() consumes as much input as it can. A partial chunk-size line or
+ * CRLF is left unconsumed and must be passed again together with the bytes
+ * that follow it. The output may overlap the input as long as it starts at
+ * or before it, so a body can be decoded in place.
+ */
+class BodyDecoder {
+public:
+    /** Decode a body of exactly content_length bytes */
+    void start(size_t content_length);
+
+    /** Decode a chunked body of at most max_body_size bytes */
+    void start_chunked(size_t max_body_size);
+
+    /**
+     * @param in Raw body bytes
+     * @param len Bytes available at in
+     * @param out Destination for decoded bytes
+     * @param capacity Space at out
+     * @param consumed Set to the input bytes used
+     * @param produced Set to the bytes written to out
+     * @return INCOMPLETE when more input (or output space) is needed,
+     *         COMPLETE once the whole body has been decoded
+     */
+    ParseResult decode(const char* in, size_t len, char* out, size_t capacity,
+                       size_t& consumed, size_t& produced);
+
+    bool done() const { return state_ == State::DONE; }
+    bool chunked() const { return chunked_; }
+
+    /** Body bytes decoded so far */
+    size_t decoded() const { return decoded_; }
+
+    /** HTTP status describing the last ERROR (400, 413 or 431) */
+    int error_status() const { return error_status_; }
+
+private:
+    enum class State {
+        LENGTH,
+        CHUNK_SIZE,
+        CHUNK_DATA,
+        CHUNK_DATA_END,  // CRLF after a chunk's data
+        TRAILERS,
+        DONE
+    };
+
+    ParseResult fail(int status);
+
+    State state_ = State::DONE;
+    bool chunked_ = false;
+    size_t remaining_ = 0;       // of the body or the current chunk
+    size_t decoded_ = 0;
+    size_t framing_ = 0;         // chunk-size lines, CRLFs and trailers
+    size_t trailer_bytes_ = 0;
+    size_t max_body_size_ = 0;
+    int error_status_ = 0;
+};
+
+/**
+ * @brief Resumable request parser
+ *
+ * Feed it the connection's receive buffer after every recv(); parsing
+ * resumes where the previous call stopped, so a request split across many
+ * segments is scanned once. The buffer may grow or move between calls as
+ * long as the bytes already seen stay at the same offsets. The parser
+ * itself never allocates: positions are kept as offsets and only turned
+ * into views once the request is complete.
+ *
+ * Bodies are framed by Content-Length or Transfer-Encoding: chunked. Chunked
+ * bodies are decoded in place: chunk data is moved down over the chunk
+ * framing as it arrives, so the decoded body is one contiguous view and the
+ * bytes between its end and the end of the request are left unspecified.
+ */
+class HttpParser {
+public:
+    using Result = ParseResult;
+
+    /**
+     * @brief Parse the first request in buffer
+     * @param buffer Receive buffer starting at the request
+     * @param len Bytes available
+     * @param out Filled in on COMPLETE; out.length bytes belong to it
+     */
+    Result parse(char* buffer, size_t len, ParsedRequest& out);
+
+    /**
+     * @brief Parse only as far as the end of the header block
+     *
+     * On COMPLETE, out holds everything but the body (out.body is null and
+     * out.content_length is the declared length, 0 if chunked), and
+     * out.length is the size of the request line and headers. The caller
+     * may then either keep calling parse() to buffer the body, or read the
+     * body that follows out.length itself with body_decoder().
+     */
+    Result parse_head(char* buffer, size_t len, ParsedRequest& out);
+
+    /**
+     * @brief Start reading the body of a request parse_head() completed
+     * without buffering it
+     *
+     * @param max_body_size Largest body accepted, in place of the parser's
+     * own limit
+     * @param decoder Set up to decode the raw bytes that follow the head
+     * @return false if parse() has already started on the body, or if a
+     *         Content-Length is over the limit (error_status() is then 413)
+     */
+    bool body_decoder(size_t max_body_size, BodyDecoder& decoder);
+
+    /**
+     * @brief Forget the current request, e.g. after it was consumed
+     *
+     * The body size limit is kept.
+     */
+    void reset();
+
+    /**
+     * @brief Set the largest body parse() accepts; larger ones fail with 413
+     *
+     * A Content-Length over the limit fails as soon as the header block is
+     * complete, before any of the body has to be received.
+     */
+    void set_max_body_size(size_t bytes) { max_body_size_ = bytes; }
+
+    /**
+     * @brief HTTP status describing the last ERROR (400, 413, 431 or 501)
+     */
+    int error_status() const { return error_status_; }
+
+    /**
+     * @brief Whether the client is waiting for "100 Continue" before it
+     * sends the body it announced with "Expect: 100-continue"
+     *
+     * After parse_head(), ask only once body_decoder() has accepted the body.
+     */
+    bool expects_continue() const;
+
+    /**
+     * @brief Total size of the current request once its headers are in and
+     * its body has a Content-Length, otherwise 0; lets callers size the
+     * receive buffer up front
+     */
+    size_t expected_length() const;
+
+private:
+    enum class State {
+        REQUEST_LINE,
+        HEADERS,
+        HEAD,     // header block complete, body not started
+        BODY,     // Content-Length body
+        CHUNKED,  // chunked body, decoded by body_
+        DONE      // chunked body complete
+    };
+
+    struct Span {
+        uint32_t offset;
+        uint32_t length;
+    };
+
+    Result fail(int status);
+    Result parse_headers(const char* buffer, size_t len);
+    bool next_line(const char* buffer, size_t len, size_t& offset, size_t& line_len);
+    bool parse_request_line(const char* line, size_t offset, size_t len);
+    bool parse_header(const char* line, size_t offset, size_t len);
+    bool end_headers();
+    void finish_head(const char* buffer, ParsedRequest& out) const;
+
+    State state_ = State::REQUEST_LINE;
+    size_t line_start_ = 0;    // first byte of the line being parsed
+    size_t scanned_ = 0;       // bytes already consumed or searched for '\n'
+    size_t body_start_ = 0;
+    size_t body_length_ = 0;   // decoded body bytes at body_start_
+    size_t request_length_ = 0;
+    size_t max_body_size_ = kDefaultMaxBodySize;
+    int error_status_ = 0;
+    BodyDecoder body_;
+
+    Span method_ = {0, 0};
+    Span target_ = {0, 0};
+    size_t path_length_ = 0;
+    int version_minor_ = 1;
+    bool has_content_length_ = false;
+    size_t content_length_ = 0;
+    bool connection_close_ = false;
+    bool connection_keep_alive_ = false;
+    bool has_transfer_encoding_ = false;
+    bool chunked_ = false;          // chunked is the final transfer coding
+    bool bad_coding_ = false;       // chunked repeated or not final
+    bool unknown_coding_ = false;   // a coding other than chunked
+    bool expect_continue_ = false;
+    size_t header_count_ = 0;
+    Span header_names_[kMaxHeaders];
+    Span header_values_[kMaxHeaders];
+};
+
+} // namespace server
+} // namespace crest
+
+#endif // CREST_HTTP_PARSER_HPP
@@ -0,0 +1,255 @@
+/**
+ * @file prefork.cpp
+ * @brief Prefork master process that supervises worker processes
+ */
+
+#include "prefork.hpp"
+
+#ifdef CREST_HAS_PREFORK
+
+#include "crest/crest.h"
+#include <cerrno>
+#include <csignal>
+#include <cstdio>
+#include <thread>
+#include <fcntl.h>
+#include <poll.h>
+#include <pthread.h>
+#include <sys/wait.h>
+#include <unistd.h>
+#if defined(__linux__)
+    #include <sys/prctl.h>
+#endif
+
+extern "C" {
+    void crest_log_info(const char* msg);
+    void crest_log_error(const char* msg);
+}
+
+namespace crest {
+namespace server {
+
+namespace {
+
+constexpr int kTickMs = 250;
+constexpr auto kShutdownGrace = std::chrono::seconds(10);
+// A worker that dies sooner than this is restarted after the same delay,
+// so a worker that cannot start does not turn into a fork loop
+constexpr auto kRestartBackoff = std::chrono::seconds(1);
+
+const int kHandledSignals[] = {SIGTERM, SIGINT, SIGQUIT, SIGHUP, SIGCHLD};
+constexpr size_t kNumHandledSignals = sizeof(kHandledSignals) / sizeof(kHandledSignals[0]);
+
+// Write end of the running supervisor's wake pipe, used by the signal handler
+volatile sig_atomic_t signal_fd = -1;
+
+void on_signal(int sig) {
+    int saved_errno = errno;
+    unsigned char byte = static_cast<unsigned char>(sig);
+    if (signal_fd >= 0) {
+        ssize_t ignored = write(signal_fd, &byte, 1);
+        (void)ignored;
+    }
+    errno = saved_errno;
+}
+
+void set_cloexec_nonblock(int fd) {
+    fcntl(fd, F_SETFD, fcntl(fd, F_GETFD) | FD_CLOEXEC);
+    fcntl(fd, F_SETFL, fcntl(fd, F_GETFL) | O_NONBLOCK);
+}
+
+} // namespace
+
+Supervisor::Supervisor(crest_app_t* app, size_t num_workers, std::function<int()> serve)
+    : app_(app), serve_(std::move(serve)), workers_(num_workers == 0 ? 1 : num_workers),
+      stopping_(false), stop_signal_(SIGTERM) {
+    if (pipe(wake_pipe_) != 0) {
+        wake_pipe_[0] = wake_pipe_[1] = -1;
+        return;
+    }
+    set_cloexec_nonblock(wake_pipe_[0]);
+    set_cloexec_nonblock(wake_pipe_[1]);
+}
+
+Supervisor::~Supervisor() {
+    if (wake_pipe_[0] >= 0) close(wake_pipe_[0]);
+    if (wake_pipe_[1] >= 0) close(wake_pipe_[1]);
+}
+
+int Supervisor::run() {
+    struct sigaction action = {};
+    action.sa_handler = on_signal;
+    sigemptyset(&action.sa_mask);
+    action.sa_flags = SA_RESTART;
+
+    struct sigaction previous[kNumHandledSignals];
+    signal_fd = wake_pipe_[1];
+    for (size_t i = 0; i < kNumHandledSignals; i++) {
+        sigaction(kHandledSignals[i], &action, &previous[i]);
+    }
+
+    while (!stopping_) {
+        auto now = std::chrono::steady_clock::now();
+        for (Worker& worker : workers_) {
+            if (worker.pid == 0 && now >= worker.restart_at) spawn(worker);
+        }
+
+        struct pollfd pfd = {wake_pipe_[0], POLLIN, 0};
+        poll(&pfd, 1, kTickMs);
+        drain_signals();
+        reap();
+    }
+
+    shutdown_workers();
+
+    for (size_t i = 0; i < kNumHandledSignals; i++) {
+        sigaction(kHandledSignals[i], &previous[i], nullptr);
+    }
+    signal_fd = -1;
+    return 0;
+}
+
+void Supervisor::stop() {
+    stopping_ = true;
+    unsigned char byte = 0;
+    ssize_t ignored = write(wake_pipe_[1], &byte, 1);
+    (void)ignored;
+}
+
+void Supervisor::spawn(Worker& worker) {
+    pid_t master = getpid();
+    pid_t pid = fork();
+
+    if (pid < 0) {
+        crest_log_error("Failed to fork worker process");
+        worker.restart_at = std::chrono::steady_clock::now() + kRestartBackoff;
+        return;
+    }
+
+    if (pid == 0) {
+        for (int sig : kHandledSignals) {
+            signal(sig, SIG_DFL);
+        }
+        close(wake_pipe_[0]);
+        close(wake_pipe_[1]);
+
+#if defined(__linux__)
+        // Exit with the master instead of lingering on its listeners
+        prctl(PR_SET_PDEATHSIG, SIGTERM);
+        if (getppid() != master) _exit(0);
+#else
+        (void)master;
+#endif
+
+        // Blocked before any thread starts so only the signal thread sees
+        // them; it turns a forwarded signal into a graceful crest_stop
+        sigset_t stop_signals;
+        sigemptyset(&stop_signals);
+        sigaddset(&stop_signals, SIGTERM);
+        sigaddset(&stop_signals, SIGINT);
+        sigaddset(&stop_signals, SIGQUIT);
+        sigaddset(&stop_signals, SIGHUP);
+        pthread_sigmask(SIG_BLOCK, &stop_signals, nullptr);
+
+        crest_app_t* app = app_;
+        std::thread([app, stop_signals]() {
+            int sig = 0;
+            sigwait(&stop_signals, &sig);
+            crest_stop(app);
+        }).detach();
+
+        // _exit skips the master's atexit handlers and static destructors
+        _exit(serve_() == 0 ? 0 : 1);
+    }
+
+    worker.pid = pid;
+    worker.started = std::chrono::steady_clock::now();
+}
+
+void Supervisor::reap() {
+    for (Worker& worker : workers_) {
+        if (worker.pid == 0) continue;
+
+        int status = 0;
+        pid_t pid = waitpid(worker.pid, &status, WNOHANG);
+        if (pid != worker.pid) continue;
+
+        auto now = std::chrono::steady_clock::now();
+        worker.restart_at = now - worker.started < kRestartBackoff ? now + kRestartBackoff : now;
+
+        if (!stopping_) {
+            char msg[128];
+            if (WIFSIGNALED(status)) {
+                snprintf(msg, sizeof(msg), "Worker process %d killed by signal %d, restarting",
+                         static_cast<int>(pid), WTERMSIG(status));
+                crest_log_error(msg);
+            } else {
+                snprintf(msg, sizeof(msg), "Worker process %d exited with status %d, restarting",
+                         static_cast<int>(pid), WEXITSTATUS(status));
+                crest_log_info(msg);
+            }
+        }
+        worker.pid = 0;
+    }
+}
+
+void Supervisor::signal_workers(int sig) {
+    for (const Worker& worker : workers_) {
+        if (worker.pid > 0) kill(worker.pid, sig);
+    }
+}
+
+void Supervisor::drain_signals() {
+    unsigned char sig;
+    while (read(wake_pipe_[0], &sig, 1) == 1) {
+        switch (sig) {
+            case SIGHUP:
+                // Workers drain and exit; reap() starts their replacements
+                signal_workers(SIGHUP);
+                break;
+            case SIGTERM:
+            case SIGINT:
+            case SIGQUIT:
+                stop_signal_ = sig;
+                stopping_ = true;
+                break;
+            default:
+                // SIGCHLD or a stop() wakeup
+                break;
+        }
+    }
+}
+
+void Supervisor::shutdown_workers() {
+    signal_workers(stop_signal_);
+
+    auto deadline = std::chrono::steady_clock::now() + kShutdownGrace;
+    while (true) {
+        reap();
+        bool alive = false;
+        for (const Worker& worker : workers_) {
+            if (worker.pid > 0) alive = true;
+        }
+        if (!alive) return;
+
+        if (std::chrono::steady_clock::now() >= deadline) {
+            crest_log_error("Worker processes did not stop in time, killing them");
+            signal_workers(SIGKILL);
+            for (Worker& worker : workers_) {
+                if (worker.pid > 0) waitpid(worker.pid, nullptr, 0);
+                worker.pid = 0;
+            }
+            return;
+        }
+
+        struct pollfd pfd = {wake_pipe_[0], POLLIN, 0};
+        poll(&pfd, 1, 50);
+        unsigned char sig;
+        while (read(wake_pipe_[0], &sig, 1) == 1) {}
+    }
+}
+
+} // namespace server
+} // namespace crest
+
+#endif // CREST_HAS_PREFORK
@@ -0,0 +1,85 @@
+/**
+ * @file prefork.hpp
+ * @brief Prefork master process that supervises worker processes
+ */
+
+#ifndef CREST_PREFORK_HPP
+#define CREST_PREFORK_HPP
+
+#if !defined(_WIN32) && !defined(_WIN64) && !defined(CREST_WINDOWS)
+#define CREST_HAS_PREFORK 1
+
+#include "crest/internal/app_internal.h"
+#include <atomic>
+#include <chrono>
+#include <functional>
+#include <vector>
+#include <sys/types.h>
+
+namespace crest {
+namespace server {
+
+/**
+ * @brief Forks worker processes that serve on inherited listeners
+ *
+ * The master keeps the listening sockets open and runs no handlers itself.
+ * Each worker runs the regular server loop; a worker that exits or crashes
+ * is replaced, so one bad handler only takes down its own process.
+ *
+ * SIGTERM, SIGINT and SIGQUIT sent to the master are forwarded to every
+ * worker and end the run. SIGHUP is forwarded without stopping the master:
+ * workers finish their in-flight requests, exit, and are started again.
+ */
+class Supervisor {
+public:
+    /**
+     * @param app Application the workers serve
+     * @param num_workers Worker processes to keep running
+     * @param serve Runs the server loop inside a worker; returns its exit code
+     */
+    Supervisor(crest_app_t* app, size_t num_workers, std::function<int()> serve);
+    ~Supervisor();
+
+    Supervisor(const Supervisor&) = delete;
+    Supervisor& operator=(const Supervisor&) = delete;
+
+    bool valid() const { return wake_pipe_[0] >= 0; }
+
+    /**
+     * @brief Fork the workers and keep them running until stopped
+     * @return 0 after a clean shutdown
+     */
+    int run();
+
+    /**
+     * @brief Stop every worker and return from run() (thread-safe)
+     */
+    void stop();
+
+private:
+    struct Worker {
+        pid_t pid = 0;
+        std::chrono::steady_clock::time_point started;
+        std::chrono::steady_clock::time_point restart_at;
+    };
+
+    void spawn(Worker& worker);
+    void reap();
+    void signal_workers(int sig);
+    void drain_signals();
+    void shutdown_workers();
+
+    crest_app_t* app_;
+    std::function<int()> serve_;
+    std::vector<Worker> workers_;
+    int wake_pipe_[2];
+    std::atomic<bool> stopping_;
+    int stop_signal_;
+};
+
+} // namespace server
+} // namespace crest
+
+#endif // !_WIN32
+
+#endif // CREST_PREFORK_HPP
@@ -0,0 +1,911 @@
+/**
+ * @file reactor.cpp
+ * @brief Edge-triggered epoll event loops for connection I/O
+ */
+
+#include "reactor.hpp"
+
+#ifdef CREST_HAS_REACTOR
+
+#include "server_internal.hpp"
+#include <cerrno>
+#include <cstdlib>
+#include <cstring>
+#include <thread>
+#include <sys/epoll.h>
+#include <sys/eventfd.h>
+#include <sys/sendfile.h>
+#include <sys/socket.h>
+#include <sys/uio.h>
+#include <netinet/in.h>
+#include <netinet/tcp.h>
+#include <unistd.h>
+
+namespace crest {
+namespace server {
+
+namespace {
+
+constexpr int kMaxEvents = 256;
+constexpr int kTickMs = 250;
+constexpr int kAcceptBatch = 64;
+constexpr size_t kReadChunk = 16384;
+// Buffered input past which reading pauses unless the request at the front
+// still needs more bytes; keeps pipelining clients from queueing unbounded data
+constexpr size_t kReadAheadBytes = 1024 * 1024;
+// How long a stopping loop waits for in-flight requests to be answered
+constexpr auto kDrainTimeout = std::chrono::seconds(5);
+// Buffers handed to one sendmsg call; two per response
+constexpr size_t kMaxWriteSegments = 64;
+
+} // namespace
+
+EventLoop::EventLoop(crest_app_t* app, int listen_fd, ThreadPool* pool)
+    : app_(app), listen_fd_(listen_fd), pool_(pool),
+      hold_when_full_(app->overload_policy == CREST_OVERLOAD_BLOCK),
+      epoll_fd_(epoll_create1(EPOLL_CLOEXEC)),
+      wake_fd_(eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC)),
+      running_(true),
+      now_(std::chrono::steady_clock::now()),
+      last_sweep_(now_),
+      counters_(alloc_counters(app)) {
+    if (!valid()) return;
+
+    epoll_event ev = {};
+    ev.events = EPOLLIN;
+    ev.data.ptr = &wake_fd_;
+    epoll_ctl(epoll_fd_, EPOLL_CTL_ADD, wake_fd_, &ev);
+
+    // Level-triggered so a loop that stops accepting mid-batch is woken
+    // again; EPOLLEXCLUSIVE avoids waking every loop for each connection.
+    ev.events = EPOLLIN;
+#ifdef EPOLLEXCLUSIVE
+    ev.events |= EPOLLEXCLUSIVE;
+#endif
+    ev.data.ptr = &listen_fd_;
+    epoll_ctl(epoll_fd_, EPOLL_CTL_ADD, listen_fd_, &ev);
+}
+
+EventLoop::~EventLoop() {
+    for (auto& entry : connections_) {
+        close(entry.second->fd);
+        entry.second->state = Connection::State::CLOSED;
+        release_pending(*entry.second);
+    }
+    connections_.clear();
+    // The workers are gone; completions they posted only recycle jobs now
+    run_posted();
+    for (RequestJob* job : parked_) recycle(job);
+    for (RequestJob* job : spare_jobs_) delete job;
+    if (epoll_fd_ >= 0) close(epoll_fd_);
+    if (wake_fd_ >= 0) close(wake_fd_);
+}
+
+void EventLoop::run() {
+    epoll_event events[kMaxEvents];
+    bool draining = false;
+
+    while (true) {
+        if (!running_ && !draining) {
+            begin_drain();
+            draining = true;
+        }
+        if (draining && (connections_.empty() || now_ >= drain_deadline_)) break;
+
+        int n = epoll_wait(epoll_fd_, events, kMaxEvents, kTickMs);
+        if (n < 0) {
+            if (errno == EINTR) continue;
+            break;
+        }
+        now_ = std::chrono::steady_clock::now();
+
+        for (int i = 0; i < n; i++) {
+            void* tag = events[i].data.ptr;
+            if (tag == &listen_fd_) {
+                accept_connections();
+            } else if (tag == &wake_fd_) {
+                uint64_t value;
+                while (read(wake_fd_, &value, sizeof(value)) > 0) {}
+            } else {
+                handle_event(static_cast<Connection*>(tag), events[i].events);
+            }
+        }
+
+        run_posted();
+        // Completions and ticks are when workers have taken queued tasks
+        hand_over_parked();
+        if (now_ - last_sweep_ >= std::chrono::milliseconds(kTickMs)) {
+            sweep_idle();
+            last_sweep_ = now_;
+        }
+        // Connections closed during this batch may still appear in later
+        // events of the same batch, so they are only released here.
+        closed_.clear();
+    }
+
+    // Handlers still reading a body would otherwise wait for it forever
+    std::vector<Connection*> streaming;
+    for (auto& entry : connections_) {
+        if (entry.second->stream) streaming.push_back(entry.second.get());
+    }
+    for (Connection* conn : streaming) {
+        close_connection(*conn);
+    }
+    closed_.clear();
+}
+
+void EventLoop::begin_drain() {
+    // Leave new connections to the other listeners' loops (or the backlog)
+    epoll_ctl(epoll_fd_, EPOLL_CTL_DEL, listen_fd_, nullptr);
+    now_ = std::chrono::steady_clock::now();
+    drain_deadline_ = now_ + kDrainTimeout;
+
+    // Answer requests that have already arrived; requests dispatched from
+    // here on are the connection's last. Idle keep-alive connections close
+    // right away, but a connection that was just accepted is given until
+    // the deadline for its first request to arrive.
+    std::vector<Connection*> open;
+    open.reserve(connections_.size());
+    for (auto& entry : connections_) {
+        open.push_back(entry.second.get());
+    }
+    for (Connection* conn : open) {
+        if (conn->state == Connection::State::CLOSED) continue;
+        read_input(*conn);
+        if (conn->state != Connection::State::CLOSED && conn->requests_served > 0 &&
+            conn->pending.empty() && conn->input.empty() && conn->writing.empty()) {
+            close_connection(*conn);
+        }
+    }
+    closed_.clear();
+}
+
+void EventLoop::stop() {
+    running_ = false;
+    uint64_t one = 1;
+    ssize_t ignored = write(wake_fd_, &one, sizeof(one));
+    (void)ignored;
+}
+
+void EventLoop::post(std::function<void()> fn) {
+    bool was_empty;
+    {
+        std::lock_guard<std::mutex> lock(posted_mutex_);
+        was_empty = posted_.empty();
+        posted_.push_back(std::move(fn));
+    }
+    if (was_empty) {
+        uint64_t one = 1;
+        ssize_t ignored = write(wake_fd_, &one, sizeof(one));
+        (void)ignored;
+    }
+}
+
+void EventLoop::run_posted() {
+    // The two vectors trade places, so neither gives up its capacity
+    {
+        std::lock_guard<std::mutex> lock(posted_mutex_);
+        running_posted_.swap(posted_);
+    }
+    for (auto& fn : running_posted_) {
+        fn();
+    }
+    running_posted_.clear();
+}
+
+void EventLoop::accept_connections() {
+    for (int i = 0; i < kAcceptBatch; i++) {
+        int fd = accept4(listen_fd_, nullptr, nullptr, SOCK_NONBLOCK | SOCK_CLOEXEC);
+        if (fd < 0) {
+            // EAGAIN: another loop took it; EMFILE etc.: retry next wakeup
+            return;
+        }
+
+        int one = 1;
+        setsockopt(fd, IPPROTO_TCP, TCP_NODELAY, &one, sizeof(one));
+
+        auto conn = std::make_shared<Connection>();
+        conn->fd = fd;
+        conn->parser.set_max_body_size(app_->max_body_size);
+        conn->last_active = now_;
+        conn->idle_pos = idle_.insert(idle_.end(), conn.get());
+
+        epoll_event ev = {};
+        ev.events = EPOLLIN | EPOLLOUT | EPOLLRDHUP | EPOLLET;
+        ev.data.ptr = conn.get();
+        if (epoll_ctl(epoll_fd_, EPOLL_CTL_ADD, fd, &ev) < 0) {
+            idle_.erase(conn->idle_pos);
+            close(fd);
+            continue;
+        }
+        connections_[fd] = std::move(conn);
+    }
+}
+
+void EventLoop::handle_event(Connection* conn, uint32_t events) {
+    if (conn->state == Connection::State::CLOSED) return;
+
+    if (events & EPOLLERR) {
+        close_connection(*conn);
+        return;
+    }
+    if (events & (EPOLLIN | EPOLLRDHUP | EPOLLHUP)) {
+        read_input(*conn);
+        if (conn->state == Connection::State::CLOSED) return;
+    }
+    if ((events & EPOLLOUT) && !conn->writing.empty()) {
+        write_output(*conn);
+    }
+}
+
+void EventLoop::read_input(Connection& conn) {
+    char chunk[kReadChunk];
+    conn.read_paused = false;
+    while (!conn.peer_closed) {
+        if (conn.input.size() >= kReadAheadBytes) {
+            // Frame what is buffered; a large body keeps reading, while
+            // requests queued behind a full pipeline stay in the kernel
+            if (!process_input(conn)) {
+                if (conn.state == Connection::State::CLOSED) return;
+                conn.read_paused = true;
+                break;
+            }
+        }
+        ssize_t n = recv(conn.fd, chunk, sizeof(chunk), 0);
+        if (n > 0) {
+            touch(conn);
+            size_t capacity = conn.input.capacity();
+            conn.input.append(chunk, static_cast<size_t>(n));
+            counters_.buffer_grown(conn.input, capacity);
+            continue;
+        }
+        if (n == 0) {
+            conn.peer_closed = true;
+            break;
+        }
+        if (errno == EINTR) continue;
+        if (errno == EAGAIN || errno == EWOULDBLOCK) break;
+        close_connection(conn);
+        return;
+    }
+    process_input(conn);
+}
+
+bool EventLoop::process_input(Connection& conn) {
+    size_t max_depth = static_cast<size_t>(app_->max_pipeline_depth);
+    ParsedRequest request;
+    bool needs_input = false;
+
+    // Nothing behind a streamed body can be parsed until its end is found
+    bool parsing = !conn.stream || stream_input(conn, needs_input);
+
+    while (parsing && conn.state == Connection::State::OPEN && conn.pending.size() < max_depth) {
+        auto result = conn.parser.parse_head(conn.input.data(), conn.input.size(), request);
+        if (result == HttpParser::Result::COMPLETE) {
+            if (!conn.routed) {
+                conn.stream_limit = stream_body_limit(app_, request);
+                conn.routed = true;
+            }
+            if (conn.stream_limit > 0) {
+                // Streamed requests run alone, so their "100 Continue" and
+                // their body never wait behind earlier handlers
+                if (!conn.pending.empty()) break;
+                if (!start_stream(conn, request)) return false;
+                parsing = stream_input(conn, needs_input);
+                continue;
+            }
+            result = conn.parser.parse(conn.input.data(), conn.input.size(), request);
+        }
+        if (result == HttpParser::Result::ERROR) {
+            reject(conn, conn.parser.error_status());
+            return false;
+        }
+        if (result == HttpParser::Result::INCOMPLETE) {
+            // Only the front request may be told to go ahead, so the
+            // interim response cannot overtake earlier final responses
+            if (conn.parser.expects_continue() && !conn.continue_sent && conn.pending.empty()) {
+                send_continue(conn);
+                if (conn.state == Connection::State::CLOSED) return false;
+            }
+            if (conn.parser.expected_length() > conn.input.capacity()) {
+                conn.input.reserve(conn.parser.expected_length());
+                counters_.buffers.fetch_add(1, std::memory_order_relaxed);
+            }
+            needs_input = true;
+            break;
+        }
+        dispatch_request(conn, request);
+    }
+
+    if (conn.stream && conn.peer_closed && needs_input) {
+        // The client went away partway through the body
+        end_stream(conn, 400);
+        return false;
+    }
+    if (conn.state == Connection::State::CLOSED) return false;
+    if (conn.peer_closed && conn.pending.empty() && conn.writing.empty()) {
+        // Peer went away and every complete request has been answered
+        close_connection(conn);
+        return false;
+    }
+    return needs_input;
+}
+
+void EventLoop::send_continue(Connection& conn) {
+    conn.continue_sent = true;
+    RequestJob* job = take_job();
+    job->response.assign(kContinueResponse, sizeof(kContinueResponse) - 1);
+    conn.writing.push_back(job);
+    flush(conn);
+}
+
+namespace {
+
+int64_t read_streamed_body(void* source, void* buffer, size_t size) {
+    return static_cast<StreamedBody*>(source)->read(static_cast<char*>(buffer), size);
+}
+
+} // namespace
+
+int64_t StreamedBody::read(char* out, size_t size) {
+    std::function<void()> wake;
+    size_t n = 0;
+    {
+        std::unique_lock<std::mutex> lock(mutex);
+        readable.wait(lock, [this] { return start < end || complete || error != 0; });
+        if (error) return -error;
+        n = end - start < size ? end - start : size;
+        memcpy(out, data.data() + start, n);
+        start += n;
+        if (start == end) start = end = 0;
+        // Let the loop refill once half of the window is free
+        if (loop_waiting && !resume_posted && end - start <= kStreamWindowBytes / 2) {
+            resume_posted = true;
+            wake = resume;
+        }
+    }
+    if (wake) wake();
+    return static_cast<int64_t>(n);
+}
+
+int StreamedBody::abandon() {
+    std::function<void()> wake;
+    int status;
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        abandoned = true;
+        start = end = 0;
+        std::string().swap(data);
+        status = error;
+        if (loop_waiting && !resume_posted) {
+            resume_posted = true;
+            wake = resume;
+        }
+    }
+    if (wake) wake();
+    return status;
+}
+
+bool EventLoop::start_stream(Connection& conn, const ParsedRequest& head) {
+    BodyDecoder decoder;
+    if (!conn.parser.body_decoder(conn.stream_limit, decoder)) {
+        reject(conn, conn.parser.error_status());
+        return false;
+    }
+    if (conn.parser.expects_continue()) {
+        send_continue(conn);
+        if (conn.state == Connection::State::CLOSED) return false;
+    }
+
+    auto stream = std::make_shared<StreamedBody>();
+    stream->data.resize(kStreamWindowBytes);
+    // The connection is only referenced weakly: it owns the stream
+    std::weak_ptr<Connection> weak = connections_[conn.fd];
+    StreamedBody* id = stream.get();
+    stream->resume = [this, weak, id]() {
+        post([this, weak, id]() {
+            std::shared_ptr<Connection> ref = weak.lock();
+            if (!ref || ref->state == Connection::State::CLOSED || ref->stream.get() != id) return;
+            {
+                std::lock_guard<std::mutex> lock(id->mutex);
+                id->loop_waiting = false;
+                id->resume_posted = false;
+            }
+            touch(*ref);
+            resume_input(*ref);
+        });
+    };
+
+    conn.stream = stream;
+    conn.stream_decoder = decoder;
+    dispatch_request(conn, head, std::move(stream));
+    return true;
+}
+
+bool EventLoop::stream_input(Connection& conn, bool& needs_input) {
+    StreamedBody& body = *conn.stream;
+    ParseResult result = ParseResult::INCOMPLETE;
+    size_t used = 0;
+    bool full = false;
+    {
+        std::lock_guard<std::mutex> lock(body.mutex);
+        while (true) {
+            const char* in = conn.input.data() + used;
+            size_t len = conn.input.size() - used;
+            size_t consumed = 0;
+            size_t produced = 0;
+            if (body.abandoned) {
+                // Decoded only to find where the body ends
+                char discard[kReadChunk];
+                result = conn.stream_decoder.decode(in, len, discard, sizeof(discard), consumed, produced);
+            } else {
+                if (body.start > 0) {
+                    memmove(&body.data[0], body.data.data() + body.start, body.end - body.start);
+                    body.end -= body.start;
+                    body.start = 0;
+                }
+                if (body.end == kStreamWindowBytes) {
+                    // Wait for the handler to catch up
+                    full = true;
+                    body.loop_waiting = true;
+                    break;
+                }
+                result = conn.stream_decoder.decode(in, len, &body.data[body.end],
+                                                    kStreamWindowBytes - body.end, consumed, produced);
+                body.end += produced;
+                if (produced > 0) body.readable.notify_all();
+            }
+            used += consumed;
+            if (result != ParseResult::INCOMPLETE || consumed == 0) break;
+        }
+        if (result == ParseResult::COMPLETE) {
+            body.complete = true;
+            body.readable.notify_all();
+        }
+    }
+    conn.input.erase(0, used);
+
+    if (result == ParseResult::ERROR) {
+        end_stream(conn, conn.stream_decoder.error_status());
+        return false;
+    }
+    if (result == ParseResult::COMPLETE) {
+        end_stream(conn, 0);
+        return true;
+    }
+    needs_input = !full;
+    return false;
+}
+
+void EventLoop::end_stream(Connection& conn, int error) {
+    std::shared_ptr<StreamedBody> stream = std::move(conn.stream);
+    if (error) {
+        std::lock_guard<std::mutex> lock(stream->mutex);
+        stream->error = error;
+        stream->readable.notify_all();
+    }
+    if (!error || conn.state == Connection::State::CLOSED) return;
+
+    // Where the next request would start is unknown
+    conn.state = Connection::State::DRAINING;
+    if (conn.pending.empty() && conn.writing.empty()) {
+        close_connection(conn);
+    }
+}
+
+void EventLoop::dispatch_request(Connection& conn, const ParsedRequest& request,
+                                 std::shared_ptr<StreamedBody> stream) {
+    conn.requests_served++;
+
+    bool keep_alive = running_ &&
+                      conn.requests_served < app_->max_keep_alive_requests &&
+                      request.keep_alive;
+    if (!keep_alive) {
+        // Requests pipelined behind this one are never answered
+        conn.state = Connection::State::DRAINING;
+    }
+
+    RequestJob* job = start_job(conn);
+    job->keep_alive = keep_alive;
+    job->stream = std::move(stream);
+
+    // The input buffer keeps receiving while the worker runs, so the
+    // request moves to the job's buffer; no re-parse is needed. When it is
+    // all that was buffered, the two buffers trade places instead.
+    const char* from = conn.input.data();
+    if (request.length == conn.input.size()) {
+        job->raw.swap(conn.input);
+        conn.input.clear();
+    } else {
+        size_t capacity = job->raw.capacity();
+        job->raw.assign(conn.input, 0, request.length);
+        counters_.buffer_grown(job->raw, capacity);
+        conn.input.erase(0, request.length);
+        if (conn.input.capacity() > kBufferKeepBytes && conn.input.size() < kBufferKeepBytes) {
+            conn.input.shrink_to_fit();
+        }
+    }
+    job->request = request;
+    job->request.rebase(from, job->raw.data());
+    conn.parser.reset();
+    conn.continue_sent = false;
+    conn.routed = false;
+
+    submit(job);
+}
+
+void EventLoop::submit(RequestJob* job) {
+    // Small enough to be stored in the pool's task without allocating
+    auto task = [this, job](bool shed) { execute(job, shed); };
+    if (!hold_when_full_) {
+        pool_->enqueue(task);
+    } else if (!parked_.empty() || !pool_->try_enqueue(task)) {
+        // Under the BLOCK policy the loop must still not wait for room:
+        // every connection it serves would stall, and handlers reading a
+        // streamed body wait on it. The job waits here, in arrival order.
+        parked_.push_back(job);
+    }
+}
+
+void EventLoop::hand_over_parked() {
+    while (!parked_.empty() && pool_->has_room()) {
+        RequestJob* job = parked_.front();
+        if (job->conn->state == Connection::State::CLOSED) {
+            recycle(job);
+        } else if (!pool_->try_enqueue([this, job](bool shed) { execute(job, shed); })) {
+            return;
+        }
+        parked_.pop_front();
+    }
+}
+
+void EventLoop::execute(RequestJob* job, bool shed) {
+    if (shed) {
+        // Turned away by the pool's queue limit; the connection closes
+        // once the responses ahead of this one are written
+        if (job->stream) job->stream->abandon();
+        post([this, job]() {
+            if (job->conn->state == Connection::State::OPEN) {
+                job->conn->state = Connection::State::DRAINING;
+            }
+            job->response.assign(kOverloadedResponse, sizeof(kOverloadedResponse) - 1);
+            complete(job);
+        });
+        return;
+    }
+
+    // Pipelined requests of one connection may run on several workers
+    // at once, so the scratch arena belongs to the worker rather than
+    // the connection
+    static thread_local Arena arena;
+
+    crest_request_t req = {0};
+    bind_request(job->request, &req);
+    req.arena = arena.get();
+    if (job->stream) {
+        req.read_body = read_streamed_body;
+        req.body_source = job->stream.get();
+    }
+
+    crest_response_t res = {0};
+    res.status = 200;
+    res.sent = false;
+    res.keep_alive = job->keep_alive;
+    res.arena = arena.get();
+
+    dispatch(app_, &req, &res);
+
+    size_t capacity = job->response.capacity();
+    int body_error = job->stream ? job->stream->abandon() : 0;
+    bool unanswered = !body_error && !res.head;
+    if (body_error) {
+        // The handler ran on a body that turned out malformed or too large
+        job->response = error_response(body_error);
+    } else if (unanswered) {
+        // The handler wrote nothing. Answer for it and close, so the
+        // next pipelined response cannot be taken for this one.
+        job->response = error_response(500);
+    } else {
+        // The arena is reused by the worker's next request, so the
+        // response is copied out once, head and body back to back,
+        // unless the handler handed its body over
+        if (res.body_release) {
+            job->response.assign(res.head, res.head_length);
+            job->body = res.body;
+            job->body_length = res.body_length;
+            job->body_release = res.body_release;
+            job->body_context = res.body_context;
+            if (res.body_from_file) {
+                job->body_file = res.body_file;
+                job->body_offset = res.body_offset;
+            }
+            res.body_release = nullptr;
+        } else {
+            job->response.reserve(res.head_length + res.body_length);
+            job->response.assign(res.head, res.head_length);
+            job->response.append(res.body, res.body_length);
+        }
+    }
+    counters_.buffer_grown(job->response, capacity);
+    crest_response_release(&res);
+    counters_.arena_reset(arena);
+
+    job->closes = unanswered;
+
+    // Two pointers: std::function stores them without allocating
+    post([this, job]() { complete(job); });
+}
+
+void EventLoop::reject(Connection& conn, int status) {
+    // Answered in order after the requests already in flight
+    conn.state = Connection::State::DRAINING;
+    RequestJob* job = start_job(conn);
+    job->response = error_response(status);
+    complete(job);
+}
+
+RequestJob* EventLoop::take_job() {
+    if (spare_jobs_.empty()) {
+        counters_.contexts.fetch_add(1, std::memory_order_relaxed);
+        return new RequestJob();
+    }
+    RequestJob* job = spare_jobs_.back();
+    spare_jobs_.pop_back();
+    return job;
+}
+
+RequestJob* EventLoop::start_job(Connection& conn) {
+    RequestJob* job = take_job();
+    job->conn = connections_[conn.fd];
+    conn.pending.push_back(job);
+    return job;
+}
+
+void EventLoop::complete(RequestJob* job) {
+    std::shared_ptr<Connection> conn = job->conn;
+    if (conn->state == Connection::State::CLOSED || job->dropped) {
+        recycle(job);
+        return;
+    }
+    job->ready = true;
+
+    // Responses leave strictly in request order
+    if (!conn->pending.front()->ready) return;
+
+    size_t ready = 0;
+    bool closing = false;
+    while (ready < conn->pending.size() && conn->pending[ready]->ready && !closing) {
+        closing = conn->pending[ready]->closes;
+        conn->writing.push_back(conn->pending[ready++]);
+    }
+    conn->pending.erase(conn->pending.begin(), conn->pending.begin() + static_cast<std::ptrdiff_t>(ready));
+    if (closing) {
+        // The client cannot tell which request later responses answer
+        conn->state = Connection::State::DRAINING;
+        for (RequestJob* later : conn->pending) {
+            if (later->ready) {
+                recycle(later);
+            } else {
+                later->dropped = true;
+            }
+        }
+        conn->pending.clear();
+    }
+
+    touch(*conn);
+    write_output(*conn);
+}
+
+void EventLoop::recycle(RequestJob* job) {
+    if (spare_jobs_.size() >= kSpareJobs) {
+        if (job->body_release) job->body_release(job->body_context);
+        delete job;
+        return;
+    }
+    if (job->body_release) job->body_release(job->body_context);
+    job->body = nullptr;
+    job->body_length = 0;
+    job->body_release = nullptr;
+    job->body_context = nullptr;
+    job->body_file = -1;
+    job->body_offset = 0;
+    job->conn.reset();
+    job->stream.reset();
+    job->ready = false;
+    job->closes = false;
+    job->dropped = false;
+    job->raw.clear();
+    job->response.clear();
+    if (job->raw.capacity() > kBufferKeepBytes) std::string().swap(job->raw);
+    if (job->response.capacity() > kBufferKeepBytes) std::string().swap(job->response);
+    spare_jobs_.push_back(job);
+}
+
+void EventLoop::release_pending(Connection& conn) {
+    // Jobs still with a worker are recycled when their completion arrives
+    for (RequestJob* job : conn.pending) {
+        if (job->ready) recycle(job);
+    }
+    conn.pending.clear();
+    for (RequestJob* job : conn.writing) recycle(job);
+    conn.writing.clear();
+    conn.write_offset = 0;
+}
+
+void EventLoop::write_output(Connection& conn) {
+    if (!flush(conn)) return;  // closed, or resumes on EPOLLOUT
+
+    if (conn.pending.empty() && (conn.state == Connection::State::DRAINING || !running_)) {
+        close_connection(conn);
+        return;
+    }
+
+    // Pipeline slots were freed: pick up buffered or unread requests
+    resume_input(conn);
+}
+
+void EventLoop::resume_input(Connection& conn) {
+    if (conn.read_paused) {
+        read_input(conn);
+    } else {
+        process_input(conn);
+    }
+}
+
+bool EventLoop::flush(Connection& conn) {
+    while (true) {
+        // Recycle what has been written in full
+        size_t done = 0;
+        while (done < conn.writing.size() && conn.write_offset >= conn.writing[done]->size()) {
+            conn.write_offset -= conn.writing[done]->size();
+            recycle(conn.writing[done++]);
+        }
+        conn.writing.erase(conn.writing.begin(), conn.writing.begin() + static_cast<std::ptrdiff_t>(done));
+        if (conn.writing.empty()) return true;
+
+        ssize_t n;
+        RequestJob* front = conn.writing.front();
+        if (front->body_file >= 0 && conn.write_offset >= front->response.size()) {
+            // The head is out: the kernel copies the file to the socket.
+            // A file cut short returns 0, and the connection is closed.
+            size_t sent = conn.write_offset - front->response.size();
+            off_t offset = static_cast<off_t>(front->body_offset + static_cast<int64_t>(sent));
+            n = sendfile(conn.fd, front->body_file, &offset, front->body_length - sent);
+        } else {
+            // Every pending response in one call, each from its own
+            // buffers, up to the first file body
+            iovec vectors[kMaxWriteSegments];
+            size_t count = 0;
+            size_t skip = conn.write_offset;
+            auto add = [&](const char* data, size_t length) {
+                if (skip >= length) {
+                    skip -= length;
+                    return;
+                }
+                vectors[count].iov_base = const_cast<char*>(data + skip);
+                vectors[count].iov_len = length - skip;
+                count++;
+                skip = 0;
+            };
+            int flags = MSG_NOSIGNAL;
+            for (RequestJob* job : conn.writing) {
+                if (count + 2 > kMaxWriteSegments) break;
+                add(job->response.data(), job->response.size());
+                if (job->body_file >= 0 && job->body_length > 0) {
+                    flags |= MSG_MORE;  // the file follows the head
+                    break;
+                }
+                add(job->body, job->body_length);
+            }
+
+            msghdr message = {};
+            message.msg_iov = vectors;
+            message.msg_iovlen = count;
+            n = sendmsg(conn.fd, &message, flags);
+        }
+        if (n > 0) {
+            conn.write_offset += static_cast<size_t>(n);
+            touch(conn);
+            continue;
+        }
+        if (n < 0 && errno == EINTR) continue;
+        if (n < 0 && (errno == EAGAIN || errno == EWOULDBLOCK)) {
+            return false; // resume on EPOLLOUT
+        }
+        close_connection(conn);
+        return false;
+    }
+}
+
+void EventLoop::close_connection(Connection& conn) {
+    if (conn.state == Connection::State::CLOSED) return;
+    conn.state = Connection::State::CLOSED;
+    if (conn.stream) {
+        // A handler still reading the body learns it was cut short
+        end_stream(conn, 400);
+    }
+
+    epoll_ctl(epoll_fd_, EPOLL_CTL_DEL, conn.fd, nullptr);
+    close(conn.fd);
+    idle_.erase(conn.idle_pos);
+    release_pending(conn);
+
+    auto it = connections_.find(conn.fd);
+    if (it != connections_.end()) {
+        closed_.push_back(std::move(it->second));
+        connections_.erase(it);
+    }
+}
+
+void EventLoop::touch(Connection& conn) {
+    conn.last_active = now_;
+    idle_.splice(idle_.end(), idle_, conn.idle_pos);
+}
+
+void EventLoop::sweep_idle() {
+    auto timeout = std::chrono::seconds(app_->keep_alive_timeout);
+    while (!idle_.empty()) {
+        Connection* conn = idle_.front();
+        if (now_ - conn->last_active < timeout) break;
+        // Handler time is not idle time, unless the handler is waiting for
+        // more of a body the client has stopped sending
+        bool awaiting_body = false;
+        if (conn->stream) {
+            std::lock_guard<std::mutex> lock(conn->stream->mutex);
+            awaiting_body = !conn->stream->loop_waiting;
+        }
+        if (!conn->pending.empty() && !awaiting_body) {
+            touch(*conn);
+            continue;
+        }
+        close_connection(*conn);
+    }
+}
+
+Reactor::Reactor(crest_app_t* app, const std::vector<int>& listen_fds, size_t num_loops,
+                 const std::vector<ThreadPool*>& pools, std::function<void(size_t loop)> on_start)
+    : on_start_(std::move(on_start)) {
+    if (listen_fds.empty() || pools.empty()) return;
+    if (num_loops == 0) num_loops = 1;
+    loops_.reserve(num_loops);
+    for (size_t i = 0; i < num_loops; i++) {
+        loops_.push_back(std::make_unique<EventLoop>(app, listen_fds[i % listen_fds.size()],
+                                                     pools[i % pools.size()]));
+    }
+}
+
+bool Reactor::valid() const {
+    for (const auto& loop : loops_) {
+        if (!loop->valid()) return false;
+    }
+    return !loops_.empty();
+}
+
+void Reactor::run() {
+    std::vector<std::thread> threads;
+    threads.reserve(loops_.size() - 1);
+    for (size_t i = 1; i < loops_.size(); i++) {
+        threads.emplace_back([this, i] {
+            if (on_start_) on_start_(i);
+            loops_[i]->run();
+        });
+    }
+
+    if (on_start_) on_start_(0);
+    loops_[0]->run();
+
+    for (auto& t : threads) {
+        t.join();
+    }
+}
+
+void Reactor::stop() {
+    for (auto& loop : loops_) {
+        loop->stop();
+    }
+}
+
+} // namespace server
+} // namespace crest
+
+#endif // CREST_HAS_REACTOR
@@ -0,0 +1,267 @@
+/**
+ * @file reactor.hpp
+ * @brief Edge-triggered epoll event loops for connection I/O
+ */
+
+#ifndef CREST_REACTOR_HPP
+#define CREST_REACTOR_HPP
+
+#if defined(__linux__)
+#define CREST_HAS_REACTOR 1
+
+#include "crest/internal/app_internal.h"
+#include "../utils/thread_pool.hpp"
+#include "http_parser.hpp"
+#include "server_internal.hpp"
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <deque>
+#include <functional>
+#include <list>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+namespace crest {
+namespace server {
+
+/**
+ * @brief A request body passed from its connection's loop to the handler
+ * reading it, through a bounded window
+ *
+ * The loop decodes into data until kStreamWindowBytes are waiting, then
+ * stops reading the socket until the handler has read half of them.
+ */
+struct StreamedBody {
+    std::mutex mutex;
+    std::condition_variable readable;
+    std::string data;            // kStreamWindowBytes; [start, end) is unread
+    size_t start = 0;
+    size_t end = 0;
+    bool complete = false;
+    int error = 0;               // HTTP status once the body failed
+    bool abandoned = false;      // handler returned; the rest is discarded
+    bool loop_waiting = false;   // loop stopped decoding until data is read
+    bool resume_posted = false;
+    std::function<void()> resume;  // wakes the loop; thread-safe
+
+    /** Handler side; same contract as crest_request_t::read_body */
+    int64_t read(char* out, size_t size);
+
+    /** Handler side, once it has returned; the status the body failed with */
+    int abandon();
+};
+
+/** Decoded body bytes a streamed body may hold before reading pauses */
+constexpr size_t kStreamWindowBytes = 64 * 1024;
+
+/** Finished jobs an event loop keeps for later requests */
+constexpr size_t kSpareJobs = 256;
+
+struct Connection;
+
+/**
+ * @brief A request on its way to a worker, and its response on the way back
+ *
+ * Jobs are taken from and returned to their event loop's free list on the
+ * loop thread, so later requests reuse the buffers they grew to.
+ */
+struct RequestJob {
+    std::shared_ptr<Connection> conn;  // alive until the response is handled
+    std::string raw;                   // the request's bytes; request views them
+    ParsedRequest request;
+    std::shared_ptr<StreamedBody> stream;
+    bool keep_alive = false;
+    bool ready = false;                // the response is complete
+    bool closes = false;               // nothing pipelined after it is answered
+    bool dropped = false;              // behind a closing response; recycled when complete
+    std::string response;              // head, and the body unless it was taken
+    // A body the handler handed over instead of having it copied; written
+    // straight from its buffer after response, then released
+    const char* body = nullptr;
+    size_t body_length = 0;
+    void (*body_release)(void* context) = nullptr;
+    void* body_context = nullptr;
+    // Or, when body_file is set, body_length bytes of that file from
+    // body_offset, sent with sendfile(2) after response
+    int body_file = -1;
+    int64_t body_offset = 0;
+
+    size_t size() const { return response.size() + body_length; }
+};
+
+/**
+ * @brief Per-connection state owned by exactly one event loop
+ *
+ * Only the owning loop thread touches these fields. Worker threads hold a
+ * shared_ptr so a connection that closes while its handler runs stays valid
+ * until the completion is delivered back to the loop and discarded.
+ */
+struct Connection {
+    enum class State {
+        OPEN,      // parsing and dispatching requests
+        DRAINING,  // last request dispatched; close once its response is written
+        CLOSED
+    };
+
+    int fd = -1;
+    State state = State::OPEN;
+    bool peer_closed = false;
+    bool read_paused = false;  // read-ahead full; resume once requests drain
+    int requests_served = 0;
+    std::chrono::steady_clock::time_point last_active;
+    std::list<Connection*>::iterator idle_pos;
+    std::string input;
+    HttpParser parser;  // progress on the request at the front of input
+    bool continue_sent = false;  // "100 Continue" sent for that request
+    bool routed = false;         // stream_limit is known for that request
+    size_t stream_limit = 0;     // non-zero: its body is streamed
+    // Body of a dispatched request still being streamed to its handler;
+    // input holds the rest of it, and nothing after it is parsed yet
+    std::shared_ptr<StreamedBody> stream;
+    BodyDecoder stream_decoder;
+    // Completed responses being written, oldest first, and how many bytes
+    // of the first one are out. Each is written from its job's buffers.
+    std::vector<RequestJob*> writing;
+    size_t write_offset = 0;
+
+    // Requests dispatched but not yet written, oldest first. There are at
+    // most the pipeline depth plus one, so taking from the front is cheap.
+    std::vector<RequestJob*> pending;
+};
+
+/**
+ * @brief One epoll instance driving many non-blocking connections
+ *
+ * The loop reads until EAGAIN, frames requests, and only dispatches complete
+ * requests to the thread pool. Handler results are posted back to the loop,
+ * which writes them out, so no worker ever blocks on a slow peer.
+ *
+ * Pipelined requests are dispatched in parallel, up to the app's pipeline
+ * depth, and their responses are written strictly in request order. A
+ * request on a streaming route is dispatched once its headers are in and
+ * earlier responses are written; its body then flows to the handler
+ * through a StreamedBody while it arrives.
+ * Persistent connections are closed once they sit idle longer than the
+ * app's keep-alive timeout.
+ */
+class EventLoop {
+public:
+    EventLoop(crest_app_t* app, int listen_fd, ThreadPool* pool);
+    ~EventLoop();
+
+    EventLoop(const EventLoop&) = delete;
+    EventLoop& operator=(const EventLoop&) = delete;
+
+    bool valid() const { return epoll_fd_ >= 0 && wake_fd_ >= 0; }
+
+    /**
+     * @brief Serve until stop(), then drain
+     *
+     * After stop() the loop accepts no new connections, answers requests
+     * that have already been received, and returns once every connection
+     * is closed or the drain timeout expires.
+     */
+    void run();
+    void stop();
+
+    /**
+     * @brief Run a function on the loop thread (thread-safe)
+     */
+    void post(std::function<void()> fn);
+
+private:
+    void accept_connections();
+    void handle_event(Connection* conn, uint32_t events);
+    void read_input(Connection& conn);
+    bool process_input(Connection& conn);
+    void send_continue(Connection& conn);
+    bool start_stream(Connection& conn, const ParsedRequest& head);
+    bool stream_input(Connection& conn, bool& needs_input);
+    void end_stream(Connection& conn, int error);
+    void resume_input(Connection& conn);
+    void dispatch_request(Connection& conn, const ParsedRequest& request,
+                          std::shared_ptr<StreamedBody> stream = nullptr);
+    void submit(RequestJob* job);
+    void hand_over_parked();
+    void execute(RequestJob* job, bool shed);
+    void reject(Connection& conn, int status);
+    RequestJob* take_job();
+    RequestJob* start_job(Connection& conn);
+    void complete(RequestJob* job);
+    void recycle(RequestJob* job);
+    void release_pending(Connection& conn);
+    void write_output(Connection& conn);
+    bool flush(Connection& conn);
+    void close_connection(Connection& conn);
+    void touch(Connection& conn);
+    void sweep_idle();
+    void run_posted();
+    void begin_drain();
+
+    crest_app_t* app_;
+    int listen_fd_;
+    ThreadPool* pool_;
+    // Under the BLOCK overload policy, jobs that found the pool's queue
+    // full wait here, oldest first, instead of the loop waiting for room
+    const bool hold_when_full_;
+    std::deque<RequestJob*> parked_;
+    int epoll_fd_;
+    int wake_fd_;
+    std::atomic<bool> running_;
+    std::unordered_map<int, std::shared_ptr<Connection>> connections_;
+    std::vector<std::shared_ptr<Connection>> closed_;
+    // Least recently active first; used to expire idle keep-alive connections
+    std::list<Connection*> idle_;
+    std::chrono::steady_clock::time_point now_;
+    std::chrono::steady_clock::time_point last_sweep_;
+    std::chrono::steady_clock::time_point drain_deadline_;
+    std::mutex posted_mutex_;
+    std::vector<std::function<void()>> posted_;
+    std::vector<std::function<void()>> running_posted_;  // swapped with posted_
+    std::vector<RequestJob*> spare_jobs_;
+    AllocCounters& counters_;
+};
+
+/**
+ * @brief A set of event loops accepting on one or more listening sockets
+ *
+ * Loop i accepts on listen_fds[i % listeners] and hands requests to
+ * pools[i % pools]. With one SO_REUSEPORT listener and worker group per
+ * loop, no accept queue or task queue is shared between cores.
+ */
+class Reactor {
+public:
+    /**
+     * Loop i accepts on listener i % listeners and hands requests to pool
+     * i % pools.
+     *
+     * @param on_start Runs first on every loop's thread, with its index
+     */
+    Reactor(crest_app_t* app, const std::vector<int>& listen_fds, size_t num_loops,
+            const std::vector<ThreadPool*>& pools,
+            std::function<void(size_t loop)> on_start = nullptr);
+
+    bool valid() const;
+    size_t size() const { return loops_.size(); }
+
+    /**
+     * @brief Run all loops; blocks until stop() is called
+     */
+    void run();
+    void stop();
+
+private:
+    std::vector<std::unique_ptr<EventLoop>> loops_;
+    std::function<void(size_t loop)> on_start_;
+};
+
+} // namespace server
+} // namespace crest
+
+#endif // __linux__
+
+#endif // CREST_REACTOR_HPP
@@ -7,12 +7,22 @@
 #include "crest/crest.hpp"
 #include "crest/internal/app_internal.h"
 #include "../utils/thread_pool.hpp"
+#include "../router/route_table.hpp"
+#include "server_internal.hpp"
+#include "docs.hpp"
+#include "reactor.hpp"
+#include "prefork.hpp"
+#include "affinity.hpp"
+#include <cerrno>
 #include <cstdio>
 #include <cstring>
 #include <cstdlib>
+#include <functional>
 #include <thread>
 #include <atomic>
 #include <mutex>
+#include <string>
+#include <vector>
 
 extern "C" {
     void crest_log_info(const char* msg);
@@ -26,14 +36,22 @@ extern "C" {
     #define _CRT_SECURE_NO_WARNINGS
     #include <winsock2.h>
     #include <ws2tcpip.h>
+    #include <io.h>
     #pragma comment(lib, "ws2_32.lib")
     typedef int socklen_t;
     #define strdup _strdup
 #else
     #include <sys/socket.h>
+    #include <sys/uio.h>
     #include <netinet/in.h>
     #include <arpa/inet.h>
     #include <unistd.h>
+    #include <fcntl.h>
+    #include <poll.h>
+    #include <sys/time.h>
+    #if defined(__linux__)
+        #include <sys/sendfile.h>
+    #endif
     #define SOCKET int
     #define INVALID_SOCKET -1
     #define SOCKET_ERROR -1
@@ -41,11 +59,55 @@ extern "C" {
 #endif
 
 static std::atomic<bool> server_running{false};
+static std::mutex server_mutex;
 
-static const char* get_swagger_html(crest_app_t* app);
-static const char* get_openapi_json(crest_app_t* app);
+namespace {
+
+/**
+ * @brief Listeners, worker groups and event loops owned by a running server
+ */
+struct ServerState {
+    std::vector<SOCKET> listeners;
+    std::vector<crest::ThreadPool*> pools;  // one worker group per acceptor
+    // Prefork worker: sibling processes accept on the same sockets, so they
+    // must not be shut down to stop this process
+    bool shared_listeners = false;
+#ifdef CREST_HAS_REACTOR
+    crest::server::Reactor* reactor = nullptr;
+#endif
+#ifdef CREST_HAS_PREFORK
+    crest::server::Supervisor* supervisor = nullptr;
+#endif
+    // CPUs of each worker group's NUMA node when threads are pinned
+    std::vector<std::vector<int>> group_cpus;
+    crest::server::AllocCounters counters;
+};
+
+/**
+ * @brief One piece of data to send, such as a response's head or body
+ */
+struct Segment {
+    const char* data;
+    size_t length;
+};
+
+} // namespace
+
+static SOCKET open_listener(const char* host, int port, bool reuse_port);
+static int serve(crest_app_t* app, ServerState* state);
+static void accept_loop(crest_app_t* app, SOCKET listener, crest::ThreadPool* pool, bool shared);
+static void place_threads(crest_app_t* app, ServerState* state);
 static void handle_client(SOCKET client_socket, crest_app_t* app);
-static void parse_request(const char* buffer, crest_request_t* req);
+static bool send_all(SOCKET client_socket, const char* data, size_t len);
+static bool send_segments(SOCKET client_socket, Segment* segments, size_t count, bool more = false);
+static bool send_file(SOCKET client_socket, int fd, int64_t offset, size_t length);
+
+#ifdef CREST_HAS_REACTOR
+static int run_event_loops(crest_app_t* app, ServerState* state);
+#endif
+#ifdef CREST_HAS_PREFORK
+static int run_prefork(crest_app_t* app, ServerState* state);
+#endif
 
 extern "C" {
 
@@ -60,14 +122,161 @@ int crest_run(crest_app_t* app, const char* host, int port) {
     }
 #endif
     
+    size_t num_acceptors = app->acceptors > 1 ? (size_t)app->acceptors : 1;
+#ifndef SO_REUSEPORT
+    if (num_acceptors > 1) {
+        crest_log_info("SO_REUSEPORT is not available on this platform, using one acceptor");
+        num_acceptors = 1;
+    }
+#endif
+    
+    auto* state = new ServerState();
+    for (size_t i = 0; i < num_acceptors; i++) {
+        SOCKET listener = open_listener(host, port, num_acceptors > 1);
+        if (listener == INVALID_SOCKET) {
+            for (SOCKET fd : state->listeners) closesocket(fd);
+            delete state;
+            return -1;
+        }
+        state->listeners.push_back(listener);
+    }
+    
+    {
+        std::lock_guard<std::mutex> lock(server_mutex);
+        app->server_socket = state->listeners[0];
+        app->server = state;
+        app->running = true;
+        server_running = true;
+    }
+    
+    char msg[256];
+    snprintf(msg, sizeof(msg), "Crest server running on http://%s:%d", host, port);
+    crest_log_success(msg);
+    
+    if (app->docs_enabled) {
+        snprintf(msg, sizeof(msg), "Documentation: http://%s:%d/docs", host, port);
+        crest_log_info(msg);
+        snprintf(msg, sizeof(msg), "Playground: http://%s:%d/playground", host, port);
+        crest_log_info(msg);
+    }
+    
+    int result;
+#ifdef CREST_HAS_PREFORK
+    if (app->prefork_processes > 0) {
+        result = run_prefork(app, state);
+    } else
+#endif
+    {
+        if (app->prefork_processes > 0) {
+            crest_log_info("Prefork is not available on this platform, serving in-process");
+        }
+        result = serve(app, state);
+    }
+    
+    {
+        std::lock_guard<std::mutex> lock(server_mutex);
+        for (SOCKET fd : state->listeners) {
+            if (fd != INVALID_SOCKET) closesocket(fd);
+        }
+        delete state;
+        app->server = nullptr;
+        app->server_socket = INVALID_SOCKET;
+        app->running = false;
+    }
+#if defined(_WIN32) || defined(_WIN64) || defined(CREST_WINDOWS)
+    WSACleanup();
+#endif
+    
+    return result;
+}
+
+void crest_stop(crest_app_t* app) {
+    if (app) {
+        std::lock_guard<std::mutex> lock(server_mutex);
+        bool was_running = app->running;
+        app->running = false;
+        server_running = false;
+        
+        auto* state = static_cast<ServerState*>(app->server);
+        if (!state) return;
+#ifdef CREST_HAS_PREFORK
+        if (state->supervisor) {
+            state->supervisor->stop();
+            return;
+        }
+#endif
+#ifdef CREST_HAS_REACTOR
+        if (state->reactor) {
+            state->reactor->stop();
+            return;
+        }
+#endif
+        // Wake the blocking accept() loops; shared listeners are polled
+        if (!was_running || state->shared_listeners) return;
+        for (SOCKET& fd : state->listeners) {
+#if defined(_WIN32) || defined(_WIN64) || defined(CREST_WINDOWS)
+            closesocket(fd);
+            fd = INVALID_SOCKET;
+#else
+            shutdown(fd, SHUT_RDWR);
+#endif
+        }
+    }
+}
+
+int crest_get_pool_stats(crest_app_t* app, crest_pool_stats_t* stats) {
+    if (!app || !stats) return -1;
+    
+    std::lock_guard<std::mutex> lock(server_mutex);
+    auto* state = static_cast<ServerState*>(app->server);
+    if (!state || state->pools.empty()) return -1;
+    
+    *stats = crest_pool_stats_t{};
+    for (crest::ThreadPool* pool : state->pools) {
+        crest::ThreadPool::Stats pool_stats = pool->stats();
+        stats->workers += pool_stats.threads;
+        stats->queued += pool_stats.queued;
+        stats->queue_capacity += pool_stats.capacity;
+        stats->rejected += pool_stats.rejected;
+        stats->dropped += pool_stats.dropped;
+        stats->blocked += pool_stats.blocked;
+    }
+    return 0;
+}
+
+int crest_get_alloc_stats(crest_app_t* app, crest_alloc_stats_t* stats) {
+    if (!app || !stats) return -1;
+    
+    std::lock_guard<std::mutex> lock(server_mutex);
+    auto* state = static_cast<ServerState*>(app->server);
+    if (!state) return -1;
+    
+    stats->contexts = state->counters.contexts.load(std::memory_order_relaxed);
+    stats->buffers = state->counters.buffers.load(std::memory_order_relaxed);
+    stats->arena_blocks = state->counters.arena_blocks.load(std::memory_order_relaxed);
+    return 0;
+}
+
+} // extern "C"
+
+static SOCKET open_listener(const char* host, int port, bool reuse_port) {
     SOCKET server_socket = socket(AF_INET, SOCK_STREAM, 0);
     if (server_socket == INVALID_SOCKET) {
         fprintf(stderr, "Socket creation failed\n");
-        return -1;
+        return INVALID_SOCKET;
     }
     
     int opt = 1;
     setsockopt(server_socket, SOL_SOCKET, SO_REUSEADDR, (const char*)&opt, sizeof(opt));
+#ifdef SO_REUSEPORT
+    // Every listener bound to host:port gets its own accept queue and the
+    // kernel hashes new connections across them
+    if (reuse_port) {
+        setsockopt(server_socket, SOL_SOCKET, SO_REUSEPORT, (const char*)&opt, sizeof(opt));
+    }
+#else
+    (void)reuse_port;
+#endif
     
     struct sockaddr_in address;
     address.sin_family = AF_INET;
@@ -77,407 +286,810 @@ int crest_run(crest_app_t* app, const char* host, int port) {
     if (bind(server_socket, (struct sockaddr*)&address, sizeof(address)) == SOCKET_ERROR) {
         fprintf(stderr, "Bind failed\n");
         closesocket(server_socket);
-        return -1;
+        return INVALID_SOCKET;
     }
     
     if (listen(server_socket, SOMAXCONN) == SOCKET_ERROR) {
         fprintf(stderr, "Listen failed\n");
         closesocket(server_socket);
-        return -1;
+        return INVALID_SOCKET;
     }
     
-    app->server_socket = server_socket;
-    app->running = true;
-    server_running = true;
+    return server_socket;
+}
+
+/**
+ * @brief Run the worker groups and accept loops on already-open listeners
+ */
+static int serve(crest_app_t* app, ServerState* state) {
+    size_t num_acceptors = state->listeners.size();
     
-    // Initialize thread pool with hardware concurrency
-    size_t num_threads = std::thread::hardware_concurrency();
-    if (num_threads == 0) num_threads = 8;
-    app->thread_pool = new crest::ThreadPool(num_threads * 2);
+    // Two workers per core unless configured, split evenly between the
+    // acceptors' worker groups
+    size_t num_threads = app->worker_threads > 0 ? (size_t)app->worker_threads
+                                                 : std::thread::hardware_concurrency() * 2;
+    if (num_threads == 0) num_threads = 16;
+    size_t max_threads = num_threads;
+    if (app->max_worker_threads > 0 && (size_t)app->max_worker_threads > num_threads) {
+        max_threads = (size_t)app->max_worker_threads;
+    }
+    size_t group_size = num_threads / num_acceptors;
+    if (group_size == 0) group_size = 1;
     
-    char msg[256];
-    snprintf(msg, sizeof(msg), "Crest server running on http://%s:%d", host, port);
-    crest_log_success(msg);
-    snprintf(msg, sizeof(msg), "Thread pool initialized with %zu workers", num_threads * 2);
+    crest::ThreadPool::Options options;
+    options.max_threads = max_threads / num_acceptors;
+    if (options.max_threads > group_size) {
+        options.on_resize = [](size_t from, size_t to, const char* reason) {
+            char msg[128];
+            snprintf(msg, sizeof(msg), "Worker group %s from %zu to %zu workers (%s)",
+                     to > from ? "grew" : "shrank", from, to, reason);
+            crest_log_info(msg);
+        };
+    }
+    
+    // The queue limit is split between the groups like the workers
+    size_t capacity = 0;
+    if (app->max_queued_requests != SIZE_MAX) {
+        capacity = app->max_queued_requests / num_acceptors;
+        if (capacity == 0) capacity = 1;
+    }
+    auto overflow = crest::ThreadPool::Overflow::REJECT;
+    if (app->overload_policy == CREST_OVERLOAD_BLOCK) overflow = crest::ThreadPool::Overflow::BLOCK;
+    if (app->overload_policy == CREST_OVERLOAD_DROP_OLDEST) overflow = crest::ThreadPool::Overflow::DROP_OLDEST;
+    
+    // serve() runs accept loop or event loop 0 on the caller's thread
+    std::vector<int> caller_cpus;
+    place_threads(app, state);
+    if (!state->group_cpus.empty()) caller_cpus = crest::server::thread_cpus();
+    {
+        std::lock_guard<std::mutex> lock(server_mutex);
+        for (size_t i = 0; i < num_acceptors; i++) {
+            if (!state->group_cpus.empty()) {
+                // Worker k of the group on the group's k-th core
+                options.on_start = [cpus = state->group_cpus[i]](size_t slot) {
+                    crest::server::pin_thread({cpus[slot % cpus.size()]});
+                };
+            }
+            state->pools.push_back(new crest::ThreadPool(group_size, capacity, overflow, options));
+        }
+        app->thread_pool = state->pools[0];
+    }
+    
+    char msg[160];
+    char limit[64] = "";
+    if (options.on_resize) {
+        snprintf(limit, sizeof(limit), ", growing to %zu when requests wait", options.max_threads);
+    }
+    if (num_acceptors > 1) {
+        snprintf(msg, sizeof(msg), "Accepting on %zu SO_REUSEPORT listeners, %zu workers each%s",
+                 num_acceptors, group_size, limit);
+    } else {
+        snprintf(msg, sizeof(msg), "Thread pool initialized with %zu workers%s", group_size, limit);
+    }
     crest_log_info(msg);
     
-    if (app->docs_enabled) {
-        snprintf(msg, sizeof(msg), "Documentation: http://%s:%d/docs", host, port);
-        crest_log_info(msg);
-        snprintf(msg, sizeof(msg), "Playground: http://%s:%d/playground", host, port);
-        crest_log_info(msg);
+    int result = 0;
+#ifdef CREST_HAS_REACTOR
+    if (app->io_model != CREST_IO_BLOCKING) {
+        result = run_event_loops(app, state);
+    } else
+#endif
+    {
+        if (app->io_model == CREST_IO_EVENT_LOOP) {
+            crest_log_info("Event loop I/O is not available on this platform, using blocking I/O");
+        }
+        
+        // An accept loop stays on its workers' node
+        std::vector<std::thread> acceptors;
+        for (size_t i = 1; i < num_acceptors; i++) {
+            acceptors.emplace_back([app, state, i] {
+                if (!state->group_cpus.empty()) crest::server::pin_thread(state->group_cpus[i]);
+                accept_loop(app, state->listeners[i], state->pools[i], state->shared_listeners);
+            });
+        }
+        if (!state->group_cpus.empty()) crest::server::pin_thread(state->group_cpus[0]);
+        accept_loop(app, state->listeners[0], state->pools[0], state->shared_listeners);
+        for (auto& t : acceptors) {
+            t.join();
+        }
     }
     
+    // Drains queued requests; event loops are still alive to receive the
+    // completions they post back
+    std::vector<crest::ThreadPool*> pools;
+    {
+        std::lock_guard<std::mutex> lock(server_mutex);
+        pools.swap(state->pools);
+        app->thread_pool = nullptr;
+    }
+    for (crest::ThreadPool* pool : pools) {
+        delete pool;
+    }
+    
+    if (!caller_cpus.empty()) crest::server::pin_thread(caller_cpus);
+    
+    std::lock_guard<std::mutex> lock(server_mutex);
+#ifdef CREST_HAS_REACTOR
+    delete state->reactor;
+    state->reactor = nullptr;
+#endif
+    return result;
+}
+
+/**
+ * @brief Decide which CPUs each worker group runs on, if threads are pinned
+ */
+static void place_threads(crest_app_t* app, ServerState* state) {
+    state->group_cpus.clear();
+    if (!app->cpu_affinity) return;
+    if (state->shared_listeners) {
+        // Sibling processes would pin to the same cores
+        crest_log_info("CPU affinity is not applied in prefork workers");
+        return;
+    }
+    
+    std::vector<std::vector<int>> nodes = crest::server::numa_nodes();
+    state->group_cpus = crest::server::group_cpus(nodes, state->listeners.size());
+    if (state->group_cpus.empty()) {
+        crest_log_info("CPU affinity is not available on this platform");
+        return;
+    }
+    
+    size_t cpus = 0;
+    for (const auto& node : nodes) cpus += node.size();
+    char msg[128];
+    snprintf(msg, sizeof(msg), "Pinning threads to %zu CPU(s) on %zu NUMA node(s)", cpus, nodes.size());
+    crest_log_info(msg);
+}
+
+static void accept_loop(crest_app_t* app, SOCKET listener, crest::ThreadPool* pool, bool shared) {
+#ifdef CREST_HAS_PREFORK
+    // Shared listeners cannot be shut down to wake this loop, so it polls
+    // with a timeout instead; non-blocking so losing a race is harmless
+    if (shared) {
+        fcntl(listener, F_SETFL, fcntl(listener, F_GETFL, 0) | O_NONBLOCK);
+    }
+#else
+    (void)shared;
+#endif
+    
     while (server_running && app->running) {
+#ifdef CREST_HAS_PREFORK
+        if (shared) {
+            struct pollfd pfd = {listener, POLLIN, 0};
+            if (poll(&pfd, 1, 250) <= 0) continue;
+        }
+#endif
         struct sockaddr_in client_addr;
         socklen_t client_len = sizeof(client_addr);
-        SOCKET client_socket = accept(server_socket, (struct sockaddr*)&client_addr, &client_len);
+        SOCKET client_socket = accept(listener, (struct sockaddr*)&client_addr, &client_len);
         
         if (client_socket != INVALID_SOCKET) {
-            auto* pool = static_cast<crest::ThreadPool*>(app->thread_pool);
-            pool->enqueue([client_socket, app]() {
+#ifdef CREST_HAS_PREFORK
+            if (shared) {
+                // BSDs let accepted sockets inherit O_NONBLOCK
+                fcntl(client_socket, F_SETFL, fcntl(client_socket, F_GETFL, 0) & ~O_NONBLOCK);
+            }
+#endif
+            pool->enqueue([client_socket, app](bool shed) {
+                if (shed) {
+                    // Answered without reading the request
+                    send_all(client_socket, crest::server::kOverloadedResponse,
+                             sizeof(crest::server::kOverloadedResponse) - 1);
+                    closesocket(client_socket);
+                    return;
+                }
                 handle_client(client_socket, app);
             });
         }
     }
+}
+
+#ifdef CREST_HAS_REACTOR
+static int run_event_loops(crest_app_t* app, ServerState* state) {
+    std::vector<int> listen_fds;
+    for (SOCKET fd : state->listeners) {
+        int flags = fcntl(fd, F_GETFL, 0);
+        fcntl(fd, F_SETFL, flags | O_NONBLOCK);
+        listen_fds.push_back(fd);
+    }
     
-    delete static_cast<crest::ThreadPool*>(app->thread_pool);
-    app->thread_pool = nullptr;
+    // Every listener needs at least one loop accepting on it
+    size_t num_loops = app->event_loops > 0 ? (size_t)app->event_loops : std::thread::hardware_concurrency();
+    if (num_loops < listen_fds.size()) num_loops = listen_fds.size();
     
-    closesocket(server_socket);
-#if defined(_WIN32) || defined(_WIN64) || defined(CREST_WINDOWS)
-    WSACleanup();
-#endif
+    // Loop k of a group runs on the group's k-th core
+    std::function<void(size_t)> on_start;
+    if (!state->group_cpus.empty()) {
+        on_start = [state](size_t loop) {
+            size_t groups = state->group_cpus.size();
+            const std::vector<int>& cpus = state->group_cpus[loop % groups];
+            crest::server::pin_thread({cpus[(loop / groups) % cpus.size()]});
+        };
+    }
+    
+    auto* reactor = new crest::server::Reactor(app, listen_fds, num_loops, state->pools, on_start);
+    if (!reactor->valid()) {
+        crest_log_error("Failed to initialize epoll event loops");
+        delete reactor;
+        return -1;
+    }
+    
+    {
+        std::lock_guard<std::mutex> lock(server_mutex);
+        state->reactor = reactor;
+        if (!server_running) reactor->stop();
+    }
+    
+    char msg[128];
+    snprintf(msg, sizeof(msg), "Running %zu epoll event loop(s)", num_loops);
+    crest_log_info(msg);
     
+    reactor->run();
     return 0;
 }
+#endif
 
-void crest_stop(crest_app_t* app) {
-    if (app) {
-        app->running = false;
-        server_running = false;
+#ifdef CREST_HAS_PREFORK
+static int run_prefork(crest_app_t* app, ServerState* state) {
+    size_t num_workers = (size_t)app->prefork_processes;
+    
+    auto* supervisor = new crest::server::Supervisor(app, num_workers, [app, state]() {
+        // Runs in the forked worker: serve on the inherited listeners
+        {
+            std::lock_guard<std::mutex> lock(server_mutex);
+            state->supervisor = nullptr;
+            state->shared_listeners = true;
+        }
+        return serve(app, state);
+    });
+    if (!supervisor->valid()) {
+        crest_log_error("Failed to initialize prefork supervisor");
+        delete supervisor;
+        return -1;
     }
-}
-
-} // extern "C"
-
-static void handle_client(SOCKET client_socket, crest_app_t* app) {
-    char buffer[8192] = {0};
-    int bytes_read = recv(client_socket, buffer, sizeof(buffer) - 1, 0);
     
-    if (bytes_read <= 0) {
-        closesocket(client_socket);
-        return;
+    {
+        std::lock_guard<std::mutex> lock(server_mutex);
+        state->supervisor = supervisor;
+        if (!server_running) supervisor->stop();
     }
     
-    crest_request_t req = {0};
-    parse_request(buffer, &req);
+    char msg[128];
+    snprintf(msg, sizeof(msg), "Prefork master %d supervising %zu worker process(es)",
+             (int)getpid(), num_workers);
+    crest_log_info(msg);
     
-    crest_response_t res = {0};
-    res.status = 200;
-    res.sent = false;
-    
-    // Handle docs routes only if docs are enabled
-    bool is_docs_route = (strcmp(req.path, "/docs") == 0 || 
-                          strcmp(req.path, "/openapi.json") == 0 || 
-                          strcmp(req.path, "/playground") == 0);
-    
-    if (app->docs_enabled && is_docs_route) {
-        if (strcmp(req.path, "/docs") == 0) {
-            const char* html = get_swagger_html(app);
-            crest_response_html(&res, 200, html);
-        }
-        else if (strcmp(req.path, "/openapi.json") == 0) {
-            const char* json = get_openapi_json(app);
-            crest_response_json(&res, 200, json);
-        }
-        else if (strcmp(req.path, "/playground") == 0) {
-        const char* playground_html = 
-            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>API Playground</title><meta name='viewport' content='width=device-width,initial-scale=1'><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#fafafa;color:#333}.header{background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:white;padding:40px 20px;position:relative;box-shadow:0 4px 6px rgba(0,0,0,0.1)}.header h1{font-size:2.5em;margin-bottom:10px;font-weight:600}.refresh-btn{position:absolute;top:20px;right:20px;background:rgba(255,255,255,0.2);border:2px solid white;color:white;padding:10px 20px;border-radius:6px;cursor:pointer;font-size:14px;font-weight:600;transition:all 0.3s}.refresh-btn:hover{background:rgba(255,255,255,0.3);transform:scale(1.05)}.container{max-width:1400px;margin:0 auto;padding:20px}.playground{background:white;padding:25px;margin:20px 0;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.08)}.playground h2{color:#667eea;margin-bottom:20px}.form-group{margin:15px 0}.form-group label{display:block;margin-bottom:8px;font-weight:600;color:#333}.form-control{width:100%;padding:12px;border:1px solid #e0e0e0;border-radius:6px;font-size:1em;font-family:'Courier New',monospace}textarea.form-control{min-height:150px;resize:vertical}.btn-group{display:flex;gap:10px;margin:20px 0}.btn{padding:12px 24px;border:none;border-radius:6px;cursor:pointer;font-size:1em;font-weight:600;transition:all 0.3s}.btn-primary{background:#667eea;color:white}.btn-primary:hover{background:#5568d3;transform:translateY(-2px);box-shadow:0 4px 8px rgba(102,126,234,0.3)}.btn-secondary{background:#6c757d;color:white}.btn-secondary:hover{background:#5a6268}.response-box{margin-top:20px;padding:20px;background:#f8f9fa;border-radius:6px;border-left:4px solid #667eea;display:none}.response-box.show{display:block}.response-box.success{border-left-color:#49cc90}.response-box.error{border-left-color:#f93e3e}.response-header{display:flex;justify-content:space-between;margin-bottom:15px;padding-bottom:10px;border-bottom:2px solid #e0e0e0}.response-body{font-family:'Courier New',monospace;white-space:pre-wrap;word-wrap:break-word;background:white;padding:15px;border-radius:4px;max-height:400px;overflow-y:auto}.tabs{display:flex;gap:10px;margin-bottom:20px;border-bottom:2px solid #e0e0e0}.tab{padding:12px 24px;cursor:pointer;border-bottom:3px solid transparent;transition:all 0.3s;font-weight:600}.tab.active{border-bottom-color:#667eea;color:#667eea}.tab:hover{background:#f8f9fa}.tab-content{display:none}.tab-content.active{display:block}.header-item{display:flex;gap:10px;margin-bottom:10px}.header-item input{flex:1}.add-header-btn{background:#28a745;color:white;padding:8px 16px;border:none;border-radius:4px;cursor:pointer;font-size:0.9em}.add-header-btn:hover{background:#218838}.remove-btn{background:#dc3545;color:white;padding:8px 12px;border:none;border-radius:4px;cursor:pointer}.remove-btn:hover{background:#c82333}@media(max-width:768px){.header h1{font-size:1.8em}.container{padding:10px}.btn-group{flex-direction:column}}</style></head><body><div class='header'><button class='refresh-btn' onclick='location.reload()'>🔄 Refresh</button><h1>🎮 API Playground</h1><p>Test your API endpoints interactively</p></div><div class='container'><div class='playground'><h2>🚀 Request Builder</h2><div class='tabs'><div class='tab active' onclick='switchTab(\"basic\")'>Basic</div><div class='tab' onclick='switchTab(\"headers\")'>Headers</div><div class='tab' onclick='switchTab(\"body\")'>Body</div></div><div id='basic-tab' class='tab-content active'><div class='form-group'><label>HTTP Method</label><select id='method' class='form-control'><option value='GET'>GET</option><option value='POST'>POST</option><option value='PUT'>PUT</option><option value='DELETE'>DELETE</option><option value='PATCH'>PATCH</option></select></div><div class='form-group'><label>Endpoint URL</label><input type='text' id='url' class='form-control' placeholder='/api/endpoint' value='/'></div><div class='form-group'><label>Query Parameters (key=value, one per line)</label><textarea id='query' class='form-control' placeholder='page=1&#10;limit=10'></textarea></div></div><div id='headers-tab' class='tab-content'><div class='form-group'><label>Custom Headers</label><div id='headers-list'><div class='header-item'><input type='text' placeholder='Header Name' class='form-control'><input type='text' placeholder='Header Value' class='form-control'><button class='remove-btn' onclick='removeHeader(this)'>✕</button></div></div><button class='add-header-btn' onclick='addHeader()'>+ Add Header</button></div></div><div id='body-tab' class='tab-content'><div class='form-group'><label>Request Body (JSON)</label><textarea id='body' class='form-control' placeholder='{\"key\": \"value\"}'></textarea></div><button class='btn btn-secondary' onclick='formatJSON()'>Format JSON</button></div><div class='btn-group'><button class='btn btn-primary' onclick='sendRequest()'>▶ Send Request</button><button class='btn btn-secondary' onclick='clearForm()'>🗑 Clear</button></div></div><div id='response' class='response-box'><div class='response-header'><div><strong>Response</strong></div><div id='response-status'></div></div><div class='response-body' id='response-body'></div></div></div><script>function switchTab(tab){document.querySelectorAll('.tab').forEach(t=>t.classList.remove('active'));document.querySelectorAll('.tab-content').forEach(t=>t.classList.remove('active'));event.target.classList.add('active');document.getElementById(tab+'-tab').classList.add('active');}function addHeader(){const list=document.getElementById('headers-list');const item=document.createElement('div');item.className='header-item';item.innerHTML='<input type=\"text\" placeholder=\"Header Name\" class=\"form-control\"><input type=\"text\" placeholder=\"Header Value\" class=\"form-control\"><button class=\"remove-btn\" onclick=\"removeHeader(this)\">✕</button>';list.appendChild(item);}function removeHeader(btn){btn.parentElement.remove();}function formatJSON(){try{const body=document.getElementById('body');const json=JSON.parse(body.value);body.value=JSON.stringify(json,null,2);}catch(e){alert('Invalid JSON');}}function clearForm(){document.getElementById('url').value='/';document.getElementById('query').value='';document.getElementById('body').value='';document.getElementById('response').classList.remove('show','success','error');}async function sendRequest(){const method=document.getElementById('method').value;let url=document.getElementById('url').value;const query=document.getElementById('query').value;const body=document.getElementById('body').value;const responseBox=document.getElementById('response');const responseBody=document.getElementById('response-body');const responseStatus=document.getElementById('response-status');if(query){const params=query.split('\\n').filter(l=>l.trim()).map(l=>l.trim()).join('&');url+=url.includes('?')?'&'+params:'?'+params;}const headers={'Content-Type':'application/json'};document.querySelectorAll('#headers-list .header-item').forEach(item=>{const inputs=item.querySelectorAll('input');if(inputs[0].value&&inputs[1].value){headers[inputs[0].value]=inputs[1].value;}});responseBox.classList.add('show');responseBox.classList.remove('success','error');responseBody.textContent='Sending request...';responseStatus.textContent='';try{const options={method,headers};if(body&&method!=='GET'&&method!=='DELETE'){options.body=body;}const start=Date.now();const response=await fetch(url,options);const duration=Date.now()-start;const text=await response.text();responseBox.classList.add(response.ok?'success':'error');responseStatus.innerHTML=`<span style=\"color:${response.ok?'#28a745':'#dc3545'}\">Status: ${response.status} ${response.statusText}</span> | Time: ${duration}ms`;try{const json=JSON.parse(text);responseBody.textContent=JSON.stringify(json,null,2);}catch{responseBody.textContent=text;}}catch(err){responseBox.classList.add('error');responseStatus.textContent='Error';responseBody.textContent='Error: '+err.message;}}</script></body></html>";
-            crest_response_html(&res, 200, playground_html);
-        }
-    }
-    else {
-        // Find matching route (thread-safe read)
-        bool found = false;
-        std::lock_guard<std::mutex> lock(*static_cast<std::mutex*>(app->route_mutex));
-        for (size_t i = 0; i < app->route_count; i++) {
-            const char* method_str = "";
-            switch (app->routes[i].method) {
-                case CREST_GET: method_str = "GET"; break;
-                case CREST_POST: method_str = "POST"; break;
-                case CREST_PUT: method_str = "PUT"; break;
-                case CREST_DELETE: method_str = "DELETE"; break;
-                case CREST_PATCH: method_str = "PATCH"; break;
-                default: break;
-            }
-            
-            if (strcmp(req.method, method_str) == 0 && strcmp(req.path, app->routes[i].path) == 0) {
-                found = true;
-                if (app->routes[i].cpp_handler) {
-                    // Call C++ handler
-                    auto* handler = static_cast<crest::Handler*>(app->routes[i].cpp_handler);
-                    crest::Request cpp_req(&req);
-                    crest::Response cpp_res(&res);
-                    (*handler)(cpp_req, cpp_res);
-                } else if (app->routes[i].handler) {
-                    // Call C handler
-                    app->routes[i].handler(&req, &res);
-                }
+    int result = supervisor->run();
+    
+    std::lock_guard<std::mutex> lock(server_mutex);
+    state->supervisor = nullptr;
+    delete supervisor;
+    return result;
+}
+#endif
+
+static bool send_all(SOCKET client_socket, const char* data, size_t len) {
+    Segment segment = {data, len};
+    return send_segments(client_socket, &segment, 1);
+}
+
+// Send the segments in order with as few calls as the system allows,
+// picking up after a partial write wherever it stopped. With more set the
+// data is held back, where the system allows, to share packets with
+// whatever is sent next.
+static bool send_segments(SOCKET client_socket, Segment* segments, size_t count, bool more) {
+    constexpr size_t kMaxBatch = 16;
+    while (count > 0) {
+        if (segments->length == 0) {
+            segments++;
+            count--;
+            continue;
+        }
+        size_t batch = count < kMaxBatch ? count : kMaxBatch;
+#if defined(_WIN32) || defined(_WIN64) || defined(CREST_WINDOWS)
+        WSABUF buffers[kMaxBatch];
+        for (size_t i = 0; i < batch; i++) {
+            buffers[i].buf = const_cast<char*>(segments[i].data);
+            buffers[i].len = (ULONG)segments[i].length;
+        }
+        (void)more;
+        DWORD sent_bytes = 0;
+        if (WSASend(client_socket, buffers, (DWORD)batch, &sent_bytes, 0, nullptr, nullptr) != 0) {
+            return false;
+        }
+        size_t sent = sent_bytes;
+#else
+        struct iovec vectors[kMaxBatch];
+        for (size_t i = 0; i < batch; i++) {
+            vectors[i].iov_base = const_cast<char*>(segments[i].data);
+            vectors[i].iov_len = segments[i].length;
+        }
+        struct msghdr message = {};
+        message.msg_iov = vectors;
+        message.msg_iovlen = batch;
+        int flags = 0;
+#ifdef MSG_NOSIGNAL
+        flags |= MSG_NOSIGNAL;
+#endif
+#ifdef MSG_MORE
+        if (more) flags |= MSG_MORE;
+#endif
+        ssize_t result = sendmsg(client_socket, &message, flags);
+        if (result < 0 && errno == EINTR) continue;
+        if (result <= 0) return false;
+        size_t sent = (size_t)result;
+#endif
+        if (sent == 0) return false;
+        while (sent > 0) {
+            if (sent < segments->length) {
+                segments->data += sent;
+                segments->length -= sent;
                 break;
             }
+            sent -= segments->length;
+            segments++;
+            count--;
         }
-        
-        if (!found) {
-            crest_response_json(&res, 404, "{\"error\":\"Not Found\"}");
+    }
+    return true;
+}
+
+// Send length bytes of a file from offset. Linux copies them in the
+// kernel; elsewhere they pass through a buffer. A file that turns out
+// shorter than length fails the send, since the head promised more.
+static bool send_file(SOCKET client_socket, int fd, int64_t offset, size_t length) {
+#if defined(__linux__)
+    off_t position = (off_t)offset;
+    while (length > 0) {
+        ssize_t sent = sendfile(client_socket, fd, &position, length);
+        if (sent < 0 && errno == EINTR) continue;
+        if (sent <= 0) return false;
+        length -= (size_t)sent;
+    }
+    return true;
+#else
+    char chunk[65536];
+    while (length > 0) {
+        size_t want = length < sizeof(chunk) ? length : sizeof(chunk);
+#if defined(_WIN32) || defined(_WIN64) || defined(CREST_WINDOWS)
+        if (_lseeki64(fd, offset, SEEK_SET) < 0) return false;
+        int got = _read(fd, chunk, (unsigned)want);
+#else
+        ssize_t got = pread(fd, chunk, want, (off_t)offset);
+#endif
+        if (got <= 0) return false;
+        if (!send_all(client_socket, chunk, (size_t)got)) return false;
+        offset += got;
+        length -= (size_t)got;
+    }
+    return true;
+#endif
+}
+
+static bool receive(SOCKET client_socket, std::string& buffer, crest::server::AllocCounters& counters) {
+    char chunk[8192];
+    int bytes_read = recv(client_socket, chunk, sizeof(chunk), 0);
+    if (bytes_read <= 0) return false;
+    size_t capacity = buffer.capacity();
+    buffer.append(chunk, (size_t)bytes_read);
+    counters.buffer_grown(buffer, capacity);
+    return true;
+}
+
+namespace {
+
+/**
+ * @brief A streamed request body read straight from a blocking socket
+ *
+ * Raw body bytes are staged in a buffer of their own, so the request head
+ * the handler is looking at never moves while it reads.
+ */
+struct SocketBody {
+    SOCKET socket;
+    crest::server::AllocCounters* counters;
+    crest::server::BodyDecoder decoder;
+    std::string raw;  // received but not yet decoded
+    int error = 0;
+
+    int64_t read(char* out, size_t size) {
+        if (error) return -error;
+        while (!decoder.done()) {
+            size_t consumed = 0;
+            size_t produced = 0;
+            auto result = decoder.decode(raw.data(), raw.size(), out, size, consumed, produced);
+            raw.erase(0, consumed);
+            if (result == crest::server::ParseResult::ERROR) {
+                error = decoder.error_status();
+                return -error;
+            }
+            if (produced > 0 || size == 0) return (int64_t)produced;
+            if (!receive(socket, raw, *counters)) {
+                error = 400;  // cut short or timed out
+                return -error;
+            }
         }
+        return 0;
     }
+};
+
+int64_t read_socket_body(void* source, void* buffer, size_t size) {
+    return static_cast<SocketBody*>(source)->read(static_cast<char*>(buffer), size);
+}
+
+} // namespace
+
+static void handle_client(SOCKET client_socket, crest_app_t* app) {
+    // The receive timeout doubles as the keep-alive idle timeout
+#if defined(_WIN32) || defined(_WIN64) || defined(CREST_WINDOWS)
+    DWORD timeout_ms = (DWORD)app->keep_alive_timeout * 1000;
+    setsockopt(client_socket, SOL_SOCKET, SO_RCVTIMEO, (const char*)&timeout_ms, sizeof(timeout_ms));
+#else
+    struct timeval timeout;
+    timeout.tv_sec = app->keep_alive_timeout;
+    timeout.tv_usec = 0;
+    setsockopt(client_socket, SOL_SOCKET, SO_RCVTIMEO, (const char*)&timeout, sizeof(timeout));
+#endif
     
-    // Log request
-    crest_log_request(req.method, req.path, res.status);
+    // Buffers, parser and request structures come from this thread's last
+    // connection, with the capacity they grew to
+    crest::server::AllocCounters& counters = crest::server::alloc_counters(app);
+    crest::server::LeasedContext context(counters);
+    std::string& buffer = context->buffer;
+    crest::server::HttpParser& parser = context->parser;
+    crest::server::ParsedRequest& request = context->request;
+    crest_request_t& req = context->req;
+    crest_response_t& res = context->res;
+    parser.set_max_body_size(app->max_body_size);
+    int served = 0;
+    bool keep_alive = true;
     
-    if (res.body) {
-        send(client_socket, res.body, (int)strlen(res.body), 0);
-        free(res.body);
+    // An accepted connection always gets its first request answered, even
+    // if the server is stopping; keep_alive turns false once it is
+    while (keep_alive) {
+        // The route decides whether the body is buffered or streamed
+        auto result = parser.parse_head(buffer.data(), buffer.size(), request);
+        while (result == crest::server::HttpParser::Result::INCOMPLETE) {
+            if (!receive(client_socket, buffer, counters)) {
+                closesocket(client_socket);
+                return;
+            }
+            result = parser.parse_head(buffer.data(), buffer.size(), request);
+        }
+        
+        size_t stream_limit = 0;
+        SocketBody body;
+        body.socket = client_socket;
+        body.counters = &counters;
+        if (result == crest::server::HttpParser::Result::COMPLETE) {
+            stream_limit = crest::server::stream_body_limit(app, request);
+            if (stream_limit == 0) {
+                result = parser.parse(buffer.data(), buffer.size(), request);
+            } else if (!parser.body_decoder(stream_limit, body.decoder)) {
+                result = crest::server::HttpParser::Result::ERROR;
+            }
+        }
+        
+        bool continue_sent = false;
+        // The parser's header and body limits bound how much is buffered
+        while (result == crest::server::HttpParser::Result::INCOMPLETE) {
+            if (parser.expects_continue() && !continue_sent) {
+                continue_sent = true;
+                send_all(client_socket, crest::server::kContinueResponse,
+                         sizeof(crest::server::kContinueResponse) - 1);
+            }
+            if (parser.expected_length() > buffer.capacity()) {
+                buffer.reserve(parser.expected_length());
+                counters.buffers.fetch_add(1, std::memory_order_relaxed);
+            }
+            if (!receive(client_socket, buffer, counters)) {
+                closesocket(client_socket);
+                return;
+            }
+            result = parser.parse(buffer.data(), buffer.size(), request);
+        }
+        
+        if (result == crest::server::HttpParser::Result::ERROR) {
+            std::string response = crest::server::error_response(parser.error_status());
+            send_all(client_socket, response.data(), response.size());
+            break;
+        }
+        
+        served++;
+        keep_alive = request.keep_alive && served < app->max_keep_alive_requests && server_running;
+        
+        size_t len = request.length;
+        if (stream_limit > 0) {
+            // Everything past the head is the body (and whatever follows
+            // it); the handler pulls it through body
+            if (parser.expects_continue()) {
+                send_all(client_socket, crest::server::kContinueResponse,
+                         sizeof(crest::server::kContinueResponse) - 1);
+            }
+            body.raw.assign(buffer, len, std::string::npos);
+            buffer.resize(len);
+        }
+        
+        // The request is handled in place; the first byte of a pipelined
+        // follow-up request stands in as the body's terminator meanwhile
+        char next = len < buffer.size() ? buffer[len] : '\0';
+        if (len < buffer.size()) buffer[len] = '\0';
+        
+        crest_request_clear(&req);
+        crest::server::bind_request(request, &req);
+        req.arena = context->arena.get();
+        if (stream_limit > 0) {
+            req.read_body = read_socket_body;
+            req.body_source = &body;
+        }
+        
+        crest_response_clear(&res);
+        res.keep_alive = keep_alive;
+        res.arena = context->arena.get();
+        
+        crest::server::dispatch(app, &req, &res);
+        
+        if (len < buffer.size()) buffer[len] = next;
+        buffer.erase(0, len);
+        if (buffer.empty() && buffer.capacity() > crest::server::kBufferKeepBytes) {
+            std::string().swap(buffer);
+        }
+        parser.reset();
+        
+        Segment response[2] = {{res.head, res.head_length}, {res.body, res.body_length}};
+        bool from_file = res.body_from_file && res.body_length > 0;
+        std::string error;
+        if (!res.head) {
+            // The handler wrote nothing. Answer for it and close, so the
+            // next response cannot be taken for this one.
+            error = crest::server::error_response(500);
+            response[0] = {error.data(), error.size()};
+            response[1] = {nullptr, 0};
+            from_file = false;
+            keep_alive = false;
+        }
+        if (stream_limit > 0) {
+            // Skip what the handler left unread to find the next request
+            char discard[8192];
+            while (body.read(discard, sizeof(discard)) > 0) {}
+            if (body.error) {
+                error = crest::server::error_response(body.error);
+                response[0] = {error.data(), error.size()};
+                response[1] = {nullptr, 0};
+                from_file = false;
+                keep_alive = false;
+            } else {
+                buffer.append(body.raw);
+            }
+        }
+        
+        if (from_file) {
+            // The head, then the file straight from the page cache
+            if (!send_segments(client_socket, response, 1, true) ||
+                !send_file(client_socket, res.body_file, res.body_offset, res.body_length)) {
+                keep_alive = false;
+            }
+        } else if (!send_segments(client_socket, response, 2)) {
+            keep_alive = false;
+        }
+        crest_response_release(&res);
+        counters.arena_reset(context->arena);
     }
     
-    free(req.method);
-    free(req.path);
-    free(req.body);
-    
     closesocket(client_socket);
 }
 
-static void parse_request(const char* buffer, crest_request_t* req) {
-    char method[16] = {0};
-    char path[1024] = {0};
-    
-    sscanf(buffer, "%15s %1023s", method, path);
+namespace crest {
+namespace server {
+
+void bind_request(const ParsedRequest& parsed, crest_request_t* req) {
+    // The byte after every view is a delimiter (SP, '?', ':', CR, LF or
+    // trimmed whitespace) or the body terminator, so it can become a NUL
+    auto terminate = [](std::string_view view) {
+        char* data = const_cast<char*>(view.data());
+        if (data) data[view.size()] = '\0';
+        return data;
+    };
     
-    req->method = strdup(method);
-    req->path = strdup(path);
-    req->body = strdup("");
+    req->method = terminate(parsed.method);
+    req->path = terminate(parsed.path);
+    req->query_string = terminate(parsed.query);
+    req->body = terminate(parsed.body);
+    req->body_length = parsed.body.size();
+    for (size_t i = 0; i < parsed.header_count; i++) {
+        const char* name = terminate(parsed.headers[i].name);
+        const char* value = terminate(parsed.headers[i].value);
+        crest_fields_add(&req->headers, name, parsed.headers[i].name.size(), value, true);
+    }
+    crest_fields_parse_query(&req->queries, req->query_string);
+}
+
+AllocCounters& alloc_counters(crest_app_t* app) {
+    static AllocCounters detached;
+    auto* state = static_cast<ServerState*>(app->server);
+    return state ? state->counters : detached;
+}
+
+namespace {
+
+thread_local std::vector<std::unique_ptr<ConnectionContext>> spare_contexts;
+
+} // namespace
+
+LeasedContext::LeasedContext(AllocCounters& counters) {
+    if (!spare_contexts.empty()) {
+        context_ = std::move(spare_contexts.back());
+        spare_contexts.pop_back();
+        return;
+    }
+    context_ = std::make_unique<ConnectionContext>();
+    counters.contexts.fetch_add(1, std::memory_order_relaxed);
+}
+
+LeasedContext::~LeasedContext() {
+    if (spare_contexts.size() >= kSpareContexts) return;
+    // Whatever a closed connection left unread is dropped; memory it grew
+    // past the usual size is given back
+    context_->buffer.clear();
+    if (context_->buffer.capacity() > kBufferKeepBytes) std::string().swap(context_->buffer);
+    context_->parser.reset();
+    crest_response_release(&context_->res);
+    context_->arena.reset();
+    spare_contexts.push_back(std::move(context_));
+}
+
+std::string error_response(int status) {
+    char json[96];
+    snprintf(json, sizeof(json), "{\"error\":\"%s\"}", crest_status_reason(status));
     
-    const char* body_start = strstr(buffer, "\r\n\r\n");
-    if (body_start) {
-        free(req->body);
-        req->body = strdup(body_start + 4);
+    crest_response_t res = {0};
+    res.keep_alive = false;
+    crest_response_json(&res, status, json);
+    crest_response_finish(&res);
+    std::string response;
+    if (res.head) {
+        response.reserve(res.head_length + res.body_length);
+        response.append(res.head, res.head_length);
+        response.append(res.body, res.body_length);
     }
+    crest_response_release(&res);
+    return response;
 }
 
-static const char* get_swagger_html(crest_app_t* app) {
-    static char html[65536];
-    
-    if (app->route_count == 0) {
-        snprintf(html, sizeof(html),
-            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>%s</title>"
-            "<meta name='viewport' content='width=device-width,initial-scale=1'>"
-            "<style>body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;margin:0;background:#fafafa}"
-            ".header{background:linear-gradient(135deg,#667eea 0%%,#764ba2 100%%);color:white;padding:40px 20px;position:relative}"
-            ".refresh-btn{position:absolute;top:20px;right:20px;background:rgba(255,255,255,0.2);border:2px solid white;color:white;padding:10px 20px;border-radius:6px;cursor:pointer;font-size:14px;transition:all 0.3s}"
-            ".refresh-btn:hover{background:rgba(255,255,255,0.3);transform:scale(1.05)}"
-            ".container{max-width:1200px;margin:40px auto;padding:20px;background:white;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.1)}"
-            "h1{font-size:2.5em;margin-bottom:10px}p{color:#666;margin:10px 0}</style></head>"
-            "<body><div class='header'><button class='refresh-btn' onclick='location.reload()'>🔄 Refresh</button>"
-            "<h1>%s</h1><p>%s</p><p><strong>Version:</strong> %s</p></div>"
-            "<div class='container'><h2>⚠️ No Routes Defined</h2>"
-            "<p>Add routes to your API to see them documented here.</p></div></body></html>",
-            app->title, app->title, app->description, app->version);
-        return html;
-    }
-    
-    char routes_html[32768] = {0};
-    for (size_t i = 0; i < app->route_count; i++) {
-        const char* method_str = "";
-        const char* method_color = "";
-        const char* req_body = "";
-        const char* res_body = "";
-        
-        switch (app->routes[i].method) {
-            case CREST_GET: 
-                method_str = "GET"; method_color = "#61affe";
-                req_body = "None";
-                res_body = "{&quot;data&quot;: &quot;string&quot;}";
-                break;
-            case CREST_POST: 
-                method_str = "POST"; method_color = "#49cc90";
-                req_body = "{&quot;name&quot;: &quot;string&quot;, &quot;value&quot;: &quot;string&quot;}";
-                res_body = "{&quot;id&quot;: &quot;number&quot;, &quot;status&quot;: &quot;string&quot;}";
-                break;
-            case CREST_PUT: 
-                method_str = "PUT"; method_color = "#fca130";
-                req_body = "{&quot;name&quot;: &quot;string&quot;, &quot;value&quot;: &quot;string&quot;}";
-                res_body = "{&quot;status&quot;: &quot;string&quot;}";
-                break;
-            case CREST_DELETE: 
-                method_str = "DELETE"; method_color = "#f93e3e";
-                req_body = "None";
-                res_body = "{&quot;status&quot;: &quot;string&quot;}";
-                break;
-            case CREST_PATCH: 
-                method_str = "PATCH"; method_color = "#50e3c2";
-                req_body = "{&quot;field&quot;: &quot;string&quot;}";
-                res_body = "{&quot;status&quot;: &quot;string&quot;}";
-                break;
-            default: 
-                method_str = "UNKNOWN"; method_color = "#999";
-                req_body = "Unknown";
-                res_body = "Unknown";
-                break;
-        }
-        
-        // Use custom schemas if set, otherwise use defaults
-        if (app->routes[i].request_schema) {
-            req_body = app->routes[i].request_schema;
+bool etag_listed(const char* header, std::string_view etag) {
+    auto trim = [](std::string_view text) {
+        while (!text.empty() && (text.front() == ' ' || text.front() == '\t')) text.remove_prefix(1);
+        while (!text.empty() && (text.back() == ' ' || text.back() == '\t')) text.remove_suffix(1);
+        return text;
+    };
+    std::string_view rest(header);
+    while (!rest.empty()) {
+        size_t comma = rest.find(',');
+        std::string_view item = trim(rest.substr(0, comma));
+        rest = comma == std::string_view::npos ? std::string_view() : rest.substr(comma + 1);
+        if (item == "*") return true;
+        if (item.size() > 2 && item[0] == 'W' && item[1] == '/') item.remove_prefix(2);
+        if (item == etag) return true;
+    }
+    return false;
+}
+
+bool accepts_encoding(const char* header, const char* coding) {
+    if (!header) return false;
+    auto trim = [](std::string_view text) {
+        while (!text.empty() && (text.front() == ' ' || text.front() == '\t')) text.remove_prefix(1);
+        while (!text.empty() && (text.back() == ' ' || text.back() == '\t')) text.remove_suffix(1);
+        return text;
+    };
+    auto same_text = [](std::string_view a, std::string_view b) {
+        if (a.size() != b.size()) return false;
+        for (size_t i = 0; i < a.size(); i++) {
+            char x = a[i];
+            char y = b[i];
+            if (x >= 'A' && x <= 'Z') x = static_cast<char>(x + ('a' - 'A'));
+            if (y >= 'A' && y <= 'Z') y = static_cast<char>(y + ('a' - 'A'));
+            if (x != y) return false;
         }
-        if (app->routes[i].response_schema) {
-            res_body = app->routes[i].response_schema;
+        return true;
+    };
+    std::string_view rest(header);
+    int star = -1;
+    while (!rest.empty()) {
+        size_t comma = rest.find(',');
+        std::string_view item = rest.substr(0, comma);
+        rest = comma == std::string_view::npos ? std::string_view() : rest.substr(comma + 1);
+
+        size_t semicolon = item.find(';');
+        std::string_view name = trim(item.substr(0, semicolon));
+        bool allowed = true;
+        if (semicolon != std::string_view::npos) {
+            std::string_view params = trim(item.substr(semicolon + 1));
+            if (params.size() >= 2 && (params[0] == 'q' || params[0] == 'Q') && params[1] == '=') {
+                // "q=0", "q=0.0" and so on refuse the coding
+                std::string_view q = trim(params.substr(2));
+                allowed = false;
+                for (char c : q) {
+                    if (c >= '1' && c <= '9') allowed = true;
+                }
+            }
         }
-        // Note: Schemas will be auto-detected on first request
-        
-        char route_html[4096];
-        snprintf(route_html, sizeof(route_html),
-            "<div class='endpoint'>"
-            "<div class='endpoint-header' onclick='toggleEndpoint(%zu)'>"
-            "<span class='method' style='background:%s'>%s</span>"
-            "<span class='path'>%s</span>"
-            "<span class='toggle'>▼</span>"
-            "</div>"
-            "<div class='endpoint-body' id='endpoint-%zu' style='display:none'>"
-            "<div class='description'>%s</div>"
-            "<div class='section'><h4>📥 Request Schema</h4>"
-            "<div class='schema-box'><pre>%s</pre></div></div>"
-            "<div class='section'><h4>📤 Response Schema (200 OK)</h4>"
-            "<div class='schema-box success'><pre>%s</pre></div></div>"
-            "<div class='section'><h4>📊 Possible Responses</h4>"
-            "<div class='response-list'>"
-            "<div class='response-item'><span class='status-code success'>200</span> Success</div>"
-            "<div class='response-item'><span class='status-code error'>400</span> Bad Request</div>"
-            "<div class='response-item'><span class='status-code error'>404</span> Not Found</div>"
-            "<div class='response-item'><span class='status-code error'>500</span> Internal Server Error</div>"
-            "</div></div>"
-            "<div class='section'><h4>🚀 Try it out</h4>"
-            "<button class='try-btn' onclick='tryEndpoint(\"%s\", \"%s\", %zu)'>Execute Request</button>"
-            "<div class='result' id='result-%zu'></div>"
-            "</div></div></div>",
-            i, method_color, method_str, app->routes[i].path, i,
-            app->routes[i].description[0] ? app->routes[i].description : "No description provided",
-            req_body, res_body, method_str, app->routes[i].path, i, i);
-        strcat(routes_html, route_html);
-    }
-    
-    snprintf(html, sizeof(html),
-        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>%s - API Documentation</title>"
-        "<meta name='viewport' content='width=device-width,initial-scale=1'>"
-        "<style>*{margin:0;padding:0;box-sizing:border-box}"
-        "body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,Oxygen,Ubuntu,sans-serif;background:#fafafa;color:#333}"
-        ".header{background:linear-gradient(135deg,#667eea 0%%,#764ba2 100%%);color:white;padding:40px 20px;position:relative;box-shadow:0 4px 6px rgba(0,0,0,0.1)}"
-        ".header h1{font-size:2.5em;margin-bottom:10px;font-weight:600}.header p{font-size:1.1em;opacity:0.95;margin:5px 0}"
-        ".refresh-btn{position:absolute;top:20px;right:20px;background:rgba(255,255,255,0.2);border:2px solid white;color:white;padding:10px 20px;border-radius:6px;cursor:pointer;font-size:14px;font-weight:600;transition:all 0.3s}"
-        ".refresh-btn:hover{background:rgba(255,255,255,0.3);transform:scale(1.05)}"
-        ".container{max-width:1200px;margin:0 auto;padding:20px}"
-        ".info{background:white;padding:25px;margin:20px 0;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.08)}"
-        ".info h2{color:#667eea;margin-bottom:15px;font-size:1.5em}.info p{margin:8px 0;font-size:1.05em}"
-        ".info a{color:#667eea;text-decoration:none;font-weight:600}.info a:hover{text-decoration:underline}"
-        ".endpoints{background:white;padding:20px;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.08)}"
-        ".endpoint{margin:15px 0;border:1px solid #e0e0e0;border-radius:8px;overflow:hidden;transition:all 0.3s}"
-        ".endpoint:hover{box-shadow:0 4px 12px rgba(0,0,0,0.1)}"
-        ".endpoint-header{padding:15px 20px;background:#f8f9fa;cursor:pointer;display:flex;align-items:center;transition:background 0.3s}"
-        ".endpoint-header:hover{background:#e9ecef}"
-        ".method{display:inline-block;padding:6px 14px;border-radius:4px;color:white;font-weight:700;margin-right:15px;font-size:0.85em;text-transform:uppercase;letter-spacing:0.5px}"
-        ".path{font-size:1.15em;font-weight:500;color:#333;flex:1;font-family:'Courier New',monospace}"
-        ".toggle{font-size:1.2em;color:#666;transition:transform 0.3s}.toggle.open{transform:rotate(180deg)}"
-        ".endpoint-body{padding:20px;background:white;border-top:1px solid #e0e0e0}"
-        ".description{padding:15px;background:#f8f9fa;border-left:4px solid #667eea;margin-bottom:20px;border-radius:4px;font-size:1.05em}"
-        ".section{margin:20px 0}.section h4{color:#667eea;margin-bottom:12px;font-size:1.1em;font-weight:600}"
-        ".schema-box{background:#f8f9fa;border:1px solid #e0e0e0;border-radius:6px;padding:15px;font-family:'Courier New',monospace;font-size:0.95em;overflow-x:auto}"
-        ".schema-box.success{border-left:4px solid #49cc90}.schema-box pre{margin:0;white-space:pre-wrap;word-wrap:break-word}"
-        ".response-list{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:10px}"
-        ".response-item{padding:12px;background:#f8f9fa;border-radius:6px;display:flex;align-items:center;font-size:0.95em}"
-        ".status-code{display:inline-block;padding:4px 10px;border-radius:4px;font-weight:700;margin-right:10px;font-size:0.9em}"
-        ".status-code.success{background:#d4edda;color:#155724}.status-code.error{background:#f8d7da;color:#721c24}"
-        ".try-btn{background:#667eea;color:white;border:none;padding:12px 24px;border-radius:6px;cursor:pointer;font-size:1em;font-weight:600;transition:all 0.3s}"
-        ".try-btn:hover{background:#5568d3;transform:translateY(-2px);box-shadow:0 4px 8px rgba(102,126,234,0.3)}"
-        ".result{margin-top:15px;padding:15px;background:#f8f9fa;border-radius:6px;font-family:'Courier New',monospace;font-size:0.9em;display:none}"
-        ".result.show{display:block}.result.success{border-left:4px solid #49cc90}.result.error{border-left:4px solid #f93e3e}"
-        "@media(max-width:768px){.header h1{font-size:1.8em}.container{padding:10px}.refresh-btn{top:10px;right:10px;padding:8px 16px;font-size:12px}"
-        ".endpoint-header{flex-direction:column;align-items:flex-start}.method{margin-bottom:8px}.path{font-size:1em}}"
-        "</style>"
-        "<script>"
-        "function toggleEndpoint(id){var el=document.getElementById('endpoint-'+id);var toggle=event.currentTarget.querySelector('.toggle');"
-        "if(el.style.display==='none'){el.style.display='block';toggle.classList.add('open');}else{el.style.display='none';toggle.classList.remove('open');}}"
-        "function tryEndpoint(method,path,id){var resultEl=document.getElementById('result-'+id);"
-        "resultEl.className='result show';resultEl.innerHTML='<strong>Sending '+method+' request to '+path+'...</strong>';"
-        "fetch(path,{method:method}).then(r=>r.text()).then(data=>{resultEl.className='result show success';"
-        "resultEl.innerHTML='<strong>Response ('+method+' '+path+'):</strong><br><br>'+data;}).catch(err=>{"
-        "resultEl.className='result show error';resultEl.innerHTML='<strong>Error:</strong><br><br>'+err.message;});}"
-        "</script></head>"
-        "<body><div class='header'><button class='refresh-btn' onclick='location.reload()'>🔄 Refresh</button>"
-        "<h1>%s</h1><p>%s</p><p><strong>Version:</strong> %s | <strong>Powered by:</strong> Crest %s</p></div>"
-        "<div class='container'><div class='info'><h2>📚 API Documentation</h2>"
-        "<p><strong>Total Endpoints:</strong> %zu</p>"
-        "<p><strong>OpenAPI Specification:</strong> <a href='/openapi.json' target='_blank'>View JSON</a></p>"
-        "<p><strong>Interactive Playground:</strong> <a href='/playground' target='_blank'>Test API 🎮</a></p>"
-        "<p><strong>Base URL:</strong> <code>/</code></p></div>"
-        "<div class='endpoints'><h2 style='margin-bottom:20px;color:#667eea'>Endpoints</h2>%s</div></div></body></html>",
-        app->title, app->title, app->description, app->version, CREST_VERSION,
-        app->route_count, routes_html);
-    
-    return html;
+        if (same_text(name, coding)) return allowed;
+        if (name == "*") star = allowed ? 1 : 0;
+    }
+    return star == 1;
 }
 
-static const char* get_openapi_json(crest_app_t* app) {
-    static char json[32768];
+size_t stream_body_limit(crest_app_t* app, const ParsedRequest& head) {
+    crest::router::RouteMatch match;
+    auto routes = static_cast<const crest::router::RouteTable*>(app->route_table)->read();
+    if (!routes->router.find(head.method, head.path, match)) return 0;
     
-    char paths[24576] = {0};
-    for (size_t i = 0; i < app->route_count; i++) {
-        const char* method_str = "";
-        const char* req_schema = "";
-        const char* res_schema = "";
-        
-        switch (app->routes[i].method) {
-            case CREST_GET: 
-                method_str = "get";
-                req_schema = "";
-                res_schema = "{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"data\\\":{\\\"type\\\":\\\"object\\\"}}}";
-                break;
-            case CREST_POST: 
-                method_str = "post";
-                req_schema = "{\\\"required\\\":true,\\\"content\\\":{\\\"application/json\\\":{\\\"schema\\\":{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"name\\\":{\\\"type\\\":\\\"string\\\"},\\\"value\\\":{\\\"type\\\":\\\"string\\\"}}}}}}";
-                res_schema = "{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"id\\\":{\\\"type\\\":\\\"integer\\\"},\\\"status\\\":{\\\"type\\\":\\\"string\\\"}}}";
-                break;
-            case CREST_PUT: 
-                method_str = "put";
-                req_schema = "{\\\"required\\\":true,\\\"content\\\":{\\\"application/json\\\":{\\\"schema\\\":{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"name\\\":{\\\"type\\\":\\\"string\\\"},\\\"value\\\":{\\\"type\\\":\\\"string\\\"}}}}}}";
-                res_schema = "{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"status\\\":{\\\"type\\\":\\\"string\\\"}}}";
-                break;
-            case CREST_DELETE: 
-                method_str = "delete";
-                req_schema = "";
-                res_schema = "{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"status\\\":{\\\"type\\\":\\\"string\\\"}}}";
-                break;
-            case CREST_PATCH: 
-                method_str = "patch";
-                req_schema = "{\\\"required\\\":true,\\\"content\\\":{\\\"application/json\\\":{\\\"schema\\\":{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"field\\\":{\\\"type\\\":\\\"string\\\"}}}}}}";
-                res_schema = "{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"status\\\":{\\\"type\\\":\\\"string\\\"}}}";
-                break;
-            default: 
-                method_str = "get";
-                req_schema = "";
-                res_schema = "{\\\"type\\\":\\\"object\\\"}";
-                break;
+    const crest::router::RouteTarget& route = routes->targets[match.route];
+    if (!route.stream_body) return 0;
+    return route.max_body_size > 0 ? route.max_body_size : app->max_body_size;
+}
+
+// Copy each captured value into values, NUL-terminated and percent-decoded,
+// and index it; values needs room for the path plus a NUL per parameter
+static void bind_params(crest_request_t* req, const crest::router::RouteMatch& match, char* values) {
+    for (size_t i = 0; i < match.param_count; i++) {
+        const crest::router::RouteParam& param = match.params[i];
+        if (param.name.empty()) continue;
+        memcpy(values, param.value.data(), param.value.size());
+        values[param.value.size()] = '\0';
+        size_t length = crest_url_decode(values, false);
+        crest_fields_add(&req->params, param.name.data(), param.name.size(), values, false);
+        values += length + 1;
+    }
+}
+
+// Run the handler of the route req matches, or answer 404
+static void call_handler(crest_app_t* app, crest_request_t* req, crest_response_t* res) {
+    // Lock-free lookup; the snapshot stays alive while the handler runs
+    crest::router::RouteMatch match;
+    auto routes = static_cast<const crest::router::RouteTable*>(app->route_table)->read();
+    
+    if (routes->router.find(req->method, req->path, match)) {
+        char stack_values[256];
+        std::vector<char> heap_values;
+        char* values = stack_values;
+        size_t needed = strlen(req->path) + match.param_count;
+        if (needed > sizeof(stack_values)) {
+            values = req->arena ? static_cast<char*>(crest_arena_alloc(req->arena, needed)) : nullptr;
+            if (!values) {
+                heap_values.resize(needed);
+                values = heap_values.data();
+            }
         }
+        bind_params(req, match, values);
         
-        char path_entry[2048];
-        if (req_schema[0]) {
-            snprintf(path_entry, sizeof(path_entry),
-                "%s\\\"%s\\\":{\\\"%s\\\":{\\\"summary\\\":\\\"%s\\\",\\\"description\\\":\\\"%s\\\",\\\"requestBody\\\":%s,"
-                "\\\"responses\\\":{\\\"200\\\":{\\\"description\\\":\\\"Successful response\\\",\\\"content\\\":{\\\"application/json\\\":{\\\"schema\\\":%s}}},"
-                "\\\"400\\\":{\\\"description\\\":\\\"Bad Request\\\"},\\\"404\\\":{\\\"description\\\":\\\"Not Found\\\"},\\\"500\\\":{\\\"description\\\":\\\"Internal Server Error\\\"}}}}",
-                i > 0 ? "," : "", app->routes[i].path, method_str,
-                app->routes[i].description[0] ? app->routes[i].description : "No description",
-                app->routes[i].description[0] ? app->routes[i].description : "No description",
-                req_schema, res_schema);
-        } else {
-            snprintf(path_entry, sizeof(path_entry),
-                "%s\\\"%s\\\":{\\\"%s\\\":{\\\"summary\\\":\\\"%s\\\",\\\"description\\\":\\\"%s\\\","
-                "\\\"responses\\\":{\\\"200\\\":{\\\"description\\\":\\\"Successful response\\\",\\\"content\\\":{\\\"application/json\\\":{\\\"schema\\\":%s}}},"
-                "\\\"400\\\":{\\\"description\\\":\\\"Bad Request\\\"},\\\"404\\\":{\\\"description\\\":\\\"Not Found\\\"},\\\"500\\\":{\\\"description\\\":\\\"Internal Server Error\\\"}}}}",
-                i > 0 ? "," : "", app->routes[i].path, method_str,
-                app->routes[i].description[0] ? app->routes[i].description : "No description",
-                app->routes[i].description[0] ? app->routes[i].description : "No description",
-                res_schema);
-        }
-        strcat(paths, path_entry);
-    }
-    
-    snprintf(json, sizeof(json),
-        "{\\\"openapi\\\":\\\"3.0.0\\\",\\\"info\\\":{\\\"title\\\":\\\"%s\\\",\\\"description\\\":\\\"%s\\\",\\\"version\\\":\\\"%s\\\","
-        "\\\"contact\\\":{\\\"name\\\":\\\"API Support\\\",\\\"email\\\":\\\"contact@muhammadfiaz.com\\\"}},"
-        "\\\"servers\\\":[{\\\"url\\\":\\\"/\\\",\\\"description\\\":\\\"Current server\\\"}],"
-        "\\\"paths\\\":{%s},"
-        "\\\"components\\\":{\\\"schemas\\\":{\\\"Error\\\":{\\\"type\\\":\\\"object\\\",\\\"properties\\\":{\\\"error\\\":{\\\"type\\\":\\\"string\\\"}}}}}}",
-        app->title, app->description, app->version, paths);
-    
-    return json;
+        const crest::router::RouteTarget& route = routes->targets[match.route];
+        req->route = route.pattern.c_str();  // lives as long as the snapshot
+        if (route.cpp_handler) {
+            // Call C++ handler
+            auto* handler = static_cast<crest::Handler*>(route.cpp_handler);
+            crest::Request cpp_req(req);
+            crest::Response cpp_res(res);
+            (*handler)(cpp_req, cpp_res);
+        } else if (route.handler) {
+            // Call C handler
+            route.handler(req, res);
+        }
+        req->route = nullptr;
+    } else {
+        crest_response_json(res, 404, "{\"error\":\"Not Found\"}");
+    }
 }
+
+void dispatch(crest_app_t* app, crest_request_t* req, crest_response_t* res) {
+    // The docs pages are built once per version of the routes
+    if (!serve_docs(app, req, res)) call_handler(app, req, res);
+    
+    crest_response_finish(res);
+    
+    // Log request
+    crest_log_request(req->method, req->path, res->status);
+}
+
+} // namespace server
+} // namespace crest
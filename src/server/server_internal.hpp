@@ -0,0 +1,184 @@
+/**
+ * @file server_internal.hpp
+ * @brief Internal interfaces shared by the server I/O models
+ */
+
+#ifndef CREST_SERVER_INTERNAL_HPP
+#define CREST_SERVER_INTERNAL_HPP
+
+#include "crest/internal/app_internal.h"
+#include "http_parser.hpp"
+#include <atomic>
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+#include <string>
+#include <string_view>
+
+namespace crest {
+namespace server {
+
+/** Interim response sent to a client waiting on "Expect: 100-continue" */
+constexpr char kContinueResponse[] = "HTTP/1.1 100 Continue\r\n\r\n";
+
+/** Answer for a request shed because the worker queue is full */
+constexpr char kOverloadedResponse[] =
+    "HTTP/1.1 503 Service Unavailable\r\n"
+    "Content-Type: application/json\r\n"
+    "Content-Length: 31\r\n"
+    "Retry-After: 1\r\n"
+    "Connection: close\r\n"
+    "\r\n"
+    "{\"error\":\"Service Unavailable\"}";
+
+/** Receive buffers above this capacity are released once emptied */
+constexpr size_t kBufferKeepBytes = 64 * 1024;
+
+/**
+ * @brief A crest_arena_t that releases its memory when it goes out of scope
+ *
+ * Bound to a request and its response, it holds their scratch memory;
+ * reset() once the response has been sent recycles it for the next request.
+ */
+class Arena {
+public:
+    Arena() { crest_arena_init(&arena_, nullptr, 0); }
+    Arena(void* buffer, size_t size) { crest_arena_init(&arena_, buffer, size); }
+    ~Arena() { crest_arena_destroy(&arena_); }
+
+    Arena(const Arena&) = delete;
+    Arena& operator=(const Arena&) = delete;
+
+    crest_arena_t* get() { return &arena_; }
+
+    /**
+     * @return Blocks taken from malloc since the last reset, including
+     * the larger first block the reset itself may take
+     */
+    size_t reset() {
+        crest_arena_reset(&arena_);
+        size_t blocks = arena_.mallocs - counted_;
+        counted_ = arena_.mallocs;
+        return blocks;
+    }
+
+private:
+    crest_arena_t arena_;
+    size_t counted_ = 0;
+};
+
+/**
+ * @brief Heap allocations made on the request path, for crest_get_alloc_stats()
+ *
+ * Only allocations are counted, never reuse, so in steady state requests
+ * do not write to these shared counters at all.
+ */
+struct AllocCounters {
+    std::atomic<uint64_t> contexts{0};
+    std::atomic<uint64_t> buffers{0};
+    std::atomic<uint64_t> arena_blocks{0};
+
+    /** Count an allocation if buffer's capacity changed from before */
+    void buffer_grown(const std::string& buffer, size_t capacity_before) {
+        if (buffer.capacity() != capacity_before) buffers.fetch_add(1, std::memory_order_relaxed);
+    }
+
+    void arena_reset(Arena& arena) {
+        if (size_t blocks = arena.reset()) arena_blocks.fetch_add(blocks, std::memory_order_relaxed);
+    }
+};
+
+/**
+ * @brief The counters of the app's running server; a shared fallback
+ * when it is not running
+ */
+AllocCounters& alloc_counters(crest_app_t* app);
+
+/**
+ * @brief Everything a blocking connection keeps between requests
+ *
+ * Contexts are kept on a free list per thread, so a worker serving one
+ * connection after another reuses the same buffers, request structures
+ * and field tables instead of allocating and zeroing them each time.
+ */
+struct ConnectionContext {
+    std::string buffer;  // received bytes not yet handled
+    HttpParser parser;
+    ParsedRequest request;
+    crest_request_t req = {};
+    crest_response_t res = {};
+    Arena arena;
+};
+
+/** Contexts a thread keeps for its next connections */
+constexpr size_t kSpareContexts = 4;
+
+/**
+ * @brief A ConnectionContext borrowed from the calling thread's free list
+ * for one connection, and returned to it on destruction
+ */
+class LeasedContext {
+public:
+    explicit LeasedContext(AllocCounters& counters);
+    ~LeasedContext();
+
+    LeasedContext(const LeasedContext&) = delete;
+    LeasedContext& operator=(const LeasedContext&) = delete;
+
+    ConnectionContext* operator->() { return context_.get(); }
+    ConnectionContext& operator*() { return *context_; }
+
+private:
+    std::unique_ptr<ConnectionContext> context_;
+};
+
+/**
+ * @brief Point a crest_request_t at a parsed request without copying
+ *
+ * NUL terminators are written into the request bytes in place, just past
+ * each view. The views must therefore point into a writable buffer whose
+ * byte after the body is expendable or the buffer's own terminating NUL.
+ * A null body view (a head from parse_head()) leaves req->body NULL.
+ * Headers and query parameters are indexed for lookup; the query string is
+ * split and percent-decoded in place.
+ */
+void bind_request(const ParsedRequest& parsed, crest_request_t* req);
+
+/**
+ * @brief A complete "Connection: close" response for a rejected request
+ */
+std::string error_response(int status);
+
+/**
+ * @brief Body limit of the route that streams this request's body, or 0 if
+ * the body is to be buffered
+ * @param head Request line and headers, e.g. from HttpParser::parse_head()
+ */
+size_t stream_body_limit(crest_app_t* app, const ParsedRequest& head);
+
+/**
+ * @brief Whether an If-None-Match value lists etag, or is "*"
+ *
+ * The comparison is weak, as RFC 9110 asks for this header: W/"x" matches
+ * "x".
+ */
+bool etag_listed(const char* header, std::string_view etag);
+
+/**
+ * @brief Whether an Accept-Encoding value allows coding, by name or
+ * through "*"
+ *
+ * A coding listed with q=0 is refused; header may be NULL, which allows
+ * nothing.
+ */
+bool accepts_encoding(const char* header, const char* coding);
+
+/**
+ * @brief Route a parsed request (docs, user handlers, 404) and log it
+ */
+void dispatch(crest_app_t* app, crest_request_t* req, crest_response_t* res);
+
+} // namespace server
+} // namespace crest
+
+#endif // CREST_SERVER_INTERNAL_HPP
@@ -0,0 +1,571 @@
+/**
+ * @file static_files.cpp
+ * @brief Files under a directory, served with validators, ranges and
+ * precompressed variants
+ */
+
+#include "static_files.hpp"
+#include "server_internal.hpp"
+#include <atomic>
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <sys/stat.h>
+#include <sys/types.h>
+
+#if defined(_WIN32) || defined(_WIN64) || defined(CREST_WINDOWS)
+    #include <io.h>
+    #include <fcntl.h>
+    #define CREST_STATIC_NO_MMAP 1
+#else
+    #include <fcntl.h>
+    #include <sys/mman.h>
+    #include <unistd.h>
+#endif
+
+namespace crest {
+namespace server {
+
+struct MappedFile {
+    std::atomic<int> references{1};
+    char* bytes = nullptr;
+    size_t size = 0;
+};
+
+namespace {
+
+void release_mapped(void* context) {
+    auto* file = static_cast<MappedFile*>(context);
+    if (file->references.fetch_sub(1, std::memory_order_acq_rel) != 1) return;
+#ifdef CREST_STATIC_NO_MMAP
+    free(file->bytes);
+#else
+    if (file->bytes) munmap(file->bytes, file->size);
+#endif
+    delete file;
+}
+
+void close_file(void* context) {
+    int fd = static_cast<int>(reinterpret_cast<intptr_t>(context));
+#ifdef CREST_STATIC_NO_MMAP
+    _close(fd);
+#else
+    close(fd);
+#endif
+}
+
+int open_read(const char* path) {
+#ifdef CREST_STATIC_NO_MMAP
+    return _open(path, _O_RDONLY | _O_BINARY);
+#else
+    return open(path, O_RDONLY | O_CLOEXEC);
+#endif
+}
+
+struct FileStat {
+    bool exists = false;
+    bool directory = false;
+    uint64_t size = 0;
+    int64_t mtime = 0;
+    uint64_t inode = 0;
+};
+
+#ifdef CREST_STATIC_NO_MMAP
+FileStat to_file_stat(const struct _stat64& st) {
+    FileStat out;
+    out.exists = (st.st_mode & _S_IFREG) || (st.st_mode & _S_IFDIR);
+    out.directory = (st.st_mode & _S_IFDIR) != 0;
+    out.size = static_cast<uint64_t>(st.st_size);
+    out.mtime = static_cast<int64_t>(st.st_mtime);
+    return out;
+}
+
+FileStat stat_path(const char* path) {
+    struct _stat64 st;
+    return _stat64(path, &st) == 0 ? to_file_stat(st) : FileStat();
+}
+
+FileStat stat_fd(int fd) {
+    struct _stat64 st;
+    return _fstat64(fd, &st) == 0 ? to_file_stat(st) : FileStat();
+}
+#else
+FileStat to_file_stat(const struct stat& st) {
+    FileStat out;
+    out.exists = S_ISREG(st.st_mode) || S_ISDIR(st.st_mode);
+    out.directory = S_ISDIR(st.st_mode);
+    out.size = static_cast<uint64_t>(st.st_size);
+    out.mtime = static_cast<int64_t>(st.st_mtime);
+    out.inode = static_cast<uint64_t>(st.st_ino);
+    return out;
+}
+
+FileStat stat_path(const char* path) {
+    struct stat st;
+    return stat(path, &st) == 0 ? to_file_stat(st) : FileStat();
+}
+
+FileStat stat_fd(int fd) {
+    struct stat st;
+    return fstat(fd, &st) == 0 ? to_file_stat(st) : FileStat();
+}
+#endif
+
+// The contents of a small file, or nullptr if it cannot be read
+MappedFile* map_file(const char* path) {
+    int fd = open_read(path);
+    if (fd < 0) return nullptr;
+    FileStat st = stat_fd(fd);
+    if (!st.exists || st.directory) {
+        close_file(reinterpret_cast<void*>(static_cast<intptr_t>(fd)));
+        return nullptr;
+    }
+
+    auto* file = new MappedFile();
+    file->size = static_cast<size_t>(st.size);
+    bool ok = true;
+#ifdef CREST_STATIC_NO_MMAP
+    if (file->size > 0) {
+        file->bytes = static_cast<char*>(malloc(file->size));
+        size_t have = 0;
+        while (file->bytes && have < file->size) {
+            int n = _read(fd, file->bytes + have, static_cast<unsigned>(file->size - have));
+            if (n <= 0) break;
+            have += static_cast<size_t>(n);
+        }
+        ok = file->bytes && have == file->size;
+    }
+#else
+    if (file->size > 0) {
+        void* bytes = mmap(nullptr, file->size, PROT_READ, MAP_PRIVATE, fd, 0);
+        ok = bytes != MAP_FAILED;
+        file->bytes = ok ? static_cast<char*>(bytes) : nullptr;
+    }
+#endif
+    close_file(reinterpret_cast<void*>(static_cast<intptr_t>(fd)));
+    if (!ok) {
+        release_mapped(file);
+        return nullptr;
+    }
+    return file;
+}
+
+int64_t monotonic_seconds() {
+    return std::chrono::duration_cast<std::chrono::seconds>(
+        std::chrono::steady_clock::now().time_since_epoch()).count();
+}
+
+// Join path below root, refusing anything that could leave it, and hidden
+// files and directories unless dotfiles is set
+bool resolve(const std::string& root, std::string_view path, bool dotfiles, std::string& out) {
+    if (!path.empty() && (path[0] == '/' || path[0] == '\\')) return false;
+    if (path.find('\0') != std::string_view::npos || path.find('\\') != std::string_view::npos) {
+        return false;
+    }
+
+    out.assign(root);
+    size_t start = 0;
+    while (start <= path.size()) {
+        size_t end = path.find('/', start);
+        if (end == std::string_view::npos) end = path.size();
+        std::string_view segment = path.substr(start, end - start);
+        if (segment == "." || segment == "..") return false;
+        if (!dotfiles && !segment.empty() && segment[0] == '.') return false;
+        if (!segment.empty()) {
+            out += '/';
+            out.append(segment.data(), segment.size());
+        }
+        start = end + 1;
+    }
+    return true;
+}
+
+struct ContentType {
+    const char* extension;
+    const char* type;
+};
+
+const ContentType kContentTypes[] = {
+    {"html", "text/html; charset=utf-8"},
+    {"htm", "text/html; charset=utf-8"},
+    {"css", "text/css; charset=utf-8"},
+    {"js", "text/javascript; charset=utf-8"},
+    {"mjs", "text/javascript; charset=utf-8"},
+    {"json", "application/json"},
+    {"map", "application/json"},
+    {"txt", "text/plain; charset=utf-8"},
+    {"md", "text/markdown; charset=utf-8"},
+    {"csv", "text/csv; charset=utf-8"},
+    {"xml", "application/xml"},
+    {"svg", "image/svg+xml"},
+    {"png", "image/png"},
+    {"jpg", "image/jpeg"},
+    {"jpeg", "image/jpeg"},
+    {"gif", "image/gif"},
+    {"webp", "image/webp"},
+    {"avif", "image/avif"},
+    {"ico", "image/x-icon"},
+    {"woff", "font/woff"},
+    {"woff2", "font/woff2"},
+    {"ttf", "font/ttf"},
+    {"otf", "font/otf"},
+    {"wasm", "application/wasm"},
+    {"pdf", "application/pdf"},
+    {"zip", "application/zip"},
+    {"mp3", "audio/mpeg"},
+    {"wav", "audio/wav"},
+    {"mp4", "video/mp4"},
+    {"webm", "video/webm"},
+};
+
+bool same_text(std::string_view a, const char* b) {
+    size_t length = strlen(b);
+    if (a.size() != length) return false;
+    for (size_t i = 0; i < length; i++) {
+        char x = a[i];
+        char y = b[i];
+        if (x >= 'A' && x <= 'Z') x = static_cast<char>(x + ('a' - 'A'));
+        if (y >= 'A' && y <= 'Z') y = static_cast<char>(y + ('a' - 'A'));
+        if (x != y) return false;
+    }
+    return true;
+}
+
+const char* content_type_for(std::string_view path) {
+    size_t dot = path.rfind('.');
+    size_t slash = path.rfind('/');
+    if (dot == std::string_view::npos || (slash != std::string_view::npos && dot < slash)) {
+        return "application/octet-stream";
+    }
+    std::string_view extension = path.substr(dot + 1);
+    for (const ContentType& entry : kContentTypes) {
+        if (same_text(extension, entry.extension)) return entry.type;
+    }
+    return "application/octet-stream";
+}
+
+std::string_view trim(std::string_view text) {
+    while (!text.empty() && (text.front() == ' ' || text.front() == '\t')) text.remove_prefix(1);
+    while (!text.empty() && (text.back() == ' ' || text.back() == '\t')) text.remove_suffix(1);
+    return text;
+}
+
+bool parse_number(std::string_view text, size_t at, size_t digits, int& out) {
+    out = 0;
+    for (size_t i = at; i < at + digits; i++) {
+        if (text[i] < '0' || text[i] > '9') return false;
+        out = out * 10 + (text[i] - '0');
+    }
+    return true;
+}
+
+// Days from 1970-01-01 to a proleptic Gregorian date
+int64_t days_from_civil(int64_t year, unsigned month, unsigned day) {
+    year -= month <= 2;
+    int64_t era = (year >= 0 ? year : year - 399) / 400;
+    unsigned year_of_era = static_cast<unsigned>(year - era * 400);
+    unsigned day_of_year = (153 * (month > 2 ? month - 3 : month + 9) + 2) / 5 + day - 1;
+    unsigned day_of_era = year_of_era * 365 + year_of_era / 4 - year_of_era / 100 + day_of_year;
+    return era * 146097 + static_cast<int64_t>(day_of_era) - 719468;
+}
+
+// Seconds since the epoch of an IMF-fixdate ("Sun, 06 Nov 1994 08:49:37
+// GMT"), or -1. The obsolete RFC 850 and asctime forms are not accepted;
+// a validator the server cannot read is ignored.
+int64_t parse_http_date(const char* value) {
+    static const char months[12][4] = {"Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                       "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"};
+    std::string_view text(value);
+    if (text.size() != CREST_HTTP_DATE_LENGTH || text[3] != ',' ||
+        text.compare(25, 4, " GMT") != 0) {
+        return -1;
+    }
+    int day, year, hour, minute, second;
+    if (!parse_number(text, 5, 2, day) || !parse_number(text, 12, 4, year) ||
+        !parse_number(text, 17, 2, hour) || !parse_number(text, 20, 2, minute) ||
+        !parse_number(text, 23, 2, second)) {
+        return -1;
+    }
+    int month = -1;
+    for (int i = 0; i < 12; i++) {
+        if (text.compare(8, 3, months[i]) == 0) month = i + 1;
+    }
+    if (month < 0 || day < 1 || day > 31 || hour > 23 || minute > 59 || second > 60) return -1;
+    return days_from_civil(year, static_cast<unsigned>(month), static_cast<unsigned>(day)) * 86400 +
+           hour * 3600 + minute * 60 + second;
+}
+
+enum class RangeResult { IGNORED, SATISFIABLE, UNSATISFIABLE };
+
+// A single "bytes=" range. Several ranges, other units and malformed
+// values are ignored, and the whole file is sent.
+RangeResult parse_range(const char* header, uint64_t size, uint64_t& start, uint64_t& length) {
+    std::string_view text = trim(header);
+    if (text.compare(0, 6, "bytes=") != 0) return RangeResult::IGNORED;
+    text = trim(text.substr(6));
+    if (text.find(',') != std::string_view::npos) return RangeResult::IGNORED;
+
+    size_t dash = text.find('-');
+    if (dash == std::string_view::npos) return RangeResult::IGNORED;
+    std::string_view first = trim(text.substr(0, dash));
+    std::string_view last = trim(text.substr(dash + 1));
+
+    auto number = [](std::string_view digits, uint64_t& out) {
+        if (digits.empty() || digits.size() > 19) return false;
+        out = 0;
+        for (char c : digits) {
+            if (c < '0' || c > '9') return false;
+            out = out * 10 + static_cast<uint64_t>(c - '0');
+        }
+        return true;
+    };
+
+    uint64_t a = 0;
+    uint64_t b = 0;
+    if (first.empty()) {
+        // The last b bytes
+        if (!number(last, b)) return RangeResult::IGNORED;
+        if (b == 0 || size == 0) return RangeResult::UNSATISFIABLE;
+        start = b < size ? size - b : 0;
+        length = size - start;
+        return RangeResult::SATISFIABLE;
+    }
+    if (!number(first, a)) return RangeResult::IGNORED;
+    if (last.empty()) {
+        b = size > 0 ? size - 1 : 0;
+    } else if (!number(last, b) || b < a) {
+        return RangeResult::IGNORED;
+    }
+    if (a >= size) return RangeResult::UNSATISFIABLE;
+    if (b >= size) b = size - 1;
+    start = a;
+    length = b - a + 1;
+    return RangeResult::SATISFIABLE;
+}
+
+void not_found(crest_response_t* res) {
+    crest_response_json(res, 404, "{\"error\":\"Not Found\"}");
+}
+
+} // namespace
+
+StaticFiles::StaticFiles(std::string root, bool dotfiles, size_t cache_file_bytes, size_t cache_bytes)
+    : root_(std::move(root)), dotfiles_(dotfiles), cache_file_bytes_(cache_file_bytes),
+      cache_bytes_(cache_bytes) {
+    while (root_.size() > 1 && (root_.back() == '/' || root_.back() == '\\')) root_.pop_back();
+    if (root_.empty()) root_ = ".";
+}
+
+StaticFiles::~StaticFiles() {
+    for (Entry& entry : entries_) {
+        if (entry.data) release_mapped(entry.data);
+    }
+}
+
+size_t StaticFiles::cached_bytes() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return mapped_bytes_;
+}
+
+void StaticFiles::refresh(Entry& entry, int64_t now) {
+    entry.checked_at = now;
+    FileStat st = stat_path(entry.path.c_str());
+    if (st.exists && entry.exists && st.directory == entry.directory && st.size == entry.size &&
+        st.mtime == entry.mtime && st.inode == entry.inode) {
+        return;
+    }
+
+    // Responses still sending the old contents keep their reference
+    if (entry.data) {
+        mapped_bytes_ -= entry.data->size;
+        release_mapped(entry.data);
+        entry.data = nullptr;
+    }
+    entry.exists = st.exists;
+    entry.directory = st.directory;
+    entry.size = st.size;
+    entry.mtime = st.mtime;
+    entry.inode = st.inode;
+    if (st.exists && !st.directory && st.size <= cache_file_bytes_) {
+        // Not cached if it cannot be read now: it is then opened per request
+        entry.data = map_file(entry.path.c_str());
+        if (entry.data) {
+            entry.size = entry.data->size;
+            mapped_bytes_ += entry.data->size;
+        }
+    }
+}
+
+void StaticFiles::evict() {
+    while (entries_.size() > 1 && (mapped_bytes_ > cache_bytes_ || entries_.size() > kStaticCacheEntries)) {
+        Entry& oldest = entries_.back();
+        index_.erase(oldest.path);
+        if (oldest.data) {
+            mapped_bytes_ -= oldest.data->size;
+            release_mapped(oldest.data);
+        }
+        entries_.pop_back();
+    }
+}
+
+StaticFiles::File StaticFiles::lookup(const std::string& path) {
+    int64_t now = monotonic_seconds();
+    std::lock_guard<std::mutex> lock(mutex_);
+
+    // A small file is mapped under the lock; it is a few system calls, and
+    // happens once per change
+    Entry* entry;
+    auto found = index_.find(path);
+    if (found == index_.end()) {
+        entries_.emplace_front();
+        entry = &entries_.front();
+        entry->path = path;
+        index_.emplace(entry->path, entries_.begin());
+        refresh(*entry, now);
+    } else {
+        entries_.splice(entries_.begin(), entries_, found->second);
+        entry = &*found->second;
+        if (now - entry->checked_at >= kStaticRecheckSeconds) refresh(*entry, now);
+    }
+
+    File file;
+    file.exists = entry->exists;
+    file.directory = entry->directory;
+    file.size = entry->size;
+    file.mtime = entry->mtime;
+    file.data = entry->data;
+    if (file.data) file.data->references.fetch_add(1, std::memory_order_relaxed);
+    evict();
+    return file;
+}
+
+void StaticFiles::serve(crest_request_t* req, crest_response_t* res, std::string_view path) {
+    // Reused, so a warm thread builds paths without allocating
+    thread_local std::string full;
+    if (!resolve(root_, path, dotfiles_, full)) {
+        not_found(res);
+        return;
+    }
+
+    File file = lookup(full);
+    if (file.exists && file.directory) {
+        full += "/index.html";
+        file = lookup(full);
+    }
+    auto release = [](File& f) {
+        if (f.data) release_mapped(f.data);
+        f.data = nullptr;
+    };
+    if (!file.exists || file.directory) {
+        release(file);
+        not_found(res);
+        return;
+    }
+    const char* type = content_type_for(full);
+
+    // A precompressed sibling is sent whole; ranges apply to the file itself
+    const char* range = crest_request_get_header(req, "Range");
+    const char* encoding = nullptr;
+    if (!range) {
+        static const char* const kEncodings[][2] = {{"br", ".br"}, {"gzip", ".gz"}};
+        const char* accept = crest_request_get_header(req, "Accept-Encoding");
+        size_t base = full.size();
+        for (const auto& candidate : kEncodings) {
+            if (!accepts_encoding(accept, candidate[0])) continue;
+            full += candidate[1];
+            File variant = lookup(full);
+            if (variant.exists && !variant.directory) {
+                release(file);
+                file = variant;
+                encoding = candidate[0];
+                break;
+            }
+            release(variant);
+            full.resize(base);
+        }
+    }
+
+    // Larger files are sent from an open descriptor, which also settles
+    // the size and time the headers describe
+    int fd = -1;
+    if (!file.data) {
+        fd = open_read(full.c_str());
+        FileStat st = fd >= 0 ? stat_fd(fd) : FileStat();
+        if (!st.exists || st.directory) {
+            if (fd >= 0) close_file(reinterpret_cast<void*>(static_cast<intptr_t>(fd)));
+            not_found(res);
+            return;
+        }
+        file.size = st.size;
+        file.mtime = st.mtime;
+    }
+
+    char etag[48];
+    snprintf(etag, sizeof(etag), "\"%llx-%llx\"", static_cast<unsigned long long>(file.mtime),
+             static_cast<unsigned long long>(file.size));
+    char modified[CREST_HTTP_DATE_LENGTH + 1];
+    bool has_modified = crest_format_http_date(file.mtime, modified) > 0;
+    crest_response_set_header(res, "ETag", etag);
+    if (has_modified) crest_response_set_header(res, "Last-Modified", modified);
+    crest_response_set_header(res, "Accept-Ranges", "bytes");
+    crest_response_set_header(res, "Vary", "Accept-Encoding");
+    if (encoding) crest_response_set_header(res, "Content-Encoding", encoding);
+
+    auto finish_early = [&](int status, const char* content_type) {
+        release(file);
+        if (fd >= 0) close_file(reinterpret_cast<void*>(static_cast<intptr_t>(fd)));
+        crest_response_write(res, status, content_type, false, "", 0, nullptr, nullptr);
+    };
+
+    // If-None-Match takes precedence; If-Modified-Since is only read
+    // without it
+    const char* none_match = crest_request_get_header(req, "If-None-Match");
+    const char* modified_since = none_match ? nullptr : crest_request_get_header(req, "If-Modified-Since");
+    int64_t since = modified_since ? parse_http_date(modified_since) : -1;
+    if ((none_match && etag_listed(none_match, etag)) || (since >= 0 && file.mtime <= since)) {
+        finish_early(304, type);
+        return;
+    }
+
+    int status = 200;
+    uint64_t start = 0;
+    uint64_t length = file.size;
+    if (range) {
+        // If-Range holds the validator the client's partial copy has: a
+        // strong ETag, or the exact Last-Modified
+        const char* if_range = crest_request_get_header(req, "If-Range");
+        bool current = !if_range || strcmp(if_range, etag) == 0 ||
+                       (has_modified && strcmp(if_range, modified) == 0);
+        RangeResult result = current ? parse_range(range, file.size, start, length)
+                                     : RangeResult::IGNORED;
+        char content_range[80];
+        if (result == RangeResult::UNSATISFIABLE) {
+            snprintf(content_range, sizeof(content_range), "bytes */%llu",
+                     static_cast<unsigned long long>(file.size));
+            crest_response_set_header(res, "Content-Range", content_range);
+            finish_early(416, "text/plain");
+            return;
+        }
+        if (result == RangeResult::SATISFIABLE) {
+            snprintf(content_range, sizeof(content_range), "bytes %llu-%llu/%llu",
+                     static_cast<unsigned long long>(start),
+                     static_cast<unsigned long long>(start + length - 1),
+                     static_cast<unsigned long long>(file.size));
+            crest_response_set_header(res, "Content-Range", content_range);
+            status = 206;
+        }
+    }
+
+    if (file.data) {
+        crest_response_write(res, status, type, false, file.data->bytes + start,
+                             static_cast<size_t>(length), release_mapped, file.data);
+    } else {
+        crest_response_file(res, status, type, fd, static_cast<int64_t>(start),
+                            static_cast<size_t>(length), close_file,
+                            reinterpret_cast<void*>(static_cast<intptr_t>(fd)));
+    }
+}
+
+} // namespace server
+} // namespace crest
@@ -0,0 +1,117 @@
+/**
+ * @file static_files.hpp
+ * @brief Files under a directory, served with validators, ranges and
+ * precompressed variants
+ */
+
+#ifndef CREST_STATIC_FILES_HPP
+#define CREST_STATIC_FILES_HPP
+
+#include "crest/internal/app_internal.h"
+#include <cstdint>
+#include <list>
+#include <mutex>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+
+namespace crest {
+namespace server {
+
+/** Files up to this size are kept in memory; larger ones are sent from disk */
+constexpr size_t kStaticCacheFileBytes = 256 * 1024;
+
+/** Bytes of file contents one directory keeps in memory */
+constexpr size_t kStaticCacheBytes = 64 * 1024 * 1024;
+
+/** Paths, including missing ones, whose metadata one directory remembers */
+constexpr size_t kStaticCacheEntries = 4096;
+
+/** Seconds a remembered stat() is trusted before the file is checked again */
+constexpr int64_t kStaticRecheckSeconds = 1;
+
+/** Contents of a cached file, shared by every response sending them */
+struct MappedFile;
+
+/**
+ * @brief Serves the files under one directory
+ *
+ * Small files are mapped into memory once and sent from there, with
+ * recently used ones kept up to a byte budget; larger ones are opened per
+ * request and sent with sendfile(2). Responses carry an ETag and
+ * Last-Modified and answer conditional requests with 304, a single byte
+ * range with 206, and prefer a "name.br" or "name.gz" sibling when the
+ * client accepts that encoding.
+ *
+ * Files are checked for changes at most once every kStaticRecheckSeconds.
+ * Replace a file by renaming a new one over it: a mapped file truncated in
+ * place can fault the process that maps it.
+ */
+class StaticFiles {
+public:
+    /**
+     * @param dotfiles Serve paths with a segment starting with ".", such as
+     * ".git/config" or ".well-known/"; by default they are answered 404
+     */
+    explicit StaticFiles(std::string root, bool dotfiles = false,
+                         size_t cache_file_bytes = kStaticCacheFileBytes,
+                         size_t cache_bytes = kStaticCacheBytes);
+    ~StaticFiles();
+
+    StaticFiles(const StaticFiles&) = delete;
+    StaticFiles& operator=(const StaticFiles&) = delete;
+
+    /**
+     * @brief Answer a GET request for path, relative to the root
+     *
+     * path is percent-decoded. Paths that are absolute, contain "." or
+     * ".." segments or a NUL, and files that do not exist, are answered
+     * 404, as are other segments starting with "." unless dotfiles was
+     * set. A directory is answered with its index.html.
+     */
+    void serve(crest_request_t* req, crest_response_t* res, std::string_view path);
+
+    /** Bytes of file contents held in memory */
+    size_t cached_bytes() const;
+
+private:
+    // What stat() said about a path, and the contents of a small file
+    struct Entry {
+        std::string path;
+        bool exists = false;
+        bool directory = false;
+        uint64_t size = 0;
+        int64_t mtime = 0;
+        uint64_t inode = 0;
+        MappedFile* data = nullptr;  // holds one reference
+        int64_t checked_at = 0;
+    };
+
+    // A copy of an entry for one request, holding its own reference
+    struct File {
+        bool exists = false;
+        bool directory = false;
+        uint64_t size = 0;
+        int64_t mtime = 0;
+        MappedFile* data = nullptr;
+    };
+
+    File lookup(const std::string& path);
+    void refresh(Entry& entry, int64_t now);
+    void evict();
+
+    std::string root_;
+    bool dotfiles_;
+    size_t cache_file_bytes_;
+    size_t cache_bytes_;
+
+    mutable std::mutex mutex_;
+    std::list<Entry> entries_;  // most recently used first
+    std::unordered_map<std::string_view, std::list<Entry>::iterator> index_;  // views entry.path
+    size_t mapped_bytes_ = 0;
+};
+
+} // namespace server
+} // namespace crest
+
+#endif // CREST_STATIC_FILES_HPP
@@ -0,0 +1,243 @@
+/**
+ * @file json_writer.cpp
+ * @brief JSON written straight into a growing string
+ */
+
+#include "json_writer.hpp"
+#include <cstdio>
+
+namespace crest {
+namespace swagger {
+
+namespace {
+
+// Nesting accepted by json_value_end(), which recurses once per level
+constexpr int kMaxDepth = 64;
+
+const char kHex[] = "0123456789abcdef";
+
+size_t skip_space(std::string_view text, size_t pos) {
+    while (pos < text.size() &&
+           (text[pos] == ' ' || text[pos] == '\t' || text[pos] == '\n' || text[pos] == '\r')) {
+        pos++;
+    }
+    return pos;
+}
+
+bool is_digit(char c) {
+    return c >= '0' && c <= '9';
+}
+
+bool is_hex(char c) {
+    return is_digit(c) || (c >= 'a' && c <= 'f') || (c >= 'A' && c <= 'F');
+}
+
+size_t string_end(std::string_view text, size_t pos) {
+    for (pos++; pos < text.size(); pos++) {
+        unsigned char c = static_cast<unsigned char>(text[pos]);
+        if (c == '"') return pos + 1;
+        if (c < 0x20) return std::string_view::npos;
+        if (c != '\\') continue;
+        if (++pos >= text.size()) return std::string_view::npos;
+        switch (text[pos]) {
+            case '"': case '\\': case '/': case 'b': case 'f': case 'n': case 'r': case 't':
+                break;
+            case 'u':
+                if (pos + 4 >= text.size() || !is_hex(text[pos + 1]) || !is_hex(text[pos + 2]) ||
+                    !is_hex(text[pos + 3]) || !is_hex(text[pos + 4])) {
+                    return std::string_view::npos;
+                }
+                pos += 4;
+                break;
+            default:
+                return std::string_view::npos;
+        }
+    }
+    return std::string_view::npos;
+}
+
+size_t digits_end(std::string_view text, size_t pos) {
+    size_t start = pos;
+    while (pos < text.size() && is_digit(text[pos])) pos++;
+    return pos > start ? pos : std::string_view::npos;
+}
+
+size_t number_end(std::string_view text, size_t pos) {
+    if (text[pos] == '-') pos++;
+    if (pos < text.size() && text[pos] == '0') {
+        pos++;
+    } else if ((pos = digits_end(text, pos)) == std::string_view::npos) {
+        return pos;
+    }
+    if (pos < text.size() && text[pos] == '.') {
+        if ((pos = digits_end(text, pos + 1)) == std::string_view::npos) return pos;
+    }
+    if (pos < text.size() && (text[pos] == 'e' || text[pos] == 'E')) {
+        pos++;
+        if (pos < text.size() && (text[pos] == '+' || text[pos] == '-')) pos++;
+        pos = digits_end(text, pos);
+    }
+    return pos;
+}
+
+size_t literal_end(std::string_view text, size_t pos, std::string_view literal) {
+    return text.substr(pos, literal.size()) == literal ? pos + literal.size() : std::string_view::npos;
+}
+
+size_t value_end(std::string_view text, size_t pos, int depth) {
+    pos = skip_space(text, pos);
+    if (pos >= text.size() || depth > kMaxDepth) return std::string_view::npos;
+
+    char c = text[pos];
+    if (c == '"') return string_end(text, pos);
+    if (c == '-' || is_digit(c)) return number_end(text, pos);
+    if (c == 't') return literal_end(text, pos, "true");
+    if (c == 'f') return literal_end(text, pos, "false");
+    if (c == 'n') return literal_end(text, pos, "null");
+    if (c != '{' && c != '[') return std::string_view::npos;
+
+    char close = c == '{' ? '}' : ']';
+    pos = skip_space(text, pos + 1);
+    if (pos < text.size() && text[pos] == close) return pos + 1;
+    while (true) {
+        if (c == '{') {
+            pos = skip_space(text, pos);
+            if (pos >= text.size() || text[pos] != '"') return std::string_view::npos;
+            pos = skip_space(text, string_end(text, pos));
+            if (pos >= text.size() || text[pos] != ':') return std::string_view::npos;
+            pos++;
+        }
+        pos = value_end(text, pos, depth + 1);
+        if (pos == std::string_view::npos) return pos;
+        pos = skip_space(text, pos);
+        if (pos >= text.size()) return std::string_view::npos;
+        if (text[pos] == close) return pos + 1;
+        if (text[pos] != ',') return std::string_view::npos;
+        pos++;
+    }
+}
+
+} // namespace
+
+void append_escaped(std::string& out, std::string_view text) {
+    out += '"';
+    // Copy runs of plain bytes at once; UTF-8 sequences pass through unchanged
+    size_t run = 0;
+    for (size_t i = 0; i < text.size(); i++) {
+        unsigned char c = static_cast<unsigned char>(text[i]);
+        if (c >= 0x20 && c != '"' && c != '\\') continue;
+        out.append(text.data() + run, i - run);
+        run = i + 1;
+        switch (c) {
+            case '"': out += "\\\""; break;
+            case '\\': out += "\\\\"; break;
+            case '\b': out += "\\b"; break;
+            case '\f': out += "\\f"; break;
+            case '\n': out += "\\n"; break;
+            case '\r': out += "\\r"; break;
+            case '\t': out += "\\t"; break;
+            default:
+                out += "\\u00";
+                out += kHex[c >> 4];
+                out += kHex[c & 0xf];
+                break;
+        }
+    }
+    out.append(text.data() + run, text.size() - run);
+    out += '"';
+}
+
+size_t json_value_end(std::string_view text, size_t pos) {
+    return value_end(text, pos, 0);
+}
+
+bool valid_json(std::string_view text) {
+    size_t end = json_value_end(text, 0);
+    return end != std::string_view::npos && skip_space(text, end) == text.size();
+}
+
+void JsonWriter::separate() {
+    if (after_key_) {
+        after_key_ = false;
+    } else if (!open_.empty()) {
+        if (open_.back()) out_ += ',';
+        open_.back() = true;
+    }
+}
+
+JsonWriter& JsonWriter::begin_object() {
+    separate();
+    out_ += '{';
+    open_.push_back(false);
+    return *this;
+}
+
+JsonWriter& JsonWriter::end_object() {
+    out_ += '}';
+    open_.pop_back();
+    return *this;
+}
+
+JsonWriter& JsonWriter::begin_array() {
+    separate();
+    out_ += '[';
+    open_.push_back(false);
+    return *this;
+}
+
+JsonWriter& JsonWriter::end_array() {
+    out_ += ']';
+    open_.pop_back();
+    return *this;
+}
+
+JsonWriter& JsonWriter::key(std::string_view name) {
+    separate();
+    append_escaped(out_, name);
+    out_ += ':';
+    after_key_ = true;
+    return *this;
+}
+
+JsonWriter& JsonWriter::key_raw(std::string_view quoted) {
+    separate();
+    out_ += quoted;
+    out_ += ':';
+    after_key_ = true;
+    return *this;
+}
+
+JsonWriter& JsonWriter::value(std::string_view text) {
+    separate();
+    append_escaped(out_, text);
+    return *this;
+}
+
+JsonWriter& JsonWriter::number(int64_t number) {
+    separate();
+    char digits[24];
+    int length = snprintf(digits, sizeof(digits), "%lld", static_cast<long long>(number));
+    out_.append(digits, static_cast<size_t>(length));
+    return *this;
+}
+
+JsonWriter& JsonWriter::boolean(bool flag) {
+    separate();
+    out_ += flag ? "true" : "false";
+    return *this;
+}
+
+JsonWriter& JsonWriter::null() {
+    separate();
+    out_ += "null";
+    return *this;
+}
+
+JsonWriter& JsonWriter::raw(std::string_view json) {
+    separate();
+    out_ += json;
+    return *this;
+}
+
+} // namespace swagger
+} // namespace crest
@@ -0,0 +1,76 @@
+/**
+ * @file json_writer.hpp
+ * @brief JSON written straight into a growing string
+ */
+
+#ifndef CREST_JSON_WRITER_HPP
+#define CREST_JSON_WRITER_HPP
+
+#include <cstdint>
+#include <string>
+#include <string_view>
+#include <vector>
+
+namespace crest {
+namespace swagger {
+
+/**
+ * @brief Appends JSON to a string as it is described
+ *
+ * Strings are escaped, and commas and colons placed, as values are
+ * written, so a document costs one pass over its contents and no tree is
+ * built. Containers must be ended in the order they were begun; the
+ * writer does not check.
+ */
+class JsonWriter {
+public:
+    explicit JsonWriter(std::string& out) : out_(out) {}
+
+    JsonWriter& begin_object();
+    JsonWriter& end_object();
+    JsonWriter& begin_array();
+    JsonWriter& end_array();
+
+    /** The name of the next member of the current object */
+    JsonWriter& key(std::string_view name);
+
+    /** A member name already encoded as a JSON string, quotes included */
+    JsonWriter& key_raw(std::string_view quoted);
+
+    JsonWriter& value(std::string_view text);
+    JsonWriter& value(const char* text) { return value(std::string_view(text ? text : "")); }
+    JsonWriter& number(int64_t number);
+    JsonWriter& boolean(bool flag);
+    JsonWriter& null();
+
+    /** A value already encoded as JSON, written as is; see valid_json() */
+    JsonWriter& raw(std::string_view json);
+
+    /** True once every object and array begun has been ended */
+    bool complete() const { return open_.empty() && !after_key_; }
+
+private:
+    void separate();
+
+    std::string& out_;
+    std::vector<bool> open_;  // per open container: whether it has a member yet
+    bool after_key_ = false;
+};
+
+/** Append text as a quoted JSON string */
+void append_escaped(std::string& out, std::string_view text);
+
+/**
+ * @brief The end of the JSON value starting at pos, leading spaces allowed
+ * @return Offset just past the value, or std::string_view::npos if there
+ * is no well-formed value there
+ */
+size_t json_value_end(std::string_view text, size_t pos);
+
+/** Whether text is exactly one JSON value, with optional surrounding spaces */
+bool valid_json(std::string_view text);
+
+} // namespace swagger
+} // namespace crest
+
+#endif // CREST_JSON_WRITER_HPP
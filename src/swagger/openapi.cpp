@@ -3,52 +3,320 @@
  * @brief OpenAPI specification generation
  */
 
-#include "crest/internal/app_internal.h"
-#include <string>
-#include <sstream>
+#include "openapi.hpp"
+#include "json_writer.hpp"
+#include <string_view>
+#include <unordered_map>
+#include <vector>
 
 namespace crest {
 namespace swagger {
 
+namespace {
+
+constexpr size_t kNone = static_cast<size_t>(-1);
+
+// JSON Schema keywords; an object made only of these is taken as a schema
+// rather than shorthand
+const std::string_view kSchemaKeywords[] = {
+    "\"type\"", "\"properties\"", "\"items\"", "\"required\"", "\"description\"", "\"format\"",
+    "\"enum\"", "\"nullable\"", "\"example\"", "\"default\"", "\"title\"", "\"additionalProperties\"",
+    "\"minimum\"", "\"maximum\"", "\"minLength\"", "\"maxLength\"", "\"pattern\"", "\"minItems\"",
+    "\"maxItems\"", "\"oneOf\"", "\"anyOf\"", "\"allOf\"",
+};
+
+const std::string_view kTypeNames[] = {"string", "number", "integer", "boolean", "object", "array"};
+
+const char* method_key(crest_method_t method) {
+    switch (method) {
+        case CREST_GET: return "get";
+        case CREST_POST: return "post";
+        case CREST_PUT: return "put";
+        case CREST_DELETE: return "delete";
+        case CREST_PATCH: return "patch";
+        case CREST_HEAD: return "head";
+        case CREST_OPTIONS: return "options";
+        default: return nullptr;
+    }
+}
+
+// The schemas /docs shows for routes that do not set their own
+const char* default_request_schema(crest_method_t method) {
+    switch (method) {
+        case CREST_POST:
+        case CREST_PUT: return "{\"name\": \"string\", \"value\": \"string\"}";
+        case CREST_PATCH: return "{\"field\": \"string\"}";
+        default: return nullptr;
+    }
+}
+
+const char* default_response_schema(crest_method_t method) {
+    switch (method) {
+        case CREST_GET: return "{\"data\": \"string\"}";
+        case CREST_POST: return "{\"id\": \"number\", \"status\": \"string\"}";
+        case CREST_PUT:
+        case CREST_DELETE:
+        case CREST_PATCH: return "{\"status\": \"string\"}";
+        default: return nullptr;
+    }
+}
+
+size_t skip_space(std::string_view text, size_t pos) {
+    while (pos < text.size() &&
+           (text[pos] == ' ' || text[pos] == '\t' || text[pos] == '\n' || text[pos] == '\r')) {
+        pos++;
+    }
+    return pos;
+}
+
+// Write pattern as an OpenAPI path, each parameter segment as "{name}",
+// and collect the parameter names
+void openapi_path(std::string_view pattern, std::string& path, std::vector<std::string_view>& params) {
+    path.clear();
+    params.clear();
+    size_t start = 0;
+    while (true) {
+        size_t end = pattern.find('/', start);
+        std::string_view segment = pattern.substr(start, end == std::string_view::npos ? end : end - start);
+        std::string_view name;
+        bool param = true;
+        if (!segment.empty() && (segment[0] == ':' || segment[0] == '*')) {
+            name = segment.substr(1);
+            if (name.empty()) name = "path";
+        } else if (segment.size() > 2 && segment.front() == '{' && segment.back() == '}') {
+            name = segment.substr(1, segment.size() - 2);
+        } else {
+            param = false;
+        }
+        if (param) {
+            path += '{';
+            path += name;
+            path += '}';
+            params.push_back(name);
+        } else {
+            path += segment;
+        }
+        if (end == std::string_view::npos) break;
+        path += '/';
+        start = end + 1;
+    }
+}
+
+// Call visit(key, value, value_end) for each member of the object at pos in
+// already validated JSON; key keeps its quotes
+template <typename Visit>
+void for_each_member(std::string_view text, size_t pos, Visit visit) {
+    pos = skip_space(text, pos) + 1;
+    while (true) {
+        pos = skip_space(text, pos);
+        if (text[pos] == '}') return;
+        size_t key_end = json_value_end(text, pos);
+        size_t value = skip_space(text, skip_space(text, key_end) + 1);
+        size_t value_end = json_value_end(text, value);
+        visit(text.substr(pos, key_end - pos), value, value_end);
+        pos = skip_space(text, value_end);
+        if (text[pos] == ',') pos++;
+    }
+}
+
+bool is_json_schema(std::string_view text, size_t pos) {
+    bool keywords_only = true;
+    bool typed = false;
+    for_each_member(text, pos, [&](std::string_view key, size_t, size_t) {
+        if (key == "\"$ref\"" || key == "\"type\"") typed = true;
+        bool keyword = key == "\"$ref\"";
+        for (std::string_view known : kSchemaKeywords) keyword = keyword || key == known;
+        keywords_only = keywords_only && keyword;
+    });
+    return typed && keywords_only;
+}
+
+void write_type(JsonWriter& json, std::string_view type) {
+    json.begin_object();
+    if (type == "null") {
+        json.key("nullable").boolean(true);
+    } else {
+        bool known = false;
+        for (std::string_view name : kTypeNames) known = known || type == name;
+        if (known) {
+            json.key("type").value(type);
+        } else {
+            // "email", "date-time", "uuid": formats of a string
+            json.key("type").value("string").key("format").value(type);
+        }
+    }
+    json.end_object();
+}
+
+// Expand the shorthand value text[pos, end): type names become schemas,
+// objects list their fields as properties, arrays describe their first item
+void write_shorthand(JsonWriter& json, std::string_view text, size_t pos, size_t end) {
+    switch (text[pos]) {
+        case '"': {
+            std::string_view name = text.substr(pos + 1, end - pos - 2);
+            write_type(json, name.find('\\') == std::string_view::npos ? name : "string");
+            break;
+        }
+        case '{':
+            if (is_json_schema(text, pos)) {
+                json.raw(text.substr(pos, end - pos));
+                break;
+            }
+            json.begin_object().key("type").value("object").key("properties").begin_object();
+            for_each_member(text, pos, [&](std::string_view key, size_t value, size_t value_end) {
+                json.key_raw(key);
+                write_shorthand(json, text, value, value_end);
+            });
+            json.end_object().end_object();
+            break;
+        case '[': {
+            json.begin_object().key("type").value("array");
+            size_t first = skip_space(text, pos + 1);
+            if (text[first] != ']') {
+                json.key("items");
+                write_shorthand(json, text, first, json_value_end(text, first));
+            }
+            json.end_object();
+            break;
+        }
+        case 't':
+        case 'f': write_type(json, "boolean"); break;
+        case 'n': write_type(json, "null"); break;
+        default: write_type(json, "number"); break;
+    }
+}
+
+void write_schema(JsonWriter& json, std::string_view schema) {
+    if (!valid_json(schema)) {
+        // Not JSON: keep the text where a reader can still see it
+        json.begin_object().key("type").value("object").key("description").value(schema).end_object();
+        return;
+    }
+    size_t pos = skip_space(schema, 0);
+    write_shorthand(json, schema, pos, json_value_end(schema, pos));
+}
+
+void write_content(JsonWriter& json, const char* schema) {
+    json.key("content").begin_object().key("application/json").begin_object().key("schema");
+    write_schema(json, schema);
+    json.end_object().end_object();
+}
+
+void write_operation(JsonWriter& json, const crest_route_entry_t& route, const char* method,
+                     const std::vector<std::string_view>& params) {
+    const char* summary = route.description && route.description[0] ? route.description : "No description";
+    json.key(method).begin_object();
+    json.key("summary").value(summary).key("description").value(summary);
+
+    if (!params.empty()) {
+        json.key("parameters").begin_array();
+        for (std::string_view name : params) {
+            json.begin_object()
+                .key("name").value(name)
+                .key("in").value("path")
+                .key("required").boolean(true)
+                .key("schema").begin_object().key("type").value("string").end_object()
+                .end_object();
+        }
+        json.end_array();
+    }
+
+    const char* request = route.request_schema ? route.request_schema : default_request_schema(route.method);
+    if (request) {
+        json.key("requestBody").begin_object().key("required").boolean(true);
+        write_content(json, request);
+        json.end_object();
+    }
+
+    const char* response = route.response_schema ? route.response_schema : default_response_schema(route.method);
+    json.key("responses").begin_object();
+    json.key("200").begin_object().key("description").value("Successful response");
+    if (response) write_content(json, response);
+    json.end_object();
+    json.key("400").begin_object().key("description").value("Bad Request").end_object();
+    json.key("404").begin_object().key("description").value("Not Found").end_object();
+    json.key("500").begin_object().key("description").value("Internal Server Error").end_object();
+    json.end_object();
+
+    json.end_object();
+}
+
+// The routes sharing one OpenAPI path, as a list threaded through next[]
+struct PathItem {
+    std::string path;
+    size_t first;
+    size_t last;
+};
+
+} // namespace
+
 std::string generate_openapi_spec(const crest_app_t* app) {
-    std::ostringstream oss;
-    
-    oss << "{\n";
-    oss << "  \"openapi\": \"3.0.0\",\n";
-    oss << "  \"info\": {\n";
-    oss << "    \"title\": \"" << (app->title ? app->title : "API") << "\",\n";
-    oss << "    \"description\": \"" << (app->description ? app->description : "") << "\",\n";
-    oss << "    \"version\": \"" << (app->version ? app->version : "0.0.0") << "\"\n";
-    oss << "  },\n";
-    oss << "  \"servers\": [{\"url\": \"/\"}],\n";
-    oss << "  \"paths\": {\n";
-    
+    // Group routes by path in one pass, keeping the order paths first appear
+    std::vector<PathItem> items;
+    items.reserve(app->route_count);  // never reallocated: index views the paths
+    std::vector<size_t> next(app->route_count, kNone);
+    std::unordered_map<std::string_view, size_t> index;
+    index.reserve(app->route_count);
+    std::string path;
+    std::vector<std::string_view> params;
     for (size_t i = 0; i < app->route_count; i++) {
-        const char* method = "";
-        switch (app->routes[i].method) {
-            case CREST_GET: method = "get"; break;
-            case CREST_POST: method = "post"; break;
-            case CREST_PUT: method = "put"; break;
-            case CREST_DELETE: method = "delete"; break;
-            case CREST_PATCH: method = "patch"; break;
-            default: method = "get"; break;
-        }
-        
-        if (i > 0) oss << ",\n";
-        oss << "    \"" << app->routes[i].path << "\": {\n";
-        oss << "      \"" << method << "\": {\n";
-        oss << "        \"summary\": \"" << (app->routes[i].description ? app->routes[i].description : "No description") << "\",\n";
-        oss << "        \"responses\": {\n";
-        oss << "          \"200\": {\"description\": \"Successful response\"}\n";
-        oss << "        }\n";
-        oss << "      }\n";
-        oss << "    }";
-    }
-    
-    oss << "\n  }\n";
-    oss << "}\n";
-    
-    return oss.str();
+        openapi_path(app->routes[i].path, path, params);
+        auto found = index.find(path);
+        if (found == index.end()) {
+            items.push_back({path, i, i});
+            index.emplace(items.back().path, items.size() - 1);
+        } else {
+            PathItem& item = items[found->second];
+            next[item.last] = i;
+            item.last = i;
+        }
+    }
+
+    std::string out;
+    out.reserve(1024 + app->route_count * 640);
+    JsonWriter json(out);
+    json.begin_object();
+    json.key("openapi").value("3.0.0");
+    json.key("info").begin_object()
+        .key("title").value(app->title)
+        .key("description").value(app->description)
+        .key("version").value(app->version)
+        .key("contact").begin_object()
+            .key("name").value("API Support")
+            .key("email").value("contact@muhammadfiaz.com")
+        .end_object()
+        .end_object();
+    json.key("servers").begin_array()
+        .begin_object().key("url").value("/").key("description").value("Current server").end_object()
+        .end_array();
+
+    json.key("paths").begin_object();
+    for (const PathItem& item : items) {
+        json.key(item.path).begin_object();
+        unsigned written = 0;  // methods already under this path
+        for (size_t i = item.first; i != kNone; i = next[i]) {
+            const crest_route_entry_t& route = app->routes[i];
+            const char* method = method_key(route.method);
+            unsigned bit = 1u << route.method;
+            if (!method || (written & bit)) continue;
+            written |= bit;
+            openapi_path(route.path, path, params);
+            write_operation(json, route, method, params);
+        }
+        json.end_object();
+    }
+    json.end_object();
+
+    json.key("components").begin_object().key("schemas").begin_object()
+        .key("Error").begin_object()
+            .key("type").value("object")
+            .key("properties").begin_object()
+                .key("error").begin_object().key("type").value("string").end_object()
+            .end_object()
+        .end_object()
+        .end_object().end_object();
+    json.end_object();
+    return out;
 }
 
 } // namespace swagger
@@ -0,0 +1,30 @@
+/**
+ * @file openapi.hpp
+ * @brief OpenAPI specification generation
+ */
+
+#ifndef CREST_OPENAPI_HPP
+#define CREST_OPENAPI_HPP
+
+#include "crest/internal/app_internal.h"
+#include <string>
+
+namespace crest {
+namespace swagger {
+
+/**
+ * @brief The OpenAPI 3.0 document for app's routes
+ *
+ * Routes sharing a path are grouped under one path item, with ":name",
+ * "{name}" and "*name" segments written as path parameters. Schemas in
+ * the shorthand of set_request_schema(), {"field": "type"}, are expanded
+ * to JSON Schema; a schema that already is one, with a top-level "type"
+ * or "$ref", is embedded as given. Runs in time linear in the size of the
+ * routes. The caller holds the app's route_mutex.
+ */
+std::string generate_openapi_spec(const crest_app_t* app);
+
+} // namespace swagger
+} // namespace crest
+
+#endif // CREST_OPENAPI_HPP
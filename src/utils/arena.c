@@ -0,0 +1,102 @@
+/**
+ * @file arena.c
+ * @brief Bump allocator for memory that lives as long as one request
+ */
+
+#include "crest/internal/app_internal.h"
+#include <stdlib.h>
+
+/* Every allocation is aligned for any type */
+#define ARENA_ALIGN 16
+
+struct crest_arena_block {
+    crest_arena_block_t* next;
+};
+
+/* Usable bytes start after the header, rounded up to the alignment */
+#define BLOCK_HEADER ((sizeof(crest_arena_block_t) + ARENA_ALIGN - 1) & ~(size_t)(ARENA_ALIGN - 1))
+
+void crest_arena_init(crest_arena_t* arena, void* buffer, size_t size) {
+    arena->first = (char*)buffer;
+    arena->first_size = buffer ? size : 0;
+    arena->first_owned = false;
+    arena->base = arena->first;
+    arena->size = arena->first_size;
+    arena->used = 0;
+    arena->requested = 0;
+    arena->extra = NULL;
+    arena->mallocs = 0;
+}
+
+void* crest_arena_alloc(crest_arena_t* arena, size_t size) {
+    size = (size + ARENA_ALIGN - 1) & ~(size_t)(ARENA_ALIGN - 1);
+    if (size == 0) size = ARENA_ALIGN;
+
+    if (arena->used + size > arena->size) {
+        if (!arena->first) {
+            size_t first_size = size > CREST_ARENA_BLOCK_SIZE ? size : CREST_ARENA_BLOCK_SIZE;
+            char* first = (char*)malloc(first_size);
+            if (!first) return NULL;
+            arena->mallocs++;
+            arena->first = first;
+            arena->first_size = first_size;
+            arena->first_owned = true;
+            arena->base = first;
+            arena->size = first_size;
+        } else {
+            /* Each block is at least twice the last, so a large request
+               needs few of them */
+            size_t block_size = arena->size * 2 > size ? arena->size * 2 : size;
+            crest_arena_block_t* block = (crest_arena_block_t*)malloc(BLOCK_HEADER + block_size);
+            if (!block) return NULL;
+            arena->mallocs++;
+            block->next = arena->extra;
+            arena->extra = block;
+            arena->base = (char*)block + BLOCK_HEADER;
+            arena->size = block_size;
+        }
+        arena->used = 0;
+    }
+
+    void* ptr = arena->base + arena->used;
+    arena->used += size;
+    arena->requested += size;
+    return ptr;
+}
+
+static void free_blocks(crest_arena_t* arena) {
+    while (arena->extra) {
+        crest_arena_block_t* next = arena->extra->next;
+        free(arena->extra);
+        arena->extra = next;
+    }
+}
+
+void crest_arena_reset(crest_arena_t* arena) {
+    bool overflowed = arena->extra != NULL;
+    free_blocks(arena);
+
+    /* A request that outgrew the first block makes it large enough for the
+       next one, so steady traffic settles on a single block */
+    if (overflowed && arena->requested <= CREST_ARENA_KEEP_SIZE) {
+        char* first = (char*)malloc(arena->requested);
+        if (first) {
+            arena->mallocs++;
+            if (arena->first_owned) free(arena->first);
+            arena->first = first;
+            arena->first_size = arena->requested;
+            arena->first_owned = true;
+        }
+    }
+
+    arena->base = arena->first;
+    arena->size = arena->first_size;
+    arena->used = 0;
+    arena->requested = 0;
+}
+
+void crest_arena_destroy(crest_arena_t* arena) {
+    free_blocks(arena);
+    if (arena->first_owned) free(arena->first);
+    crest_arena_init(arena, NULL, 0);
+}
@@ -7,32 +7,269 @@
 #define CREST_THREAD_POOL_HPP
 
 #include <vector>
-#include <queue>
 #include <thread>
 #include <mutex>
 #include <condition_variable>
-#include <functional>
 #include <atomic>
+#include <chrono>
+#include <functional>
+#include <memory>
+#include <new>
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+#include <type_traits>
+#include <utility>
 
 namespace crest {
 
+/**
+ * @brief Move-only void() callable that keeps small closures inline
+ *
+ * Unlike std::function, a closure of up to kInlineBytes is stored in the
+ * task itself, so enqueueing one does not allocate. A closure may instead
+ * take a bool: it is called with false to run, or with true if the pool
+ * sheds it under overload, so that it can still answer its client.
+ * Closures without the parameter are simply destroyed when shed.
+ */
+class Task {
+public:
+    /** Fits the server's per-request closures; a task is one cache line */
+    static constexpr size_t kInlineBytes = 56;
+
+    Task() noexcept = default;
+
+    template <typename F, typename = std::enable_if_t<!std::is_same_v<std::decay_t<F>, Task>>>
+    Task(F&& f) {
+        using Fn = std::decay_t<F>;
+        if constexpr (fits_inline<Fn>()) {
+            new (storage_) Fn(std::forward<F>(f));
+            ops_ = &kInlineOps<Fn>;
+        } else {
+            *reinterpret_cast<Fn**>(storage_) = new Fn(std::forward<F>(f));
+            ops_ = &kHeapOps<Fn>;
+        }
+    }
+
+    Task(Task&& other) noexcept { take(other); }
+
+    Task& operator=(Task&& other) noexcept {
+        if (this != &other) {
+            reset();
+            take(other);
+        }
+        return *this;
+    }
+
+    Task(const Task&) = delete;
+    Task& operator=(const Task&) = delete;
+
+    ~Task() { reset(); }
+
+    explicit operator bool() const noexcept { return ops_ != nullptr; }
+
+    void operator()() { ops_->invoke(storage_, false); }
+
+    /** Tell the task it will not run */
+    void shed() { ops_->invoke(storage_, true); }
+
+    void reset() noexcept {
+        if (ops_) {
+            ops_->destroy(storage_);
+            ops_ = nullptr;
+        }
+    }
+
+private:
+    struct Ops {
+        void (*invoke)(void* storage, bool shed);
+        void (*relocate)(void* from, void* to);  // move into to, destroy from; null: memcpy
+        void (*destroy)(void* storage);
+    };
+
+    template <typename Fn>
+    static constexpr bool fits_inline() {
+        return sizeof(Fn) <= kInlineBytes && alignof(Fn) <= alignof(std::max_align_t) &&
+               std::is_nothrow_move_constructible_v<Fn>;
+    }
+
+    template <typename Fn>
+    static void call(Fn& fn, bool shed) {
+        if constexpr (std::is_invocable_v<Fn&, bool>) {
+            fn(shed);
+        } else if (!shed) {
+            fn();
+        }
+    }
+
+    template <typename Fn>
+    static void relocate(void* from, void* to) {
+        new (to) Fn(std::move(*static_cast<Fn*>(from)));
+        static_cast<Fn*>(from)->~Fn();
+    }
+
+    template <typename Fn>
+    static constexpr Ops kInlineOps = {
+        [](void* storage, bool shed) { call(*static_cast<Fn*>(storage), shed); },
+        std::is_trivially_copyable_v<Fn> ? nullptr : &relocate<Fn>,
+        [](void* storage) { static_cast<Fn*>(storage)->~Fn(); }
+    };
+
+    template <typename Fn>
+    static constexpr Ops kHeapOps = {
+        [](void* storage, bool shed) { call(**static_cast<Fn**>(storage), shed); },
+        nullptr,
+        [](void* storage) { delete *static_cast<Fn**>(storage); }
+    };
+
+    void take(Task& other) noexcept {
+        ops_ = other.ops_;
+        if (ops_) {
+            if (ops_->relocate) {
+                ops_->relocate(other.storage_, storage_);
+            } else {
+                memcpy(storage_, other.storage_, kInlineBytes);
+            }
+            other.ops_ = nullptr;
+        }
+    }
+
+    alignas(std::max_align_t) unsigned char storage_[kInlineBytes];
+    const Ops* ops_ = nullptr;
+};
+
+/**
+ * @brief Growable FIFO ring of tasks; not thread-safe
+ */
+class TaskRing {
+public:
+    size_t size() const { return count_; }
+    bool empty() const { return count_ == 0; }
+
+    void push_back(Task&& task) {
+        if (count_ == slots_.size()) grow();
+        slots_[(head_ + count_) & (slots_.size() - 1)] = std::move(task);
+        count_++;
+    }
+
+    Task pop_front() {
+        Task task = std::move(slots_[head_]);
+        head_ = (head_ + 1) & (slots_.size() - 1);
+        count_--;
+        return task;
+    }
+
+private:
+    void grow() {
+        std::vector<Task> bigger(slots_.empty() ? 16 : slots_.size() * 2);
+        for (size_t i = 0; i < count_; i++) {
+            bigger[i] = std::move(slots_[(head_ + i) & (slots_.size() - 1)]);
+        }
+        slots_.swap(bigger);
+        head_ = 0;
+    }
+
+    std::vector<Task> slots_;  // power-of-two capacity
+    size_t head_ = 0;
+    size_t count_ = 0;
+};
+
+/**
+ * @brief Work-stealing thread pool
+ *
+ * Every worker owns a queue with its own lock. Tasks enqueued by a worker
+ * go to its own queue; tasks from other threads (event loops, acceptors)
+ * are spread round-robin. A worker whose queue runs dry steals half of
+ * another worker's queue, so the queues' locks are rarely contended.
+ *
+ * Idle workers sleep. An enqueue wakes one only if no worker is already
+ * awake and looking for work; the last searcher to find a task wakes the
+ * next one if more is queued. A burst of tasks therefore ramps workers up
+ * one wakeup at a time instead of signalling for every task.
+ *
+ * A pool may bound its queue. Once that many tasks wait, enqueueing from
+ * outside the pool sheds the new task, waits for room or sheds the oldest
+ * queued task, depending on the Overflow policy; try_enqueue() instead
+ * refuses the task and leaves it to the caller. Tasks enqueued by running
+ * tasks are always accepted, so admitted work cannot stall on itself.
+ *
+ * A pool may also size itself between num_threads and Options::max_threads.
+ * A monitor thread estimates how long queued tasks wait from the queue
+ * length and the rate tasks start, and adds workers while that exceeds the
+ * target, as happens when handlers block on I/O. Workers left idle for the
+ * idle timeout exit until num_threads remain.
+ *
+ * Destroying the pool runs every task already enqueued, then joins.
+ */
 class ThreadPool {
 public:
-    explicit ThreadPool(size_t num_threads = std::thread::hardware_concurrency()) 
-        : stop_(false) {
+    /** What an enqueue does when a bounded queue is full */
+    enum class Overflow {
+        REJECT,       // shed the new task
+        BLOCK,        // wait until a worker takes a task
+        DROP_OLDEST   // shed the longest-waiting task to make room
+    };
+
+    /** Sizing bounds and per-worker hooks */
+    struct Options {
+        size_t max_threads = 0;  // 0 or num_threads: fixed size
+        std::chrono::milliseconds target_delay{10};
+        std::chrono::milliseconds idle_timeout{10000};
+        // Told of every change in the number of workers
+        std::function<void(size_t from, size_t to, const char* reason)> on_resize;
+        // Runs first on every worker thread, with the worker's slot
+        // (below max_threads); a slot is reused when its worker exits
+        std::function<void(size_t slot)> on_start;
+    };
+
+    struct Stats {
+        size_t threads = 0;
+        size_t queued = 0;     // enqueued, not yet started
+        size_t capacity = 0;   // 0 = unbounded
+        uint64_t rejected = 0;
+        uint64_t dropped = 0;
+        uint64_t blocked = 0;  // enqueues that waited for room
+    };
+
+    /**
+     * @param num_threads Workers, or the fewest workers if the pool grows
+     * @param capacity Most tasks waiting at once (0 = unbounded)
+     */
+    explicit ThreadPool(size_t num_threads = std::thread::hardware_concurrency(),
+                        size_t capacity = 0, Overflow overflow = Overflow::REJECT)
+        : ThreadPool(num_threads, capacity, overflow, Options()) {}
+
+    ThreadPool(size_t num_threads, size_t capacity, Overflow overflow, Options options)
+        : capacity_(capacity), overflow_(overflow), options_(std::move(options)) {
         if (num_threads == 0) num_threads = 4;
-        workers_.reserve(num_threads);
+        min_threads_ = num_threads;
+        count_ = options_.max_threads > num_threads ? options_.max_threads : num_threads;
+        queues_.reset(new Queue[count_]);
+        workers_.resize(count_);
         for (size_t i = 0; i < num_threads; ++i) {
-            workers_.emplace_back([this] { worker_thread(); });
+            queues_[i].active.store(true);
+            workers_[i] = std::thread([this, i] { worker_thread(i); });
+        }
+        live_.store(num_threads);
+        if (count_ > min_threads_) {
+            monitor_ = std::thread([this] { monitor(); });
         }
     }
 
     ~ThreadPool() {
+        if (monitor_.joinable()) {
+            {
+                std::lock_guard<std::mutex> lock(monitor_mutex_);
+                monitor_stop_ = true;
+            }
+            monitor_cv_.notify_one();
+            monitor_.join();
+        }
         {
-            std::unique_lock<std::mutex> lock(queue_mutex_);
+            std::lock_guard<std::mutex> lock(sleep_mutex_);
             stop_ = true;
         }
-        condition_.notify_all();
+        sleep_cv_.notify_all();
         for (std::thread& worker : workers_) {
             if (worker.joinable()) {
                 worker.join();
@@ -40,43 +277,366 @@ public:
         }
     }
 
-    void enqueue(std::function<void()> task) {
-        {
-            std::unique_lock<std::mutex> lock(queue_mutex_);
-            tasks_.push(std::move(task));
+    ThreadPool(const ThreadPool&) = delete;
+    ThreadPool& operator=(const ThreadPool&) = delete;
+
+    /**
+     * @return false if the task was shed because the queue is full
+     */
+    template <typename F>
+    bool enqueue(F&& f) {
+        Task task(std::forward<F>(f));
+        return submit(task);
+    }
+
+    /**
+     * @brief Enqueue f only if the bounded queue has room, whatever the
+     * Overflow policy; never waits and never sheds
+     *
+     * For callers that must not block, such as an event loop under
+     * Overflow::BLOCK, which hold the work and try again later. A refusal
+     * counts in Stats::blocked.
+     *
+     * @return false, leaving f unused, if the queue is full
+     */
+    template <typename F>
+    bool try_enqueue(F&& f) {
+        if (capacity_ == 0 || current_pool_ == this) return enqueue(std::forward<F>(f));
+        if (queued_.fetch_add(1) >= capacity_) {
+            queued_.fetch_sub(1);
+            blocked_.fetch_add(1, std::memory_order_relaxed);
+            return false;
         }
-        condition_.notify_one();
+        Task task(std::forward<F>(f));
+        push(pick_queue(), task);
+        return true;
     }
 
+    /** Whether an enqueue from outside the pool would find room now */
+    bool has_room() const { return capacity_ == 0 || queued_.load() < capacity_; }
+
+    /** Tasks enqueued but not yet started */
     size_t pending_tasks() const {
-        std::unique_lock<std::mutex> lock(queue_mutex_);
-        return tasks_.size();
+        size_t total = 0;
+        for (size_t i = 0; i < count_; i++) total += queues_[i].size.load();
+        return total;
+    }
+
+    /** Workers currently running */
+    size_t size() const { return live_.load(); }
+
+    Stats stats() const {
+        Stats stats;
+        stats.threads = size();
+        stats.queued = pending_tasks();
+        stats.capacity = capacity_;
+        stats.rejected = rejected_.load(std::memory_order_relaxed);
+        stats.dropped = dropped_.load(std::memory_order_relaxed);
+        stats.blocked = blocked_.load(std::memory_order_relaxed);
+        return stats;
     }
 
 private:
-    void worker_thread() {
+    struct alignas(64) Queue {
+        std::mutex mutex;
+        TaskRing tasks;
+        // Mirrors tasks.size() for readers that don't hold the lock
+        std::atomic<size_t> size{0};
+        std::atomic<uint64_t> started{0};  // written by the owning worker only
+        std::atomic<bool> active{false};   // a worker owns this queue
+    };
+
+    /** Most tasks moved to the thief's own queue by one steal */
+    static constexpr size_t kStealBatch = 16;
+
+    bool submit(Task& task) {
+        bool own = current_pool_ == this;
+        size_t index = own ? current_index_ : pick_queue();
+
+        Task dropped;
+        if (capacity_ > 0 && queued_.fetch_add(1) >= capacity_ && !own) {
+            switch (overflow_) {
+                case Overflow::REJECT:
+                    queued_.fetch_sub(1);
+                    rejected_.fetch_add(1, std::memory_order_relaxed);
+                    task.shed();
+                    return false;
+                case Overflow::BLOCK:
+                    queued_.fetch_sub(1);
+                    wait_for_room();
+                    break;
+                case Overflow::DROP_OLDEST:
+                    if (drop_oldest(index, dropped)) queued_.fetch_sub(1);
+                    break;
+            }
+        }
+
+        push(index, task);
+        if (dropped) dropped.shed();
+        return true;
+    }
+
+    void push(size_t index, Task& task) {
+        {
+            Queue& queue = queues_[index];
+            std::lock_guard<std::mutex> lock(queue.mutex);
+            queue.tasks.push_back(std::move(task));
+            queue.size.store(queue.tasks.size());
+        }
+        wake_one();
+    }
+
+    // The next queue in turn that has a worker; queues of workers that
+    // exited are still emptied by stealing
+    size_t pick_queue() {
+        size_t index = next_.fetch_add(1, std::memory_order_relaxed) % count_;
+        for (size_t k = 1; k < count_ && !queues_[index].active.load(std::memory_order_relaxed); k++) {
+            index = (index + 1) % count_;
+        }
+        return index;
+    }
+
+    // Reserve a place in the bounded queue once one frees up
+    void wait_for_room() {
+        blocked_.fetch_add(1, std::memory_order_relaxed);
+        std::unique_lock<std::mutex> lock(room_mutex_);
+        room_waiters_.fetch_add(1);
+        size_t queued = queued_.load();
         while (true) {
-            std::function<void()> task;
-            {
-                std::unique_lock<std::mutex> lock(queue_mutex_);
-                condition_.wait(lock, [this] { return stop_ || !tasks_.empty(); });
-                if (stop_ && tasks_.empty()) return;
-                if (!tasks_.empty()) {
-                    task = std::move(tasks_.front());
-                    tasks_.pop();
+            if (queued >= capacity_) {
+                room_cv_.wait(lock);
+                queued = queued_.load();
+            } else if (queued_.compare_exchange_weak(queued, queued + 1)) {
+                break;
+            }
+        }
+        room_waiters_.fetch_sub(1);
+    }
+
+    // The oldest task of the target queue, or of the next non-empty one
+    bool drop_oldest(size_t index, Task& dropped) {
+        for (size_t k = 0; k < count_; k++) {
+            Queue& queue = queues_[(index + k) % count_];
+            if (queue.size.load(std::memory_order_relaxed) == 0) continue;
+            std::lock_guard<std::mutex> lock(queue.mutex);
+            if (queue.tasks.empty()) continue;
+            dropped = queue.tasks.pop_front();
+            queue.size.store(queue.tasks.size(), std::memory_order_relaxed);
+            dropped_.fetch_add(1, std::memory_order_relaxed);
+            return true;
+        }
+        return false;
+    }
+
+    // A task left the queue to run
+    void started() {
+        if (capacity_ == 0) return;
+        queued_.fetch_sub(1);
+        if (room_waiters_.load() > 0) {
+            { std::lock_guard<std::mutex> lock(room_mutex_); }
+            room_cv_.notify_one();
+        }
+    }
+
+    // Skipped while a worker is searching, or already woken and about to,
+    // since it will see the new task before it sleeps
+    void wake_one() {
+        if (searching_.load() > 0 || waking_.load() || idle_.load() == 0) return;
+        {
+            std::lock_guard<std::mutex> lock(sleep_mutex_);
+            if (waking_.load() || idle_.load() == 0) return;
+            waking_.store(true);
+        }
+        sleep_cv_.notify_one();
+    }
+
+    bool has_work() const {
+        for (size_t i = 0; i < count_; i++) {
+            if (queues_[i].size.load() > 0) return true;
+        }
+        return false;
+    }
+
+    bool pop_local(size_t index, Task& task) {
+        Queue& queue = queues_[index];
+        std::lock_guard<std::mutex> lock(queue.mutex);
+        if (queue.tasks.empty()) return false;
+        task = queue.tasks.pop_front();
+        queue.size.store(queue.tasks.size(), std::memory_order_relaxed);
+        return true;
+    }
+
+    // Take the oldest task of the first non-empty queue, and move up to
+    // half of what remains there into our own queue
+    void steal(size_t thief, Task& task) {
+        Task batch[kStealBatch];
+        size_t taken = 0;
+        for (size_t k = 1; k < count_ && !task; k++) {
+            Queue& victim = queues_[(thief + k) % count_];
+            if (victim.size.load(std::memory_order_relaxed) == 0) continue;
+            std::lock_guard<std::mutex> lock(victim.mutex);
+            if (victim.tasks.empty()) continue;
+            task = victim.tasks.pop_front();
+            size_t half = victim.tasks.size() / 2;
+            while (taken < half && taken < kStealBatch) batch[taken++] = victim.tasks.pop_front();
+            victim.size.store(victim.tasks.size(), std::memory_order_relaxed);
+        }
+        if (taken > 0) {
+            Queue& own = queues_[thief];
+            std::lock_guard<std::mutex> lock(own.mutex);
+            for (size_t i = 0; i < taken; i++) own.tasks.push_back(std::move(batch[i]));
+            own.size.store(own.tasks.size());
+        }
+    }
+
+    // The last searcher to find a task hands the search on if work is left,
+    // since enqueues skipped waking anyone while it searched
+    void stop_searching() {
+        if (searching_.fetch_sub(1) == 1 && has_work()) wake_one();
+    }
+
+    void worker_thread(size_t index) {
+        if (options_.on_start) options_.on_start(index);
+        current_pool_ = this;
+        current_index_ = index;
+        bool searching = false;  // just woken, or out of local work
+        while (true) {
+            Task task;
+            if (!pop_local(index, task)) {
+                if (!searching) {
+                    searching = true;
+                    searching_.fetch_add(1);
                 }
+                steal(index, task);
             }
             if (task) {
+                if (searching) {
+                    searching = false;
+                    stop_searching();
+                }
+                started();
+                queues_[index].started.fetch_add(1, std::memory_order_relaxed);
                 task();
+                continue;
             }
+
+            searching = false;
+            searching_.fetch_sub(1);
+            std::unique_lock<std::mutex> lock(sleep_mutex_);
+            idle_.fetch_add(1);
+            bool retire = false;
+            while (!stop_ && !has_work() && !retire) {
+                if (count_ == min_threads_) {
+                    sleep_cv_.wait(lock);
+                } else if (sleep_cv_.wait_for(lock, options_.idle_timeout) == std::cv_status::timeout) {
+                    retire = !stop_ && !has_work() && live_.load() > min_threads_;
+                }
+                waking_.store(false);  // the wakeup is used even if this worker sleeps again
+            }
+            idle_.fetch_sub(1);
+            if (retire) {
+                // Whatever lands on this queue from now on is stolen
+                size_t from = live_.fetch_sub(1);
+                lock.unlock();
+                {
+                    std::lock_guard<std::mutex> slots(resize_mutex_);
+                    queues_[index].active.store(false);
+                }
+                if (options_.on_resize) options_.on_resize(from, from - 1, "idle");
+                return;
+            }
+            if (stop_ && !has_work()) return;
+            searching = true;
+            searching_.fetch_add(1);
+        }
+    }
+
+    uint64_t total_started() const {
+        uint64_t total = 0;
+        for (size_t i = 0; i < count_; i++) total += queues_[i].started.load(std::memory_order_relaxed);
+        return total;
+    }
+
+    // Samples the queue every target delay. By Little's law, tasks wait
+    // about queued / start rate; while that is over the target and no
+    // worker is idle, more workers are needed.
+    void monitor() {
+        uint64_t last_started = total_started();
+        auto last = std::chrono::steady_clock::now();
+        std::unique_lock<std::mutex> lock(monitor_mutex_);
+        while (!monitor_cv_.wait_for(lock, options_.target_delay, [this] { return monitor_stop_; })) {
+            auto now = std::chrono::steady_clock::now();
+            uint64_t started = total_started();
+            double seconds = std::chrono::duration<double>(now - last).count();
+            double rate = static_cast<double>(started - last_started) / seconds;
+            last_started = started;
+            last = now;
+
+            size_t queued = pending_tasks();
+            if (queued == 0 || idle_.load() > 0) continue;
+            double delay = rate > 0 ? static_cast<double>(queued) / rate : seconds;
+            if (delay * 1000 < static_cast<double>(options_.target_delay.count())) continue;
+
+            size_t live = live_.load();
+            size_t add = live / 2 > 0 ? live / 2 : 1;
+            if (add > count_ - live) add = count_ - live;
+            if (add > 0) grow(add);
         }
     }
 
+    void grow(size_t add) {
+        size_t from = 0;
+        size_t to = 0;
+        {
+            std::lock_guard<std::mutex> slots(resize_mutex_);
+            from = live_.load();
+            for (size_t i = 0; i < count_ && add > 0; i++) {
+                if (queues_[i].active.load()) continue;
+                if (workers_[i].joinable()) workers_[i].join();  // exited when idle
+                queues_[i].active.store(true);
+                live_.fetch_add(1);
+                add--;
+                workers_[i] = std::thread([this, i] { worker_thread(i); });
+            }
+            to = live_.load();
+        }
+        if (to != from && options_.on_resize) options_.on_resize(from, to, "queue delay");
+    }
+
+    inline static thread_local const ThreadPool* current_pool_ = nullptr;
+    inline static thread_local size_t current_index_ = 0;
+
+    size_t count_ = 0;
+    std::unique_ptr<Queue[]> queues_;
     std::vector<std::thread> workers_;
-    std::queue<std::function<void()>> tasks_;
-    mutable std::mutex queue_mutex_;
-    std::condition_variable condition_;
-    std::atomic<bool> stop_;
+    std::atomic<size_t> next_{0};
+    std::atomic<size_t> searching_{0};
+    std::atomic<size_t> idle_{0};
+    std::atomic<bool> waking_{false};  // a notified worker has not yet run
+    std::mutex sleep_mutex_;
+    std::condition_variable sleep_cv_;
+    bool stop_ = false;  // guarded by sleep_mutex_
+
+    // Admission; queued_ is only kept when the queue is bounded
+    const size_t capacity_;
+    const Overflow overflow_;
+    std::atomic<size_t> queued_{0};
+    std::atomic<size_t> room_waiters_{0};
+    std::mutex room_mutex_;
+    std::condition_variable room_cv_;
+    std::atomic<uint64_t> rejected_{0};
+    std::atomic<uint64_t> dropped_{0};
+    std::atomic<uint64_t> blocked_{0};
+
+    // Sizing; count_ is the most workers, one queue each
+    size_t min_threads_ = 0;
+    const Options options_;
+    std::atomic<size_t> live_{0};
+    std::mutex resize_mutex_;  // starting workers and retiring their queues
+    std::thread monitor_;
+    std::mutex monitor_mutex_;
+    std::condition_variable monitor_cv_;
+    bool monitor_stop_ = false;  // guarded by monitor_mutex_
 };
 
 } // namespace crest
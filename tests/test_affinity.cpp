@@ -0,0 +1,99 @@
+/**
+ * @file test_affinity.cpp
+ * @brief Tests for CPU topology parsing and thread pinning
+ */
+
+#include "server/affinity.hpp"
+#include <cassert>
+#include <iostream>
+#include <thread>
+#include <vector>
+
+using crest::server::group_cpus;
+using crest::server::parse_cpu_list;
+
+void test_parse_cpu_list() {
+    std::cout << "Testing CPU list parsing..." << std::endl;
+
+    assert((parse_cpu_list("0-3,8,10-11\n") == std::vector<int>{0, 1, 2, 3, 8, 10, 11}));
+    assert((parse_cpu_list("5") == std::vector<int>{5}));
+    assert((parse_cpu_list("4-5,0-1") == std::vector<int>{0, 1, 4, 5}));
+    assert(parse_cpu_list("").empty());
+    assert(parse_cpu_list("3-1").empty());
+    assert(parse_cpu_list("a-b").empty());
+    assert(parse_cpu_list("1,x").empty());
+
+    std::cout << "  ✓ Ranges, single CPUs and malformed lists" << std::endl;
+}
+
+void test_group_cpus() {
+    std::cout << "Testing CPUs shared between worker groups..." << std::endl;
+
+    std::vector<std::vector<int>> nodes = {{0, 1, 2, 3}, {4, 5, 6, 7}};
+
+    // One group per node
+    auto two = group_cpus(nodes, 2);
+    assert(two.size() == 2);
+    assert((two[0] == std::vector<int>{0, 1, 2, 3}));
+    assert((two[1] == std::vector<int>{4, 5, 6, 7}));
+
+    // A single group spans every node
+    auto one = group_cpus(nodes, 1);
+    assert(one.size() == 1 && one[0].size() == 8);
+
+    // More groups than nodes: each still stays on one node
+    auto three = group_cpus(nodes, 3);
+    assert(three.size() == 3);
+    assert(three[0] == nodes[0] && three[1] == nodes[1] && three[2] == nodes[0]);
+
+    assert(group_cpus({}, 2).empty());
+
+    std::cout << "  ✓ Each group stays on one NUMA node" << std::endl;
+}
+
+void test_pin_thread() {
+    std::cout << "Testing thread pinning..." << std::endl;
+
+    auto nodes = crest::server::numa_nodes();
+#if defined(__linux__)
+    assert(!nodes.empty());
+    size_t total = 0;
+    for (const auto& node : nodes) {
+        assert(!node.empty());
+        total += node.size();
+    }
+    std::vector<int> usable = crest::server::thread_cpus();
+    assert(total == usable.size());
+
+    // Pin a thread of its own so the test's main thread stays unpinned
+    int cpu = nodes.back().back();
+    std::thread pinned([cpu] {
+        bool pinned = crest::server::pin_thread({cpu});
+        assert(pinned);
+        std::vector<int> cpus = crest::server::thread_cpus();
+        assert((cpus == std::vector<int>{cpu}));
+    });
+    pinned.join();
+    std::vector<int> cpus = crest::server::thread_cpus();
+    assert(cpus == usable);
+    bool pinned_to_none = crest::server::pin_thread({});
+    assert(!pinned_to_none);
+#else
+    assert(nodes.empty());
+    bool pinned = crest::server::pin_thread({0});
+    assert(!pinned);
+#endif
+
+    std::cout << "  ✓ Threads are restricted to the given CPUs" << std::endl;
+}
+
+int main() {
+    std::cout << "\n=== Affinity Tests ===" << std::endl;
+
+    test_parse_cpu_list();
+    test_group_cpus();
+    test_pin_thread();
+
+    std::cout << "\n✅ All affinity tests passed!" << std::endl;
+    return 0;
+}
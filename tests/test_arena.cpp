@@ -0,0 +1,143 @@
+/**
+ * @file test_arena.cpp
+ * @brief Tests for the per-request arena allocator
+ */
+
+#include "crest/internal/app_internal.h"
+#include <cassert>
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+#include <iostream>
+#include <string>
+
+static bool aligned(void* ptr) {
+    return reinterpret_cast<uintptr_t>(ptr) % alignof(std::max_align_t) == 0;
+}
+
+void test_bump_allocation() {
+    std::cout << "Testing allocation from a caller's buffer..." << std::endl;
+
+    alignas(16) char buffer[256];
+    crest_arena_t arena;
+    crest_arena_init(&arena, buffer, sizeof(buffer));
+
+    char* a = static_cast<char*>(crest_arena_alloc(&arena, 10));
+    char* b = static_cast<char*>(crest_arena_alloc(&arena, 1));
+    char* c = static_cast<char*>(crest_arena_alloc(&arena, 0));
+    assert(a == buffer);
+    assert(b > a && b < buffer + sizeof(buffer));
+    assert(c > b && c < buffer + sizeof(buffer));
+    assert(aligned(a) && aligned(b) && aligned(c));
+    assert(arena.extra == nullptr);
+
+    // Reset hands out the same memory again
+    crest_arena_reset(&arena);
+    char* reused = static_cast<char*>(crest_arena_alloc(&arena, 10));
+    assert(reused == a);
+
+    crest_arena_destroy(&arena);
+    std::cout << "  ✓ Aligned allocations, recycled by reset" << std::endl;
+}
+
+void test_overflow() {
+    std::cout << "Testing allocations beyond the first block..." << std::endl;
+
+    alignas(16) char buffer[64];
+    crest_arena_t arena;
+    crest_arena_init(&arena, buffer, sizeof(buffer));
+
+    char* small = static_cast<char*>(crest_arena_alloc(&arena, 32));
+    char* large = static_cast<char*>(crest_arena_alloc(&arena, 1000));
+    assert(small == buffer);
+    assert(large && aligned(large));
+    assert(large < buffer || large >= buffer + sizeof(buffer));
+    assert(arena.extra != nullptr);
+    memset(small, 's', 32);
+    memset(large, 'x', 1000);
+    assert(small[31] == 's');
+
+    // The first block grows to fit what the request needed
+    crest_arena_reset(&arena);
+    assert(arena.extra == nullptr);
+    assert(arena.first != buffer && arena.first_owned);
+    assert(arena.first_size >= 32 + 1000);
+    char* again = static_cast<char*>(crest_arena_alloc(&arena, 1000));
+    assert(again == arena.first);
+    assert(arena.extra == nullptr);
+
+    // Requests above the kept size never grow it that far
+    crest_arena_reset(&arena);
+    size_t first_size = arena.first_size;
+    char* huge = static_cast<char*>(crest_arena_alloc(&arena, CREST_ARENA_KEEP_SIZE * 2));
+    assert(huge != nullptr);
+    crest_arena_reset(&arena);
+    assert(arena.first_size == first_size);
+
+    crest_arena_destroy(&arena);
+    assert(arena.first == nullptr && arena.extra == nullptr);
+    std::cout << "  ✓ Extra blocks freed on reset, first block grown to fit" << std::endl;
+}
+
+void test_zeroed_arena() {
+    std::cout << "Testing an arena with no buffer of its own..." << std::endl;
+
+    crest_arena_t arena = {};
+    void* ptr = crest_arena_alloc(&arena, 100);
+    assert(ptr && aligned(ptr));
+    assert(arena.first_owned && arena.first_size == CREST_ARENA_BLOCK_SIZE);
+    crest_arena_reset(&arena);
+    void* reused = crest_arena_alloc(&arena, 100);
+    assert(reused == ptr);
+    crest_arena_destroy(&arena);
+
+    std::cout << "  ✓ All zero is a valid empty arena" << std::endl;
+}
+
+void test_response_body() {
+    std::cout << "Testing response bodies from an arena..." << std::endl;
+
+    alignas(16) char buffer[1024];
+    crest_arena_t arena;
+    crest_arena_init(&arena, buffer, sizeof(buffer));
+
+    crest_response_t res = {};
+    res.keep_alive = true;
+    res.arena = &arena;
+    crest_response_json(&res, 200, "{\"ok\":true}");
+    crest_response_finish(&res);
+    assert(res.head >= buffer && res.head < buffer + sizeof(buffer));
+    assert(res.body >= buffer && res.body < buffer + sizeof(buffer));
+    std::string head(res.head, res.head_length);
+    assert(head.find("Content-Length: 11\r\n") != std::string::npos);
+    assert(head.size() >= 4 && head.compare(head.size() - 4, 4, "\r\n\r\n") == 0);
+    assert(std::string(res.body, res.body_length) == "{\"ok\":true}");
+
+    // Releasing leaves arena memory to the arena
+    crest_response_release(&res);
+    assert(res.head == nullptr && res.body == nullptr);
+    assert(res.head_length == 0 && res.body_length == 0);
+
+    crest_response_t heap = {};
+    crest_response_text(&heap, 404, "missing");
+    crest_response_finish(&heap);
+    assert(heap.head && std::string(heap.head, heap.head_length).find("HTTP/1.1 404") == 0);
+    assert(std::string(heap.body, heap.body_length) == "missing");
+    crest_response_release(&heap);
+    assert(heap.head == nullptr && heap.body == nullptr);
+
+    crest_arena_destroy(&arena);
+    std::cout << "  ✓ Head and body come from the arena and are not freed" << std::endl;
+}
+
+int main() {
+    std::cout << "\n=== Arena Tests ===" << std::endl;
+
+    test_bump_allocation();
+    test_overflow();
+    test_zeroed_arena();
+    test_response_body();
+
+    std::cout << "\n✅ All arena tests passed!" << std::endl;
+    return 0;
+}
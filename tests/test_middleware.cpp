@@ -5,8 +5,13 @@
 
 #include "crest/crest.hpp"
 #include "crest/middleware.hpp"
+#include "crest/internal/app_internal.h"
+#include "middleware/compression.hpp"
 #include <cassert>
+#include <cstring>
 #include <iostream>
+#include <string>
+#include <zlib.h>
 
 void test_cors_middleware() {
     std::cout << "Testing CORS middleware..." << std::endl;
@@ -55,6 +60,322 @@ void test_logging_middleware() {
     std::cout << "  ✓ Logging middleware created" << std::endl;
 }
 
+// Decode gzip or zlib data, whichever header it has
+static std::string inflate_all(const char* data, size_t length) {
+    z_stream z{};
+    int rc = inflateInit2(&z, 15 + 32);
+    assert(rc == Z_OK);
+    std::string out;
+    char buffer[65536];
+    z.next_in = reinterpret_cast<Bytef*>(const_cast<char*>(data));
+    z.avail_in = static_cast<uInt>(length);
+    do {
+        z.next_out = reinterpret_cast<Bytef*>(buffer);
+        z.avail_out = sizeof(buffer);
+        rc = inflate(&z, Z_NO_FLUSH);
+        assert(rc == Z_OK || rc == Z_STREAM_END);
+        out.append(buffer, sizeof(buffer) - z.avail_out);
+    } while (rc != Z_STREAM_END);
+    inflateEnd(&z);
+    return out;
+}
+
+static std::string json_payload(size_t bytes) {
+    std::string json = "[";
+    for (int i = 0; json.size() < bytes; i++) {
+        if (i > 0) json += ",";
+        json += "{\"id\":" + std::to_string(i) + ",\"name\":\"item " + std::to_string(i) +
+                "\",\"active\":" + (i % 2 ? "true" : "false") + "}";
+    }
+    return json + "]";
+}
+
+// Run the middleware for a request with these headers around a handler
+// that writes body
+static void compress_response(crest::CompressionMiddleware& compression, const char* accept,
+                              crest_response_t* raw, const std::string& body,
+                              const char* content_type = "application/json") {
+    crest_request_t request = {};
+    if (accept) crest_fields_add(&request.headers, "Accept-Encoding", 15, accept, true);
+    crest::Request req(&request);
+    crest::Response res(raw);
+    compression.handle(req, res, [&] { res.send(200, body, content_type); });
+}
+
+void test_compression_middleware() {
+    std::cout << "Testing compression middleware..." << std::endl;
+
+    crest::CompressionMiddleware compression;
+    std::string json = json_payload(4096);
+
+    crest_response_t res = {};
+    crest_response_set_header(&res, "ETag", "\"v1\"");
+    compress_response(compression, "gzip, deflate", &res, json);
+    assert(std::string(crest_response_get_header(&res, "Content-Encoding")) == "gzip");
+    assert(std::string(crest_response_get_header(&res, "Vary")) == "Accept-Encoding");
+    assert(std::string(crest_response_get_header(&res, "ETag")) == "W/\"v1\"");
+    assert(res.body_length < json.size() / 2);
+    assert(inflate_all(res.body, res.body_length) == json);
+    assert(std::string(res.content_type) == "application/json");
+    crest_response_release(&res);
+
+    // No Accept-Encoding: nothing is touched
+    res = {};
+    compress_response(compression, nullptr, &res, json);
+    assert(!crest_response_get_header(&res, "Content-Encoding"));
+    assert(!crest_response_get_header(&res, "Vary"));
+    assert(std::string(res.body, res.body_length) == json);
+    crest_response_release(&res);
+
+    // deflate when gzip is refused; nothing when both are
+    res = {};
+    compress_response(compression, "gzip;q=0, deflate", &res, json);
+    assert(std::string(crest_response_get_header(&res, "Content-Encoding")) == "deflate");
+    assert(inflate_all(res.body, res.body_length) == json);
+    crest_response_release(&res);
+    res = {};
+    compress_response(compression, "identity", &res, json);
+    assert(!crest_response_get_header(&res, "Content-Encoding"));
+    assert(std::string(crest_response_get_header(&res, "Vary")) == "Accept-Encoding");
+    crest_response_release(&res);
+
+    // Accept-Encoding joins a Vary the handler set, once, whatever its case
+    auto vary_after = [&](const char* vary) {
+        crest_response_t vres = {};
+        crest_response_set_header(&vres, "Vary", vary);
+        compress_response(compression, "gzip", &vres, json);
+        std::string merged = crest_response_get_header(&vres, "Vary");
+        crest_response_release(&vres);
+        return merged;
+    };
+    assert(vary_after("Origin") == "Origin, Accept-Encoding");
+    assert(vary_after("Origin, accept-encoding") == "Origin, accept-encoding");
+    assert(vary_after("ACCEPT-ENCODING") == "ACCEPT-ENCODING");
+    assert(vary_after("X-Accept-Encoding-Foo") == "X-Accept-Encoding-Foo, Accept-Encoding");
+    assert(vary_after("*") == "*");
+
+    // Small bodies and types outside the allowlist are sent as written
+    res = {};
+    compress_response(compression, "gzip", &res, "{\"ok\":true}");
+    assert(!crest_response_get_header(&res, "Content-Encoding") && res.body_length == 11);
+    crest_response_release(&res);
+    res = {};
+    compress_response(compression, "gzip", &res, json, "image/png");
+    assert(!crest_response_get_header(&res, "Content-Encoding"));
+    crest_response_release(&res);
+    res = {};
+    compress_response(compression, "gzip", &res, json, "application/problem+json; charset=utf-8");
+    assert(std::string(crest_response_get_header(&res, "Content-Encoding")) == "gzip");
+    crest_response_release(&res);
+
+    // Options narrow what is compressed
+    crest::CompressionMiddleware::Options opts;
+    opts.min_size = 8192;
+    opts.deflate = false;
+    crest::CompressionMiddleware strict(opts);
+    res = {};
+    compress_response(strict, "gzip", &res, json);
+    assert(!crest_response_get_header(&res, "Content-Encoding"));
+    crest_response_release(&res);
+    res = {};
+    compress_response(strict, "deflate", &res, json_payload(10000));
+    assert(!crest_response_get_header(&res, "Content-Encoding"));
+    crest_response_release(&res);
+
+    std::cout << "  ✓ Negotiated, filtered and decodable" << std::endl;
+}
+
+void test_compression_engine() {
+    std::cout << "Testing the compression engine..." << std::endl;
+    using crest::middleware::Encoding;
+
+    // Bodies past the streaming threshold round-trip at every level, and a
+    // reused stream gives the same bytes
+    std::string json = json_payload(3 * 1024 * 1024);
+    std::string first;
+    std::string again;
+    for (int level : {1, 6, 9}) {
+        bool shrank = crest::middleware::compress(Encoding::GZIP, level, json.data(), json.size(), first);
+        assert(shrank && first.size() < json.size() / 4);
+        assert(inflate_all(first.data(), first.size()) == json);
+        shrank = crest::middleware::compress(Encoding::GZIP, level, json.data(), json.size(), again);
+        assert(shrank && again == first);
+    }
+    bool shrank = crest::middleware::compress(Encoding::DEFLATE, 6, json.data(), json.size(), first);
+    assert(shrank);
+    assert(inflate_all(first.data(), first.size()) == json);
+
+    // Data that does not shrink is given up on
+    std::string noise(1024 * 1024, '\0');
+    uint32_t seed = 7;
+    for (char& c : noise) {
+        seed = seed * 1103515245u + 12345u;
+        c = static_cast<char>(seed >> 24);
+    }
+    shrank = crest::middleware::compress(Encoding::GZIP, 6, noise.data(), noise.size(), first);
+    assert(!shrank);
+    shrank = crest::middleware::compress(Encoding::GZIP, 6, noise.data(), 4096, first);
+    assert(!shrank);
+
+    std::cout << "  ✓ Streamed bodies round-trip, noise is skipped" << std::endl;
+}
+
+void test_precompressed_cache() {
+    std::cout << "Testing the precompressed cache..." << std::endl;
+    using crest::middleware::Encoding;
+    using crest::middleware::hash_body;
+
+    // A hit hands out the same bytes, one per encoding
+    crest::middleware::PrecompressedCache cache(64 * 1024);
+    std::string json = json_payload(20000);
+    uint64_t hash = hash_body(json.data(), json.size());
+    auto* gzip = cache.acquire("/spec", hash, json.data(), json.size(), Encoding::GZIP, 9);
+    assert(gzip && inflate_all(gzip->data.data(), gzip->data.size()) == json);
+    auto* again = cache.acquire("/spec", hash, json.data(), json.size(), Encoding::GZIP, 9);
+    assert(again == gzip && gzip->references.load() == 3);
+    auto* deflate = cache.acquire("/spec", hash, json.data(), json.size(), Encoding::DEFLATE, 9);
+    assert(deflate && deflate != gzip && inflate_all(deflate->data.data(), deflate->data.size()) == json);
+    size_t held = cache.cached_bytes();
+    assert(held >= gzip->data.size() + deflate->data.size());
+
+    // Other routes and other bodies are other entries
+    std::string changed = json;
+    changed[100] = 'x';
+    assert(hash_body(changed.data(), changed.size()) != hash);
+    auto* other = cache.acquire("/spec", hash_body(changed.data(), changed.size()), changed.data(),
+                                changed.size(), Encoding::GZIP, 9);
+    assert(other && other != gzip);
+    crest::middleware::release_compressed(other);
+
+    // A body whose hash collides with a cached one gets its own bytes
+    auto* forged = cache.acquire("/spec", hash, changed.data(), changed.size(), Encoding::GZIP, 9);
+    assert(forged && forged != gzip && inflate_all(forged->data.data(), forged->data.size()) == changed);
+    crest::middleware::release_compressed(forged);
+    again = cache.acquire("/spec", hash, json.data(), json.size(), Encoding::GZIP, 9);
+    assert(again == gzip);
+    crest::middleware::release_compressed(again);
+    held = cache.cached_bytes();
+    assert(held >= json.size() + gzip->data.size() + deflate->data.size());
+
+    // Bodies whose copy would not fit the budget are compressed every time
+    std::string huge = json_payload(80 * 1024);
+    uint64_t huge_hash = hash_body(huge.data(), huge.size());
+    auto* once = cache.acquire("/huge", huge_hash, huge.data(), huge.size(), Encoding::GZIP, 1);
+    auto* twice = cache.acquire("/huge", huge_hash, huge.data(), huge.size(), Encoding::GZIP, 1);
+    assert(once && twice && once != twice && cache.cached_bytes() == held);
+    crest::middleware::release_compressed(once);
+    crest::middleware::release_compressed(twice);
+
+    // A body that does not shrink is remembered as such
+    std::string noise(8192, '\0');
+    uint32_t seed = 11;
+    for (char& c : noise) {
+        seed = seed * 1103515245u + 12345u;
+        c = static_cast<char>(seed >> 24);
+    }
+    uint64_t noise_hash = hash_body(noise.data(), noise.size());
+    auto* incompressible = cache.acquire("/noise", noise_hash, noise.data(), noise.size(), Encoding::GZIP, 9);
+    assert(!incompressible);
+    incompressible = cache.acquire("/noise", noise_hash, noise.data(), noise.size(), Encoding::GZIP, 9);
+    assert(!incompressible);
+
+    // Past the budget the least recently used bodies go; responses still
+    // sending one keep it
+    for (int i = 0; i < 64; i++) {
+        std::string body = json_payload(20000 + i);
+        std::string route = "/filler/" + std::to_string(i);
+        auto* filler = cache.acquire(route, hash_body(body.data(), body.size()), body.data(), body.size(),
+                                     Encoding::GZIP, 1);
+        assert(filler);
+        crest::middleware::release_compressed(filler);
+    }
+    assert(cache.cached_bytes() <= 64 * 1024);
+    assert(gzip->references.load() == 2);
+    assert(inflate_all(gzip->data.data(), gzip->data.size()) == json);
+    auto* rebuilt = cache.acquire("/spec", hash, json.data(), json.size(), Encoding::GZIP, 9);
+    assert(rebuilt && rebuilt != gzip);
+    for (auto* body : {gzip, again, deflate, rebuilt}) crest::middleware::release_compressed(body);
+
+    std::cout << "  ✓ Built once, shared, and evicted by age" << std::endl;
+}
+
+void test_immutable_bodies() {
+    std::cout << "Testing compression of immutable bodies..." << std::endl;
+    crest::CompressionMiddleware compression;
+    std::string json = json_payload(20000);
+
+    auto send = [&](const char* path, const std::string& body, bool immutable, crest_response_t* raw,
+                    const char* route = nullptr) {
+        crest_request_t request = {};
+        request.path = const_cast<char*>(path);
+        request.route = route;
+        crest_fields_add(&request.headers, "Accept-Encoding", 15, "gzip", true);
+        crest::Request req(&request);
+        crest::Response res(raw);
+        compression.handle(req, res, [&] {
+            res.send(200, body, "application/json");
+            if (immutable) res.mark_immutable();
+        });
+    };
+
+    // Marked bodies share one compressed copy
+    crest_response_t first = {};
+    crest_response_t second = {};
+    send("/config", json, true, &first);
+    send("/config", json, true, &second);
+    assert(std::string(crest_response_get_header(&first, "Content-Encoding")) == "gzip");
+    assert(first.body == second.body && first.body_length == second.body_length);
+    assert(inflate_all(second.body, second.body_length) == json);
+    assert(!second.body_immutable);  // the mark went with the body it was for
+    crest_response_release(&first);
+    crest_response_release(&second);
+
+    // Entries belong to the matched route, not to each path it matches
+    first = {};
+    second = {};
+    send("/items/1", json, true, &first, "/items/:id");
+    send("/items/2", json, true, &second, "/items/:id");
+    assert(first.body == second.body);
+    crest_response_release(&first);
+    crest_response_release(&second);
+
+    // A different body on the same route is compressed anew
+    std::string changed = json_payload(30000);
+    first = {};
+    send("/config", changed, true, &first);
+    assert(inflate_all(first.body, first.body_length) == changed);
+    crest_response_release(&first);
+
+    // Unmarked bodies are compressed for each response
+    first = {};
+    second = {};
+    send("/config", json, false, &first);
+    send("/config", json, false, &second);
+    assert(first.body != second.body);
+    assert(inflate_all(first.body, first.body_length) == json);
+    crest_response_release(&first);
+    crest_response_release(&second);
+
+    // Without a cache marked bodies are compressed like any other
+    crest::CompressionMiddleware::Options options;
+    options.cache_bytes = 0;
+    crest::CompressionMiddleware uncached(options);
+    crest_request_t request = {};
+    crest_fields_add(&request.headers, "Accept-Encoding", 15, "gzip", true);
+    crest::Request req(&request);
+    first = {};
+    crest::Response res(&first);
+    uncached.handle(req, res, [&] {
+        res.send(200, json, "application/json");
+        res.mark_immutable();
+    });
+    assert(std::string(crest_response_get_header(&first, "Content-Encoding")) == "gzip");
+    assert(inflate_all(first.body, first.body_length) == json);
+    crest_response_release(&first);
+
+    std::cout << "  ✓ Compressed once and served from memory" << std::endl;
+}
+
 int main() {
     std::cout << "\n=== Middleware Tests ===" << std::endl;
     
@@ -62,6 +383,10 @@ int main() {
     test_rate_limit_middleware();
     test_auth_middleware();
     test_logging_middleware();
+    test_compression_middleware();
+    test_compression_engine();
+    test_precompressed_cache();
+    test_immutable_bodies();
     
     std::cout << "\n✅ All middleware tests passed!" << std::endl;
     return 0;
@@ -0,0 +1,152 @@
+/**
+ * @file test_openapi.cpp
+ * @brief Tests for the JSON writer and the OpenAPI document
+ */
+
+#include "crest/internal/app_internal.h"
+#include "swagger/json_writer.hpp"
+#include "swagger/openapi.hpp"
+#include <cassert>
+#include <iostream>
+#include <string>
+
+using crest::swagger::JsonWriter;
+
+static void noop(crest_request_t*, crest_response_t*) {}
+
+static size_t count(const std::string& text, const std::string& needle) {
+    size_t n = 0;
+    for (size_t at = text.find(needle); at != std::string::npos; at = text.find(needle, at + 1)) n++;
+    return n;
+}
+
+void test_json_writer() {
+    std::cout << "Testing the JSON writer..." << std::endl;
+
+    std::string out;
+    JsonWriter json(out);
+    json.begin_object()
+        .key("text").value("quote \" backslash \\ newline \n tab \t bell \x07")
+        .key("utf8").value("caf\xc3\xa9")
+        .key("list").begin_array().number(-12).boolean(true).null().begin_object().end_object().end_array()
+        .key("raw").raw("{\"a\":[1,2]}")
+        .key_raw("\"pre\\u0041encoded\"").value("")
+        .end_object();
+    assert(json.complete());
+    assert(out ==
+           "{\"text\":\"quote \\\" backslash \\\\ newline \\n tab \\t bell \\u0007\","
+           "\"utf8\":\"caf\xc3\xa9\","
+           "\"list\":[-12,true,null,{}],"
+           "\"raw\":{\"a\":[1,2]},"
+           "\"pre\\u0041encoded\":\"\"}");
+    assert(crest::swagger::valid_json(out));
+
+    // The validator takes standard JSON and nothing else
+    assert(crest::swagger::valid_json(" [1, -0.5e+3, \"\\u00e9\", {\"k\": null}] "));
+    assert(crest::swagger::valid_json("\"string\""));
+    assert(!crest::swagger::valid_json("{\"a\": 1,}"));
+    assert(!crest::swagger::valid_json("{\\\"a\\\":1}"));
+    assert(!crest::swagger::valid_json("[01]"));
+    assert(!crest::swagger::valid_json("\"raw\ttab\""));
+    assert(!crest::swagger::valid_json("{} {}"));
+    assert(!crest::swagger::valid_json(std::string(100, '[') + std::string(100, ']')));
+
+    std::cout << "  ✓ Escaping, separators and validation" << std::endl;
+}
+
+void test_methods_share_a_path() {
+    std::cout << "Testing routes grouped by path..." << std::endl;
+
+    crest_app_t* app = crest_create();
+    crest_set_title(app, "Say \"hi\"");
+    crest_route(app, CREST_GET, "/users/{id}", noop, "Get a user");
+    crest_route(app, CREST_POST, "/users", noop, "Create a user");
+    crest_route(app, CREST_PUT, "/users/{id}", noop, "Replace a user");
+    crest_route(app, CREST_DELETE, "/users/{id}", noop, "Delete a user");
+    crest_route(app, CREST_GET, "/files/*path", noop, "");
+    crest_route(app, CREST_HEAD, "/users/{id}", noop, "Check a user");
+
+    std::string spec = crest::swagger::generate_openapi_spec(app);
+    assert(crest::swagger::valid_json(spec));
+    assert(spec.find("\"title\":\"Say \\\"hi\\\"\"") != std::string::npos);
+    assert(count(spec, "\"/users/{id}\":{") == 1);
+    size_t item = spec.find("\"/users/{id}\":{");
+    size_t next_path = spec.find("\"/users\":{");
+    assert(next_path > item);
+    for (const char* method : {"\"get\":{", "\"put\":{", "\"delete\":{", "\"head\":{"}) {
+        size_t at = spec.find(method, item);
+        assert(at != std::string::npos && at < next_path);
+    }
+    assert(spec.find("\"/files/{path}\":{\"get\":{\"summary\":\"No description\"") != std::string::npos);
+    assert(spec.find("{\"name\":\"id\",\"in\":\"path\",\"required\":true") != std::string::npos);
+
+    crest_destroy(app);
+    std::cout << "  ✓ One path item holds every method" << std::endl;
+}
+
+void test_schemas() {
+    std::cout << "Testing schemas in the document..." << std::endl;
+
+    crest_app_t* app = crest_create();
+    crest_route(app, CREST_POST, "/orders", noop, "Create an order");
+    crest_set_request_schema(app, CREST_POST, "/orders",
+                             "{\"sku\": \"string\", \"count\": \"integer\", \"email\": \"email\","
+                             " \"tags\": [\"string\"], \"address\": {\"city\": \"string\"}}");
+    crest_set_response_schema(app, CREST_POST, "/orders",
+                              "{\"type\": \"object\", \"required\": [\"id\"], \"properties\": {\"id\": {\"type\": \"integer\"}}}");
+    crest_route(app, CREST_GET, "/broken", noop, "Broken schema");
+    crest_set_response_schema(app, CREST_GET, "/broken", "{id: number");
+
+    std::string spec = crest::swagger::generate_openapi_spec(app);
+    assert(crest::swagger::valid_json(spec));
+
+    // Shorthand is expanded into JSON Schema
+    assert(spec.find("\"requestBody\":{\"required\":true,\"content\":{\"application/json\":{\"schema\":"
+                     "{\"type\":\"object\",\"properties\":{"
+                     "\"sku\":{\"type\":\"string\"},"
+                     "\"count\":{\"type\":\"integer\"},"
+                     "\"email\":{\"type\":\"string\",\"format\":\"email\"},"
+                     "\"tags\":{\"type\":\"array\",\"items\":{\"type\":\"string\"}},"
+                     "\"address\":{\"type\":\"object\",\"properties\":{\"city\":{\"type\":\"string\"}}}}}}}}") !=
+           std::string::npos);
+    // A schema that already is JSON Schema is kept as written
+    assert(spec.find("\"schema\":{\"type\": \"object\", \"required\": [\"id\"]") != std::string::npos);
+    // Text that is not JSON is kept as a description
+    assert(spec.find("\"description\":\"{id: number\"") != std::string::npos);
+
+    crest_destroy(app);
+    std::cout << "  ✓ Shorthand expanded, schemas embedded" << std::endl;
+}
+
+void test_large_tables() {
+    std::cout << "Testing a large route table..." << std::endl;
+
+    crest_app_t* app = crest_create();
+    const crest_method_t methods[] = {CREST_GET, CREST_POST, CREST_PUT, CREST_DELETE, CREST_PATCH};
+    for (int i = 0; i < 5000; i++) {
+        std::string path = "/api/resource" + std::to_string(i / 5) + "/{id}";
+        crest_route(app, methods[i % 5], path.c_str(), noop, "Generated route");
+    }
+
+    std::string spec = crest::swagger::generate_openapi_spec(app);
+    assert(crest::swagger::valid_json(spec));
+    assert(spec.size() > 1000000);
+    assert(count(spec, "\"/api/resource") == 1000);
+    assert(spec.find("\"/api/resource999/{id}\":{\"get\"") != std::string::npos);
+    assert(count(spec, "\"patch\":{") == 1000);
+
+    crest_destroy(app);
+    std::cout << "  ✓ 5000 routes, nothing cut off" << std::endl;
+}
+
+int main() {
+    std::cout << "\n=== OpenAPI Tests ===" << std::endl;
+
+    test_json_writer();
+    test_methods_share_a_path();
+    test_schemas();
+    test_large_tables();
+
+    std::cout << "\n✅ All OpenAPI tests passed!" << std::endl;
+    return 0;
+}
@@ -0,0 +1,315 @@
+/**
+ * @file test_parser.cpp
+ * @brief Tests for the incremental HTTP request parser
+ */
+
+#include "server/http_parser.hpp"
+#include <cassert>
+#include <iostream>
+#include <string>
+
+using crest::server::HttpParser;
+using crest::server::ParsedRequest;
+
+// The buffer is writable: chunked bodies are decoded in place
+static HttpParser::Result parse_all(std::string& raw, ParsedRequest& out, HttpParser& parser) {
+    return parser.parse(raw.data(), raw.size(), out);
+}
+
+static int error_of(std::string raw, size_t max_body_size = crest::server::kDefaultMaxBodySize) {
+    HttpParser parser;
+    ParsedRequest request;
+    parser.set_max_body_size(max_body_size);
+    if (parse_all(raw, request, parser) != HttpParser::Result::ERROR) return 0;
+    return parser.error_status();
+}
+
+void test_simple_request() {
+    std::cout << "Testing request line and headers..." << std::endl;
+
+    std::string raw = "GET /users/42?sort=asc&limit=5 HTTP/1.1\r\n"
+                      "Host: localhost\r\n"
+                      "X-Trace:   abc  \r\n"
+                      "\r\n";
+    HttpParser parser;
+    ParsedRequest request;
+    auto result = parse_all(raw, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+
+    assert(request.method == "GET");
+    assert(request.target == "/users/42?sort=asc&limit=5");
+    assert(request.path == "/users/42");
+    assert(request.query == "sort=asc&limit=5");
+    assert(request.version_minor == 1);
+    assert(request.keep_alive);
+    assert(request.body.empty());
+    assert(request.length == raw.size());
+
+    assert(request.header_count == 2);
+    assert(request.headers[0].name == "Host");
+    assert(request.headers[0].value == "localhost");
+    assert(request.headers[1].name == "X-Trace");
+    assert(request.headers[1].value == "abc");
+
+    // Views point into the buffer rather than at copies
+    assert(request.path.data() == raw.data() + 4);
+
+    std::cout << "  ✓ Request parsed" << std::endl;
+}
+
+void test_body_and_pipelining() {
+    std::cout << "Testing Content-Length bodies..." << std::endl;
+
+    std::string first = "POST /echo HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello";
+    std::string raw = first + "GET /next HTTP/1.1\r\n\r\n";
+    HttpParser parser;
+    ParsedRequest request;
+    auto result = parse_all(raw, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+    assert(request.content_length == 5);
+    assert(request.body == "hello");
+    assert(request.length == first.size());
+
+    // The next request starts right after the previous one
+    parser.reset();
+    std::string rest = raw.substr(request.length);
+    result = parse_all(rest, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+    assert(request.path == "/next");
+
+    std::cout << "  ✓ Bodies and pipelined requests parsed" << std::endl;
+}
+
+void test_byte_at_a_time() {
+    std::cout << "Testing requests split into single bytes..." << std::endl;
+
+    std::string raw = "\r\nPUT /items HTTP/1.1\r\nHost: x\r\nContent-Length: 3\r\n\r\nabc";
+    HttpParser parser;
+    ParsedRequest request;
+    std::string buffer;
+    for (size_t i = 0; i < raw.size(); i++) {
+        buffer += raw[i];
+        // The buffer reallocates as it grows; offsets stay valid
+        auto result = parser.parse(buffer.data(), buffer.size(), request);
+        if (i + 1 < raw.size()) {
+            assert(result == HttpParser::Result::INCOMPLETE);
+        } else {
+            assert(result == HttpParser::Result::COMPLETE);
+        }
+    }
+    assert(request.method == "PUT");
+    assert(request.path == "/items");
+    assert(request.body == "abc");
+    assert(request.length == raw.size());
+
+    std::cout << "  ✓ Split request parsed" << std::endl;
+}
+
+void test_connection_header() {
+    std::cout << "Testing persistent connection rules..." << std::endl;
+
+    HttpParser parser;
+    ParsedRequest request;
+
+    std::string raw = "GET / HTTP/1.1\r\nConnection: Upgrade, close\r\n\r\n";
+    auto result = parse_all(raw, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+    assert(!request.keep_alive);
+
+    parser.reset();
+    raw = "GET / HTTP/1.0\r\n\r\n";
+    result = parse_all(raw, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+    assert(!request.keep_alive);
+
+    parser.reset();
+    raw = "GET / HTTP/1.0\r\nconnection: Keep-Alive\r\n\r\n";
+    result = parse_all(raw, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+    assert(request.keep_alive);
+
+    std::cout << "  ✓ Keep-alive detected" << std::endl;
+}
+
+void test_chunked_body() {
+    std::cout << "Testing chunked bodies..." << std::endl;
+
+    std::string first = "POST /upload HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                        "5\r\nhello\r\n"
+                        "1;name=value\r\n \r\n"
+                        "A\r\n0123456789\r\n"
+                        "0\r\nX-Checksum: abc\r\n\r\n";
+    std::string raw = first + "GET /next HTTP/1.1\r\n\r\n";
+    HttpParser parser;
+    ParsedRequest request;
+    auto result = parse_all(raw, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+    assert(request.chunked);
+    assert(request.body == "hello 0123456789");
+    assert(request.content_length == 16);
+    assert(request.length == first.size());
+    assert(raw.compare(first.size(), std::string::npos, "GET /next HTTP/1.1\r\n\r\n") == 0);
+
+    // Fed one byte at a time, including partial chunk-size lines and CRLFs
+    HttpParser split;
+    std::string buffer;
+    for (size_t i = 0; i < first.size(); i++) {
+        buffer += first[i];
+        result = split.parse(buffer.data(), buffer.size(), request);
+        assert(result == (i + 1 < first.size() ? HttpParser::Result::INCOMPLETE
+                                                : HttpParser::Result::COMPLETE));
+    }
+    assert(request.body == "hello 0123456789");
+
+    std::cout << "  ✓ Chunked body decoded" << std::endl;
+}
+
+void test_body_limits() {
+    std::cout << "Testing body size limits..." << std::endl;
+
+    // Rejected from the headers alone, before any body arrives
+    assert(error_of("POST / HTTP/1.1\r\nContent-Length: 11\r\n\r\n", 10) == 413);
+
+    HttpParser parser;
+    ParsedRequest request;
+    parser.set_max_body_size(10);
+    std::string raw = "POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\n0123456789";
+    auto result = parse_all(raw, request, parser);
+    assert(result == HttpParser::Result::COMPLETE);
+
+    assert(error_of("POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                    "6\r\nabcdef\r\n5\r\n", 10) == 413);
+
+    // Expect: 100-continue is honoured only once the body is due
+    HttpParser expect;
+    raw = "POST / HTTP/1.1\r\nExpect: 100-continue\r\nContent-Length: 4\r\n";
+    result = parse_all(raw, request, expect);
+    assert(result == HttpParser::Result::INCOMPLETE);
+    assert(!expect.expects_continue());
+    raw += "\r\n";
+    result = parse_all(raw, request, expect);
+    assert(result == HttpParser::Result::INCOMPLETE);
+    assert(expect.expects_continue());
+    assert(expect.expected_length() == raw.size() + 4);
+
+    std::cout << "  ✓ Limits enforced" << std::endl;
+}
+
+void test_streamed_body() {
+    std::cout << "Testing bodies decoded outside the buffer..." << std::endl;
+
+    // The head is complete without the body; the limit is the caller's
+    std::string raw = "POST /ingest HTTP/1.1\r\nContent-Length: 20\r\n\r\n";
+    HttpParser parser;
+    ParsedRequest request;
+    parser.set_max_body_size(10);
+    auto head = parser.parse_head(raw.data(), raw.size(), request);
+    assert(head == HttpParser::Result::COMPLETE);
+    assert(request.path == "/ingest");
+    assert(request.content_length == 20);
+    assert(request.body.data() == nullptr);
+    assert(request.length == raw.size());
+
+    crest::server::BodyDecoder decoder;
+    bool started = parser.body_decoder(19, decoder);
+    assert(!started);
+    assert(parser.error_status() == 413);
+
+    parser.reset();
+    head = parser.parse_head(raw.data(), raw.size(), request);
+    assert(head == HttpParser::Result::COMPLETE);
+    started = parser.body_decoder(20, decoder);
+    assert(started);
+
+    // Read into an output smaller than the body
+    std::string body = "0123456789abcdefghij" + std::string("GET / HTTP/1.1\r\n\r\n");
+    std::string decoded;
+    size_t offset = 0;
+    char out[8];
+    while (!decoder.done()) {
+        size_t consumed = 0;
+        size_t produced = 0;
+        auto result = decoder.decode(body.data() + offset, body.size() - offset, out, sizeof(out),
+                                     consumed, produced);
+        assert(result != crest::server::ParseResult::ERROR);
+        assert(produced <= sizeof(out));
+        decoded.append(out, produced);
+        offset += consumed;
+    }
+    assert(decoded == "0123456789abcdefghij");
+    assert(offset == 20);
+
+    // Chunked input arriving a byte at a time
+    std::string chunked = "5\r\nhello\r\n6;x=y\r\n world\r\n0\r\nX-Sum: 1\r\n\r\n";
+    decoder.start_chunked(11);
+    std::string pending;
+    decoded.clear();
+    for (char c : chunked) {
+        pending += c;
+        size_t consumed = 0;
+        size_t produced = 0;
+        auto result = decoder.decode(pending.data(), pending.size(), out, sizeof(out), consumed, produced);
+        assert(result != crest::server::ParseResult::ERROR);
+        decoded.append(out, produced);
+        pending.erase(0, consumed);
+    }
+    assert(decoder.done());
+    assert(pending.empty());
+    assert(decoded == "hello world");
+
+    // Refused at the chunk-size line that would cross the limit
+    decoder.start_chunked(10);
+    size_t consumed = 0;
+    size_t produced = 0;
+    std::string big = "5\r\nhello\r\n6\r\n";
+    auto refused = decoder.decode(big.data(), big.size(), out, sizeof(out), consumed, produced);
+    assert(refused == crest::server::ParseResult::ERROR);
+    assert(decoder.error_status() == 413);
+
+    std::cout << "  ✓ Body decoded in pieces" << std::endl;
+}
+
+void test_malformed_requests() {
+    std::cout << "Testing malformed requests..." << std::endl;
+
+    assert(error_of("GET\r\n\r\n") == 400);
+    assert(error_of("GET /path\r\n\r\n") == 400);
+    assert(error_of("GET /path HTTP/2.0\r\n\r\n") == 400);
+    assert(error_of("G(T / HTTP/1.1\r\n\r\n") == 400);
+    assert(error_of("GET / HTTP/1.1\r\nBad Header: x\r\n\r\n") == 400);
+    assert(error_of("GET / HTTP/1.1\r\nNoColon\r\n\r\n") == 400);
+    assert(error_of("GET / HTTP/1.1\r\nA: b\r\n  folded\r\n\r\n") == 400);
+    assert(error_of("POST / HTTP/1.1\r\nContent-Length: 1x\r\n\r\n") == 400);
+    assert(error_of("POST / HTTP/1.1\r\nContent-Length: 99999999999999999999999\r\n\r\n") == 400);
+    assert(error_of("POST / HTTP/1.1\r\nContent-Length: 1\r\nContent-Length: 2\r\n\r\n") == 400);
+    assert(error_of("POST / HTTP/1.1\r\nContent-Length: 2\r\nTransfer-Encoding: chunked\r\n\r\n") == 400);
+    assert(error_of("POST / HTTP/1.1\r\nTransfer-Encoding: chunked, gzip\r\n\r\n") == 400);
+    assert(error_of("POST / HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\n") == 501);
+    assert(error_of("POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n") == 400);
+    assert(error_of("POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n1\r\nab\r\n") == 400);
+
+    std::string many = "GET / HTTP/1.1\r\n";
+    for (size_t i = 0; i <= crest::server::kMaxHeaders; i++) many += "X-H: v\r\n";
+    assert(error_of(many + "\r\n") == 431);
+
+    std::string huge = "GET / HTTP/1.1\r\nX-Big: " + std::string(crest::server::kMaxHeaderBytes, 'a');
+    assert(error_of(huge) == 431);
+
+    std::cout << "  ✓ Malformed requests rejected" << std::endl;
+}
+
+int main() {
+    std::cout << "\n=== HTTP Parser Tests ===" << std::endl;
+
+    test_simple_request();
+    test_body_and_pipelining();
+    test_byte_at_a_time();
+    test_connection_header();
+    test_chunked_body();
+    test_body_limits();
+    test_streamed_body();
+    test_malformed_requests();
+
+    std::cout << "\n✅ All parser tests passed!" << std::endl;
+    return 0;
+}
@@ -0,0 +1,291 @@
+/**
+ * @file test_response.cpp
+ * @brief Tests for response headers and serialization
+ */
+
+#include "crest/internal/app_internal.h"
+#include <cassert>
+#include <cstdlib>
+#include <cstring>
+#include <iostream>
+#include <string>
+
+static std::string head_of(const crest_response_t& res) {
+    return res.head ? std::string(res.head, res.head_length) : std::string();
+}
+
+static bool has_line(const std::string& head, const std::string& line) {
+    return head.find("\r\n" + line + "\r\n") != std::string::npos;
+}
+
+void test_status_lines() {
+    std::cout << "Testing status lines..." << std::endl;
+
+    const int statuses[] = {200, 201, 204, 304, 400, 404, 413, 429, 500, 503};
+    const char* reasons[] = {"OK", "Created", "No Content", "Not Modified", "Bad Request",
+                             "Not Found", "Payload Too Large", "Too Many Requests",
+                             "Internal Server Error", "Service Unavailable"};
+    for (size_t i = 0; i < sizeof(statuses) / sizeof(statuses[0]); i++) {
+        crest_response_t res = {};
+        crest_response_text(&res, statuses[i], "x");
+        crest_response_finish(&res);
+        std::string line = "HTTP/1.1 " + std::to_string(statuses[i]) + " " + reasons[i] + "\r\n";
+        assert(head_of(res).compare(0, line.size(), line) == 0);
+        assert(std::string(crest_status_reason(statuses[i])) == reasons[i]);
+        crest_response_release(&res);
+    }
+
+    // Codes without a table entry keep an empty reason phrase
+    crest_response_t res = {};
+    crest_response_text(&res, 299, "x");
+    crest_response_finish(&res);
+    assert(head_of(res).find("HTTP/1.1 299 \r\n") == 0);
+    assert(std::string(crest_status_reason(299)).empty());
+    crest_response_release(&res);
+
+    std::cout << "  ✓ Reason phrases match the status" << std::endl;
+}
+
+void test_headers() {
+    std::cout << "Testing response headers..." << std::endl;
+
+    crest_response_t res = {};
+    res.keep_alive = true;
+
+    // Headers set before the body is written are kept
+    crest_response_set_header(&res, "X-Request-Id", "abc");
+    crest_response_set_header(&res, "Cache-Control", "no-store");
+    crest_response_json(&res, 201, "{\"id\":1}");
+    crest_response_set_header(&res, "x-request-id", "def");
+    assert(res.header_count == 2);
+    assert(std::string(crest_response_get_header(&res, "X-REQUEST-ID")) == "def");
+    assert(crest_response_get_header(&res, "Missing") == nullptr);
+
+    // The server owns framing, and values cannot start new lines
+    crest_response_set_header(&res, "Content-Length", "1");
+    crest_response_set_header(&res, "Connection", "close");
+    crest_response_set_header(&res, "X-Injected", "a\r\nSet-Cookie: b");
+    crest_response_set_header(&res, "Bad:Name", "c");
+    assert(res.header_count == 2);
+
+    crest_response_finish(&res);
+    std::string head = head_of(res);
+    assert(head.find("HTTP/1.1 201 Created\r\n") == 0);
+    assert(has_line(head, "Content-Type: application/json"));
+    assert(has_line(head, "Content-Length: 8"));
+    assert(has_line(head, "Connection: keep-alive"));
+    assert(has_line(head, "x-request-id: def"));
+    assert(has_line(head, "Cache-Control: no-store"));
+    assert(head.find("Injected") == std::string::npos);
+    assert(head.compare(head.size() - 4, 4, "\r\n\r\n") == 0);
+    assert(std::string(res.body, res.body_length) == "{\"id\":1}");
+
+    // Finishing twice keeps the first head
+    const char* first = res.head;
+    crest_response_finish(&res);
+    assert(res.head == first);
+
+    crest_response_release(&res);
+    assert(res.header_count == 0 && res.head == nullptr);
+
+    std::cout << "  ✓ Set, replaced and rejected headers" << std::endl;
+}
+
+void test_overrides() {
+    std::cout << "Testing headers the server would add..." << std::endl;
+
+    crest_response_t res = {};
+    crest_response_set_header(&res, "Content-Type", "application/problem+json");
+    crest_response_set_header(&res, "Date", "Thu, 01 Jan 1970 00:00:00 GMT");
+    crest_response_json(&res, 400, "{}");
+    crest_response_finish(&res);
+    std::string head = head_of(res);
+    assert(has_line(head, "Content-Type: application/problem+json"));
+    assert(head.find("application/json") == std::string::npos);
+    assert(has_line(head, "Date: Thu, 01 Jan 1970 00:00:00 GMT"));
+    assert(head.find("Date: ") == head.rfind("Date: "));
+    assert(has_line(head, "Connection: close"));
+    crest_response_clear(&res);
+
+    // A generated Date has the RFC 7231 fixed-length form
+    crest_response_text(&res, 200, "ok");
+    crest_response_finish(&res);
+    head = head_of(res);
+    size_t date = head.find("\r\nDate: ");
+    assert(date != std::string::npos);
+    std::string value = head.substr(date + 8, head.find("\r\n", date + 2) - date - 8);
+    assert(value.size() == 29);
+    assert(value[3] == ',' && value.compare(26, 3, "GMT") == 0);
+    crest_response_clear(&res);
+
+    // No body, and no Content-Length, for 204 and 304
+    crest_response_text(&res, 204, "ignored");
+    crest_response_finish(&res);
+    head = head_of(res);
+    assert(head.find("Content-Length") == std::string::npos);
+    assert(head.find("Content-Type") == std::string::npos);
+    assert(res.body_length == 0);
+    crest_response_release(&res);
+
+    std::cout << "  ✓ Handler headers take precedence" << std::endl;
+}
+
+void test_arena_headers() {
+    std::cout << "Testing headers in an arena..." << std::endl;
+
+    alignas(16) char buffer[2048];
+    crest_arena_t arena;
+    crest_arena_init(&arena, buffer, sizeof(buffer));
+
+    crest_response_t res = {};
+    res.arena = &arena;
+    crest_response_set_header(&res, "X-One", "1");
+    crest_response_text(&res, 200, "hello");
+    crest_response_finish(&res);
+    assert(res.headers[0].name >= buffer && res.headers[0].name < buffer + sizeof(buffer));
+    assert(res.head >= buffer && res.head < buffer + sizeof(buffer));
+    assert(has_line(head_of(res), "X-One: 1"));
+
+    // Cleared for the next request, with the arena kept
+    crest_response_clear(&res);
+    assert(res.header_count == 0 && !res.sent && res.status == 200);
+    assert(res.arena == &arena);
+
+    crest_arena_destroy(&arena);
+    std::cout << "  ✓ Header copies come from the arena" << std::endl;
+}
+
+static int released = 0;
+
+static void count_release(void* data) {
+    released++;
+    free(data);
+}
+
+void test_binary_bodies() {
+    std::cout << "Testing bodies with explicit lengths..." << std::endl;
+
+    const char bytes[] = {'a', '\0', 'b', '\0', '\xff'};
+    char type[] = "image/x-test";
+    crest_response_t res = {};
+    crest_response_bytes(&res, 200, type, bytes, sizeof(bytes));
+    type[0] = 'X';  // the response kept a copy
+    crest_response_finish(&res);
+    assert(res.body_length == sizeof(bytes));
+    assert(memcmp(res.body, bytes, sizeof(bytes)) == 0);
+    assert(has_line(head_of(res), "Content-Type: image/x-test"));
+    assert(has_line(head_of(res), "Content-Length: 5"));
+    crest_response_clear(&res);
+
+    crest_response_bytes(&res, 200, nullptr, "", 0);
+    crest_response_finish(&res);
+    assert(has_line(head_of(res), "Content-Type: application/octet-stream"));
+    assert(has_line(head_of(res), "Content-Length: 0"));
+    crest_response_clear(&res);
+
+    std::cout << "  ✓ NUL bytes and content types are kept" << std::endl;
+}
+
+void test_owned_bodies() {
+    std::cout << "Testing bodies handed to the response..." << std::endl;
+
+    // Written from the handler's buffer, then released once
+    char* data = static_cast<char*>(malloc(4));
+    memcpy(data, "owned", 4);
+    crest_response_t res = {};
+    crest_response_bytes_owned(&res, 200, "text/plain", data, 4, count_release);
+    crest_response_finish(&res);
+    assert(res.body == data && res.body_length == 4);
+    assert(released == 0);
+    crest_response_clear(&res);
+    assert(released == 1 && res.body == nullptr);
+
+    // A response that was already written still takes the buffer
+    crest_response_text(&res, 200, "first");
+    char* late = static_cast<char*>(malloc(4));
+    crest_response_bytes_owned(&res, 500, nullptr, late, 4, count_release);
+    assert(released == 2);
+    assert(res.status == 200 && std::string(res.body, res.body_length) == "first");
+    crest_response_clear(&res);
+
+    // Without a release function the data is only borrowed
+    static const char fixed[] = "static";
+    crest_response_bytes_owned(&res, 200, nullptr, const_cast<char*>(fixed), 6, nullptr);
+    assert(res.body == fixed);
+    crest_response_release(&res);
+    assert(released == 2);
+
+    std::cout << "  ✓ Buffers are sent in place and released after" << std::endl;
+}
+
+static int closed_files = 0;
+
+static void count_close(void* context) {
+    closed_files++;
+    (void)context;
+}
+
+void test_file_bodies() {
+    std::cout << "Testing bodies sent from a file..." << std::endl;
+
+    crest_response_t res = {};
+    crest_response_file(&res, 206, "text/plain", 7, 100, 50, count_close, nullptr);
+    crest_response_finish(&res);
+    assert(res.body_from_file && res.body_file == 7 && res.body_offset == 100);
+    assert(res.body == nullptr && res.body_length == 50);
+    assert(has_line(head_of(res), "Content-Length: 50"));
+    assert(head_of(res).find("HTTP/1.1 206 Partial Content\r\n") == 0);
+    crest_response_clear(&res);
+    assert(closed_files == 1 && !res.body_from_file);
+
+    char date[CREST_HTTP_DATE_LENGTH + 1];
+    size_t length = crest_format_http_date(784111777, date);
+    assert(length == CREST_HTTP_DATE_LENGTH);
+    assert(std::string(date) == "Sun, 06 Nov 1994 08:49:37 GMT");
+
+    std::cout << "  ✓ Files are described, not read" << std::endl;
+}
+
+void test_replaced_bodies() {
+    std::cout << "Testing bodies replaced after the handler..." << std::endl;
+
+    // Status, copied content type and headers survive; the new body is taken
+    crest_response_t res = {};
+    crest_response_set_header(&res, "X-Kept", "1");
+    crest_response_bytes(&res, 201, "application/x-test", "original", 8);
+    char* data = static_cast<char*>(malloc(3));
+    memcpy(data, "new", 3);
+    crest_response_replace_body(&res, data, 3, count_release, data);
+    assert(res.body == data && res.body_length == 3);
+    crest_response_finish(&res);
+    std::string head = head_of(res);
+    assert(head.find("HTTP/1.1 201 Created\r\n") == 0);
+    assert(has_line(head, "Content-Type: application/x-test"));
+    assert(has_line(head, "Content-Length: 3"));
+    assert(has_line(head, "X-Kept: 1"));
+
+    // Too late once the head is built: the new body is released unused
+    char* late = static_cast<char*>(malloc(4));
+    crest_response_replace_body(&res, late, 4, count_release, late);
+    assert(released == 3 && res.body == data);
+    crest_response_release(&res);
+    assert(released == 4);
+
+    std::cout << "  ✓ Only the body changes" << std::endl;
+}
+
+int main() {
+    std::cout << "\n=== Response Tests ===" << std::endl;
+
+    test_status_lines();
+    test_headers();
+    test_overrides();
+    test_arena_headers();
+    test_binary_bodies();
+    test_owned_bodies();
+    test_file_bodies();
+    test_replaced_bodies();
+
+    std::cout << "\n✅ All response tests passed!" << std::endl;
+    return 0;
+}
@@ -0,0 +1,374 @@
+/**
+ * @file test_router.cpp
+ * @brief Tests for the radix-tree router and path parameters
+ */
+
+#include "crest/crest.hpp"
+#include "crest/internal/app_internal.h"
+#include "router/route_table.hpp"
+#include "router/route_tree.hpp"
+#include "server/server_internal.hpp"
+#include <atomic>
+#include <cassert>
+#include <chrono>
+#include <cstring>
+#include <iostream>
+#include <memory>
+#include <string>
+#include <thread>
+#include <vector>
+
+using crest::router::RouteMatch;
+using crest::router::RouteTree;
+
+static std::string param_of(const RouteMatch& match, const std::string& name) {
+    for (size_t i = 0; i < match.param_count; i++) {
+        if (match.params[i].name == name) return std::string(match.params[i].value);
+    }
+    return "<none>";
+}
+
+void test_static_routes() {
+    std::cout << "Testing static routes..." << std::endl;
+
+    RouteTree tree;
+    bool inserted = tree.insert("/", 0);
+    assert(inserted);
+    inserted = tree.insert("/users", 1);
+    assert(inserted);
+    inserted = tree.insert("/user", 2);
+    assert(inserted);
+    inserted = tree.insert("/users/all", 3);
+    assert(inserted);
+    inserted = tree.insert("/items", 4);
+    assert(inserted);
+    inserted = tree.insert("/users", 5);
+    assert(!inserted);
+
+    RouteMatch match;
+    bool found = tree.find("/", match);
+    assert(found && match.route == 0);
+    found = tree.find("/users", match);
+    assert(found && match.route == 1);
+    found = tree.find("/user", match);
+    assert(found && match.route == 2);
+    found = tree.find("/users/all", match);
+    assert(found && match.route == 3);
+    found = tree.find("/items", match);
+    assert(found && match.route == 4);
+    found = tree.find("/use", match);
+    assert(!found);
+    found = tree.find("/users/", match);
+    assert(!found);
+    found = tree.find("/users/all/x", match);
+    assert(!found);
+    found = tree.find("", match);
+    assert(!found);
+
+    std::cout << "  ✓ Static routes" << std::endl;
+}
+
+void test_parameters() {
+    std::cout << "Testing parameter and wildcard segments..." << std::endl;
+
+    RouteTree tree;
+    bool inserted = tree.insert("/users/{id}", 0);
+    assert(inserted);
+    inserted = tree.insert("/users/me", 1);
+    assert(inserted);
+    inserted = tree.insert("/users/{id}/posts/{post}", 2);
+    assert(inserted);
+    inserted = tree.insert("/files/*path", 3);
+    assert(inserted);
+    inserted = tree.insert("/files/readme", 4);
+    assert(inserted);
+    inserted = tree.insert("/users/{id}/files/*", 5);
+    assert(inserted);
+
+    RouteMatch match;
+    bool found = tree.find("/users/42", match);
+    assert(found && match.route == 0);
+    assert(match.param_count == 1 && param_of(match, "id") == "42");
+
+    // Static text wins over a parameter
+    found = tree.find("/users/me", match);
+    assert(found && match.route == 1);
+    assert(match.param_count == 0);
+
+    // ...but a parameter still matches where the static branch fails
+    found = tree.find("/users/mem", match);
+    assert(found && match.route == 0);
+    assert(param_of(match, "id") == "mem");
+    found = tree.find("/users/me/posts/7", match);
+    assert(found && match.route == 2);
+    assert(param_of(match, "id") == "me" && param_of(match, "post") == "7");
+
+    found = tree.find("/users/", match);
+    assert(!found);
+    found = tree.find("/users/42/posts", match);
+    assert(!found);
+    found = tree.find("/users/42/posts/", match);
+    assert(!found);
+
+    found = tree.find("/files/a/b/c.txt", match);
+    assert(found && match.route == 3);
+    assert(param_of(match, "path") == "a/b/c.txt");
+    found = tree.find("/files/readme", match);
+    assert(found && match.route == 4);
+    found = tree.find("/files/", match);
+    assert(found && match.route == 3);
+    assert(param_of(match, "path").empty());
+    found = tree.find("/users/9/files/x/y", match);
+    assert(found && match.route == 5);
+    assert(param_of(match, "id") == "9" && param_of(match, "") == "x/y");
+
+    // ":name" is the same as "{name}"
+    inserted = tree.insert("/users/:id", 6);
+    assert(!inserted);
+    inserted = tree.insert("/teams/:team/members/:member", 7);
+    assert(inserted);
+    found = tree.find("/teams/red/members/ann", match);
+    assert(found && match.route == 7);
+    assert(param_of(match, "team") == "red" && param_of(match, "member") == "ann");
+
+    std::cout << "  ✓ Parameters and wildcards" << std::endl;
+}
+
+void test_rejected_patterns() {
+    std::cout << "Testing rejected patterns..." << std::endl;
+
+    RouteTree tree;
+    bool inserted = tree.insert("/users/{id}", 0);
+    assert(inserted);
+    inserted = tree.insert("/users/{name}/posts", 1);  // conflicting name
+    assert(!inserted);
+    inserted = tree.insert("/users/{id}", 2);
+    assert(!inserted);
+    inserted = tree.insert("/a/{}", 3);
+    assert(!inserted);
+    inserted = tree.insert("/a/{id", 4);
+    assert(!inserted);
+    inserted = tree.insert("/a/{id}x", 5);
+    assert(!inserted);
+    inserted = tree.insert("/a/*rest/more", 6);
+    assert(!inserted);
+    inserted = tree.insert("/a/*", 7);
+    assert(inserted);
+    inserted = tree.insert("/a/*other", 8);
+    assert(!inserted);
+
+    // Braces inside a segment are plain text
+    inserted = tree.insert("/b/x{y}", 9);
+    assert(inserted);
+    RouteMatch match;
+    bool found = tree.find("/b/x{y}", match);
+    assert(found && match.route == 9);
+
+    std::string many = "/p";
+    for (size_t i = 0; i <= crest::router::kMaxParams; i++) many += "/{p" + std::to_string(i) + "}";
+    inserted = tree.insert(many, 10);
+    assert(!inserted);
+
+    std::cout << "  ✓ Malformed and conflicting patterns rejected" << std::endl;
+}
+
+static std::string dispatch(crest::App& app, const char* method, const char* path) {
+    std::string path_copy = path;
+    crest_request_t req = {0};
+    req.method = const_cast<char*>(method);
+    req.path = &path_copy[0];
+
+    crest_response_t res = {0};
+    res.status = 200;
+    crest::server::dispatch(app.raw(), &req, &res);
+    std::string response;
+    if (res.head) {
+        response.assign(res.head, res.head_length);
+        response.append(res.body, res.body_length);
+    }
+    crest_response_release(&res);
+    return response;
+}
+
+void test_dispatch() {
+    std::cout << "Testing dispatch with path parameters..." << std::endl;
+
+    crest::Config config;
+    config.docs_enabled = false;
+    crest::App app(config);
+    app.get("/users/{id}", [](crest::Request& req, crest::Response& res) {
+        res.text(200, "get " + req.param("id"));
+    });
+    app.del("/users/{id}", [](crest::Request& req, crest::Response& res) {
+        res.text(200, "delete " + req.param("id") + " " + std::to_string(req.params().size()));
+    });
+    app.get("/static/*file", [](crest::Request& req, crest::Response& res) {
+        res.text(200, "file " + req.param("file"));
+    });
+
+    std::string res = dispatch(app, "GET", "/users/42");
+    assert(res.find("get 42") != std::string::npos);
+    res = dispatch(app, "DELETE", "/users/7");
+    assert(res.find("delete 7 1") != std::string::npos);
+    res = dispatch(app, "GET", "/static/css/a%20b.css");
+    assert(res.find("file css/a b.css") != std::string::npos);
+    res = dispatch(app, "PUT", "/users/42");
+    assert(res.find("404") != std::string::npos);
+    res = dispatch(app, "GET", "/nothing");
+    assert(res.find("404") != std::string::npos);
+
+    bool threw = false;
+    try {
+        app.get("/users/{name}", [](crest::Request&, crest::Response&) {});
+    } catch (const crest::Exception&) {
+        threw = true;
+    }
+    assert(threw);
+
+    std::cout << "  ✓ Dispatch binds path parameters" << std::endl;
+}
+
+void test_dispatch_arena() {
+    std::cout << "Testing dispatch with a request arena..." << std::endl;
+
+    crest::Config config;
+    config.docs_enabled = false;
+    crest::App app(config);
+    app.get("/files/*path", [](crest::Request& req, crest::Response& res) {
+        std::string_view path = req.param_view("path");
+        std::string_view method = req.method_view();
+        res.text(200, std::string(method) + " " + std::to_string(path.size()) + " " +
+                          std::string(req.path_view().substr(0, 7)));
+    });
+
+    // Longer than the stack buffer dispatch uses for parameter values
+    std::string path = "/files/" + std::string(1000, 'a');
+    crest::server::Arena arena;
+    crest_request_t req = {0};
+    req.method = const_cast<char*>("GET");
+    req.path = &path[0];
+    req.arena = arena.get();
+
+    crest_response_t res = {0};
+    res.status = 200;
+    res.arena = arena.get();
+    crest::server::dispatch(app.raw(), &req, &res);
+    assert(std::string(res.body, res.body_length) == "GET 1000 /files/");
+
+    const char* value = crest_request_get_param(&req, "path");
+    const crest_arena_t* a = arena.get();
+    assert(value >= a->base && value < a->base + a->size);
+    assert(res.head >= a->base && res.head < a->base + a->size);
+    assert(res.body >= a->base && res.body < a->base + a->size);
+
+    crest_response_release(&res);
+    arena.reset();
+
+    std::cout << "  ✓ Parameter values and the response come from the arena" << std::endl;
+}
+
+void test_concurrent_registration() {
+    std::cout << "Testing registration while requests are dispatched..." << std::endl;
+
+    crest::Config config;
+    config.docs_enabled = false;
+    crest::App app(config);
+    app.get("/base", [](crest::Request& req, crest::Response& res) {
+        res.text(200, "base");
+    });
+
+    // Readers never block on, or observe a half-built, route table
+    std::atomic<bool> done{false};
+    std::vector<std::thread> readers;
+    for (int t = 0; t < 4; t++) {
+        readers.emplace_back([&] {
+            while (!done.load()) {
+                std::string base = dispatch(app, "GET", "/base");
+                assert(base.find("base") != std::string::npos);
+                std::string late = dispatch(app, "GET", "/r/199/x");
+                assert(late.find("404") != std::string::npos || late.find("r 199 x") != std::string::npos);
+            }
+        });
+    }
+    for (int i = 0; i < 200; i++) {
+        app.get("/r/" + std::to_string(i) + "/{v}", [i](crest::Request& req, crest::Response& res) {
+            res.text(200, "r " + std::to_string(i) + " " + req.param("v"));
+        });
+    }
+    done = true;
+    for (auto& reader : readers) reader.join();
+
+    std::string res = dispatch(app, "GET", "/r/199/x");
+    assert(res.find("r 199 x") != std::string::npos);
+    res = dispatch(app, "GET", "/r/0/y");
+    assert(res.find("r 0 y") != std::string::npos);
+
+    std::cout << "  ✓ Concurrent registration and lookup" << std::endl;
+}
+
+static void noop(crest_request_t*, crest_response_t*) {}
+
+void test_route_publishing() {
+    std::cout << "Testing route table publishing..." << std::endl;
+    using crest::router::RouteTable;
+
+    crest_app_t* app = crest_create();
+    auto* table = static_cast<RouteTable*>(app->route_table);
+
+    // Registration only marks the table; the next lookup publishes once
+    for (int i = 0; i < 1000; i++) {
+        crest_route(app, CREST_GET, ("/many/" + std::to_string(i)).c_str(), noop, "");
+    }
+    const crest::router::RouteSnapshot* first;
+    {
+        RouteTable::Reader reader = table->read();
+        assert(reader->targets.size() == 1000);
+        first = &*reader;
+    }
+    {
+        RouteTable::Reader reader = table->read();
+        assert(&*reader == first);
+    }
+
+    // A full reader count waits for a reader to let go instead of
+    // carrying into the snapshot pointer
+    std::vector<std::unique_ptr<RouteTable::Reader>> held;
+    for (int i = 0; i < 65535; i++) held.emplace_back(new RouteTable::Reader(table->read()));
+    std::atomic<bool> read{false};
+    std::thread late([&] {
+        RouteTable::Reader reader = table->read();
+        assert(&*reader == first && reader->targets.size() == 1000);
+        read = true;
+    });
+    std::this_thread::sleep_for(std::chrono::milliseconds(50));
+    assert(!read.load());
+    held.pop_back();
+    late.join();
+    assert(read.load());
+    held.clear();
+
+    crest_route(app, CREST_GET, "/after", noop, "");
+    {
+        RouteTable::Reader reader = table->read();
+        assert(reader->targets.size() == 1001);
+    }
+    crest_destroy(app);
+
+    std::cout << "  ✓ Published once per change, reader count saturates safely" << std::endl;
+}
+
+int main() {
+    std::cout << "\n=== Router Tests ===" << std::endl;
+    crest::App::set_logging_enabled(false);
+
+    test_static_routes();
+    test_parameters();
+    test_rejected_patterns();
+    test_dispatch();
+    test_dispatch_arena();
+    test_concurrent_registration();
+    test_route_publishing();
+
+    std::cout << "\n✅ All router tests passed!" << std::endl;
+    return 0;
+}
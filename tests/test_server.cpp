@@ -0,0 +1,1321 @@
+/**
+ * @file test_server.cpp
+ * @brief End-to-end tests for the HTTP server over loopback sockets
+ */
+
+#include "crest/crest.hpp"
+#include <atomic>
+#include <cassert>
+#include <chrono>
+#include <cstdlib>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <iostream>
+#include <string>
+#include <thread>
+#include <vector>
+#include <zlib.h>
+
+#if defined(_WIN32) || defined(_WIN64)
+    #include <winsock2.h>
+    #include <ws2tcpip.h>
+    #pragma comment(lib, "ws2_32.lib")
+    #define close_socket closesocket
+#else
+    #include <sys/socket.h>
+    #include <netinet/in.h>
+    #include <arpa/inet.h>
+    #include <signal.h>
+    #include <unistd.h>
+    #define close_socket close
+#endif
+
+static int connect_local(int port) {
+    int fd = (int)socket(AF_INET, SOCK_STREAM, 0);
+    struct sockaddr_in addr;
+    memset(&addr, 0, sizeof(addr));
+    addr.sin_family = AF_INET;
+    addr.sin_port = htons((unsigned short)port);
+    addr.sin_addr.s_addr = inet_addr("127.0.0.1");
+    if (connect(fd, (struct sockaddr*)&addr, sizeof(addr)) != 0) {
+        close_socket(fd);
+        return -1;
+    }
+    return fd;
+}
+
+static void send_raw(int fd, const std::string& data) {
+    size_t sent = 0;
+    while (sent < data.size()) {
+        int n = send(fd, data.data() + sent, (int)(data.size() - sent), 0);
+        assert(n > 0);
+        sent += (size_t)n;
+    }
+}
+
+static std::string read_all(int fd) {
+    std::string out;
+    char buf[4096];
+    int n;
+    while ((n = recv(fd, buf, sizeof(buf), 0)) > 0) {
+        out.append(buf, (size_t)n);
+    }
+    return out;
+}
+
+/**
+ * @brief Read one response framed by Content-Length; leftover bytes stay in buffer
+ */
+static std::string read_response(int fd, std::string& buffer) {
+    char buf[4096];
+    while (true) {
+        size_t header_end = buffer.find("\r\n\r\n");
+        if (header_end != std::string::npos) {
+            size_t body_len = 0;
+            size_t cl = buffer.find("Content-Length: ");
+            if (cl != std::string::npos && cl < header_end) {
+                body_len = std::stoul(buffer.substr(cl + 16));
+            }
+            size_t total = header_end + 4 + body_len;
+            if (buffer.size() >= total) {
+                std::string response = buffer.substr(0, total);
+                buffer.erase(0, total);
+                return response;
+            }
+        }
+        int n = recv(fd, buf, sizeof(buf), 0);
+        if (n <= 0) return "";
+        buffer.append(buf, (size_t)n);
+    }
+}
+
+static std::string request(int port, const std::string& raw) {
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, raw);
+    std::string response = read_all(fd);
+    close_socket(fd);
+    return response;
+}
+
+/**
+ * @brief Runs an app on a background thread for the lifetime of the object
+ */
+class TestServer {
+public:
+    TestServer(crest::App& app, int port) : app_(app), port_(port) {
+        thread_ = std::thread([this] { app_.run("127.0.0.1", port_); });
+        for (int i = 0; i < 250; i++) {
+            int fd = connect_local(port_);
+            if (fd >= 0) {
+                close_socket(fd);
+                return;
+            }
+            std::this_thread::sleep_for(std::chrono::milliseconds(20));
+        }
+        assert(false && "server did not start");
+    }
+
+    ~TestServer() {
+        app_.stop();
+        thread_.join();
+    }
+
+private:
+    crest::App& app_;
+    int port_;
+    std::thread thread_;
+};
+
+static void register_routes(crest::App& app) {
+    app.get("/ping", [](crest::Request& req, crest::Response& res) {
+        res.json(200, R"({"pong":true})");
+    });
+    app.post("/echo", [](crest::Request& req, crest::Response& res) {
+        res.text(200, req.body());
+    });
+    app.post("/delay", [](crest::Request& req, crest::Response& res) {
+        std::string body = req.body();
+        std::this_thread::sleep_for(std::chrono::milliseconds(std::stoi(body)));
+        res.text(200, body);
+    });
+}
+
+static std::string delay_request(int ms, bool close = false) {
+    std::string body = std::to_string(ms);
+    return "POST /delay HTTP/1.1\r\nHost: localhost\r\n" +
+           std::string(close ? "Connection: close\r\n" : "") +
+           "Content-Length: " + std::to_string(body.size()) + "\r\n\r\n" + body;
+}
+
+static std::string body_of(const std::string& response) {
+    size_t pos = response.find("\r\n\r\n");
+    return pos == std::string::npos ? "" : response.substr(pos + 4);
+}
+
+// Decode a gzip or zlib body
+static std::string inflate_body(const std::string& body) {
+    z_stream z{};
+    int rc = inflateInit2(&z, 15 + 32);
+    assert(rc == Z_OK);
+    z.next_in = reinterpret_cast<Bytef*>(const_cast<char*>(body.data()));
+    z.avail_in = static_cast<uInt>(body.size());
+    std::string out;
+    char buffer[65536];
+    do {
+        z.next_out = reinterpret_cast<Bytef*>(buffer);
+        z.avail_out = sizeof(buffer);
+        rc = inflate(&z, Z_NO_FLUSH);
+        assert(rc == Z_OK || rc == Z_STREAM_END);
+        out.append(buffer, sizeof(buffer) - z.avail_out);
+    } while (rc != Z_STREAM_END);
+    inflateEnd(&z);
+    return out;
+}
+
+static void test_basic_requests(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    std::string res = request(port, "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(res.find(R"({"pong":true})") != std::string::npos);
+
+    res = request(port, "GET /missing HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+    assert(res.find("HTTP/1.1 404") == 0);
+
+    res = request(port, "POST /echo HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: 5\r\n\r\nhello");
+    assert(res.find("\r\n\r\nhello") != std::string::npos);
+
+    // Headers set by the handler reach the client, with the status's reason
+    app.post("/created", [](crest::Request&, crest::Response& res) {
+        res.set_header("Location", "/items/1");
+        res.json(crest::Status::CREATED, R"({"id":1})");
+    });
+    res = request(port, "POST /created HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: 0\r\n\r\n");
+    assert(res.find("HTTP/1.1 201 Created\r\n") == 0);
+    assert(res.find("\r\nLocation: /items/1\r\n") != std::string::npos);
+    assert(res.find("\r\nDate: ") != std::string::npos);
+}
+
+static void test_keep_alive(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    std::string buffer;
+
+    for (int i = 0; i < 3; i++) {
+        send_raw(fd, "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n");
+        std::string res = read_response(fd, buffer);
+        assert(res.find("HTTP/1.1 200") == 0);
+        assert(res.find("Connection: keep-alive") != std::string::npos);
+    }
+
+    send_raw(fd, "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+    std::string res = read_response(fd, buffer);
+    assert(res.find("Connection: close") != std::string::npos);
+    std::string rest = read_all(fd);
+    assert(rest.empty());
+    close_socket(fd);
+
+    // HTTP/1.0 closes unless keep-alive is requested
+    fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "GET /ping HTTP/1.0\r\n\r\n");
+    res = read_all(fd);
+    assert(res.find("Connection: close") != std::string::npos);
+    close_socket(fd);
+}
+
+static void test_keep_alive_limits(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    app.set_keep_alive(1, 2);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // Second request reaches max_requests and closes the connection
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    std::string buffer;
+    send_raw(fd, "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n");
+    std::string res = read_response(fd, buffer);
+    assert(res.find("Connection: keep-alive") != std::string::npos);
+    send_raw(fd, "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n");
+    res = read_response(fd, buffer);
+    assert(res.find("Connection: close") != std::string::npos);
+    res = read_all(fd);
+    assert(res.empty());
+    close_socket(fd);
+
+    // Idle connection is closed after the timeout
+    fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n");
+    res = read_response(fd, buffer);
+    assert(res.find("HTTP/1.1 200") == 0);
+    auto start = std::chrono::steady_clock::now();
+    res = read_all(fd);
+    assert(res.empty());
+    auto waited = std::chrono::steady_clock::now() - start;
+    assert(waited >= std::chrono::milliseconds(500));
+    assert(waited < std::chrono::seconds(4));
+    close_socket(fd);
+}
+
+static void test_pipelining(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // Slow first request must not let faster later responses overtake it
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, delay_request(150) + delay_request(0) + delay_request(50) + delay_request(0));
+    std::string buffer;
+    std::string res;
+    for (const char* body : {"150", "0", "50", "0"}) {
+        res = read_response(fd, buffer);
+        assert(body_of(res) == body);
+    }
+
+    // Nothing after "Connection: close" is answered
+    send_raw(fd, delay_request(0, true) + delay_request(0));
+    res = read_response(fd, buffer);
+    assert(res.find("Connection: close") != std::string::npos);
+    res = read_all(fd);
+    assert(res.empty());
+    close_socket(fd);
+}
+
+static void test_pipeline_depth(int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = crest::IoModel::EVENT_LOOP;
+    config.max_pipeline_depth = 1;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // Depth 1 holds the second request until the first is answered
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    auto start = std::chrono::steady_clock::now();
+    send_raw(fd, delay_request(150) + delay_request(150) + delay_request(0, true));
+    std::string buffer;
+    std::string res;
+    for (const char* body : {"150", "150", "0"}) {
+        res = read_response(fd, buffer);
+        assert(body_of(res) == body);
+    }
+    auto elapsed = std::chrono::steady_clock::now() - start;
+    assert(elapsed >= std::chrono::milliseconds(300));
+    res = read_all(fd);
+    assert(res.empty());
+    close_socket(fd);
+}
+
+static void test_silent_handler(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+    app.get("/silent", [](crest::Request&, crest::Response&) {});
+
+    TestServer server(app, port);
+
+    // A handler that writes nothing gets a 500, and the connection closes
+    // rather than letting the next response answer this request
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "GET /silent HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                 "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n");
+    std::string buffer;
+    std::string res = read_response(fd, buffer);
+    assert(res.find("HTTP/1.1 500") == 0);
+    assert(res.find("Connection: close") != std::string::npos);
+    std::string rest = read_all(fd);
+    assert(buffer.empty() && rest.empty());
+    close_socket(fd);
+}
+
+static void test_multiple_acceptors(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.acceptors = 3;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // New connections are spread across the listeners; all of them answer
+    for (int i = 0; i < 30; i++) {
+        std::string res = request(port, "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+        assert(res.find("HTTP/1.1 200") == 0);
+    }
+}
+
+static void test_stop_answers_in_flight(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    std::string res;
+    std::thread client([&] { res = request(port, delay_request(200, true)); });
+    std::this_thread::sleep_for(std::chrono::milliseconds(50));
+    app.stop();
+    client.join();
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(body_of(res) == "200");
+}
+
+static void test_parallel_handlers(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // Two slow handlers overlap instead of queueing behind each other
+    auto start = std::chrono::steady_clock::now();
+    std::string first, second;
+    std::thread a([&] { first = request(port, delay_request(400, true)); });
+    std::thread b([&] { second = request(port, delay_request(400, true)); });
+    a.join();
+    b.join();
+    auto elapsed = std::chrono::steady_clock::now() - start;
+    assert(body_of(first) == "400" && body_of(second) == "400");
+    assert(elapsed < std::chrono::milliseconds(700));
+
+    // Routes registered while serving are picked up
+    app.get("/late/{n}", [](crest::Request& req, crest::Response& res) {
+        res.text(200, "late " + req.param("n"));
+    });
+    std::string res = request(port, "GET /late/7 HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+    assert(body_of(res) == "late 7");
+}
+
+static void test_overload(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.max_queued_requests = 1;
+    config.worker_threads = 2;
+    crest::App app(config);
+    register_routes(app);
+
+    bool threw = false;
+    try {
+        app.pool_stats();
+    } catch (const crest::Exception&) {
+        threw = true;
+    }
+    assert(threw);
+
+    TestServer server(app, port);
+    crest::PoolStats before = app.pool_stats();
+    assert(before.queue_capacity == 1 && before.workers == 2);
+    while (app.pool_stats().queued > 0) {
+        // The startup probe's connection
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    }
+
+    // More slow requests than workers plus queue: the excess is shed
+    size_t clients = before.workers + 4;
+    std::vector<std::string> responses(clients);
+    std::vector<std::thread> threads;
+    for (size_t i = 0; i < clients; i++) {
+        threads.emplace_back([&, i] { responses[i] = request(port, delay_request(400, true)); });
+        std::this_thread::sleep_for(std::chrono::milliseconds(20));
+    }
+    for (auto& thread : threads) thread.join();
+
+    size_t ok = 0, shed = 0;
+    for (const std::string& res : responses) {
+        if (res.find("HTTP/1.1 200") == 0) {
+            ok++;
+        } else {
+            assert(res.find("HTTP/1.1 503") == 0);
+            assert(res.find("Retry-After: 1\r\n") != std::string::npos);
+            assert(body_of(res) == R"({"error":"Service Unavailable"})");
+            shed++;
+        }
+    }
+    assert(ok > 0 && shed > 0);
+
+    crest::PoolStats after = app.pool_stats();
+    assert(after.rejected == shed);
+    assert(after.dropped == 0 && after.blocked == 0);
+    assert(after.queued == 0);
+}
+
+static void test_blocking_overload(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.event_loops = 1;
+    config.worker_threads = 1;
+    config.max_queued_requests = 1;
+    config.overload_policy = crest::OverloadPolicy::BLOCK;
+    crest::App app(config);
+    register_routes(app);
+    app.post("/upload", [](crest::Request& req, crest::Response& res) {
+        char buffer[64];
+        size_t total = 0;
+        size_t n;
+        while ((n = req.read_body(buffer, sizeof(buffer))) > 0) total += n;
+        res.text(200, std::to_string(total));
+    });
+    app.set_body_streaming(crest::Method::POST, "/upload", 1024);
+
+    TestServer server(app, port);
+    while (app.pool_stats().queued > 0) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    }
+
+    // The only worker streams a body that is still arriving
+    int upload = connect_local(port);
+    assert(upload >= 0);
+    send_raw(upload, "POST /upload HTTP/1.1\r\nHost: localhost\r\nContent-Length: 10\r\n\r\nhello");
+    std::this_thread::sleep_for(std::chrono::milliseconds(100));
+
+    // One request fills the queue, the next finds it full. Waiting for
+    // room must not stop the server delivering the rest of the upload.
+    std::vector<std::string> responses(2);
+    std::vector<std::thread> threads;
+    for (size_t i = 0; i < responses.size(); i++) {
+        threads.emplace_back([&, i] { responses[i] = request(port, delay_request(0, true)); });
+        std::this_thread::sleep_for(std::chrono::milliseconds(50));
+    }
+    send_raw(upload, "world");
+    std::string buffer;
+    std::string res = read_response(upload, buffer);
+    assert(body_of(res) == "10");
+    close_socket(upload);
+
+    for (auto& thread : threads) thread.join();
+    for (const std::string& res : responses) assert(res.find("HTTP/1.1 200") == 0);
+    crest::PoolStats stats = app.pool_stats();
+    assert(stats.blocked >= 1 && stats.rejected == 0 && stats.dropped == 0);
+}
+
+static void test_cpu_affinity(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.acceptors = 2;
+    config.cpu_affinity = true;
+    config.worker_threads = 4;
+    config.max_worker_threads = 8;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // Pinned loops and workers serve as before, from either listener
+    for (int i = 0; i < 20; i++) {
+        std::string res = request(port, "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+        assert(res.find("HTTP/1.1 200") == 0);
+    }
+    std::string res = request(port, delay_request(50, true));
+    assert(body_of(res) == "50");
+}
+
+static bool same_allocs(const crest::AllocStats& a, const crest::AllocStats& b) {
+    return a.contexts == b.contexts && a.buffers == b.buffers && a.arena_blocks == b.arena_blocks;
+}
+
+static void test_memory_reuse(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.worker_threads = 1;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+    const std::string ping = "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n";
+
+    // Once the first requests have sized everything, later ones reuse it
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    std::string buffer;
+    std::string res;
+    for (int i = 0; i < 5; i++) {
+        send_raw(fd, ping);
+        res = read_response(fd, buffer);
+        assert(res.find("HTTP/1.1 200") == 0);
+    }
+    crest::AllocStats warm = app.alloc_stats();
+    assert(warm.contexts > 0);
+    for (int i = 0; i < 50; i++) {
+        send_raw(fd, ping);
+        res = read_response(fd, buffer);
+        assert(res.find("HTTP/1.1 200") == 0);
+    }
+    assert(same_allocs(app.alloc_stats(), warm));
+
+    // A request larger than anything before needs bigger buffers
+    std::string body(100000, 'x');
+    send_raw(fd, "POST /echo HTTP/1.1\r\nHost: localhost\r\nContent-Length: " +
+                     std::to_string(body.size()) + "\r\n\r\n" + body);
+    res = read_response(fd, buffer);
+    assert(body_of(res) == body);
+    assert(app.alloc_stats().buffers > warm.buffers);
+    close_socket(fd);
+
+    if (model == crest::IoModel::BLOCKING) {
+        // The single worker's next connection takes over the last one's context
+        request(port, "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+        crest::AllocStats before = app.alloc_stats();
+        for (int i = 0; i < 10; i++) {
+            res = request(port, "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+            assert(res.find("HTTP/1.1 200") == 0);
+        }
+        assert(same_allocs(app.alloc_stats(), before));
+    }
+}
+
+static void test_large_response(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+
+    // Far more than the socket buffers hold, so it goes out in many writes
+    std::string large(4 << 20, ' ');
+    for (size_t i = 0; i < large.size(); i++) large[i] = static_cast<char>('a' + i % 26);
+    app.get("/large", [&large](crest::Request&, crest::Response& res) {
+        res.text(200, large);
+    });
+
+    TestServer server(app, port);
+
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "GET /large HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                 "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n");
+    // Let the server fill the socket before anything is read
+    std::this_thread::sleep_for(std::chrono::milliseconds(100));
+
+    std::string buffer;
+    std::string res = read_response(fd, buffer);
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(res.find("Content-Length: " + std::to_string(large.size()) + "\r\n") != std::string::npos);
+    assert(body_of(res) == large);
+    res = read_response(fd, buffer);
+    assert(body_of(res) == R"({"pong":true})");
+    close_socket(fd);
+}
+
+static std::atomic<int> owned_released{0};
+
+static void release_owned(void* data) {
+    free(data);
+    owned_released++;
+}
+
+static void test_binary_bodies(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+
+    std::vector<std::byte> all_bytes(256);
+    for (size_t i = 0; i < all_bytes.size(); i++) all_bytes[i] = static_cast<std::byte>(i);
+    app.get("/bytes", [&all_bytes](crest::Request&, crest::Response& res) {
+        res.send(200, std::span<const std::byte>(all_bytes), "application/x-bytes");
+    });
+    app.get("/moved", [](crest::Request&, crest::Response& res) {
+        std::string body(1 << 20, '\0');
+        for (size_t i = 0; i < body.size(); i++) body[i] = static_cast<char>(i % 251);
+        res.send_owned(200, std::move(body));
+    });
+    app.get("/owned", [](crest::Request&, crest::Response& res) {
+        char* data = static_cast<char*>(malloc(3));
+        memcpy(data, "a\0b", 3);
+        crest_response_bytes_owned(res.raw(), 200, "text/plain", data, 3, release_owned);
+    });
+
+    TestServer server(app, port);
+    owned_released = 0;
+
+    // Pipelined, so taken and copied bodies share the connection's writes
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "GET /moved HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                 "GET /bytes HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                 "GET /owned HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                 "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\n");
+    std::string buffer;
+    std::string moved = body_of(read_response(fd, buffer));
+    assert(moved.size() == (1u << 20));
+    for (size_t i = 0; i < moved.size(); i++) assert(moved[i] == static_cast<char>(i % 251));
+
+    std::string res = read_response(fd, buffer);
+    assert(res.find("Content-Type: application/x-bytes\r\n") != std::string::npos);
+    std::string bytes = body_of(res);
+    assert(bytes.size() == 256 && memcmp(bytes.data(), all_bytes.data(), 256) == 0);
+
+    res = read_response(fd, buffer);
+    assert(body_of(res) == std::string("a\0b", 3));
+    res = read_response(fd, buffer);
+    assert(body_of(res) == R"({"pong":true})");
+    close_socket(fd);
+
+    // Released once written, which may be just after the client has it
+    for (int i = 0; i < 100 && owned_released == 0; i++) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    }
+    assert(owned_released == 1);
+}
+
+static std::string header_value(const std::string& response, const std::string& name) {
+    size_t at = response.find("\r\n" + name + ": ");
+    if (at == std::string::npos || at > response.find("\r\n\r\n")) return "";
+    at += name.size() + 4;
+    return response.substr(at, response.find("\r\n", at) - at);
+}
+
+static void write_file(const std::filesystem::path& path, const std::string& data) {
+    std::ofstream out(path, std::ios::binary);
+    out.write(data.data(), static_cast<std::streamsize>(data.size()));
+}
+
+static void test_static_files(crest::IoModel model, int port) {
+    namespace fs = std::filesystem;
+    fs::path root = fs::temp_directory_path() / ("crest_static_" + std::to_string(port));
+    fs::remove_all(root);
+    fs::create_directories(root / "sub");
+    write_file(root / "small.txt", "hello static");
+    write_file(root / "sub" / "index.html", "<p>index</p>");
+    write_file(root / "app.js", "console.log(1)");
+    write_file(root / "app.js.gz", "gzip bytes");
+    write_file(root / "app.js.br", "brotli bytes");
+    fs::create_directories(root / ".git");
+    write_file(root / ".git" / "config", "secret");
+    write_file(root / ".env", "secret");
+    // Past the cache limit, so sent from disk
+    std::string large(600 * 1024, '\0');
+    for (size_t i = 0; i < large.size(); i++) large[i] = static_cast<char>(i % 253);
+    write_file(root / "large.bin", large);
+
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+    app.static_dir("/static", root.string());
+    app.static_dir("/dotfiles", root.string(), true);
+    TestServer server(app, port);
+
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    std::string buffer;
+    auto get = [&](const std::string& path, const std::string& headers = "") {
+        send_raw(fd, "GET " + path + " HTTP/1.1\r\nHost: localhost\r\n" + headers + "\r\n");
+        return read_response(fd, buffer);
+    };
+
+    std::string res = get("/static/small.txt");
+    assert(res.find("HTTP/1.1 200 OK\r\n") == 0);
+    assert(body_of(res) == "hello static");
+    assert(header_value(res, "Content-Type") == "text/plain; charset=utf-8");
+    assert(header_value(res, "Accept-Ranges") == "bytes");
+    std::string etag = header_value(res, "ETag");
+    std::string modified = header_value(res, "Last-Modified");
+    assert(etag.size() > 2 && etag.front() == '"' && modified.size() == 29);
+
+    // Validators the client already has
+    res = get("/static/small.txt", "If-None-Match: W/\"other\", " + etag + "\r\n");
+    assert(res.find("HTTP/1.1 304 Not Modified\r\n") == 0);
+    assert(body_of(res).empty() && header_value(res, "ETag") == etag);
+    res = get("/static/small.txt", "If-Modified-Since: " + modified + "\r\n");
+    assert(res.find("HTTP/1.1 304") == 0);
+    res = get("/static/small.txt", "If-None-Match: \"other\"\r\nIf-Modified-Since: " + modified + "\r\n");
+    assert(res.find("HTTP/1.1 200") == 0);
+
+    // Single ranges, from the cache and from disk
+    res = get("/static/small.txt", "Range: bytes=0-4\r\n");
+    assert(res.find("HTTP/1.1 206 Partial Content\r\n") == 0);
+    assert(body_of(res) == "hello" && header_value(res, "Content-Range") == "bytes 0-4/12");
+    res = get("/static/large.bin", "Range: bytes=-3\r\n");
+    assert(body_of(res) == large.substr(large.size() - 3));
+    res = get("/static/large.bin", "Range: bytes=1000-1999\r\n");
+    assert(body_of(res) == large.substr(1000, 1000));
+    res = get("/static/small.txt", "Range: bytes=100-\r\n");
+    assert(res.find("HTTP/1.1 416") == 0 && header_value(res, "Content-Range") == "bytes */12");
+    res = get("/static/small.txt", "Range: bytes=0-1\r\nIf-Range: \"stale\"\r\n");
+    assert(res.find("HTTP/1.1 200") == 0 && body_of(res) == "hello static");
+
+    // The whole large file, then a request behind it on the same connection
+    res = get("/static/large.bin");
+    assert(header_value(res, "Content-Type") == "application/octet-stream");
+    assert(body_of(res) == large);
+    res = get("/ping");
+    assert(body_of(res) == R"({"pong":true})");
+
+    // Precompressed siblings
+    res = get("/static/app.js", "Accept-Encoding: gzip, br\r\n");
+    assert(body_of(res) == "brotli bytes" && header_value(res, "Content-Encoding") == "br");
+    assert(header_value(res, "Content-Type") == "text/javascript; charset=utf-8");
+    res = get("/static/app.js", "Accept-Encoding: gzip, br;q=0\r\n");
+    assert(body_of(res) == "gzip bytes" && header_value(res, "Content-Encoding") == "gzip");
+    res = get("/static/app.js");
+    assert(body_of(res) == "console.log(1)" && header_value(res, "Content-Encoding").empty());
+    assert(header_value(res, "Vary") == "Accept-Encoding");
+
+    // Directories, missing files and paths that leave the root
+    res = get("/static/sub/");
+    assert(body_of(res) == "<p>index</p>");
+    for (const char* path : {"/static/missing.txt", "/static/sub/%2e%2e/%2e%2e/etc/passwd",
+                             "/static//etc/passwd"}) {
+        res = get(path);
+        assert(res.find("HTTP/1.1 404") == 0);
+    }
+
+    // Hidden files, unless the directory is served with dotfiles
+    for (const char* path : {"/static/.env", "/static/.git/config", "/static/%2egit/config"}) {
+        res = get(path);
+        assert(res.find("HTTP/1.1 404") == 0);
+    }
+    res = get("/dotfiles/.git/config");
+    assert(body_of(res) == "secret");
+    close_socket(fd);
+
+    fs::remove_all(root);
+}
+
+static void test_docs_pages(crest::IoModel model, int port) {
+    crest::Config config;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+    // Far more than the old fixed-size page buffers held
+    for (int i = 0; i < 300; i++) {
+        app.get("/generated/route/" + std::to_string(i), [](crest::Request&, crest::Response& res) {
+            res.json(200, "{}");
+        }, "Generated route number " + std::to_string(i));
+    }
+    TestServer server(app, port);
+
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    std::string buffer;
+    auto get = [&](const std::string& path, const std::string& headers = "") {
+        send_raw(fd, "GET " + path + " HTTP/1.1\r\nHost: localhost\r\n" + headers + "\r\n");
+        return read_response(fd, buffer);
+    };
+
+    std::string docs = get("/docs");
+    assert(docs.find("HTTP/1.1 200") == 0);
+    assert(header_value(docs, "Content-Type") == "text/html; charset=utf-8");
+    assert(header_value(docs, "Cache-Control") == "no-cache");
+    assert(body_of(docs).find("/generated/route/299") != std::string::npos);
+    std::string etag = header_value(docs, "ETag");
+    assert(etag.size() == 18 && etag.front() == '"');
+
+    // Unchanged routes: the same page, or 304 for a client that has it
+    std::string again = get("/docs");
+    assert(body_of(again) == body_of(docs) && header_value(again, "ETag") == etag);
+    std::string cached = get("/docs", "If-None-Match: " + etag + "\r\n");
+    assert(cached.find("HTTP/1.1 304") == 0 && body_of(cached).empty());
+
+    std::string openapi = get("/openapi.json");
+    assert(header_value(openapi, "Content-Type") == "application/json");
+    assert(body_of(openapi).find("/generated/route/299") != std::string::npos);
+    std::string openapi_etag = header_value(openapi, "ETag");
+    assert(!openapi_etag.empty() && openapi_etag != etag);
+
+    // A new route, a schema and a title each give a new version
+    app.get("/added", [](crest::Request&, crest::Response& res) { res.json(200, "{}"); });
+    docs = get("/docs", "If-None-Match: " + etag + "\r\n");
+    assert(docs.find("HTTP/1.1 200") == 0 && body_of(docs).find("/added") != std::string::npos);
+    assert(header_value(docs, "ETag") != etag);
+    openapi = get("/openapi.json");
+    assert(header_value(openapi, "ETag") != openapi_etag);
+    etag = header_value(docs, "ETag");
+
+    app.set_request_schema(crest::Method::GET, "/added", "{\"marker\": \"string\"}");
+    docs = get("/docs");
+    assert(body_of(docs).find("marker") != std::string::npos && header_value(docs, "ETag") != etag);
+    etag = header_value(docs, "ETag");
+    app.set_title("Renamed API");
+    docs = get("/docs");
+    assert(body_of(docs).find("Renamed API") != std::string::npos && header_value(docs, "ETag") != etag);
+
+    std::string playground = get("/playground");
+    assert(playground.find("HTTP/1.1 200") == 0);
+    std::string playground_etag = header_value(playground, "ETag");
+    std::string revalidated = get("/playground", "If-None-Match: " + playground_etag + "\r\n");
+    assert(revalidated.find("HTTP/1.1 304") == 0);
+
+    // Clients taking gzip or deflate get the pages compressed once, each
+    // encoding under its own validator
+    etag = header_value(docs, "ETag");
+    std::string zipped = get("/docs", "Accept-Encoding: gzip, deflate\r\n");
+    assert(header_value(zipped, "Content-Encoding") == "gzip");
+    assert(header_value(zipped, "Vary") == "Accept-Encoding");
+    assert(header_value(zipped, "ETag") == etag.substr(0, etag.size() - 1) + "-gzip\"");
+    assert(body_of(zipped).size() < body_of(docs).size() / 4);
+    assert(inflate_body(body_of(zipped)) == body_of(docs));
+    cached = get("/docs", "Accept-Encoding: gzip\r\n");
+    assert(body_of(cached) == body_of(zipped));
+    cached = get("/docs", "Accept-Encoding: gzip\r\nIf-None-Match: " + header_value(zipped, "ETag") + "\r\n");
+    assert(cached.find("HTTP/1.1 304") == 0);
+    cached = get("/docs", "Accept-Encoding: gzip\r\nIf-None-Match: " + etag + "\r\n");
+    assert(cached.find("HTTP/1.1 200") == 0);
+    std::string deflated = get("/playground", "Accept-Encoding: deflate\r\n");
+    assert(header_value(deflated, "Content-Encoding") == "deflate");
+    assert(inflate_body(body_of(deflated)) == body_of(playground));
+    std::string spec = get("/openapi.json", "Accept-Encoding: gzip\r\n");
+    assert(header_value(spec, "Content-Encoding") == "gzip");
+    std::string plain_spec = get("/openapi.json");
+    assert(inflate_body(body_of(spec)) == body_of(plain_spec));
+    close_socket(fd);
+
+    // Concurrent readers all get the same complete page
+    std::string expected = body_of(request(port, "GET /openapi.json HTTP/1.1\r\nConnection: close\r\n\r\n"));
+    std::atomic<int> mismatches{0};
+    std::vector<std::thread> readers;
+    for (int t = 0; t < 4; t++) {
+        readers.emplace_back([&] {
+            for (int i = 0; i < 20; i++) {
+                std::string body = body_of(request(port, "GET /openapi.json HTTP/1.1\r\nConnection: close\r\n\r\n"));
+                if (body != expected) mismatches++;
+            }
+        });
+    }
+    for (auto& reader : readers) reader.join();
+    assert(mismatches == 0);
+}
+
+#if !defined(_WIN32) && !defined(_WIN64)
+static void test_prefork(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.prefork_processes = 2;
+    crest::App app(config);
+    register_routes(app);
+    app.get("/crash", [](crest::Request& req, crest::Response& res) {
+        kill(getpid(), SIGKILL);
+    });
+
+    TestServer server(app, port);
+    const std::string ping = "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n";
+    const std::string crash = "GET /crash HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n";
+
+    // More crashes than workers: only works if the master replaces them
+    for (int i = 0; i < 3; i++) {
+        std::string res = request(port, crash);
+        assert(res.empty());
+        res = request(port, ping);
+        assert(res.find("HTTP/1.1 200") == 0);
+    }
+
+    // SIGHUP restarts the workers without dropping the listener
+    kill(getpid(), SIGHUP);
+    for (int i = 0; i < 5; i++) {
+        std::string res = request(port, ping);
+        assert(res.find("HTTP/1.1 200") == 0);
+    }
+}
+#endif
+
+static void test_request_parsing(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    crest::App app(config);
+    register_routes(app);
+    app.post("/length", [](crest::Request& req, crest::Response& res) {
+        res.text(200, std::to_string(req.body().size()));
+    });
+    app.get("/fields", [](crest::Request& req, crest::Response& res) {
+        res.text(200, req.header("x-token") + "|" + req.header("Accept") + "|" +
+                      req.query("name") + "|" + req.query("tag") + "|" + req.query("Name") + "|" +
+                      std::to_string(req.headers().size()) + "|" + std::to_string(req.queries().size()));
+    });
+
+    TestServer server(app, port);
+
+    // Headers match case-insensitively, query names exactly; values are
+    // percent-decoded and a repeated name keeps its first value
+    std::string res = request(port, "GET /fields?name=J%C3%B6rg+K&tag=a&tag=b&flag HTTP/1.1\r\n"
+                                    "Host: localhost\r\nX-Token:  secret \r\nConnection: close\r\n\r\n");
+    assert(body_of(res) == "secret||J\xC3\xB6rg K|a||3|3");
+
+    // The query string is not part of the route
+    res = request(port, "GET /ping?verbose=1 HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+    assert(res.find("HTTP/1.1 200") == 0);
+
+    // Bodies may contain NUL bytes
+    std::string binary("a\0b", 3);
+    res = request(port, "POST /length HTTP/1.1\r\nConnection: close\r\nContent-Length: 3\r\n\r\n" + binary);
+    assert(body_of(res) == "3");
+
+    res = request(port, "GET /ping HTTP/9\r\n\r\n");
+    assert(res.find("HTTP/1.1 400") == 0);
+    assert(res.find("Connection: close") != std::string::npos);
+
+    std::string headers;
+    for (int i = 0; i < 100; i++) headers += "X-Header: value\r\n";
+    res = request(port, "GET /ping HTTP/1.1\r\n" + headers + "\r\n");
+    assert(res.find("HTTP/1.1 431") == 0);
+
+    res = request(port, "POST /echo HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\n");
+    assert(res.find("HTTP/1.1 501") == 0);
+
+    // A bad request behind a good one still gets the good one answered
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "GET /ping HTTP/1.1\r\nHost: localhost\r\n\r\nBROKEN\r\n\r\n");
+    res = read_all(fd);
+    close_socket(fd);
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(res.find("HTTP/1.1 400") != std::string::npos);
+}
+
+static void test_request_bodies(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.max_body_size = 4 * 1024 * 1024;
+    crest::App app(config);
+    register_routes(app);
+    app.post("/length", [](crest::Request& req, crest::Response& res) {
+        res.text(200, std::to_string(req.body().size()));
+    });
+
+    TestServer server(app, port);
+
+    // A body many receive buffers long
+    std::string big(3 * 1024 * 1024, 'x');
+    std::string res = request(port, "POST /length HTTP/1.1\r\nConnection: close\r\nContent-Length: " +
+                                    std::to_string(big.size()) + "\r\n\r\n" + big);
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(body_of(res) == std::to_string(big.size()));
+
+    std::string chunked = "POST /length HTTP/1.1\r\nConnection: close\r\nTransfer-Encoding: chunked\r\n\r\n";
+    for (int i = 0; i < 200; i++) chunked += "2710\r\n" + std::string(10000, 'y') + "\r\n";
+    res = request(port, chunked + "0\r\n\r\n");
+    assert(body_of(res) == "2000000");
+
+    res = request(port, "POST /echo HTTP/1.1\r\nConnection: close\r\nTransfer-Encoding: chunked\r\n\r\n"
+                        "6\r\nhello \r\n5\r\nworld\r\n0\r\n\r\n");
+    assert(body_of(res) == "hello world");
+
+    // Over the limit: answered from the headers, without sending the body
+    res = request(port, "POST /length HTTP/1.1\r\nContent-Length: 5000000\r\n\r\n");
+    assert(res.find("HTTP/1.1 413") == 0);
+
+    // The body is only sent after "100 Continue"
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    std::string buffer;
+    send_raw(fd, "POST /echo HTTP/1.1\r\nExpect: 100-continue\r\nContent-Length: 5\r\n\r\n");
+    res = read_response(fd, buffer);
+    assert(res.find("HTTP/1.1 100 Continue") == 0);
+    send_raw(fd, "hello");
+    res = read_response(fd, buffer);
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(body_of(res) == "hello");
+    close_socket(fd);
+
+    res = request(port, "POST /echo HTTP/1.1\r\nExpect: 100-continue\r\nContent-Length: 5000000\r\n\r\n");
+    assert(res.find("HTTP/1.1 413") == 0);
+}
+
+static void test_streaming_body(crest::IoModel model, int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = model;
+    config.max_body_size = 1024;
+    crest::App app(config);
+    register_routes(app);
+
+    std::atomic<size_t> received{0};
+    app.post("/ingest", [&received](crest::Request& req, crest::Response& res) {
+        char buffer[4096];
+        size_t n;
+        while ((n = req.read_body(buffer, sizeof(buffer))) > 0) {
+            received += n;
+        }
+        if (req.body_error()) {
+            res.json(req.body_error(), R"({"error":"bad body"})");
+            return;
+        }
+        res.text(200, std::to_string(received.exchange(0)));
+    });
+    app.post("/sum", [](crest::Request& req, crest::Response& res) {
+        unsigned long sum = 0;
+        bool ok = req.read_body([&sum](const char* data, size_t size) {
+            for (size_t i = 0; i < size; i++) sum += (unsigned char)data[i];
+        });
+        res.text(ok ? 200 : 500, std::to_string(sum));
+    });
+    app.post("/skip", [](crest::Request& req, crest::Response& res) {
+        res.text(200, "skipped");
+    });
+    app.post("/small", [](crest::Request& req, crest::Response& res) {
+        res.text(200, req.body());
+    });
+    app.post("/read", [](crest::Request& req, crest::Response& res) {
+        char buffer[3];
+        std::string body;
+        size_t n;
+        while ((n = req.read_body(buffer, sizeof(buffer))) > 0) body.append(buffer, n);
+        res.text(200, body);
+    });
+    app.set_body_streaming(crest::Method::POST, "/ingest", 64 * 1024 * 1024);
+    app.set_body_streaming(crest::Method::POST, "/sum", 64 * 1024 * 1024);
+    app.set_body_streaming(crest::Method::POST, "/skip", 1024 * 1024);
+    app.set_body_streaming(crest::Method::POST, "/small", 100);
+
+    TestServer server(app, port);
+
+    // Far beyond max_body_size, which only applies to buffered routes
+    std::string big(8 * 1024 * 1024, 'x');
+    std::string res = request(port, "POST /ingest HTTP/1.1\r\nConnection: close\r\nContent-Length: " +
+                                    std::to_string(big.size()) + "\r\n\r\n" + big);
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(body_of(res) == std::to_string(big.size()));
+
+    std::string chunked = "POST /sum HTTP/1.1\r\nConnection: close\r\nTransfer-Encoding: chunked\r\n\r\n";
+    for (int i = 0; i < 200; i++) chunked += "2710\r\n" + std::string(10000, '\x01') + "\r\n";
+    res = request(port, chunked + "0\r\n\r\n");
+    assert(body_of(res) == "2000000");
+
+    // The handler gets the first part before the client sends the rest
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "POST /ingest HTTP/1.1\r\nConnection: close\r\nContent-Length: 2000\r\n\r\n" +
+                 std::string(1000, 'a'));
+    for (int i = 0; i < 200 && received < 1000; i++) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    }
+    assert(received == 1000);
+    send_raw(fd, std::string(1000, 'b'));
+    res = read_all(fd);
+    close_socket(fd);
+    assert(body_of(res) == "2000");
+
+    // An unread body is skipped; the request behind it is still answered
+    fd = connect_local(port);
+    assert(fd >= 0);
+    std::string buffer;
+    send_raw(fd, "POST /skip HTTP/1.1\r\nContent-Length: 300000\r\n\r\n" + std::string(300000, 'z') +
+                 "GET /ping HTTP/1.1\r\nConnection: close\r\n\r\n");
+    res = read_response(fd, buffer);
+    assert(body_of(res) == "skipped");
+    res = read_response(fd, buffer);
+    assert(res.find(R"({"pong":true})") != std::string::npos);
+    close_socket(fd);
+
+    // Buffered routes read through the same API
+    res = request(port, "POST /read HTTP/1.1\r\nConnection: close\r\nContent-Length: 11\r\n\r\nhello world");
+    assert(body_of(res) == "hello world");
+
+    // Limits: per streaming route, from the headers or as chunks arrive
+    res = request(port, "POST /small HTTP/1.1\r\nContent-Length: 101\r\n\r\n");
+    assert(res.find("HTTP/1.1 413") == 0);
+    res = request(port, "POST /small HTTP/1.1\r\nConnection: close\r\nContent-Length: 100\r\n\r\n" +
+                        std::string(100, 's'));
+    assert(body_of(res) == std::string(100, 's'));
+    res = request(port, "POST /small HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                        "50\r\n" + std::string(80, 's') + "\r\n50\r\n" + std::string(80, 's') + "\r\n0\r\n\r\n");
+    assert(res.find("HTTP/1.1 413") == 0);
+    res = request(port, "POST /ingest HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nabcdeXX");
+    assert(res.find("HTTP/1.1 400") == 0);
+    assert(res.find("Connection: close") != std::string::npos);
+    res = request(port, "POST /echo HTTP/1.1\r\nContent-Length: 2000\r\n\r\n");
+    assert(res.find("HTTP/1.1 413") == 0);
+}
+
+static void test_split_request(int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = crest::IoModel::EVENT_LOOP;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // Headers and body arrive in separate segments
+    int fd = connect_local(port);
+    assert(fd >= 0);
+    send_raw(fd, "POST /echo HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n");
+    std::this_thread::sleep_for(std::chrono::milliseconds(50));
+    send_raw(fd, "Content-Length: 11\r\n\r\nhello ");
+    std::this_thread::sleep_for(std::chrono::milliseconds(50));
+    send_raw(fd, "world");
+    std::string res = read_all(fd);
+    close_socket(fd);
+
+    assert(res.find("HTTP/1.1 200") == 0);
+    assert(res.find("\r\n\r\nhello world") != std::string::npos);
+}
+
+static void test_idle_peers_do_not_block(int port) {
+    crest::Config config;
+    config.docs_enabled = false;
+    config.io_model = crest::IoModel::EVENT_LOOP;
+    crest::App app(config);
+    register_routes(app);
+
+    TestServer server(app, port);
+
+    // More silent connections than there are workers
+    std::vector<int> idle;
+    size_t count = std::thread::hardware_concurrency() * 2 + 4;
+    for (size_t i = 0; i < count; i++) {
+        int fd = connect_local(port);
+        assert(fd >= 0);
+        idle.push_back(fd);
+    }
+
+    std::string res = request(port, "GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n");
+    assert(res.find("HTTP/1.1 200") == 0);
+
+    for (int fd : idle) close_socket(fd);
+}
+
+int main() {
+    std::cout << "\n=== Server Tests ===" << std::endl;
+    crest::App::set_logging_enabled(false);
+
+#if defined(_WIN32) || defined(_WIN64)
+    WSADATA wsa_data;
+    WSAStartup(MAKEWORD(2, 2), &wsa_data);
+#endif
+
+    test_basic_requests(crest::IoModel::BLOCKING, 18901);
+    std::cout << "  ✓ Blocking I/O requests" << std::endl;
+
+    test_basic_requests(crest::IoModel::AUTO, 18902);
+    std::cout << "  ✓ Default I/O requests" << std::endl;
+
+    test_keep_alive(crest::IoModel::BLOCKING, 18905);
+    test_keep_alive(crest::IoModel::AUTO, 18906);
+    std::cout << "  ✓ Persistent connections" << std::endl;
+
+    test_keep_alive_limits(crest::IoModel::BLOCKING, 18907);
+    test_keep_alive_limits(crest::IoModel::AUTO, 18908);
+    std::cout << "  ✓ Keep-alive idle timeout and request limit" << std::endl;
+
+    test_pipelining(crest::IoModel::BLOCKING, 18909);
+    test_pipelining(crest::IoModel::AUTO, 18910);
+    std::cout << "  ✓ Pipelined responses stay in order" << std::endl;
+
+    test_silent_handler(crest::IoModel::BLOCKING, 18941);
+    test_silent_handler(crest::IoModel::AUTO, 18942);
+    std::cout << "  ✓ Handlers that write nothing get a 500" << std::endl;
+
+    test_multiple_acceptors(crest::IoModel::BLOCKING, 18912);
+    test_multiple_acceptors(crest::IoModel::AUTO, 18913);
+    std::cout << "  ✓ Multiple acceptors" << std::endl;
+
+    test_stop_answers_in_flight(crest::IoModel::BLOCKING, 18916);
+    test_stop_answers_in_flight(crest::IoModel::AUTO, 18917);
+    std::cout << "  ✓ Stopping answers in-flight requests" << std::endl;
+
+    test_parallel_handlers(crest::IoModel::BLOCKING, 18924);
+    test_parallel_handlers(crest::IoModel::AUTO, 18925);
+    std::cout << "  ✓ Handlers run in parallel" << std::endl;
+
+    test_overload(crest::IoModel::BLOCKING, 18926);
+    test_overload(crest::IoModel::AUTO, 18927);
+    std::cout << "  ✓ Requests beyond the queue limit are shed" << std::endl;
+
+    test_blocking_overload(crest::IoModel::BLOCKING, 18943);
+    test_blocking_overload(crest::IoModel::AUTO, 18944);
+    std::cout << "  ✓ A full queue under BLOCK does not stall the server" << std::endl;
+
+    test_cpu_affinity(crest::IoModel::BLOCKING, 18928);
+    test_cpu_affinity(crest::IoModel::AUTO, 18929);
+    std::cout << "  ✓ Threads pinned to CPUs" << std::endl;
+
+    test_memory_reuse(crest::IoModel::BLOCKING, 18930);
+    test_memory_reuse(crest::IoModel::AUTO, 18931);
+    std::cout << "  ✓ Request memory is reused" << std::endl;
+
+    test_large_response(crest::IoModel::BLOCKING, 18932);
+    test_large_response(crest::IoModel::AUTO, 18933);
+    std::cout << "  ✓ Large responses written in full" << std::endl;
+
+    test_binary_bodies(crest::IoModel::BLOCKING, 18934);
+    test_binary_bodies(crest::IoModel::AUTO, 18935);
+    std::cout << "  ✓ Binary and handed-over bodies" << std::endl;
+
+    test_static_files(crest::IoModel::BLOCKING, 18936);
+    test_static_files(crest::IoModel::AUTO, 18937);
+    std::cout << "  ✓ Static files, validators, ranges and encodings" << std::endl;
+
+    test_docs_pages(crest::IoModel::BLOCKING, 18938);
+    test_docs_pages(crest::IoModel::AUTO, 18939);
+    std::cout << "  ✓ Docs pages are cached per route version" << std::endl;
+
+    test_request_parsing(crest::IoModel::BLOCKING, 18918);
+    test_request_parsing(crest::IoModel::AUTO, 18919);
+    std::cout << "  ✓ Request parsing and malformed requests" << std::endl;
+
+    test_request_bodies(crest::IoModel::BLOCKING, 18920);
+    test_request_bodies(crest::IoModel::AUTO, 18921);
+    std::cout << "  ✓ Large, chunked and rejected request bodies" << std::endl;
+
+    test_streaming_body(crest::IoModel::BLOCKING, 18922);
+    test_streaming_body(crest::IoModel::AUTO, 18923);
+    std::cout << "  ✓ Streamed request bodies" << std::endl;
+
+#if !defined(_WIN32) && !defined(_WIN64)
+    test_prefork(crest::IoModel::BLOCKING, 18914);
+    test_prefork(crest::IoModel::AUTO, 18915);
+    std::cout << "  ✓ Prefork workers are restarted" << std::endl;
+#endif
+
+#if defined(__linux__)
+    test_pipeline_depth(18911);
+    std::cout << "  ✓ Pipeline depth cap" << std::endl;
+
+    test_split_request(18903);
+    std::cout << "  ✓ Request split across segments" << std::endl;
+
+    test_idle_peers_do_not_block(18904);
+    std::cout << "  ✓ Idle peers do not pin workers" << std::endl;
+#endif
+
+    std::cout << "\n✅ All server tests passed!" << std::endl;
+    return 0;
+}
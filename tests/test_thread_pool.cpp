@@ -0,0 +1,346 @@
+/**
+ * @file test_thread_pool.cpp
+ * @brief Tests for the work-stealing thread pool, its task type, its
+ * queue limit and its sizing
+ */
+
+#include "utils/thread_pool.hpp"
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <cassert>
+#include <chrono>
+#include <iostream>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+static void wait_for(const std::atomic<long>& counter, long expected) {
+    auto deadline = std::chrono::steady_clock::now() + std::chrono::seconds(30);
+    while (counter.load() < expected) {
+        assert(std::chrono::steady_clock::now() < deadline);
+        std::this_thread::yield();
+    }
+}
+
+void test_task() {
+    std::cout << "Testing task storage..." << std::endl;
+
+    int calls = 0;
+    crest::Task small([&calls] { calls++; });
+    crest::Task moved = std::move(small);
+    assert(!small && moved);
+    moved();
+    assert(calls == 1);
+
+    // Too large to store inline: kept on the heap and still moved cheaply
+    std::array<char, crest::Task::kInlineBytes * 2> big{};
+    big[0] = 'x';
+    crest::Task large([&calls, big] { calls += big[0] == 'x' ? 10 : 0; });
+    crest::Task other;
+    other = std::move(large);
+    other();
+    assert(calls == 11);
+
+    // Move-only captures are released with the task
+    auto owned = std::make_shared<int>(7);
+    std::weak_ptr<int> watch = owned;
+    {
+        crest::Task holder([p = std::unique_ptr<int>(new int(1)), owned = std::move(owned)] {});
+        assert(!watch.expired());
+    }
+    assert(watch.expired());
+
+    // Shed tasks run only if they take the flag
+    bool was_shed = false;
+    crest::Task aware([&was_shed](bool shed) { was_shed = shed; });
+    aware.shed();
+    assert(was_shed);
+    crest::Task plain([&calls] { calls++; });
+    plain.shed();
+    assert(calls == 11);
+
+    std::cout << "  ✓ Inline, heap and move-only tasks" << std::endl;
+}
+
+void test_external_submission() {
+    std::cout << "Testing tasks from outside the pool..." << std::endl;
+
+    std::atomic<long> done{0};
+    crest::ThreadPool pool(4);
+    assert(pool.size() == 4);
+
+    std::thread producers[3];
+    for (auto& producer : producers) {
+        producer = std::thread([&] {
+            for (int i = 0; i < 10000; i++) pool.enqueue([&done] { done++; });
+        });
+    }
+    for (auto& producer : producers) producer.join();
+    wait_for(done, 30000);
+    assert(pool.pending_tasks() == 0);
+
+    std::cout << "  ✓ All externally submitted tasks ran" << std::endl;
+}
+
+void test_nested_submission() {
+    std::cout << "Testing tasks enqueued by tasks..." << std::endl;
+
+    std::atomic<long> done{0};
+    std::atomic<int> busy{0};
+    std::atomic<int> most_busy{0};
+    crest::ThreadPool pool(4);
+
+    // One root fans out; idle workers must steal to share the load
+    pool.enqueue([&] {
+        for (int i = 0; i < 400; i++) {
+            pool.enqueue([&] {
+                int now = ++busy;
+                int seen = most_busy.load();
+                while (now > seen && !most_busy.compare_exchange_weak(seen, now)) {}
+                std::this_thread::sleep_for(std::chrono::microseconds(200));
+                busy--;
+                done++;
+            });
+        }
+    });
+    wait_for(done, 400);
+    assert(most_busy.load() > 1);
+
+    std::cout << "  ✓ Work enqueued on one worker spreads to the others" << std::endl;
+}
+
+void test_idle_wakeups() {
+    std::cout << "Testing wakeups after the pool goes idle..." << std::endl;
+
+    std::atomic<long> done{0};
+    crest::ThreadPool pool(8);
+    for (int round = 1; round <= 50; round++) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(1));
+        for (int i = 0; i < round; i++) pool.enqueue([&done] { done++; });
+        wait_for(done, static_cast<long>(round) * (round + 1) / 2);
+    }
+
+    std::cout << "  ✓ Sleeping workers pick up new tasks" << std::endl;
+}
+
+void test_drain_on_destroy() {
+    std::cout << "Testing destruction drains queued tasks..." << std::endl;
+
+    std::atomic<long> done{0};
+    {
+        crest::ThreadPool pool(2);
+        for (int i = 0; i < 1000; i++) {
+            pool.enqueue([&done] {
+                std::this_thread::sleep_for(std::chrono::microseconds(10));
+                done++;
+            });
+        }
+    }
+    assert(done.load() == 1000);
+
+    std::cout << "  ✓ Queued tasks run before the workers exit" << std::endl;
+}
+
+// Occupies the pool's only worker until released
+struct Gate {
+    std::atomic<bool> entered{false};
+    std::atomic<bool> open{false};
+
+    void hold() {
+        entered = true;
+        while (!open.load()) std::this_thread::yield();
+    }
+};
+
+void test_reject_overflow() {
+    std::cout << "Testing a full queue rejects new tasks..." << std::endl;
+
+    Gate gate;
+    std::atomic<long> done{0};
+    std::atomic<long> shed{0};
+    {
+        crest::ThreadPool pool(1, 2, crest::ThreadPool::Overflow::REJECT);
+        bool accepted = pool.enqueue([&gate] { gate.hold(); });
+        assert(accepted);
+        while (!gate.entered.load()) std::this_thread::yield();
+
+        auto task = [&](bool was_shed) { was_shed ? shed++ : done++; };
+        for (int i = 0; i < 4; i++) {
+            accepted = pool.enqueue(task);
+            assert(accepted == (i < 2));
+        }
+
+        crest::ThreadPool::Stats stats = pool.stats();
+        assert(stats.threads == 1 && stats.capacity == 2);
+        assert(stats.queued == 2 && stats.rejected == 2);
+        gate.open = true;
+    }
+    assert(done.load() == 2 && shed.load() == 2);
+
+    std::cout << "  ✓ Tasks beyond the limit are shed" << std::endl;
+}
+
+void test_drop_oldest_overflow() {
+    std::cout << "Testing a full queue drops its oldest task..." << std::endl;
+
+    Gate gate;
+    std::vector<int> ran;
+    std::vector<int> shed;
+    {
+        crest::ThreadPool pool(1, 2, crest::ThreadPool::Overflow::DROP_OLDEST);
+        pool.enqueue([&gate] { gate.hold(); });
+        while (!gate.entered.load()) std::this_thread::yield();
+
+        for (int i = 0; i < 4; i++) {
+            bool accepted = pool.enqueue([&, i](bool was_shed) { (was_shed ? shed : ran).push_back(i); });
+            assert(accepted);
+        }
+        assert(pool.stats().dropped == 2);
+        gate.open = true;
+    }
+    assert((shed == std::vector<int>{0, 1}));
+    assert((ran == std::vector<int>{2, 3}));
+
+    std::cout << "  ✓ The longest-waiting tasks are shed" << std::endl;
+}
+
+void test_block_overflow() {
+    std::cout << "Testing a full queue blocks the submitter..." << std::endl;
+
+    Gate gate;
+    std::atomic<long> done{0};
+    std::atomic<bool> submitted{false};
+    crest::ThreadPool pool(1, 1, crest::ThreadPool::Overflow::BLOCK);
+    pool.enqueue([&gate] { gate.hold(); });
+    while (!gate.entered.load()) std::this_thread::yield();
+    pool.enqueue([&done] { done++; });
+
+    std::thread producer([&] {
+        bool accepted = pool.enqueue([&done] { done++; });
+        assert(accepted);
+        submitted = true;
+    });
+    std::this_thread::sleep_for(std::chrono::milliseconds(50));
+    assert(!submitted.load());
+
+    gate.open = true;
+    producer.join();
+    wait_for(done, 2);
+    assert(pool.stats().blocked == 1);
+
+    // Tasks enqueued by running tasks never wait
+    std::atomic<bool> nested{false};
+    pool.enqueue([&] {
+        for (int i = 0; i < 8; i++) pool.enqueue([&done] { done++; });
+        nested = true;
+    });
+    wait_for(done, 10);
+    assert(nested.load());
+
+    std::cout << "  ✓ Submitters wait for room, tasks on the pool do not" << std::endl;
+}
+
+void test_try_enqueue() {
+    std::cout << "Testing enqueues that must not wait..." << std::endl;
+
+    Gate gate;
+    std::atomic<long> done{0};
+    crest::ThreadPool pool(1, 1, crest::ThreadPool::Overflow::BLOCK);
+    pool.enqueue([&gate] { gate.hold(); });
+    while (!gate.entered.load()) std::this_thread::yield();
+    bool accepted = pool.try_enqueue([&done] { done++; });
+    assert(accepted);
+
+    // Full: refused at once, neither run nor shed, whatever the policy
+    bool shed = false;
+    assert(!pool.has_room());
+    accepted = pool.try_enqueue([&shed](bool dropped) { shed = dropped; });
+    assert(!accepted);
+    assert(!shed && pool.stats().blocked == 1 && pool.stats().rejected == 0);
+
+    gate.open = true;
+    wait_for(done, 1);
+    while (!pool.has_room()) std::this_thread::yield();
+    accepted = pool.try_enqueue([&done] { done++; });
+    assert(accepted);
+    wait_for(done, 2);
+
+    std::cout << "  ✓ Refused when full, accepted once a worker takes a task" << std::endl;
+}
+
+void test_adaptive_size() {
+    std::cout << "Testing a pool that sizes itself..." << std::endl;
+
+    std::mutex events_mutex;
+    std::vector<std::pair<size_t, size_t>> events;
+    crest::ThreadPool::Options options;
+    options.max_threads = 8;
+    options.target_delay = std::chrono::milliseconds(5);
+    options.idle_timeout = std::chrono::milliseconds(100);
+    options.on_resize = [&](size_t from, size_t to, const char*) {
+        std::lock_guard<std::mutex> lock(events_mutex);
+        events.emplace_back(from, to);
+    };
+
+    std::atomic<long> done{0};
+    crest::ThreadPool pool(1, 0, crest::ThreadPool::Overflow::REJECT, options);
+    assert(pool.size() == 1);
+
+    // Tasks that block: one worker would take 1.6 seconds
+    for (int i = 0; i < 80; i++) {
+        pool.enqueue([&done] {
+            std::this_thread::sleep_for(std::chrono::milliseconds(20));
+            done++;
+        });
+    }
+    size_t most = 0;
+    while (done.load() < 80) {
+        most = std::max(most, pool.size());
+        std::this_thread::sleep_for(std::chrono::milliseconds(1));
+    }
+    assert(most > 1 && most <= 8);
+
+    // Idle workers retire down to the minimum
+    auto deadline = std::chrono::steady_clock::now() + std::chrono::seconds(10);
+    while (pool.size() > 1) {
+        assert(std::chrono::steady_clock::now() < deadline);
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    }
+    {
+        std::lock_guard<std::mutex> lock(events_mutex);
+        assert(events.front().first == 1 && events.front().second > 1);
+        assert(events.back().second == 1);
+    }
+
+    // Retired workers' slots are reused
+    for (int i = 0; i < 80; i++) {
+        pool.enqueue([&done] {
+            std::this_thread::sleep_for(std::chrono::milliseconds(20));
+            done++;
+        });
+    }
+    wait_for(done, 160);
+
+    std::cout << "  ✓ Workers are added while tasks wait and retired when idle" << std::endl;
+}
+
+int main() {
+    std::cout << "\n=== Thread Pool Tests ===" << std::endl;
+
+    test_task();
+    test_external_submission();
+    test_nested_submission();
+    test_idle_wakeups();
+    test_drain_on_destroy();
+    test_reject_overflow();
+    test_drop_oldest_overflow();
+    test_block_overflow();
+    test_try_enqueue();
+    test_adaptive_size();
+
+    std::cout << "\n✅ All thread pool tests passed!" << std::endl;
+    return 0;
+}
@@ -9,6 +9,9 @@ set_languages("c17", "cxx20")
 set_optimize("faster")
 set_warnings("all")
 
+-- CompressionMiddleware
+add_requires("zlib")
+
 if is_plat("windows") then
     add_defines("CREST_WINDOWS", "CREST_EXPORT")
     add_cxxflags("/utf-8")
@@ -38,6 +41,7 @@ target("crest")
     add_files("src/utils/*.cpp")
     add_headerfiles("include/(**.h)", "include/(**.hpp)")
     add_includedirs("include", {public = true})
+    add_packages("zlib", {public = true})
     set_targetdir("build/lib")
     
     if is_kind("shared") then
@@ -125,7 +129,7 @@ target("crest_test_middleware")
     set_kind("binary")
     add_files("tests/test_middleware.cpp")
     add_deps("crest")
-    add_includedirs("include")
+    add_includedirs("include", "src")
     set_targetdir("build/tests")
 
 target("crest_test_websocket")
@@ -155,3 +159,140 @@ target("crest_test_template")
     add_deps("crest")
     add_includedirs("include")
     set_targetdir("build/tests")
+
+target("crest_test_server")
+    set_kind("binary")
+    add_files("tests/test_server.cpp")
+    add_deps("crest")
+    add_includedirs("include")
+    set_targetdir("build/tests")
+
+target("crest_test_parser")
+    set_kind("binary")
+    add_files("tests/test_parser.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/tests")
+
+target("crest_test_router")
+    set_kind("binary")
+    add_files("tests/test_router.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/tests")
+
+target("crest_test_thread_pool")
+    set_kind("binary")
+    add_files("tests/test_thread_pool.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/tests")
+
+target("crest_test_affinity")
+    set_kind("binary")
+    add_files("tests/test_affinity.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/tests")
+
+target("crest_test_arena")
+    set_kind("binary")
+    add_files("tests/test_arena.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/tests")
+
+target("crest_test_response")
+    set_kind("binary")
+    add_files("tests/test_response.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/tests")
+
+target("crest_test_openapi")
+    set_kind("binary")
+    add_files("tests/test_openapi.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/tests")
+
+-- Benchmarks (POSIX)
+target("crest_bench_server")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_server.cpp")
+    add_deps("crest")
+    add_includedirs("include")
+    set_targetdir("build/bench")
+
+target("crest_bench_accept")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_accept.cpp")
+    add_deps("crest")
+    add_includedirs("include")
+    set_targetdir("build/bench")
+
+target("crest_bench_parser")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_parser.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/bench")
+
+target("crest_bench_router")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_router.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/bench")
+
+target("crest_bench_thread_pool")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_thread_pool.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/bench")
+
+target("crest_bench_worker_sizing")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_worker_sizing.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/bench")
+
+target("crest_bench_request_allocs")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_request_allocs.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/bench")
+
+target("crest_bench_static_files")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_static_files.cpp")
+    add_deps("crest")
+    add_includedirs("include")
+    set_targetdir("build/bench")
+
+target("crest_bench_openapi")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_openapi.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/bench")
+
+target("crest_bench_compression")
+    set_kind("binary")
+    set_default(false)
+    add_files("benchmarks/bench_compression.cpp")
+    add_deps("crest")
+    add_includedirs("include", "src")
+    set_targetdir("build/bench")